@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import backtrader as bt
+
+
+class EquityCurve(bt.Analyzer):
+    """
+    记录每根bar结束时的账户净值与现金
+    get_analysis() 返回 {"datetime": [...], "value": [...], "cash": [...]}
+    """
+
+    def start(self):
+        self.rets = {"datetime": [], "value": [], "cash": []}
+
+    def next(self):
+        self.rets["datetime"].append(self.data.datetime[0])
+        self.rets["value"].append(self.strategy.broker.getvalue())
+        self.rets["cash"].append(self.strategy.broker.getcash())
+
+    def get_analysis(self):
+        return self.rets
+
+
+class TradeList(bt.Analyzer):
+    """
+    记录所有已平仓交易
+    get_analysis() 返回按列组织的字典, 便于直接构造DataFrame
+    """
+
+    def start(self):
+        self._open_size = {}
+        self.rets = {
+            "open_datetime": [],
+            "close_datetime": [],
+            "size": [],
+            "price": [],
+            "pnl": [],
+            "pnlcomm": [],
+            "commission": [],
+            "barlen": [],
+        }
+
+    def notify_trade(self, trade):
+        if trade.justopened:
+            self._open_size[trade.ref] = trade.size
+            return
+        if not trade.isclosed:
+            return
+        self.rets["open_datetime"].append(trade.dtopen)
+        self.rets["close_datetime"].append(trade.dtclose)
+        # 平仓后 trade.size 为0, 因此使用开仓时记录的数量
+        self.rets["size"].append(self._open_size.pop(trade.ref, 0.0))
+        self.rets["price"].append(trade.price)
+        self.rets["pnl"].append(trade.pnl)
+        self.rets["pnlcomm"].append(trade.pnlcomm)
+        self.rets["commission"].append(trade.commission)
+        self.rets["barlen"].append(trade.barlen)
+
+    def get_analysis(self):
+        return self.rets
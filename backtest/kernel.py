@@ -0,0 +1,795 @@
+# -*- coding: utf-8 -*-
+"""
+编译的单次遍历回测内核: 止损/止盈/跟踪止损/限价与止损单等路径相关的下单逻辑
+
+    entries, exits, start = strategy_signals(SmaCrossStrategy, df, {"maperiod": 20})
+    result = simulate(df, entries, exits, start, stop_loss=0.02, trail=0.03)
+
+    # 多个策略配置一次遍历, 各自独立的broker, 共用的指标只算一次
+    configs = [(SmaCrossStrategy, {"maperiod": p}) for p in range(5, 55)]
+    results = run_strategies(df, configs + [(MacdStrategy, {}), (RsiStrategy, {})])
+
+信号 (每根K线收盘时是否开/平仓) 由指标预先算好, 内核按 backtrader BackBroker 的
+规则逐根撮合, 与 backtrader 中等价写法的策略结果一致 (见 tests/test_kernel.py):
+    - 第 i 根收盘产生的订单从第 i+1 根开始撮合; 市价单以开盘价成交
+    - 限价/止损单按 open/high/low 判断盘中触发: 跳空时以开盘价成交, 否则以挂单价
+    - 入场成交后挂出保护单 (同一OCO组, 依次尝试): 止损 entry*(1-stop_loss),
+      跟踪止损 (初始 close*(1-trail), 每根未成交时按收盘价上移), 止盈 entry*(1+take_profit)
+    - 平仓信号撤销保护单并以市价卖出; 保护单挂出的当根还不能撤销 (backtrader 中
+      仍在 submitted 队列), 这一根的平仓信号被忽略; 有未成交的策略订单时不产生新订单
+      (同 BaseStrategy 的 ``if self.order: return``)
+    - 手续费同 setcommission(commission=...): |size| * commission * price;
+      下单时与成交时现金不足的订单作废 (Margin)
+    - 仓位同 FixedSize(stake) 或 PercentSizer(percents), 只做多
+多个配置 (simulate_many / run_strategies) 在同一个循环里逐根处理: 每根K线依次
+推进各配置的状态, K线数据只遍历一次.
+安装了 numba 时内核与指标编译为机器码 (每秒数百万根K线), 否则以纯Python运行,
+结果相同但慢约两个数量级 (运行时会有一次 warning).
+"""
+
+import itertools
+import logging
+import math
+
+import numpy as np
+import pandas as pd
+
+from backtest.result_store import BacktestResult
+from backtest.runner import normalize_broker, summarize
+from indicators import streaming
+from strategy.base import TRADE_DTYPE
+
+logger = logging.getLogger("backtest")
+
+try:
+    from numba import njit
+
+    HAVE_NUMBA = True
+except ImportError:  # 没有numba时以纯Python运行
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+_warned = False
+
+
+def _warn_pure_python():
+    """没有numba时提示一次: 纯Python的逐根循环比编译后慢约两个数量级"""
+    global _warned
+    if not HAVE_NUMBA and not _warned:
+        _warned = True
+        logger.warning(
+            "numba is not installed: the backtest kernel and its signals run as "
+            "pure Python (about 100x slower). Install it with `pip install numba`."
+        )
+
+
+# 入场订单类型
+MARKET, LIMIT, STOP = 0, 1, 2
+ORDER_TYPES = {"market": MARKET, "limit": LIMIT, "stop": STOP}
+# 仓位计算
+SIZERS = {"FixedSize": 0, "PercentSizer": 1}
+
+NAN = float("nan")
+
+
+@njit(cache=True)
+def _stop_fill(is_buy, trigger, o, h, l):
+    """止损单的成交价, 未触发时为 nan (同 BackBroker._try_exec_stop)"""
+    if is_buy:
+        if o >= trigger:
+            return o
+        if h >= trigger:
+            return trigger
+    else:
+        if o <= trigger:
+            return o
+        if l <= trigger:
+            return trigger
+    return math.nan
+
+
+@njit(cache=True)
+def _limit_fill(is_buy, limit, o, h, l):
+    """限价单的成交价, 未触发时为 nan (同 BackBroker._try_exec_limit)"""
+    if is_buy:
+        if limit >= o:
+            return o
+        if limit >= l:
+            return limit
+    else:
+        if limit <= o:
+            return o
+        if limit <= h:
+            return limit
+    return math.nan
+
+
+@njit(cache=True)
+def _simulate(
+    open_,
+    high,
+    low,
+    close,
+    entries,
+    exits,
+    start,
+    cash0,
+    commission,
+    sizer,
+    stake,
+    entry_type,
+    entry_offset,
+    valid_bars,
+    stop_loss,
+    take_profit,
+    trail,
+):
+    """
+    K 个互不影响的策略一起逐根撮合: 每根K线依次处理各策略, 每个策略有自己的
+    现金/仓位/订单状态. 信号为 (n, K) 数组, 其余参数为长度 K 的数组
+    :return: value (n, K), cash (n, K), trades (m, 9): 策略序号 + TRADE_DTYPE 各列
+    """
+    n = len(close)
+    K = len(start)
+    value = np.empty((n, K))
+    cash_out = np.empty((n, K))
+    # k, open_bar, close_bar, size, price, pnl, pnlcomm, commission, barlen
+    trades = np.zeros((max(16, K * 4), 9))
+    n_trades = 0
+
+    # 各策略的状态, 每根K线开始时读出, 结束时写回
+    cash_k = cash0.copy()
+    pos_k = np.zeros(K)
+    entry_price_k = np.zeros(K)
+    entry_comm_k = np.zeros(K)
+    entry_bar_k = np.zeros(K, np.int64)
+    # 策略的未成交订单: 0 无, 1 入场买单, -1 平仓市价卖单
+    side_k = np.zeros(K, np.int64)
+    order_price_k = np.zeros(K)  # 下单时的价格 (市价单为收盘价)
+    order_size_k = np.zeros(K)
+    order_bar_k = np.zeros(K, np.int64)
+    # 保护单, nan 表示没有
+    sl_price_k = np.full(K, math.nan)
+    trail_price_k = np.full(K, math.nan)
+    tp_price_k = np.full(K, math.nan)
+    protect_from_k = np.zeros(K, np.int64)
+
+    for i in range(n):
+        o = open_[i]
+        h = high[i]
+        l = low[i]
+        c = close[i]
+        for k in range(K):
+            cash = cash_k[k]
+            pos = pos_k[k]
+            side = side_k[k]
+            sl_price = sl_price_k[k]
+            trail_price = trail_price_k[k]
+            tp_price = tp_price_k[k]
+            protect_from = protect_from_k[k]
+            order_price = order_price_k[k]
+            order_size = order_size_k[k]
+            order_bar = order_bar_k[k]
+            sl_pct = stop_loss[k]
+            tp_pct = take_profit[k]
+            trail_pct = trail[k]
+            comm_pct = commission[k]
+
+            # ---------------- broker ----------------
+            if side == 1:
+                if i == order_bar + 1:
+                    # 提交检查: 按下单时的价格计算所需现金
+                    if (
+                        order_size * order_price + order_size * comm_pct * order_price
+                        > cash
+                    ):
+                        side = 0
+                if side == 1 and valid_bars[k] > 0 and i > order_bar + valid_bars[k]:
+                    side = 0  # 过期
+                if side == 1:
+                    if entry_type[k] == MARKET:
+                        price = o
+                    elif entry_type[k] == LIMIT:
+                        price = _limit_fill(True, order_price, o, h, l)
+                    else:
+                        price = _stop_fill(True, order_price, o, h, l)
+                    if price == price:
+                        side = 0
+                        comm = order_size * comm_pct * price
+                        if order_size * price + comm <= cash:
+                            cash -= order_size * price
+                            cash -= comm
+                            pos = order_size
+                            entry_price_k[k] = price
+                            entry_comm_k[k] = comm
+                            entry_bar_k[k] = i
+                            # 保护单在成交的下一根生效
+                            protect_from = i + 1
+                            if sl_pct == sl_pct:
+                                sl_price = price * (1.0 - sl_pct)
+                            if trail_pct == trail_pct:
+                                trail_price = c - c * trail_pct
+                            if tp_pct == tp_pct:
+                                tp_price = price * (1.0 + tp_pct)
+
+            exit_price = math.nan
+            if side == -1:
+                side = 0
+                exit_price = o
+            elif pos > 0 and i >= protect_from:
+                if sl_price == sl_price:
+                    exit_price = _stop_fill(False, sl_price, o, h, l)
+                if exit_price != exit_price and trail_price == trail_price:
+                    exit_price = _stop_fill(False, trail_price, o, h, l)
+                    if exit_price != exit_price:
+                        adjusted = c - c * trail_pct
+                        if adjusted > trail_price:
+                            trail_price = adjusted
+                if exit_price != exit_price and tp_price == tp_price:
+                    exit_price = _limit_fill(False, tp_price, o, h, l)
+
+            if exit_price == exit_price:
+                entry_price = entry_price_k[k]
+                pnl = pos * (exit_price - entry_price)
+                comm = pos * comm_pct * exit_price
+                cash += pos * entry_price + pnl
+                cash -= comm
+                if n_trades == len(trades):
+                    grown = np.zeros((2 * len(trades), 9))
+                    grown[:n_trades] = trades
+                    trades = grown
+                trades[n_trades, 0] = k
+                trades[n_trades, 1] = entry_bar_k[k]
+                trades[n_trades, 2] = i
+                trades[n_trades, 3] = pos
+                trades[n_trades, 4] = entry_price
+                trades[n_trades, 5] = pnl
+                trades[n_trades, 6] = pnl - (entry_comm_k[k] + comm)
+                trades[n_trades, 7] = entry_comm_k[k] + comm
+                trades[n_trades, 8] = i - entry_bar_k[k]
+                n_trades += 1
+                pos = 0.0
+                sl_price = trail_price = tp_price = math.nan
+
+            # ---------------- strategy ----------------
+            if i >= start[k] and side == 0:
+                if pos == 0.0:
+                    if entries[i, k]:
+                        side = 1
+                        order_bar = i
+                        if sizer[k] == 0:
+                            order_size = stake[k]
+                        else:
+                            order_size = cash / c * (stake[k] / 100.0)
+                        if entry_type[k] == LIMIT:
+                            order_price = c * (1.0 - entry_offset[k])
+                        elif entry_type[k] == STOP:
+                            order_price = c * (1.0 + entry_offset[k])
+                        else:
+                            order_price = c
+                elif exits[i, k] and (
+                    protect_from <= i
+                    or not (
+                        sl_pct == sl_pct or tp_pct == tp_pct or trail_pct == trail_pct
+                    )
+                ):
+                    side = -1
+                    sl_price = trail_price = tp_price = math.nan
+
+            value[i, k] = cash + pos * c
+            cash_out[i, k] = cash
+            cash_k[k] = cash
+            pos_k[k] = pos
+            side_k[k] = side
+            sl_price_k[k] = sl_price
+            trail_price_k[k] = trail_price
+            tp_price_k[k] = tp_price
+            protect_from_k[k] = protect_from
+            order_price_k[k] = order_price
+            order_size_k[k] = order_size
+            order_bar_k[k] = order_bar
+
+    return value, cash_out, trades[:n_trades]
+
+
+def simulate(
+    df: pd.DataFrame,
+    entries,
+    exits,
+    start: int = 0,
+    broker: dict = None,
+    entry: str = "market",
+    entry_offset: float = 0.0,
+    valid: int = 0,
+    stop_loss: float = None,
+    take_profit: float = None,
+    trail: float = None,
+) -> BacktestResult:
+    """
+    用编译内核回测一组开/平仓信号
+    :param df: 含 datetime/open/high/low/close 的K线
+    :param entries / exits: 每根K线收盘时的开仓/平仓信号 (bool数组)
+    :param start: 策略开始运行的K线 (指标预热完成, 同 backtrader 的 minperiod)
+    :param broker: broker设置, 见 runner.DEFAULT_BROKER; sizer 支持 FixedSize(stake)
+        与 PercentSizer(percents)
+    :param entry: 入场订单类型 'market' / 'limit' / 'stop'
+    :param entry_offset: 限价单挂在 close*(1-offset), 止损单挂在 close*(1+offset)
+    :param valid: 入场挂单的有效K线数, 0为一直有效
+    :param stop_loss / take_profit / trail: 相对入场价 (跟踪止损相对收盘价) 的比例, None为不设
+    :return: BacktestResult (cerebro 为None)
+    """
+    run = dict(
+        entries=entries,
+        exits=exits,
+        start=start,
+        broker=broker,
+        entry=entry,
+        entry_offset=entry_offset,
+        valid=valid,
+        stop_loss=stop_loss,
+        take_profit=take_profit,
+        trail=trail,
+    )
+    return simulate_many(df, [run])[0]
+
+
+def _run_settings(
+    broker: dict = None,
+    entry: str = "market",
+    entry_offset: float = 0.0,
+    valid: int = 0,
+    stop_loss: float = None,
+    take_profit: float = None,
+    trail: float = None,
+) -> tuple:
+    settings = normalize_broker(broker)
+    if settings["sizer"] not in SIZERS:
+        raise ValueError(f"Unsupported sizer for the kernel: {settings['sizer']}")
+    sizer = SIZERS[settings["sizer"]]
+    sizer_params = settings["sizer_params"]
+    stake = sizer_params.get("stake", 1) if sizer == 0 else sizer_params["percents"]
+    return (
+        float(settings["cash"]),
+        float(settings["commission"]),
+        sizer,
+        float(stake),
+        ORDER_TYPES[entry],
+        float(entry_offset),
+        int(valid),
+        NAN if stop_loss is None else float(stop_loss),
+        NAN if take_profit is None else float(take_profit),
+        NAN if trail is None else float(trail),
+    )
+
+
+def simulate_many(df: pd.DataFrame, runs: list) -> list:
+    """
+    在同一份K线上一次遍历回测多组信号, 各自的现金/仓位/订单互不影响
+    :param runs: 每组一个dict: entries, exits, start (可选) 以及 simulate 的
+        broker / entry / stop_loss ... 参数
+    :return: 与 runs 顺序一致的 BacktestResult 列表
+    """
+    n = len(df)
+    K = len(runs)
+    entries = np.empty((n, K), dtype=np.bool_)
+    exits = np.empty((n, K), dtype=np.bool_)
+    starts = np.empty(K, dtype=np.int64)
+    settings = []
+    for k, run in enumerate(runs):
+        run = dict(run)
+        entries[:, k] = np.asarray(run.pop("entries"), dtype=np.bool_)
+        exits[:, k] = np.asarray(run.pop("exits"), dtype=np.bool_)
+        starts[k] = int(run.pop("start", 0))
+        settings.append(_run_settings(**run))
+    columns = [np.array(c) for c in zip(*settings)] if K else [np.empty(0)] * 10
+
+    def arr(name):
+        return np.ascontiguousarray(df[name].to_numpy(dtype=np.float64))
+
+    _warn_pure_python()
+    value, cash, trades = _simulate(
+        arr("open"),
+        arr("high"),
+        arr("low"),
+        arr("close"),
+        entries,
+        exits,
+        starts,
+        *columns,
+    )
+
+    dt = pd.to_datetime(df["datetime"]).reset_index(drop=True)
+    owner = trades[:, 0].astype(np.int64)
+    results = []
+    for k in range(K):
+        equity = pd.DataFrame(
+            {"datetime": dt.to_numpy(), "value": value[:, k], "cash": cash[:, k]}
+        )
+        rows = trades[owner == k, 1:]
+        columns = {name: rows[:, j] for j, name in enumerate(TRADE_DTYPE.names)}
+        columns["open_datetime"] = dt.iloc[rows[:, 0].astype(np.int64)].to_numpy()
+        columns["close_datetime"] = dt.iloc[rows[:, 1].astype(np.int64)].to_numpy()
+        columns["barlen"] = rows[:, 7].astype(np.int64)
+        trade_df = pd.DataFrame(columns, columns=list(TRADE_DTYPE.names))
+        metrics = summarize(equity, trade_df, settings[k][0])
+        results.append(
+            BacktestResult(key=None, equity=equity, trades=trade_df, metrics=metrics)
+        )
+    return results
+
+
+# ----------------------------------------------------------------------
+# strategy/trendance 策略的信号, 指标用 indicators.streaming (与 backtrader 逐位一致)
+# ----------------------------------------------------------------------
+def _run(indicator, *inputs) -> np.ndarray:
+    """逐根更新流式指标, 返回每根的输出 (多输出的指标为二维数组)"""
+    return np.array([indicator.update(*x) for x in zip(*inputs)], dtype=np.float64)
+
+
+def _crossover(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    bt.indicators.CrossOver: 前一根的非零差值 (NonZeroDifference) 与当前比较
+    """
+    diff = a - b
+    # 差值为0的位置沿用之前最近一个非零差值 (第一根总是取自身)
+    keep = diff != 0.0
+    keep[:1] = True
+    nzd = diff[np.maximum.accumulate(np.where(keep, np.arange(len(diff)), 0))]
+    prev = np.concatenate([[np.nan], nzd[:-1]])
+    with np.errstate(invalid="ignore"):
+        up = (prev < 0) & (a > b)
+        down = (prev > 0) & (a < b)
+    return up.astype(np.int8) - down.astype(np.int8)
+
+
+def _first_valid(*arrays) -> int:
+    """所有数组都有值的第一根 (backtrader 的 minperiod - 1)"""
+    valid = np.logical_and.reduce([a == a for a in arrays])
+    return int(np.argmax(valid)) if valid.any() else len(valid)
+
+
+# ----------------------------------------------------------------------
+# 整列计算的指标: 与 streaming 同样的浮点运算, 结果逐位一致; 递推部分由 numba
+# 编译, 其余用 numpy 向量化. 没有numba时逐根更新 streaming 指标
+# ----------------------------------------------------------------------
+@njit(cache=True)
+def _exact_add(partials, n, x):
+    """把x加入 partials[:n] (Shewchuk 非重叠部分和, 同 math.fsum), 返回新的个数"""
+    i = 0
+    for j in range(n):
+        y = partials[j]
+        if abs(x) < abs(y):
+            x, y = y, x
+        hi = x + y
+        lo = y - (hi - x)
+        if lo != 0.0:
+            partials[i] = lo
+            i += 1
+        x = hi
+    partials[i] = x
+    return i + 1
+
+
+@njit(cache=True)
+def _exact_value(partials, n):
+    """部分和的正确舍入结果 (math.fsum 的最后一步)"""
+    hi = 0.0
+    lo = 0.0
+    if n > 0:
+        n -= 1
+        hi = partials[n]
+        while n > 0:
+            x = hi
+            n -= 1
+            y = partials[n]
+            hi = x + y
+            lo = y - (hi - x)
+            if lo != 0.0:
+                break
+        if n > 0 and (
+            (lo < 0.0 and partials[n - 1] < 0.0) or (lo > 0.0 and partials[n - 1] > 0.0)
+        ):
+            y = lo * 2.0
+            x = hi + y
+            if y == x - hi:
+                hi = x
+    return hi
+
+
+@njit(cache=True)
+def _sma_array(x, period):
+    out = np.full(len(x), np.nan)
+    # 双精度的非重叠部分和最多约40个
+    partials = np.zeros(128)
+    n = 0
+    for i in range(len(x)):
+        if not math.isfinite(x[i]):
+            # 同 streaming.SMA: 部分和里有了 nan 之后一直是 nan
+            return out
+        n = _exact_add(partials, n, x[i])
+        if i >= period:
+            n = _exact_add(partials, n, -x[i - period])
+        if i >= period - 1:
+            out[i] = _exact_value(partials, n) / period
+    return out
+
+
+@njit(cache=True)
+def _ema_array(x, period, alpha):
+    out = np.full(len(x), np.nan)
+    if len(x) < period:
+        return out
+    out[period - 1] = _sma_array(x[:period], period)[period - 1]
+    alpha1 = 1.0 - alpha
+    for i in range(period, len(x)):
+        out[i] = out[i - 1] * alpha1 + x[i] * alpha
+    return out
+
+
+def _movav_array(x: np.ndarray, period: int, movav: str) -> np.ndarray:
+    if movav == "sma":
+        return _sma_array(x, period)
+    alpha = 1.0 / period if movav == "smma" else 2.0 / (1.0 + period)
+    return _ema_array(x, period, alpha)
+
+
+def _updated(valid: np.ndarray, compute, line: np.ndarray) -> np.ndarray:
+    """
+    下游指标只在 valid 的K线上用 line 更新 (streaming 中上游有值时才 update),
+    其余位置为nan
+    """
+    out = np.full(len(line), np.nan)
+    out[valid] = compute(line[valid])
+    return out
+
+
+def _hold(line: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """不 valid 的K线沿用上一根 valid 的值 (streaming 多输出指标的 self.xxx)"""
+    last = np.maximum.accumulate(np.where(valid, np.arange(len(line)), -1))
+    return np.where(last >= 0, line[np.maximum(last, 0)], np.nan)
+
+
+def _macd_lines(
+    x, period_me1: int = 12, period_me2: int = 26, period_signal: int = 9
+) -> np.ndarray:
+    macd = _movav_array(x, period_me1, "ema") - _movav_array(x, period_me2, "ema")
+    valid = macd == macd
+    signal = _updated(valid, lambda m: _movav_array(m, period_signal, "ema"), macd)
+    lines = [macd, signal, macd - signal]
+    return np.column_stack([_hold(line, valid) for line in lines])
+
+
+def _rsi_lines(
+    x,
+    period: int = 14,
+    movav: str = "smma",
+    safediv: bool = False,
+    safehigh: float = 100.0,
+    safelow: float = 50.0,
+    lookback: int = 1,
+) -> np.ndarray:
+    diff = x[lookback:] - x[:-lookback]
+    maup = _movav_array(np.maximum(diff, 0.0), period, movav)
+    madown = _movav_array(np.maximum(-diff, 0.0), period, movav)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = maup / madown
+    if safediv:
+        lowrs = streaming.RSI._rscalc(safelow)
+        highrs = streaming.RSI._rscalc(safehigh)
+        rs = np.where(madown == 0.0, np.where(maup == 0.0, lowrs, highrs), rs)
+    out = np.full(len(x), np.nan)
+    out[lookback:] = _hold(100.0 - 100.0 / (1.0 + rs), maup == maup)
+    return out
+
+
+def _pow(x: np.ndarray, y: float) -> np.ndarray:
+    """
+    逐元素 C pow, 同 backtrader 中 Python 的 x ** y; numpy 会把平方/开平方换成
+    乘法/sqrt, 与 pow 的末位可能不同
+    """
+    return np.fromiter(map(math.pow, x.tolist(), itertools.repeat(y)), np.float64)
+
+
+def _bollinger_lines(x, period: int = 20, devfactor: float = 2.0) -> np.ndarray:
+    mid = _sma_array(x, period)
+    meansq = _sma_array(_pow(x, 2.0), period)
+    std = _pow(np.abs(meansq - _pow(mid, 2.0)), 0.5)
+    dev = devfactor * std
+    lines = [mid, mid + dev, mid - dev]
+    return np.column_stack([_hold(line, std == std) for line in lines])
+
+
+def _extreme(x: np.ndarray, period: int, reduce) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    if len(x) >= period:
+        window = np.lib.stride_tricks.sliding_window_view(x, period)
+        out[period - 1 :] = reduce(window, axis=1)
+    return out
+
+
+def _stochastic_lines(
+    high,
+    low,
+    close,
+    period: int = 14,
+    period_dfast: int = 3,
+    period_dslow: int = 3,
+    safediv: bool = False,
+    safezero: float = 0.0,
+) -> np.ndarray:
+    hh = _extreme(high, period, np.max)
+    ll = _extreme(low, period, np.min)
+    kden = hh - ll
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = (close - ll) / kden
+    if safediv:
+        k = np.where(kden == 0.0, safezero, k)
+    k = 100.0 * k
+    perc_k = _updated(hh == hh, lambda v: _sma_array(v, period_dfast), k)
+    valid = perc_k == perc_k
+    perc_d = _updated(valid, lambda v: _sma_array(v, period_dslow), perc_k)
+    return np.column_stack([_hold(perc_k, valid), _hold(perc_d, valid)])
+
+
+# streaming 指标 -> 整列版本, 参数相同
+ARRAY_INDICATORS = {
+    streaming.SMA: _sma_array,
+    streaming.MACD: _macd_lines,
+    streaming.RSI: _rsi_lines,
+    streaming.BollingerBands: _bollinger_lines,
+    streaming.Stochastic: _stochastic_lines,
+}
+# 只有numba编译后整列版本才更快; 纯Python下逐根更新 streaming 指标
+USE_ARRAYS = HAVE_NUMBA
+
+
+class SignalCache:
+    """
+    同一份K线上的输入列与指标输出; 多个策略配置共用一个实例时, 参数相同的指标
+    (e.g., 多个配置都用到的 SMA(20)) 只计算一次
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._values = {}
+
+    def get(self, key, compute):
+        if key not in self._values:
+            self._values[key] = compute()
+        return self._values[key]
+
+    def column(self, name: str) -> np.ndarray:
+        return self.get(name, lambda: self.df[name].to_numpy(dtype=np.float64))
+
+    def indicator(self, cls, *args, inputs=("close",), **kwargs) -> np.ndarray:
+        """streaming 指标 cls(*args, **kwargs) 在 inputs 列上的逐根输出"""
+        key = (cls.__name__, args, tuple(sorted(kwargs.items())), inputs)
+
+        def compute():
+            columns = [self.column(c) for c in inputs]
+            if USE_ARRAYS and cls in ARRAY_INDICATORS:
+                return ARRAY_INDICATORS[cls](*columns, *args, **kwargs)
+            _warn_pure_python()
+            return _run(cls(*args, **kwargs), *columns)
+
+        return self.get(key, compute)
+
+
+def _sma_cross(data, p):
+    close = data.column("close")
+    sma = data.indicator(streaming.SMA, p.get("maperiod", 15))
+    with np.errstate(invalid="ignore"):
+        return close > sma, close < sma, _first_valid(sma)
+
+
+def _golden_cross(data, p):
+    fast = data.indicator(streaming.SMA, p.get("fast_ma", 50))
+    slow = data.indicator(streaming.SMA, p.get("slow_ma", 200))
+    cross = _crossover(fast, slow)
+    return cross > 0, cross < 0, _first_valid(fast, slow) + 1
+
+
+def _macd(data, p):
+    lines = data.indicator(
+        streaming.MACD,
+        p.get("fast_period", 12),
+        p.get("slow_period", 26),
+        p.get("signal_period", 9),
+    )
+    macd, signal = lines[:, 0], lines[:, 1]
+    cross = _crossover(macd, signal)
+    return cross > 0, cross < 0, _first_valid(macd, signal) + 1
+
+
+def _rsi(data, p):
+    rsi = data.indicator(
+        streaming.RSI, p.get("rsi_period", 14), movav="sma", safediv=True
+    )
+    with np.errstate(invalid="ignore"):
+        return (
+            rsi < p.get("rsi_oversold", 30),
+            rsi > p.get("rsi_overbought", 70),
+            _first_valid(rsi),
+        )
+
+
+def _bollinger(data, p):
+    close = data.column("close")
+    bands = data.indicator(
+        streaming.BollingerBands, p.get("period", 20), p.get("devfactor", 2.0)
+    )
+    with np.errstate(invalid="ignore"):
+        return close < bands[:, 2], close > bands[:, 1], _first_valid(bands[:, 0])
+
+
+def _stochastic(data, p):
+    lines = data.indicator(
+        streaming.Stochastic,
+        p.get("period", 14),
+        period_dslow=p.get("period_d_slow", 3),
+        inputs=("high", "low", "close"),
+    )
+    k, d = lines[:, 0], lines[:, 1]
+    k_prev = np.concatenate([[np.nan], k[:-1]])
+    d_prev = np.concatenate([[np.nan], d[:-1]])
+    upper, lower = p.get("upperband", 80.0), p.get("lowerband", 20.0)
+    with np.errstate(invalid="ignore"):
+        entries = (k_prev < lower) & (d_prev < lower) & (k > d)
+        exits = (k_prev > upper) & (d_prev > upper) & (k < d)
+    return entries, exits, _first_valid(k, d)
+
+
+SIGNALS = {
+    "SmaCrossStrategy": _sma_cross,
+    "GoldenCrossStrategy": _golden_cross,
+    "MacdStrategy": _macd,
+    "RsiStrategy": _rsi,
+    "BollingerBandsStrategy": _bollinger,
+    "StochasticStrategy": _stochastic,
+}
+
+
+def strategy_signals(
+    strategy, df: pd.DataFrame, params: dict = None, cache: SignalCache = None
+) -> tuple:
+    """
+    strategy/trendance 中策略的开/平仓信号
+    :param strategy: 策略类或类名
+    :param cache: 多个配置共用的 SignalCache, 默认为这一次单独计算
+    :return: (entries, exits, start)
+    """
+    name = strategy if isinstance(strategy, str) else strategy.__name__
+    if name not in SIGNALS:
+        raise ValueError(f"No kernel signals for {name}")
+    return SIGNALS[name](cache or SignalCache(df), params or {})
+
+
+def run_strategies(df: pd.DataFrame, configs: list, broker: dict = None) -> list:
+    """
+    多个策略配置在同一份K线上一次回测: 数据只准备一次, 相同的指标只计算一次,
+    撮合在一次遍历中完成, 每个配置有自己的broker (现金/仓位/sizer)
+
+        run_strategies(df, [
+            (SmaCrossStrategy, {"maperiod": 20}),
+            (MacdStrategy, {}, {"broker": {"cash": 50000.0}, "stop_loss": 0.02}),
+        ])
+
+    :param configs: (策略, 参数) 或 (策略, 参数, 选项), 选项为 broker 与
+        simulate 的下单参数 (entry / stop_loss / take_profit / trail ...)
+    :param broker: 没有在选项中指定 broker 的配置使用的broker设置
+    :return: 与 configs 顺序一致的 BacktestResult 列表
+    """
+    cache = SignalCache(df)
+    runs = []
+    for config in configs:
+        strategy, params, options = (tuple(config) + ({},))[:3]
+        entries, exits, start = strategy_signals(strategy, df, params, cache)
+        run = {"broker": broker, **options}
+        run.update(entries=entries, exits=exits, start=start)
+        runs.append(run)
+    return simulate_many(df, runs)
@@ -0,0 +1,599 @@
+# -*- coding: utf-8 -*-
+"""
+模拟盘 (paper trading): 用实时行情或录制/存储的行情驱动策略, 在本地维护的L2订单簿上撮合
+
+    class MyStrategy(PaperStrategy):
+        def on_book(self, event):
+            if ...:
+                self.broker.buy(event.exchange, event.symbol, 0.01)
+
+    engine = PaperEngine(MyStrategy(), PaperBroker(latency=0.05, jitter=0.01))
+    report = asyncio.run(engine.run_live(duration=600))      # 实时 (或 TRANSPORT_MODE=replay)
+    report = engine.run(trade_stream(...), book_stream(...))  # 已存储的行情, 同步回放
+
+撮合规则:
+    - 订单在 下单时刻 + 延迟 (indicators.metrics.order_latency) 到达交易所,
+      用到达时该交易所最新的订单簿撮合; 撤单同样有延迟
+    - 市价单逐档吃单, 订单簿深度不足的部分撤销; 限价单可成交部分按taker成交, 其余挂单
+    - 挂单在对手价穿过挂单价, 或有成交价严格穿过挂单价时按挂单价以maker成交
+    - 手续费由 indicators.metrics.trading_fee 按交易所的 maker/taker 费率计算
+    - 同一快照内被吃掉的深度在下一次快照前不会恢复
+
+每个事件从进入引擎到策略回调返回的耗时都会记录 (LatencyStats), 实时模式还记录
+事件在队列中的等待时间, 用来判断策略在行情高峰时是否跟得上.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable, NamedTuple
+
+from config import WS_EXCHANGES, WS_SYMBOLS
+from backtest.replay import BookEvent, ReplayStrategy, TradeEvent, merge_streams
+from data_fetcher.transport import create_exchange
+from data_processor.symbols import REGISTRY as SYMBOLS
+from indicators.metrics import order_latency, trading_fee
+from utils import instrumentation
+from utils.instrumentation import LatencyStats
+
+logger = logging.getLogger("backtest")
+
+EPSILON = 1e-12
+
+
+def _timestamp(message: dict, client) -> int:
+    """消息的交易所时间戳, 部分交易所的订单簿没有时间戳, 用本地时间代替"""
+    ts = message.get("timestamp")
+    return client.milliseconds() if ts is None else ts
+
+
+class L2Book:
+    """
+    一个交易所一个交易对的订单簿
+    apply 只保存引用, 第一次吃单时才复制被修改的一侧 (写时复制)
+    """
+
+    __slots__ = ("bids", "asks", "timestamp", "_owned")
+
+    def __init__(self):
+        self.bids = []
+        self.asks = []
+        self.timestamp = None
+        self._owned = set()
+
+    def apply(self, bids: list, asks: list, timestamp: int):
+        self.bids = bids
+        self.asks = asks
+        self.timestamp = timestamp
+        self._owned.clear()
+
+    @property
+    def best_bid(self) -> float:
+        return self.bids[0][0] if self.bids else None
+
+    @property
+    def best_ask(self) -> float:
+        return self.asks[0][0] if self.asks else None
+
+    @property
+    def mid(self) -> float:
+        if not self.bids or not self.asks:
+            return None
+        return (self.bids[0][0] + self.asks[0][0]) / 2
+
+    def _levels(self, side: str) -> list:
+        if side not in self._owned:
+            setattr(self, side, [[p, a] for p, a, *_ in getattr(self, side)])
+            self._owned.add(side)
+        return getattr(self, side)
+
+    def take(self, side: int, amount: float, limit: float = None) -> list:
+        """
+        按价格优先吃掉对手盘, 返回 [(price, qty), ...]
+        :param side: 1 = 买 (吃asks), -1 = 卖 (吃bids)
+        :param limit: 限价, None为市价
+        """
+        levels = self._levels("asks" if side > 0 else "bids")
+        fills = []
+        i = 0
+        while amount > EPSILON and i < len(levels):
+            price, size = levels[i]
+            if limit is not None and (price > limit if side > 0 else price < limit):
+                break
+            qty = min(size, amount)
+            fills.append((price, qty))
+            amount -= qty
+            if qty < size:
+                levels[i][1] = size - qty
+            else:
+                i += 1
+        del levels[:i]
+        return fills
+
+
+@dataclass
+class PaperOrder:
+    id: int
+    exchange: str
+    symbol: str
+    side: int  # 1 = 买, -1 = 卖
+    amount: float
+    price: float  # None = 市价单
+    created: float  # 下单时刻 (ms)
+    arrival: float  # 到达交易所的时刻 (ms)
+    status: str = "pending"  # pending -> open -> filled / canceled
+    filled: float = 0.0
+    cost: float = 0.0
+    fee: float = 0.0
+
+    @property
+    def remaining(self) -> float:
+        return self.amount - self.filled
+
+    @property
+    def average(self) -> float:
+        return self.cost / self.filled if self.filled else None
+
+
+class Fill(NamedTuple):
+    timestamp: float
+    order_id: int
+    exchange: str
+    symbol: str
+    side: int
+    amount: float
+    price: float
+    fee: float
+    taker: bool
+
+
+class Position:
+    """
+    单个交易所单个交易对的持仓, 平均成本法计算已实现盈亏
+    """
+
+    __slots__ = ("qty", "avg_price", "realized", "fees")
+
+    def __init__(self):
+        self.qty = 0.0
+        self.avg_price = 0.0
+        self.realized = 0.0
+        self.fees = 0.0
+
+    def apply(self, side: int, amount: float, price: float, fee: float):
+        self.fees += fee
+        qty = self.qty
+        if qty == 0.0 or (qty > 0) == (side > 0):
+            total = abs(qty) + amount
+            self.avg_price = (self.avg_price * abs(qty) + price * amount) / total
+            self.qty = qty + side * amount
+            return
+        closing = min(amount, abs(qty))
+        self.realized += closing * (price - self.avg_price) * (1 if qty > 0 else -1)
+        self.qty = qty + side * amount
+        if abs(self.qty) <= EPSILON:
+            self.qty = 0.0
+            self.avg_price = 0.0
+        elif amount > closing:
+            # 反手, 剩余部分以成交价开仓
+            self.avg_price = price
+
+    def unrealized(self, mark: float) -> float:
+        if not self.qty or mark is None:
+            return 0.0
+        return self.qty * (mark - self.avg_price)
+
+
+class PaperBroker:
+    """
+    模拟撮合与持仓记账, 时间以事件时间戳 (ms) 推进, 每个交易所独立计时
+
+    :param latency: 下单/撤单的固定延迟 (秒)
+    :param jitter: 延迟抖动均值 (秒)
+    :param fee_rates: 覆盖 indicators.metrics.FEE_RATES
+    :param seed: 延迟抖动的随机数种子
+    :param on_fill: 成交回调 on_fill(fill)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        fee_rates: dict = None,
+        seed: int = 0,
+        on_fill=None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.fee_rates = fee_rates
+        self.on_fill = on_fill
+        self._rng = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self.books = {}  # (exchange, symbol) -> L2Book
+        self.last_price = {}  # (exchange, symbol) -> 最新成交价
+        self.positions = {}  # (exchange, symbol) -> Position
+        self.orders = {}  # id -> PaperOrder
+        self.fills = []
+        self._clock = {}  # exchange -> 最新事件时间 (ms)
+        self._inflight = defaultdict(
+            list
+        )  # exchange -> [(arrival, seq, action, order)]
+        self._resting = defaultdict(list)  # (exchange, symbol) -> [PaperOrder]
+
+    # ------------------------------------------------------------------
+    # 下单接口 (策略调用)
+    # ------------------------------------------------------------------
+    def _delay_ms(self) -> float:
+        return order_latency(self.latency, self.jitter, self._rng) * 1000.0
+
+    def submit(
+        self, exchange: str, symbol: str, side: int, amount: float, price: float = None
+    ) -> PaperOrder:
+        now = self._clock.get(exchange, 0)
+        order = PaperOrder(
+            next(self._ids),
+            exchange,
+            symbol,
+            side,
+            amount,
+            price,
+            now,
+            now + self._delay_ms(),
+        )
+        self.orders[order.id] = order
+        heapq.heappush(
+            self._inflight[exchange], (order.arrival, next(self._seq), "new", order)
+        )
+        return order
+
+    def buy(self, exchange: str, symbol: str, amount: float, price: float = None):
+        return self.submit(exchange, symbol, 1, amount, price)
+
+    def sell(self, exchange: str, symbol: str, amount: float, price: float = None):
+        return self.submit(exchange, symbol, -1, amount, price)
+
+    def cancel(self, order_id: int):
+        order = self.orders[order_id]
+        if order.status in ("filled", "canceled"):
+            return
+        arrival = self._clock.get(order.exchange, 0) + self._delay_ms()
+        heapq.heappush(
+            self._inflight[order.exchange], (arrival, next(self._seq), "cancel", order)
+        )
+
+    # ------------------------------------------------------------------
+    # 撮合
+    # ------------------------------------------------------------------
+    def _fill(self, order: PaperOrder, ts: float, qty: float, price: float, taker):
+        fee = trading_fee(price * qty, order.exchange, taker, self.fee_rates)
+        order.filled += qty
+        order.cost += price * qty
+        order.fee += fee
+        if order.remaining <= EPSILON:
+            order.status = "filled"
+        key = (order.exchange, order.symbol)
+        position = self.positions.get(key)
+        if position is None:
+            position = self.positions[key] = Position()
+        position.apply(order.side, qty, price, fee)
+        fill = Fill(
+            ts,
+            order.id,
+            order.exchange,
+            order.symbol,
+            order.side,
+            qty,
+            price,
+            fee,
+            taker,
+        )
+        self.fills.append(fill)
+        if self.on_fill is not None:
+            self.on_fill(fill)
+
+    def _arrive(self, order: PaperOrder, ts: float):
+        key = (order.exchange, order.symbol)
+        book = self.books.get(key)
+        if book is not None:
+            for price, qty in book.take(order.side, order.remaining, order.price):
+                self._fill(order, ts, qty, price, True)
+        if order.status == "filled":
+            return
+        if order.price is None:
+            # 市价单: 深度不足的部分撤销
+            order.status = "canceled"
+        else:
+            order.status = "open"
+            self._resting[key].append(order)
+
+    def _advance(self, exchange: str, ts: float):
+        """处理在 ts 之前到达交易所的订单和撤单"""
+        self._clock[exchange] = ts
+        inflight = self._inflight.get(exchange)
+        while inflight and inflight[0][0] <= ts:
+            arrival, _, action, order = heapq.heappop(inflight)
+            if action == "new":
+                if order.status == "pending":
+                    self._arrive(order, arrival)
+            elif order.status in ("pending", "open"):
+                if order.status == "open":
+                    self._resting[(order.exchange, order.symbol)].remove(order)
+                order.status = "canceled"
+
+    def _match_resting(self, key: tuple, ts: float, book: L2Book = None, trade=None):
+        resting = self._resting.get(key)
+        if not resting:
+            return
+        for order in list(resting):
+            if book is not None:
+                taken = book.take(order.side, order.remaining, order.price)
+                qty = sum(q for _, q in taken)
+            elif (trade.price - order.price) * order.side < 0:
+                qty = trade.amount
+            else:
+                qty = 0.0
+            if qty > EPSILON:
+                self._fill(order, ts, min(qty, order.remaining), order.price, False)
+                if order.status == "filled":
+                    resting.remove(order)
+
+    def on_book(self, event: BookEvent):
+        self._advance(event.exchange, event.timestamp)
+        key = (event.exchange, event.symbol)
+        book = self.books.get(key)
+        if book is None:
+            book = self.books[key] = L2Book()
+        book.apply(event.bids, event.asks, event.timestamp)
+        self._match_resting(key, event.timestamp, book=book)
+
+    def on_trade(self, event: TradeEvent):
+        self._advance(event.exchange, event.timestamp)
+        key = (event.exchange, event.symbol)
+        self.last_price[key] = event.price
+        self._match_resting(key, event.timestamp, trade=event)
+
+    # ------------------------------------------------------------------
+    # 持仓与盈亏
+    # ------------------------------------------------------------------
+    def position(self, exchange: str, symbol: str) -> Position:
+        return self.positions.get((exchange, symbol)) or Position()
+
+    def mark_price(self, exchange: str, symbol: str) -> float:
+        book = self.books.get((exchange, symbol))
+        mid = book.mid if book is not None else None
+        return mid if mid is not None else self.last_price.get((exchange, symbol))
+
+    def pnl(self) -> dict:
+        """
+        按交易所汇总盈亏, 未实现盈亏按订单簿中间价 (没有订单簿时按最新成交价) 计算
+        :return: {exchange: {'realized', 'unrealized', 'fees', 'net'}}
+        """
+        result = {}
+        for (exchange, symbol), pos in self.positions.items():
+            acc = result.setdefault(
+                exchange, {"realized": 0.0, "unrealized": 0.0, "fees": 0.0}
+            )
+            acc["realized"] += pos.realized
+            acc["unrealized"] += pos.unrealized(self.mark_price(exchange, symbol))
+            acc["fees"] += pos.fees
+        for acc in result.values():
+            acc["net"] = acc["realized"] + acc["unrealized"] - acc["fees"]
+        return result
+
+
+class PaperStrategy(ReplayStrategy):
+    """
+    模拟盘策略的基类; 引擎启动前把 broker 赋给 self.broker
+    """
+
+    broker: PaperBroker = None
+
+    def on_fill(self, fill: Fill):
+        pass
+
+
+class PaperEngine:
+    """
+    按事件驱动策略并撮合
+
+    :param strategy: PaperStrategy
+    :param broker: PaperBroker, 默认使用 PaperBroker()
+    :param budget: 单个事件的处理耗时预算 (秒)
+    :param depth: 实时模式下每次保留的订单簿档数
+    """
+
+    def __init__(
+        self,
+        strategy: PaperStrategy,
+        broker: PaperBroker = None,
+        budget: float = 100e-6,
+        depth: int = 20,
+    ):
+        self.strategy = strategy
+        self.broker = broker or PaperBroker()
+        self.broker.on_fill = strategy.on_fill
+        strategy.broker = self.broker
+        self.depth = depth
+        self.latency = LatencyStats(budget)  # 单个事件的处理耗时
+        self.queue_delay = LatencyStats()  # 实时模式: 事件在队列中的等待时间
+        self.events = 0
+        self.busy = 0.0
+        self.elapsed = 0.0
+        self._hist = instrumentation.histogram(
+            "paper_event_seconds",
+            "Paper trading per-event processing time",
+            buckets=(1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2),
+        )
+
+    def process(self, event):
+        """撮合 + 策略回调, 记录耗时"""
+        start = time.perf_counter()
+        if type(event) is TradeEvent:
+            self.broker.on_trade(event)
+            self.strategy.on_trade(event)
+        else:
+            self.broker.on_book(event)
+            self.strategy.on_book(event)
+        spent = time.perf_counter() - start
+        self.latency.observe(spent)
+        self._hist.observe(spent)
+        self.busy += spent
+        self.events += 1
+
+    def run(self, *streams: Iterable) -> dict:
+        """
+        同步回放已存储/录制的事件流 (backtest.replay 的 trade_stream / book_stream),
+        事件的 exchange 字段决定在哪个交易所撮合
+        """
+        self.strategy.on_start()
+        start = time.perf_counter()
+        for event in merge_streams(*streams):
+            self.process(event)
+        self.strategy.on_finish()
+        self.elapsed = time.perf_counter() - start
+        return self.report()
+
+    async def _watch_books(self, client, exchange_id: str, symbol: str, queue):
+        venue = SYMBOLS.venue_symbol(exchange_id, symbol)
+        depth = self.depth
+        while True:
+            try:
+                ob = await client.watch_order_book(venue)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error watching order book on {exchange_id}: {e}")
+                await asyncio.sleep(1)
+                continue
+            # ccxt.pro 会原地更新订单簿, 入队时复制需要的档位
+            event = BookEvent(
+                _timestamp(ob, client),
+                symbol,
+                [level[:2] for level in ob["bids"][:depth]],
+                [level[:2] for level in ob["asks"][:depth]],
+                exchange_id,
+            )
+            queue.put_nowait((time.perf_counter(), event))
+
+    async def _watch_trades(self, client, exchange_id: str, symbol: str, queue):
+        venue = SYMBOLS.venue_symbol(exchange_id, symbol)
+        while True:
+            try:
+                trades = await client.watch_trades(venue)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error watching trades on {exchange_id}: {e}")
+                await asyncio.sleep(1)
+                continue
+            received = time.perf_counter()
+            for t in trades:
+                event = TradeEvent(
+                    _timestamp(t, client),
+                    symbol,
+                    t["price"],
+                    t["amount"],
+                    1 if t.get("side") == "buy" else -1,
+                    t.get("id"),
+                    exchange_id,
+                )
+                queue.put_nowait((received, event))
+
+    async def _consume(self, queue):
+        while True:
+            received, event = await queue.get()
+            self.queue_delay.observe(time.perf_counter() - received)
+            self.process(event)
+
+    async def run_live(
+        self,
+        exchanges=WS_EXCHANGES,
+        symbols=WS_SYMBOLS,
+        duration: float = None,
+        trades: bool = True,
+        **exchange_options,
+    ) -> dict:
+        """
+        订阅实时订单簿 (和逐笔成交) 并驱动策略, 直到 duration 秒后或被取消
+        传输模式由 create_exchange 决定, TRANSPORT_MODE=replay 时回放录制的WebSocket消息
+        :param exchange_options: 传给 create_exchange, e.g., mode='replay', speed=10.0
+        """
+        queue = asyncio.Queue()
+        clients = {
+            ex: create_exchange(ex, pro=True, **exchange_options) for ex in exchanges
+        }
+        tasks = []
+        for exchange_id, client in clients.items():
+            for symbol in symbols:
+                tasks.append(self._watch_books(client, exchange_id, symbol, queue))
+                if trades:
+                    tasks.append(self._watch_trades(client, exchange_id, symbol, queue))
+        tasks = [asyncio.ensure_future(t) for t in tasks]
+        consumer = asyncio.ensure_future(self._consume(queue))
+
+        self.strategy.on_start()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait([consumer], timeout=duration)
+        finally:
+            for task in tasks + [consumer]:
+                task.cancel()
+            await asyncio.gather(*tasks, consumer, return_exceptions=True)
+            for client in clients.values():
+                await client.close()
+            self.elapsed = time.perf_counter() - start
+            self.strategy.on_finish()
+        report = self.report()
+        logger.info(self.format_report(report))
+        return report
+
+    def report(self) -> dict:
+        elapsed = self.elapsed
+        return {
+            "events": self.events,
+            "elapsed": elapsed,
+            "events_per_sec": self.events / elapsed if elapsed > 0 else 0.0,
+            # 处理时间占墙钟时间的比例, 接近1说明策略跟不上行情
+            "utilization": self.busy / elapsed if elapsed > 0 else 0.0,
+            "latency": self.latency.summary(),
+            "queue_delay": self.queue_delay.summary(),
+            "fills": len(self.broker.fills),
+            "pnl": self.broker.pnl(),
+        }
+
+    @staticmethod
+    def format_report(report: dict) -> str:
+        lat = report["latency"]
+        lines = [
+            f"Paper trading: {report['events']} events in {report['elapsed']:.2f}s "
+            f"({report['events_per_sec']:,.0f} events/s, "
+            f"utilization {report['utilization']:.1%}), {report['fills']} fills",
+            "per-event latency (us): "
+            + ", ".join(
+                f"{k} {lat[k] * 1e6:.1f}" for k in ("mean", "p50", "p99", "p999", "max")
+            )
+            + (
+                f", over budget {lat['over_budget']}"
+                if lat["budget"] is not None
+                else ""
+            ),
+        ]
+        if report["queue_delay"]["count"]:
+            q = report["queue_delay"]
+            lines.append(
+                f"queue delay (us): p50 {q['p50'] * 1e6:.1f}, p99 {q['p99'] * 1e6:.1f}, "
+                f"max {q['max'] * 1e6:.1f}"
+            )
+        for exchange, acc in sorted(report["pnl"].items()):
+            lines.append(
+                f"{exchange:<12} realized {acc['realized']:.4f} "
+                f"unrealized {acc['unrealized']:.4f} fees {acc['fees']:.4f} "
+                f"net {acc['net']:.4f}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import heapq
+import logging
+import time
+from typing import Iterable, Iterator, NamedTuple
+
+from config import DATA_ROOT_PATH
+from data_processor.loader import iter_parquet_batches
+
+logger = logging.getLogger("backtest")
+
+TRADE_FIELDS = ["id", "timestamp", "price", "amount", "side"]
+
+
+class TradeEvent(NamedTuple):
+    timestamp: int
+    symbol: str
+    price: float
+    amount: float
+    side: int  # 1 = 主动买, -1 = 主动卖
+    id: int
+    exchange: str = ""
+
+
+class BookEvent(NamedTuple):
+    timestamp: int
+    symbol: str
+    bids: list  # [[price, amount], ...] 价格从高到低
+    asks: list  # [[price, amount], ...] 价格从低到高
+    exchange: str = ""
+
+
+def trade_stream(
+    exchange: str,
+    symbol: str,
+    start_date: str = None,
+    end_date: str = None,
+    data_root: str = DATA_ROOT_PATH,
+    batch_size: int = 262144,
+) -> Iterator[TradeEvent]:
+    """
+    按时间顺序逐笔读取已存储的成交 (由 run_trades_etl 写入)
+    每次只解码一个批次, 内存占用与总成交数无关
+    """
+    for batch in iter_parquet_batches(
+        data_root,
+        "trades",
+        exchange,
+        "tick",
+        symbol,
+        start_date=start_date,
+        end_date=end_date,
+        columns=TRADE_FIELDS,
+        batch_size=batch_size,
+    ):
+        cols = {name: batch.column(name).to_pylist() for name in batch.schema.names}
+        for ts, price, amount, side, tid in zip(
+            cols["timestamp"], cols["price"], cols["amount"], cols["side"], cols["id"]
+        ):
+            yield TradeEvent(ts, symbol, price, amount, side, tid, exchange)
+
+
+def book_stream(
+    snapshots: Iterable[dict], symbol: str, exchange: str = ""
+) -> Iterator[BookEvent]:
+    """
+    把订单簿快照 (ccxt watch_order_book 的输出格式) 转换为BookEvent流
+    """
+    for ob in snapshots:
+        yield BookEvent(ob["timestamp"], symbol, ob["bids"], ob["asks"], exchange)
+
+
+def merge_streams(*streams: Iterable) -> Iterator:
+    """
+    多路归并: 把若干各自有序的事件流合并为一个按时间排序的事件流
+    同一时间戳下保持参数中的流顺序
+    """
+    return heapq.merge(*streams, key=lambda e: e.timestamp)
+
+
+class ReplayStrategy:
+    """
+    事件级回放策略的基类, 按需覆盖回调
+    """
+
+    def on_start(self):
+        pass
+
+    def on_trade(self, event: TradeEvent):
+        pass
+
+    def on_book(self, event: BookEvent):
+        pass
+
+    def on_finish(self):
+        pass
+
+
+class ReplayEngine:
+    """
+    按时间顺序把成交和订单簿事件推送给策略
+
+    用法:
+        engine = ReplayEngine(MyStrategy())
+        engine.run(
+            trade_stream("binance", "BTC/USDT", "2025-10-01", "2025-10-31"),
+            book_stream(snapshots, "BTC/USDT"),
+        )
+    """
+
+    def __init__(self, strategy: ReplayStrategy, log_every: int = 10_000_000):
+        self.strategy = strategy
+        self.log_every = log_every
+        self.events = 0
+        self.elapsed = 0.0
+
+    def run(self, *streams: Iterable) -> dict:
+        """
+        回放所有事件流, 返回统计信息
+        """
+        strategy = self.strategy
+        on_trade = strategy.on_trade
+        on_book = strategy.on_book
+        log_every = self.log_every
+
+        strategy.on_start()
+        start = time.perf_counter()
+        n = 0
+        for event in merge_streams(*streams):
+            if type(event) is TradeEvent:
+                on_trade(event)
+            else:
+                on_book(event)
+            n += 1
+            if n % log_every == 0:
+                rate = n / (time.perf_counter() - start)
+                logger.info(f"Replayed {n} events ({rate:,.0f} events/s)")
+        strategy.on_finish()
+
+        self.events = n
+        self.elapsed = time.perf_counter() - start
+        return {
+            "events": n,
+            "elapsed": self.elapsed,
+            "events_per_sec": n / self.elapsed if self.elapsed > 0 else 0.0,
+        }
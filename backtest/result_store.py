@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from config import RESULTS_ROOT_PATH
+
+logger = logging.getLogger("backtest")
+
+# 不影响回测结果的策略参数, 不参与哈希
+NON_RESULT_PARAMS = {"printlog"}
+
+
+@dataclass
+class BacktestResult:
+    """
+    一次回测的结果
+    equity: 每根bar的净值曲线 (datetime, value, cash)
+    trades: 已平仓交易列表
+    metrics: 汇总指标
+    cerebro: 本次实际运行的Cerebro (命中缓存时为None)
+    profile: 剖析报告 (run_backtest(profile=...) 时才有)
+    """
+
+    key: str
+    equity: pd.DataFrame
+    trades: pd.DataFrame
+    metrics: dict
+    cached: bool = False
+    cerebro: object = field(default=None, repr=False)
+    profile: object = field(default=None, repr=False)
+
+
+def strategy_name(strategy_cls) -> str:
+    return f"{strategy_cls.__module__}.{strategy_cls.__qualname__}"
+
+
+def resolve_params(strategy_cls, params: dict = None) -> dict:
+    """
+    合并策略默认参数与用户参数, 去掉不影响结果的参数
+    """
+    resolved = {}
+    defaults = getattr(strategy_cls, "params", None)
+    if defaults is not None and hasattr(defaults, "_getitems"):
+        resolved.update(dict(defaults._getitems()))
+    resolved.update(params or {})
+    return {k: v for k, v in resolved.items() if k not in NON_RESULT_PARAMS}
+
+
+def run_key(strategy_cls, params: dict, data_fingerprint: str, broker: dict) -> str:
+    """
+    计算一次回测的内容地址: 策略类 + 参数 + 数据指纹 + broker设置
+    相同输入必然得到相同的key, 与参数书写顺序无关
+    """
+    payload = {
+        "strategy": strategy_name(strategy_cls),
+        "params": resolve_params(strategy_cls, params),
+        "data": data_fingerprint,
+        "broker": broker,
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    """
+    内容寻址的回测结果存储
+
+    目录结构:
+        <root>/index.parquet           每次运行一行 (key, 策略, 参数, 数据指纹, broker, 指标)
+        <root>/runs/<key>/equity.parquet
+        <root>/runs/<key>/trades.parquet
+    """
+
+    def __init__(self, root: str = RESULTS_ROOT_PATH):
+        self.root = root
+        self.index_path = os.path.join(root, "index.parquet")
+        self.runs_path = os.path.join(root, "runs")
+        self._index = None
+
+    def _run_dir(self, key: str) -> str:
+        return os.path.join(self.runs_path, key)
+
+    def _load_index(self) -> pd.DataFrame:
+        if self._index is None:
+            if os.path.exists(self.index_path):
+                self._index = pd.read_parquet(self.index_path)
+            else:
+                self._index = pd.DataFrame(columns=["key"])
+        return self._index
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self._run_dir(key), "equity.parquet"))
+
+    def get(self, key: str) -> BacktestResult:
+        """
+        读取缓存的结果, 未命中时返回None
+        """
+        if key not in self:
+            return None
+
+        run_dir = self._run_dir(key)
+        equity = pd.read_parquet(os.path.join(run_dir, "equity.parquet"))
+        trades = pd.read_parquet(os.path.join(run_dir, "trades.parquet"))
+
+        index = self._load_index()
+        row = index[index["key"] == key]
+        metrics = {}
+        if not row.empty:
+            metrics = {
+                c[len("metric_") :]: row.iloc[-1][c]
+                for c in index.columns
+                if c.startswith("metric_")
+            }
+        return BacktestResult(
+            key=key, equity=equity, trades=trades, metrics=metrics, cached=True
+        )
+
+    def put(
+        self,
+        result: BacktestResult,
+        strategy,
+        params: dict,
+        data_fingerprint: str,
+        broker: dict,
+    ):
+        """
+        持久化一次新的回测结果
+        """
+        run_dir = self._run_dir(result.key)
+        os.makedirs(run_dir, exist_ok=True)
+        result.equity.to_parquet(os.path.join(run_dir, "equity.parquet"), index=False)
+        result.trades.to_parquet(os.path.join(run_dir, "trades.parquet"), index=False)
+
+        row = {
+            "key": result.key,
+            "strategy": strategy_name(strategy),
+            "params": json.dumps(
+                resolve_params(strategy, params), sort_keys=True, default=str
+            ),
+            "data_fingerprint": data_fingerprint,
+            "broker": json.dumps(broker, sort_keys=True, default=str),
+            "created_at": datetime.now(timezone.utc),
+        }
+        row.update({f"metric_{k}": v for k, v in result.metrics.items()})
+
+        index = self._load_index()
+        index = index[index["key"] != result.key]
+        new_row = pd.DataFrame([row])
+        index = (
+            new_row if index.empty else pd.concat([index, new_row], ignore_index=True)
+        )
+
+        # 先写临时文件再替换, 避免中断时损坏索引
+        tmp_path = self.index_path + ".tmp"
+        index.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.index_path)
+        self._index = index
+        logger.info(f"Stored backtest result [{result.key[:12]}] in {run_dir}")
+
+    def query(self, strategy: str = None, **metric_filters) -> pd.DataFrame:
+        """
+        查询已存储的运行记录
+        :param strategy: 策略名 (可只写类名)
+        :param metric_filters: 指标下限, e.g., total_return=0.0 表示 total_return >= 0
+        :return: 索引DataFrame
+        """
+        index = self._load_index()
+        if index.empty:
+            return index
+        if strategy:
+            index = index[
+                (index["strategy"] == strategy)
+                | index["strategy"].str.endswith("." + strategy)
+            ]
+        for name, lower in metric_filters.items():
+            index = index[index[f"metric_{name}"] >= lower]
+        return index.reset_index(drop=True)
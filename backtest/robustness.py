@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+稳健性检验: 在成千上万条重采样/扰动的价格路径上运行同一个策略, 看指标的分布
+
+    df = load_from_parquet(DATA_ROOT_PATH, "ohlcv", "binance", "1h", "BTC/USDT",
+                           "2022-10-01", "2025-10-12")
+    paths = run_paths(df, MacdStrategy, method="bootstrap", n_paths=10000, block=48)
+    distribution(paths)                 # 收益/回撤/夏普的分位数
+    shuffle_trades(run_backtest(MacdStrategy, df).trades, 100000.0)
+
+路径生成方法 (PATH_METHODS):
+    bootstrap  收益的循环块自助抽样 (block 根K线为一块, 保留块内的自相关与波动聚集)
+    noise      每根K线的对数收益加上 N(0, sigma * 收益标准差) 的噪声
+    offset     从随机起点截取 length 根原始K线
+K线按 (跳空, 收益, 上影, 下影) 整根重采样再还原为 OHLC, 保证 low <= open/close <= high.
+成交顺序的重排 (shuffle_trades) 直接作用于一次回测的已平仓交易.
+
+策略用 backtest.kernel 的单次遍历内核评估 (与 backtrader 结果一致). 原始K线放在
+共享内存中, 各进程按 (seed, 路径序号) 自己生成路径, 不传输也不同时持有全部路径;
+结果与进程数无关.
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest.kernel import simulate, strategy_signals
+
+logger = logging.getLogger("backtest")
+
+PATH_METRICS = [
+    "total_return",
+    "max_drawdown",
+    "sharpe_per_bar",
+    "n_trades",
+    "win_rate",
+    "final_value",
+]
+
+# 工作进程中挂载的共享数组
+_SHARED = {}
+
+
+def bar_shapes(ohlc: np.ndarray) -> np.ndarray:
+    """
+    每根K线 (第二根起) 的对数 (跳空, 收益, 上影, 下影), 相对前一根收盘价
+    :param ohlc: (n, 4) open/high/low/close
+    :return: (n-1, 4)
+    """
+    o, h, l, c = ohlc.T
+    prev = c[:-1]
+    o, h, l, c = o[1:], h[1:], l[1:], c[1:]
+    return np.column_stack(
+        [
+            np.log(o / prev),
+            np.log(c / prev),
+            np.log(h / np.maximum(o, c)),
+            np.log(np.minimum(o, c) / l),
+        ]
+    )
+
+
+def build_ohlc(first_close: float, shapes: np.ndarray) -> np.ndarray:
+    """bar_shapes 的逆运算: 从起始收盘价与一串K线形状还原 (m, 4) OHLC"""
+    gap, ret, upper, lower = shapes.T
+    close = first_close * np.exp(np.cumsum(ret))
+    prev = np.concatenate([[first_close], close[:-1]])
+    open_ = prev * np.exp(gap)
+    high = np.maximum(open_, close) * np.exp(upper)
+    low = np.minimum(open_, close) * np.exp(-lower)
+    return np.column_stack([open_, high, low, close])
+
+
+def bootstrap_path(ohlc, shapes, rng, block: int = 24, length: int = None):
+    """循环块自助抽样, 路径长度默认与原始数据相同"""
+    n = len(shapes)
+    length = length or n
+    starts = rng.integers(0, n, -(-length // block))
+    idx = (starts[:, None] + np.arange(block)).ravel()[:length] % n
+    return build_ohlc(ohlc[0, 3], shapes[idx])
+
+
+def noise_path(ohlc, shapes, rng, sigma: float = 0.5):
+    """收益加噪声, 噪声标准差为 sigma 倍的收益标准差"""
+    noisy = shapes.copy()
+    noisy[:, 1] += rng.normal(0.0, sigma * shapes[:, 1].std(), len(shapes))
+    return build_ohlc(ohlc[0, 3], noisy)
+
+
+def offset_path(ohlc, shapes, rng, length: int = None):
+    """随机起点的原始K线窗口, length 默认为一半数据"""
+    length = length or len(ohlc) // 2
+    if length >= len(ohlc):
+        raise ValueError(f"length must be shorter than the data ({len(ohlc)} bars)")
+    start = rng.integers(0, len(ohlc) - length + 1)
+    return ohlc[start : start + length]
+
+
+PATH_METHODS = {
+    "bootstrap": bootstrap_path,
+    "noise": noise_path,
+    "offset": offset_path,
+}
+
+
+def path_rng(seed: int, path: int) -> np.random.Generator:
+    """第 path 条路径的随机数 (同 SeedSequence(seed).spawn 的第 path 个)"""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(path,)))
+
+
+def _share(array: np.ndarray):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach(specs: dict):
+    """工作进程初始化: 挂载共享内存中的原始K线"""
+    _SHARED.clear()
+    for key, (name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _SHARED[key] = (shm, np.ndarray(shape, np.dtype(dtype), buffer=shm.buf))
+
+
+def _detach():
+    for key in ("ohlc", "datetime"):
+        shm, _ = _SHARED.pop(key)
+        shm.close()
+    _SHARED.clear()
+
+
+def _evaluate(paths: range, job: dict) -> list:
+    """在当前进程中生成并评估一段路径, 返回每条路径的指标"""
+    ohlc = _SHARED["ohlc"][1]
+    dt = _SHARED["datetime"][1]
+    shapes = _SHARED.get("shapes")
+    if shapes is None:
+        shapes = _SHARED["shapes"] = bar_shapes(ohlc)
+    make_path = PATH_METHODS[job["method"]]
+
+    rows = []
+    for path in paths:
+        prices = make_path(ohlc, shapes, path_rng(job["seed"], path), **job["kwargs"])
+        df = pd.DataFrame(prices, columns=["open", "high", "low", "close"])
+        df.insert(0, "datetime", dt[: len(df)])
+        entries, exits, start = strategy_signals(job["strategy"], df, job["params"])
+        result = simulate(df, entries, exits, start, job["broker"], **job["orders"])
+        row = {"path": path}
+        row.update({k: result.metrics[k] for k in PATH_METRICS})
+        rows.append(row)
+    return rows
+
+
+def run_paths(
+    df: pd.DataFrame,
+    strategy,
+    params: dict = None,
+    broker: dict = None,
+    method: str = "bootstrap",
+    n_paths: int = 1000,
+    seed: int = 0,
+    workers: int = None,
+    orders: dict = None,
+    **method_params,
+) -> pd.DataFrame:
+    """
+    在 n_paths 条生成的价格路径上评估策略
+    :param df: 原始K线 (datetime/open/high/low/close)
+    :param strategy: strategy/trendance 中的策略类或类名 (见 kernel.SIGNALS)
+    :param params / broker: 策略参数与broker设置, 同 run_backtest
+    :param method: PATH_METHODS 中的路径生成方法
+    :param seed: 随机数种子, 相同的种子得到相同的路径
+    :param workers: 进程数, 默认为CPU数; 1 时在当前进程中运行
+    :param orders: 传给 kernel.simulate 的下单设置 (entry / stop_loss / trail ...)
+    :param method_params: 路径生成方法的参数, e.g. block=48, sigma=0.5, length=2000
+    :return: 每条路径一行, 列为 path + PATH_METRICS
+    """
+    if method not in PATH_METHODS:
+        raise ValueError(
+            f"Unknown path method {method!r}, choose from {list(PATH_METHODS)}"
+        )
+    ohlc = np.ascontiguousarray(
+        df[["open", "high", "low", "close"]].to_numpy(dtype=np.float64)
+    )
+    dt = pd.to_datetime(df["datetime"]).to_numpy()
+    job = dict(
+        method=method,
+        seed=seed,
+        kwargs=method_params,
+        strategy=strategy,
+        params=params or {},
+        broker=broker,
+        orders=orders or {},
+    )
+    workers = min(workers or os.cpu_count() or 1, n_paths)
+
+    segments = [_share(ohlc), _share(dt)]
+    try:
+        specs = {"ohlc": segments[0][1], "datetime": segments[1][1]}
+        if workers <= 1:
+            _attach(specs)
+            try:
+                rows = _evaluate(range(n_paths), job)
+            finally:
+                _detach()
+        else:
+            # 每个进程多领几段, 各段耗时不同时也能均衡
+            bounds = np.linspace(0, n_paths, workers * 4 + 1).astype(int)
+            chunks = [range(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+            with ProcessPoolExecutor(
+                workers, initializer=_attach, initargs=(specs,)
+            ) as pool:
+                rows = [
+                    row
+                    for part in pool.map(_evaluate, chunks, [job] * len(chunks))
+                    for row in part
+                ]
+    finally:
+        for shm, _ in segments:
+            shm.close()
+            shm.unlink()
+    logger.info(f"Evaluated {n_paths} {method} paths with {workers} worker(s)")
+    return pd.DataFrame(rows, columns=["path"] + PATH_METRICS)
+
+
+def shuffle_trades(
+    trades: pd.DataFrame, start_cash: float, n_paths: int = 1000, seed: int = 0
+) -> pd.DataFrame:
+    """
+    打乱已平仓交易的先后顺序: 最终收益不变, 看回撤对交易顺序有多敏感
+    :param trades: BacktestResult.trades (使用 pnlcomm 列)
+    :param start_cash: 初始资金
+    :return: 每种顺序一行, 列为 total_return, max_drawdown
+    """
+    pnl = trades["pnlcomm"].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    orders = rng.permuted(np.broadcast_to(pnl, (n_paths, len(pnl))), axis=1)
+    equity = start_cash + np.cumsum(orders, axis=1)
+    equity = np.concatenate([np.full((n_paths, 1), start_cash), equity], axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    return pd.DataFrame(
+        {
+            "total_return": equity[:, -1] / start_cash - 1.0,
+            "max_drawdown": (1.0 - equity / peak).max(axis=1),
+        }
+    )
+
+
+def distribution(
+    paths: pd.DataFrame, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)
+) -> pd.DataFrame:
+    """
+    各指标的均值与分位数, 另加亏损路径的比例
+    """
+    metrics = paths.drop(columns=["path"], errors="ignore")
+    table = metrics.quantile(list(quantiles)).T
+    table.columns = [f"p{round(q * 100)}" for q in quantiles]
+    table.insert(0, "mean", metrics.mean())
+    if "total_return" in metrics:
+        table.loc["total_return", "p_loss"] = (metrics["total_return"] < 0).mean()
+    return table
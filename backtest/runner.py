@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import logging
+import time
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+from backtest.analyzers import EquityCurve, TradeList
+from backtest.result_store import BacktestResult, run_key
+from strategy.base import BaseStrategy
+from utils import instrumentation
+
+logger = logging.getLogger("backtest")
+
+# 与 scripts/ma_strategy.py 中的 setcash / setcommission / FixedSize 设置一致
+DEFAULT_BROKER = {
+    "cash": 100000.0,
+    "commission": 0.01,
+    "sizer": "FixedSize",
+    "sizer_params": {"stake": 0.001},
+}
+
+
+def normalize_broker(broker: dict = None) -> dict:
+    """
+    用默认值补全broker设置, 返回新的字典
+    """
+    settings = dict(DEFAULT_BROKER)
+    if broker:
+        settings.update(broker)
+    settings["sizer_params"] = dict(settings.get("sizer_params") or {})
+    return settings
+
+
+def parse_timeframe(timeframe: str) -> tuple:
+    """
+    把 '1m' / '4h' / '1d' 之类的字符串转换为 (bt.TimeFrame, compression)
+    """
+    units = {
+        "s": (bt.TimeFrame.Seconds, 1),
+        "m": (bt.TimeFrame.Minutes, 1),
+        "h": (bt.TimeFrame.Minutes, 60),
+        "d": (bt.TimeFrame.Days, 1),
+        "w": (bt.TimeFrame.Weeks, 1),
+        "M": (bt.TimeFrame.Months, 1),
+    }
+    n, unit = int(timeframe[:-1] or 1), timeframe[-1]
+    if unit not in units:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    tf, factor = units[unit]
+    return tf, n * factor
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """
+    DataFrame内容的指纹 (当数据不是直接从分区读取时使用)
+    """
+    h = hashlib.sha256()
+    h.update(",".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def build_cerebro(
+    strategy_cls,
+    data,
+    params: dict = None,
+    broker: dict = None,
+    timeframe=bt.TimeFrame.Minutes,
+    compression: int = 1,
+) -> bt.Cerebro:
+    """
+    按照scripts中的约定组装Cerebro
+    :param strategy_cls: 策略类
+    :param data: DataFrame (含'datetime'列) 或已经构造好的backtrader数据源
+    :param params: 策略参数
+    :param broker: broker设置, 见 DEFAULT_BROKER
+    :param timeframe: bt.TimeFrame
+    :param compression: 周期压缩倍数
+    """
+    settings = normalize_broker(broker)
+
+    if isinstance(data, pd.DataFrame):
+        df = data
+        if df["datetime"].dt.tz is not None:
+            df = df.assign(datetime=df["datetime"].dt.tz_localize(None))
+        data = bt.feeds.PandasData(
+            dataname=df,
+            datetime="datetime",
+            timeframe=timeframe,
+            compression=compression,
+        )
+
+    cerebro = bt.Cerebro()
+    cerebro.addstrategy(strategy_cls, **(params or {}))
+    cerebro.adddata(data)
+    cerebro.broker.setcash(settings["cash"])
+    cerebro.addsizer(getattr(bt.sizers, settings["sizer"]), **settings["sizer_params"])
+    cerebro.broker.setcommission(commission=settings["commission"])
+    cerebro.addanalyzer(EquityCurve, _name="equity")
+    # BaseStrategy 自带交易记录 (trade_record), 其余策略用分析器收集
+    if not issubclass(strategy_cls, BaseStrategy):
+        cerebro.addanalyzer(TradeList, _name="trades")
+    return cerebro
+
+
+def trade_frame(strat) -> pd.DataFrame:
+    """
+    已平仓交易 (open/close_datetime 为 backtrader 日期数)
+    """
+    if isinstance(strat, BaseStrategy):
+        return pd.DataFrame(strat.trade_record())
+    return pd.DataFrame(strat.analyzers.trades.get_analysis())
+
+
+def summarize(equity: pd.DataFrame, trades: pd.DataFrame, start_cash: float) -> dict:
+    """
+    根据净值曲线和交易列表计算汇总指标
+    """
+    values = equity["value"].to_numpy(dtype=float)
+    if len(values) == 0:
+        values = np.array([start_cash])
+
+    peak = np.maximum.accumulate(values)
+    drawdown = 1.0 - values / peak
+    rets = np.diff(values) / values[:-1] if len(values) > 1 else np.array([])
+    std = rets.std(ddof=1) if len(rets) > 1 else 0.0
+
+    n_trades = len(trades)
+    return {
+        "start_value": float(start_cash),
+        "final_value": float(values[-1]),
+        "total_return": float(values[-1] / start_cash - 1.0),
+        "max_drawdown": float(drawdown.max()),
+        # 每根bar的夏普, 未年化 (年化系数取决于timeframe)
+        "sharpe_per_bar": float(rets.mean() / std) if std > 0 else 0.0,
+        "n_trades": int(n_trades),
+        "win_rate": float((trades["pnlcomm"] > 0).mean()) if n_trades else 0.0,
+        "n_bars": int(len(equity)),
+    }
+
+
+def run_backtest(
+    strategy_cls,
+    data,
+    params: dict = None,
+    broker: dict = None,
+    timeframe=bt.TimeFrame.Minutes,
+    compression: int = 1,
+    store=None,
+    data_fingerprint: str = None,
+    profile=False,
+) -> BacktestResult:
+    """
+    运行一次回测, 可选地通过ResultStore缓存结果
+    :param strategy_cls: 策略类
+    :param data: DataFrame 或 backtrader数据源, 也可以是返回二者之一的无参函数
+        (仅在缓存未命中时调用, 命中时完全跳过数据加载)
+    :param params: 策略参数
+    :param broker: broker设置, 见 DEFAULT_BROKER
+    :param store: backtest.result_store.ResultStore, 为None时不缓存
+    :param data_fingerprint: 数据指纹, 推荐使用 loader.dataset_fingerprint;
+        为None且data是DataFrame时按内容计算
+    :param profile: True 或 backtest.profiling.BacktestProfiler 实例时剖析本次运行,
+        报告放在 result.profile; 剖析总是实际运行 (不读缓存)
+    :return: BacktestResult
+    """
+    settings = normalize_broker(broker)
+    lazy = callable(data) and not isinstance(
+        data, (pd.DataFrame, bt.feed.AbstractDataBase)
+    )
+
+    key = None
+    if store is not None:
+        if data_fingerprint is None:
+            if not isinstance(data, pd.DataFrame):
+                raise ValueError(
+                    "data_fingerprint is required when data is not a DataFrame"
+                )
+            data_fingerprint = frame_fingerprint(data)
+
+        key = run_key(strategy_cls, params, data_fingerprint, settings)
+        cached = None if profile else store.get(key)
+        if cached is not None:
+            logger.info(f"Backtest cache hit: {strategy_cls.__name__} [{key[:12]}]")
+            return cached
+
+    if lazy:
+        data = data()
+
+    profiler = None
+    if profile:
+        from backtest.profiling import BacktestProfiler
+
+        profiler = (
+            profile if isinstance(profile, BacktestProfiler) else BacktestProfiler()
+        )
+
+    cerebro = build_cerebro(
+        profiler.instrument(strategy_cls) if profiler else strategy_cls,
+        data,
+        params,
+        settings,
+        timeframe=timeframe,
+        compression=compression,
+    )
+    if profiler:
+        profiler.attach(cerebro)
+        strat = profiler.run(cerebro)[0]
+        elapsed = profiler.total_seconds
+    else:
+        started = time.perf_counter()
+        strat = cerebro.run(maxcpus=1)[0]
+        elapsed = time.perf_counter() - started
+
+    equity = pd.DataFrame(strat.analyzers.equity.get_analysis())
+    equity["datetime"] = pd.to_datetime([bt.num2date(x) for x in equity["datetime"]])
+    trades = trade_frame(strat)
+    for col in ("open_datetime", "close_datetime"):
+        trades[col] = pd.to_datetime([bt.num2date(x) for x in trades[col]])
+    metrics = summarize(equity, trades, settings["cash"])
+    if elapsed > 0:
+        instrumentation.gauge(
+            "backtest_bars_per_sec",
+            "Bars processed per second",
+            strategy=strategy_cls.__name__,
+        ).set(len(equity) / elapsed)
+
+    result = BacktestResult(
+        key=key, equity=equity, trades=trades, metrics=metrics, cerebro=cerebro
+    )
+    if profiler:
+        result.profile = profiler.report(strategy_cls.__name__, len(equity), elapsed)
+    if store is not None:
+        store.put(
+            result,
+            strategy=strategy_cls,
+            params=params,
+            data_fingerprint=data_fingerprint,
+            broker=settings,
+        )
+    return result
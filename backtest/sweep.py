@@ -0,0 +1,624 @@
+# -*- coding: utf-8 -*-
+"""
+分布式参数扫描: 协调端把参数网格切成块放进任务队列, 任意多个节点上的工作进程领取执行
+
+    queue = queue_for("results/sweeps.db")          # 或 "redis://host:6379/0"
+    sweep_id = submit(queue, "MacdStrategy",
+                      {"fast_period": [8, 12, 16], "slow_period": [26, 30, 34]},
+                      dataset={"exchange": "binance", "symbol": "BTC/USDT",
+                               "data_type": "ohlcv", "timeframe": "1d"})
+    # 每个节点: cryptotradelib sweep work --queue results/sweeps.db --processes 8
+    wait(queue, sweep_id)                           # 定期打印进度
+    sweep_results(queue, sweep_id)                  # 每组参数一行, 参数列 + 指标列
+
+队列:
+    SQLiteQueue  单个SQLite文件, 节点共享同一文件系统 (需要可靠的文件锁) 时使用
+    RedisQueue   Redis 协议的服务 (Redis / Valkey / KeyDB ...), 需要 redis 包
+领取的块带租约, 工作进程每跑完一组参数续约一次; 进程或节点死掉后租约过期,
+块重新排队被其他工作进程领走 (最多 max_attempts 次). 结果按 run_key 去重,
+同一块被执行两次也只记一份. 数据集在每个节点上只读取一次: run_node 在 fork
+工作进程之前加载, 子进程共享同一份 DataFrame.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from config import DATA_ROOT_PATH
+
+logger = logging.getLogger("backtest")
+
+ENGINES = ("backtrader", "kernel")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (sweep TEXT PRIMARY KEY, spec TEXT, created REAL);
+CREATE TABLE IF NOT EXISTS chunks (
+    sweep TEXT, chunk INTEGER, payload TEXT,
+    status TEXT DEFAULT 'pending', attempts INTEGER DEFAULT 0,
+    worker TEXT, lease_until REAL, error TEXT,
+    PRIMARY KEY (sweep, chunk));
+CREATE TABLE IF NOT EXISTS results (
+    sweep TEXT, key TEXT, chunk INTEGER, worker TEXT,
+    params TEXT, metrics TEXT, PRIMARY KEY (sweep, key));
+"""
+
+# 每个进程已加载的数据集: json(dataset) -> (DataFrame, 指纹)
+_DATA = {}
+
+
+def expand_grid(grid: dict) -> list:
+    """{参数名: 取值列表} -> 全部组合的参数字典列表 (顺序确定)"""
+    names = sorted(grid)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(grid[n] for n in names))
+    ]
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, sort_keys=True, default=str)
+
+
+class SQLiteQueue:
+    """
+    SQLite 任务队列
+    :param path: 数据库文件, 所有节点指向同一个文件
+    :param lease_seconds: 租约时长, 工作进程超过这么久没有续约即视为死亡
+    :param max_attempts: 一个块最多被领取的次数, 超过后标记为 failed
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 600.0, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._conn = None
+        self._pid = None
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._db().executescript(SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        # 连接不能跨 fork 使用, 每个进程各自打开
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._pid = os.getpid()
+        return self._conn
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def create_sweep(self, sweep_id: str, spec: dict, chunks: list) -> bool:
+        """登记一次扫描, 已存在时不做任何事并返回False"""
+        with self._transaction() as db:
+            if db.execute("SELECT 1 FROM sweeps WHERE sweep=?", (sweep_id,)).fetchone():
+                return False
+            db.execute(
+                "INSERT INTO sweeps VALUES (?, ?, ?)",
+                (sweep_id, _dumps(spec), time.time()),
+            )
+            db.executemany(
+                "INSERT INTO chunks (sweep, chunk, payload) VALUES (?, ?, ?)",
+                [(sweep_id, i, _dumps(c)) for i, c in enumerate(chunks)],
+            )
+        return True
+
+    def spec(self, sweep_id: str) -> dict:
+        row = (
+            self._db()
+            .execute("SELECT spec FROM sweeps WHERE sweep=?", (sweep_id,))
+            .fetchone()
+        )
+        if row is None:
+            raise KeyError(f"Unknown sweep {sweep_id}")
+        return json.loads(row[0])
+
+    def sweeps(self) -> list:
+        """全部扫描的ID, 按提交时间排序"""
+        rows = self._db().execute("SELECT sweep FROM sweeps ORDER BY created")
+        return [r[0] for r in rows]
+
+    def claim(self, worker: str, sweep_id: str = None):
+        """
+        领取一个待执行或租约已过期的块
+        :return: (sweep_id, chunk, 参数列表), 没有可领取的块时为None
+        """
+        now = time.time()
+        where = "" if sweep_id is None else "AND sweep=?"
+        args = () if sweep_id is None else (sweep_id,)
+        with self._transaction() as db:
+            # 过期且次数用完的块不再重试
+            db.execute(
+                "UPDATE chunks SET status='failed', error='lease expired' "
+                "WHERE status='leased' AND lease_until<? AND attempts>=?",
+                (now, self.max_attempts),
+            )
+            row = db.execute(
+                "SELECT sweep, chunk, payload FROM chunks "
+                "WHERE (status='pending' OR (status='leased' AND lease_until<?)) "
+                f"{where} ORDER BY sweep, chunk LIMIT 1",
+                (now,) + args,
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE chunks SET status='leased', attempts=attempts+1, worker=?, "
+                "lease_until=? WHERE sweep=? AND chunk=?",
+                (worker, now + self.lease_seconds, row[0], row[1]),
+            )
+        return row[0], row[1], json.loads(row[2])
+
+    def heartbeat(self, sweep_id: str, chunk: int, worker: str) -> bool:
+        """续约; 块已被别的工作进程接手时返回False"""
+        with self._transaction() as db:
+            cur = db.execute(
+                "UPDATE chunks SET lease_until=? WHERE sweep=? AND chunk=? "
+                "AND status='leased' AND worker=?",
+                (time.time() + self.lease_seconds, sweep_id, chunk, worker),
+            )
+        return cur.rowcount == 1
+
+    def complete(self, sweep_id: str, chunk: int, worker: str, rows: list) -> bool:
+        """
+        提交一个块的结果 (按 key 去重) 并标记完成
+        :return: 租约已不属于 worker (过期后被别的工作进程接手) 时不提交, 返回False
+        """
+        with self._transaction() as db:
+            cur = db.execute(
+                "UPDATE chunks SET status='done', lease_until=NULL "
+                "WHERE sweep=? AND chunk=? AND status='leased' AND worker=?",
+                (sweep_id, chunk, worker),
+            )
+            if cur.rowcount == 0:
+                return False
+            db.executemany(
+                "INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        sweep_id,
+                        r["key"],
+                        chunk,
+                        worker,
+                        _dumps(r["params"]),
+                        _dumps(r["metrics"]),
+                    )
+                    for r in rows
+                ],
+            )
+        return True
+
+    def fail(self, sweep_id: str, chunk: int, worker: str, error: str):
+        """执行出错: 还有重试次数时重新排队, 否则标记为 failed"""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE chunks SET status=CASE WHEN attempts>=? THEN 'failed' "
+                "ELSE 'pending' END, error=?, lease_until=NULL "
+                "WHERE sweep=? AND chunk=? AND status='leased' AND worker=?",
+                (self.max_attempts, error, sweep_id, chunk, worker),
+            )
+
+    def progress(self, sweep_id: str) -> dict:
+        """{'total', 'pending', 'leased', 'done', 'failed', 'results'}"""
+        db = self._db()
+        counts = dict(
+            db.execute(
+                "SELECT status, COUNT(*) FROM chunks WHERE sweep=? GROUP BY status",
+                (sweep_id,),
+            ).fetchall()
+        )
+        out = {s: counts.get(s, 0) for s in ("pending", "leased", "done", "failed")}
+        out["total"] = sum(counts.values())
+        out["results"] = db.execute(
+            "SELECT COUNT(*) FROM results WHERE sweep=?", (sweep_id,)
+        ).fetchone()[0]
+        return out
+
+    def results(self, sweep_id: str) -> list:
+        rows = self._db().execute(
+            "SELECT key, params, metrics, worker FROM results WHERE sweep=? "
+            "ORDER BY chunk, key",
+            (sweep_id,),
+        )
+        return [
+            {
+                "key": key,
+                "params": json.loads(params),
+                "metrics": json.loads(metrics),
+                "worker": worker,
+            }
+            for key, params, metrics, worker in rows
+        ]
+
+
+class RedisQueue:
+    """
+    Redis 协议的任务队列, 接口同 SQLiteQueue
+    :param client: redis.Redis 客户端
+    :param prefix: 键的前缀
+    """
+
+    def __init__(
+        self,
+        client,
+        prefix: str = "ctl:sweep",
+        lease_seconds: float = 600.0,
+        max_attempts: int = 3,
+    ):
+        self.r = client
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def _k(self, sweep_id: str, name: str) -> str:
+        return f"{self.prefix}:{sweep_id}:{name}"
+
+    @staticmethod
+    def _s(value):
+        return value.decode() if isinstance(value, bytes) else value
+
+    def create_sweep(self, sweep_id: str, spec: dict, chunks: list) -> bool:
+        if not self.r.hsetnx(f"{self.prefix}:sweeps", sweep_id, _dumps(spec)):
+            return False
+        self.r.zadd(f"{self.prefix}:created", {sweep_id: time.time()})
+        if chunks:
+            self.r.hset(
+                self._k(sweep_id, "chunks"),
+                mapping={str(i): _dumps(c) for i, c in enumerate(chunks)},
+            )
+            self.r.rpush(self._k(sweep_id, "pending"), *range(len(chunks)))
+        return True
+
+    def spec(self, sweep_id: str) -> dict:
+        raw = self.r.hget(f"{self.prefix}:sweeps", sweep_id)
+        if raw is None:
+            raise KeyError(f"Unknown sweep {sweep_id}")
+        return json.loads(self._s(raw))
+
+    def sweeps(self) -> list:
+        return [self._s(s) for s in self.r.zrange(f"{self.prefix}:created", 0, -1)]
+
+    def _release(self, pipe, sweep_id: str, chunk: str, error: str = None):
+        """
+        在事务中 (pipe.multi() 之前调用) 撤销租约, 重新排队或标记 failed
+        error 为None (租约过期) 时只在标记 failed 时记录
+        """
+        attempts = int(pipe.hget(self._k(sweep_id, "attempts"), chunk) or 0)
+        pipe.multi()
+        pipe.zrem(self._k(sweep_id, "leases"), chunk)
+        if error is not None or attempts >= self.max_attempts:
+            pipe.hset(self._k(sweep_id, "errors"), chunk, error or "lease expired")
+        if attempts >= self.max_attempts:
+            pipe.sadd(self._k(sweep_id, "failed"), chunk)
+        else:
+            pipe.rpush(self._k(sweep_id, "pending"), chunk)
+
+    def _requeue_expired(self, sweep_id: str):
+        leases = self._k(sweep_id, "leases")
+        for chunk in self.r.zrangebyscore(leases, 0, time.time()):
+            chunk = self._s(chunk)
+
+            def requeue(pipe):
+                # WATCH leases: 续约或其他进程已经处理时事务不执行
+                score = pipe.zscore(leases, chunk)
+                if score is not None and score <= time.time():
+                    self._release(pipe, sweep_id, chunk)
+
+            self.r.transaction(requeue, leases)
+
+    def claim(self, worker: str, sweep_id: str = None):
+        for sweep in [sweep_id] if sweep_id else self.sweeps():
+            self._requeue_expired(sweep)
+            pending = self._k(sweep, "pending")
+
+            def take(pipe):
+                # 出队, 计数与租约在同一个 MULTI/EXEC 中, 进程中途死掉不会丢块
+                chunk = pipe.lindex(pending, 0)
+                if chunk is None:
+                    return None
+                chunk = self._s(chunk)
+                pipe.multi()
+                pipe.lpop(pending)
+                pipe.hincrby(self._k(sweep, "attempts"), chunk, 1)
+                pipe.hset(self._k(sweep, "owners"), chunk, worker)
+                pipe.zadd(
+                    self._k(sweep, "leases"), {chunk: time.time() + self.lease_seconds}
+                )
+                return chunk
+
+            chunk = self.r.transaction(take, pending, value_from_callable=True)
+            if chunk is None:
+                continue
+            payload = self.r.hget(self._k(sweep, "chunks"), chunk)
+            return sweep, int(chunk), json.loads(self._s(payload))
+        return None
+
+    def heartbeat(self, sweep_id: str, chunk: int, worker: str) -> bool:
+        if self._s(self.r.hget(self._k(sweep_id, "owners"), chunk)) != worker:
+            return False
+        return bool(
+            self.r.zadd(
+                self._k(sweep_id, "leases"),
+                {str(chunk): time.time() + self.lease_seconds},
+                xx=True,
+                ch=True,
+            )
+        )
+
+    def complete(self, sweep_id: str, chunk: int, worker: str, rows: list) -> bool:
+        leases = self._k(sweep_id, "leases")
+        owners = self._k(sweep_id, "owners")
+        chunk = str(chunk)
+
+        def commit(pipe):
+            # 同 fail: 租约已被重新排队或转给别的工作进程时不提交
+            if pipe.zscore(leases, chunk) is None:
+                return False
+            if self._s(pipe.hget(owners, chunk)) != worker:
+                return False
+            pipe.multi()
+            for r in rows:
+                row = {"params": r["params"], "metrics": r["metrics"], "worker": worker}
+                pipe.hsetnx(self._k(sweep_id, "results"), r["key"], _dumps(row))
+            pipe.zrem(leases, chunk)
+            pipe.sadd(self._k(sweep_id, "done"), chunk)
+            return True
+
+        return self.r.transaction(commit, leases, owners, value_from_callable=True)
+
+    def fail(self, sweep_id: str, chunk: int, worker: str, error: str):
+        leases = self._k(sweep_id, "leases")
+
+        def release(pipe):
+            if pipe.zscore(leases, str(chunk)) is None:
+                return  # 租约已过期, 由其他进程处理
+            self._release(pipe, sweep_id, str(chunk), error)
+
+        self.r.transaction(release, leases)
+
+    def progress(self, sweep_id: str) -> dict:
+        return {
+            "pending": self.r.llen(self._k(sweep_id, "pending")),
+            "leased": self.r.zcard(self._k(sweep_id, "leases")),
+            "done": self.r.scard(self._k(sweep_id, "done")),
+            "failed": self.r.scard(self._k(sweep_id, "failed")),
+            "total": self.r.hlen(self._k(sweep_id, "chunks")),
+            "results": self.r.hlen(self._k(sweep_id, "results")),
+        }
+
+    def results(self, sweep_id: str) -> list:
+        out = []
+        for key, raw in sorted(self.r.hgetall(self._k(sweep_id, "results")).items()):
+            row = json.loads(self._s(raw))
+            row["key"] = self._s(key)
+            out.append(row)
+        return out
+
+
+def queue_for(url: str, **kwargs):
+    """
+    按地址选择队列: 'redis://...' 为 RedisQueue, 其余为 SQLite 文件路径
+    (可以写成 'sqlite:///path/to/sweeps.db')
+    """
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "Redis queues need the redis package (pip install redis)"
+            ) from e
+        return RedisQueue(redis.Redis.from_url(url), **kwargs)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///") :]
+    return SQLiteQueue(url, **kwargs)
+
+
+def submit(
+    queue,
+    strategy: str,
+    grid: dict,
+    dataset: dict,
+    broker: dict = None,
+    engine: str = "backtrader",
+    chunk_size: int = 8,
+) -> str:
+    """
+    把参数网格切块放进队列; 同样的扫描重复提交时返回已有的ID
+    :param strategy: strategy/trendance 中的策略类名
+    :param grid: {参数名: 取值列表}
+    :param dataset: load_from_parquet 的参数 (data_root / data_type / exchange /
+        timeframe / symbol / start_date / end_date), 所有节点读取同一个数据存储
+    :param engine: 'backtrader' (run_backtest) 或 'kernel' (backtest.kernel.run_strategies)
+    :return: 扫描ID
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, choose from {ENGINES}")
+    from backtest.runner import normalize_broker
+
+    dataset = dict(dataset)
+    dataset.setdefault("data_root", DATA_ROOT_PATH)
+    spec = {
+        "strategy": strategy,
+        "dataset": dataset,
+        "broker": normalize_broker(broker),
+        "engine": engine,
+        "grid": grid,
+    }
+    sweep_id = hashlib.sha256(_dumps(spec).encode("utf-8")).hexdigest()[:16]
+    combos = expand_grid(grid)
+    chunks = [combos[i : i + chunk_size] for i in range(0, len(combos), chunk_size)]
+    if queue.create_sweep(sweep_id, spec, chunks):
+        logger.info(
+            f"Submitted sweep {sweep_id}: {strategy}, {len(combos)} runs "
+            f"in {len(chunks)} chunks"
+        )
+    return sweep_id
+
+
+def load_dataset(dataset: dict) -> tuple:
+    """读取 (并在本进程内缓存) 扫描的数据集, 返回 (DataFrame, 数据指纹)"""
+    key = _dumps(dataset)
+    if key not in _DATA:
+        from data_processor.loader import dataset_fingerprint, load_from_parquet
+
+        logger.info(f"Loading {dataset.get('symbol')} {dataset.get('timeframe')} bars")
+        _DATA[key] = (
+            load_from_parquet(**dataset, use_cache=False),
+            dataset_fingerprint(**dataset),
+        )
+    return _DATA[key]
+
+
+def _run_chunk(queue, sweep_id: str, chunk: int, combos: list, worker: str) -> list:
+    from backtest.result_store import run_key
+    from backtest.runner import parse_timeframe, run_backtest
+    from strategy import discover_strategies
+
+    spec = queue.spec(sweep_id)
+    strategy_cls = discover_strategies()[spec["strategy"]]
+    df, fingerprint = load_dataset(spec["dataset"])
+    broker = spec["broker"]
+    timeframe, compression = parse_timeframe(spec["dataset"]["timeframe"])
+
+    if spec["engine"] == "kernel":
+        from backtest.kernel import run_strategies
+
+        # 整块一次遍历
+        results = iter(run_strategies(df, [(strategy_cls, p) for p in combos], broker))
+
+    rows = []
+    for params in combos:
+        if spec["engine"] == "kernel":
+            result = next(results)
+        else:
+            result = run_backtest(
+                strategy_cls,
+                df,
+                params=params,
+                broker=broker,
+                timeframe=timeframe,
+                compression=compression,
+            )
+        rows.append(
+            {
+                "key": run_key(strategy_cls, params, fingerprint, broker),
+                "params": params,
+                "metrics": result.metrics,
+            }
+        )
+        if not queue.heartbeat(sweep_id, chunk, worker):
+            logger.warning(f"Lost the lease on {sweep_id}/{chunk}, finishing anyway")
+    return rows
+
+
+def run_worker(
+    queue,
+    sweep_id: str = None,
+    worker_id: str = None,
+    poll_seconds: float = 5.0,
+    wait: bool = True,
+) -> int:
+    """
+    循环领取并执行块, 直到没有可做的工作
+    :param sweep_id: 只做这个扫描, None为队列中的全部扫描
+    :param wait: 还有其他进程持有租约的块时继续等待 (以便接手死掉的进程的块)
+    :return: 完成的块数
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    done = 0
+    while True:
+        claimed = queue.claim(worker_id, sweep_id)
+        if claimed is None:
+            sweeps = [sweep_id] if sweep_id else queue.sweeps()
+            if wait and any(queue.progress(s)["leased"] for s in sweeps):
+                time.sleep(poll_seconds)
+                continue
+            return done
+        sweep, chunk, combos = claimed
+        try:
+            rows = _run_chunk(queue, sweep, chunk, combos, worker_id)
+        except Exception as e:
+            logger.error(f"Chunk {sweep}/{chunk} failed on {worker_id}: {e!r}")
+            queue.fail(sweep, chunk, worker_id, repr(e))
+            continue
+        if not queue.complete(sweep, chunk, worker_id, rows):
+            logger.warning(f"Lost the lease on {sweep}/{chunk}, results discarded")
+            continue
+        done += 1
+
+
+def _node_worker(url: str, sweep_id: str, queue_kwargs: dict):
+    run_worker(queue_for(url, **queue_kwargs), sweep_id)
+
+
+def run_node(
+    url: str, processes: int = None, sweep_id: str = None, **queue_kwargs
+) -> None:
+    """
+    在本节点上启动 processes 个工作进程
+    数据集在 fork 之前加载一次, 各进程共享 (不支持 fork 的平台上各进程自己加载)
+    """
+    queue = queue_for(url, **queue_kwargs)
+    for sweep in [sweep_id] if sweep_id else queue.sweeps():
+        progress = queue.progress(sweep)
+        if progress["pending"] or progress["leased"]:
+            load_dataset(queue.spec(sweep)["dataset"])
+
+    processes = processes or os.cpu_count() or 1
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+    workers = [
+        ctx.Process(target=_node_worker, args=(url, sweep_id, queue_kwargs))
+        for _ in range(processes)
+    ]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+
+def wait(queue, sweep_id: str, interval: float = 10.0, timeout: float = None) -> dict:
+    """
+    定期记录进度直到扫描结束 (全部块 done 或 failed)
+    :return: 最后一次的进度
+    """
+    started = time.monotonic()
+    first = queue.progress(sweep_id)["results"]
+    while True:
+        progress = queue.progress(sweep_id)
+        elapsed = time.monotonic() - started
+        rate = (progress["results"] - first) / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Sweep {sweep_id}: {progress['done']}/{progress['total']} chunks done, "
+            f"{progress['leased']} running, {progress['failed']} failed, "
+            f"{progress['results']} runs ({rate:.2f} runs/s)"
+        )
+        if progress["done"] + progress["failed"] >= progress["total"]:
+            return progress
+        if timeout is not None and elapsed >= timeout:
+            return progress
+        time.sleep(interval)
+
+
+def sweep_results(queue, sweep_id: str) -> pd.DataFrame:
+    """每组参数一行: 参数列 + 指标列 + key / worker"""
+    rows = [
+        {**r["params"], **r["metrics"], "key": r["key"], "worker": r["worker"]}
+        for r in queue.results(sweep_id)
+    ]
+    return pd.DataFrame(rows)
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+ETL / 存储 / 回测热点路径的基准测试
+
+    python -m benchmarks.run run --sizes 1d,1w,1mo --out benchmarks/baselines/local.json
+    python -m benchmarks.run compare benchmarks/baselines/local.json current.json --threshold 0.2
+    python -m benchmarks.run run --sizes 1d --backtest-sizes "" --orderbook-sizes 1d --only orderbook
+
+耗时与机器有关, 仓库中不提交基准结果: 修改前在本机用 run --out 生成基准
+(benchmarks/baselines/ 已被忽略), 修改后再运行一次并用 compare 比较.
+
+每个用例先计时 (取多次中的最短时间), 再单独用 tracemalloc 测一次峰值内存,
+避免内存追踪拖慢计时.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.synthetic import (
+    SIZES,
+    generate_ohlcv,
+    generate_funding,
+    generate_orderbook,
+)
+from strategy import discover_strategies
+
+DEFAULT_SIZES = "1d,1w,1mo"
+DEFAULT_BACKTEST_SIZES = "1d,1w"
+DEFAULT_ORDERBOOK_SIZES = "1d"
+ORDERBOOK_DEPTH = 50
+SYMBOL = "BTC/USDT"
+
+
+def measure(fn, setup=None, repeat: int = 3) -> dict:
+    """
+    计时并测量峰值内存
+    :param fn: 被测函数
+    :param setup: 每次运行前调用的准备函数 (不计时)
+    :param repeat: 计时次数, 取最短
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": best, "peak_mb": peak / 2**20}
+
+
+def storage_cases(df, workdir: str):
+    """
+    save_to_parquet / load_from_parquet / generate_quality_report / 指标计算
+    """
+    from data_processor.writer import save_to_parquet
+    from data_processor.loader import load_from_parquet
+    from reporting.quality_check import generate_quality_report
+    from indicators.metrics import calculate_annualized_funding_rate, calculate_basis
+
+    data_root = os.path.join(workdir, "data")
+    dataset = dict(data_type="ohlcv", exchange="binance", symbol=SYMBOL, timeframe="1m")
+
+    def clean():
+        shutil.rmtree(data_root, ignore_errors=True)
+
+    def save():
+        with contextlib.redirect_stdout(io.StringIO()):
+            save_to_parquet(df.copy(), data_root=data_root, **dataset)
+
+    yield "save_to_parquet", save, clean
+
+    clean()
+    save()
+
+    def load():
+        load_from_parquet(data_root, **dataset)
+
+    yield "load_from_parquet", load, None
+
+    def quality():
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_quality_report(df.copy(), "1m")
+
+    yield "generate_quality_report", quality, None
+
+    funding = generate_funding(len(df))
+    spot = df["close"]
+    future = df["close"] * 1.0005
+
+    def indicators():
+        calculate_annualized_funding_rate(funding.copy(), periods_per_day=3)
+        calculate_basis(spot, future)
+
+    yield "indicators", indicators, None
+
+
+def backtest_cases(df):
+    """
+    每个 strategy/trendance 策略一次完整的backtrader回测
+    """
+    from data_processor.feed import ArrowData
+    from backtest.runner import run_backtest
+
+    for name, strategy in discover_strategies().items():
+
+        def run(strategy=strategy):
+            run_backtest(strategy, ArrowData(dataname=df))
+
+        yield f"backtest.{name}", run, None
+
+    def preload():
+        import backtrader as bt
+
+        data = ArrowData(dataname=df)
+        cerebro = bt.Cerebro()
+        cerebro.adddata(data)
+        data._start()
+        data.preload()
+
+    yield "feed_preload", preload, None
+
+
+def dir_bytes(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(d, f))
+        for d, _, files in os.walk(path)
+        for f in files
+    )
+
+
+def orderbook_cases(books: list, workdir: str):
+    """
+    订单簿: 关键帧+增量存储 (OrderBookRecorder / OrderBookReader.at)
+    对比每次更新都存完整快照的长表 (timestamp, side, level, price, amount)
+    用例名带 [bytes] 的结果里记录落盘大小
+    """
+    import numpy as np
+    import pandas as pd
+    from data_processor.orderbook import OrderBookReader, OrderBookRecorder
+
+    delta_root = os.path.join(workdir, "orderbook")
+    raw_path = os.path.join(workdir, "orderbook_raw.parquet")
+
+    def clean():
+        shutil.rmtree(delta_root, ignore_errors=True)
+
+    def record():
+        recorder = OrderBookRecorder("binance", SYMBOL, delta_root)
+        for book in books:
+            recorder.on_book(book)
+        recorder.flush()
+
+    yield "orderbook.record", record, clean, lambda: dir_bytes(delta_root)
+
+    def record_raw():
+        rows = [
+            (b["timestamp"], side, level, price, amount)
+            for b in books
+            for side, levels in ((1, b["bids"]), (-1, b["asks"]))
+            for level, (price, amount) in enumerate(levels)
+        ]
+        pd.DataFrame(
+            rows, columns=["timestamp", "side", "level", "price", "amount"]
+        ).to_parquet(raw_path, compression="zstd", index=False)
+
+    yield "orderbook.record_raw", record_raw, None, lambda: os.path.getsize(raw_path)
+
+    clean()
+    record()
+    record_raw()
+    probes = np.random.default_rng(0).integers(0, len(books), 200)
+    times = [books[i]["timestamp"] for i in probes]
+
+    def seek():
+        # 新的 reader, 分区解码也计入耗时
+        reader = OrderBookReader("binance", SYMBOL, delta_root)
+        for ts in times:
+            reader.at(ts)
+
+    yield "orderbook.at", seek, None, None
+
+    def seek_raw():
+        raw = pd.read_parquet(raw_path)
+        stamps = raw["timestamp"].to_numpy()
+        for ts in times:
+            i = np.searchsorted(stamps, ts, side="right")
+            snapshot = raw.iloc[np.searchsorted(stamps, stamps[i - 1]) : i]
+            snapshot[["side", "price", "amount"]].to_numpy()
+
+    yield "orderbook.at_raw", seek_raw, None, None
+
+
+def run_suite(
+    sizes: list[str],
+    backtest_sizes: list[str],
+    repeat: int = 3,
+    only: str = None,
+    orderbook_sizes: list[str] = (),
+) -> dict:
+    """
+    运行全部用例, 返回 {用例[规模]: {seconds, peak_mb, rows, rows_per_sec}}
+    """
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="ctl-bench-")
+    try:
+        for size in sizes:
+            n = SIZES[size]
+            df = generate_ohlcv(n)
+            cases = [case + (None,) for case in storage_cases(df, workdir)]
+            if size in backtest_sizes:
+                cases += [case + (None,) for case in backtest_cases(df)]
+            if size in orderbook_sizes:
+                books = generate_orderbook(n, depth=ORDERBOOK_DEPTH)
+                cases += list(orderbook_cases(books, workdir))
+
+            for name, fn, setup, size_of in cases:
+                key = f"{name}[{size}]"
+                if only and only not in key:
+                    continue
+                try:
+                    stats = measure(fn, setup, repeat)
+                except Exception as e:
+                    # 记录失败但继续跑其余用例 (比较时会跳过)
+                    print(f"{key:<45} FAILED: {type(e).__name__}: {e}")
+                    results[key] = {"error": f"{type(e).__name__}: {e}"}
+                    continue
+                stats["rows"] = n
+                stats["rows_per_sec"] = (
+                    n / stats["seconds"] if stats["seconds"] else 0.0
+                )
+                results[key] = stats
+                print(
+                    f"{key:<45} {stats['seconds']:>10.4f}s "
+                    f"{stats['rows_per_sec']:>14,.0f} rows/s {stats['peak_mb']:>9.1f} MB"
+                )
+                if size_of:
+                    stats["bytes"] = size_of()
+                    print(f"{key:<45} {stats['bytes'] / 2**20:>10.2f} MB on disk")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2) -> list[str]:
+    """
+    对比两次结果, 返回回归列表
+    耗时或峰值内存超过基线 (1 + threshold) 倍视为回归
+    """
+    regressions = []
+    base_results = baseline["results"]
+    for key, cur in sorted(current["results"].items()):
+        base = base_results.get(key)
+        if base is None or "error" in base or "error" in cur:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            if base[metric] <= 0:
+                continue
+            ratio = cur[metric] / base[metric]
+            flag = "REGRESSION" if ratio > 1 + threshold else ""
+            print(
+                f"{key:<45} {metric:<8} {base[metric]:>10.4f} -> {cur[metric]:>10.4f} ({ratio:5.2f}x) {flag}"
+            )
+            if flag:
+                regressions.append(f"{key} {metric} {ratio:.2f}x")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark ETL, storage and backtest hot paths."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="Run the benchmark suite")
+    run_p.add_argument(
+        "--sizes", default=DEFAULT_SIZES, help=f"Data sizes, from {list(SIZES)}"
+    )
+    run_p.add_argument(
+        "--backtest-sizes", default=DEFAULT_BACKTEST_SIZES, help="Sizes for backtests"
+    )
+    run_p.add_argument(
+        "--orderbook-sizes",
+        default=DEFAULT_ORDERBOOK_SIZES,
+        help="Sizes (number of book updates) for order-book storage cases",
+    )
+    run_p.add_argument("--repeat", type=int, default=3)
+    run_p.add_argument(
+        "--only", default=None, help="Only run cases containing this string"
+    )
+    run_p.add_argument("--out", default=None, help="Write results as JSON baseline")
+
+    cmp_p = sub.add_parser("compare", help="Compare results against a baseline")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("current")
+    cmp_p.add_argument("--threshold", type=float, default=0.2)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run_suite(
+            args.sizes.split(","),
+            args.backtest_sizes.split(","),
+            repeat=args.repeat,
+            only=args.only,
+            orderbook_sizes=args.orderbook_sizes.split(","),
+        )
+        report = {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "machine": platform.machine(),
+            },
+            "results": results,
+        }
+        if args.out:
+            os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+            with open(args.out, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Results written to {args.out}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for r in regressions:
+            print(f"  {r}")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
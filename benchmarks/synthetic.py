@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+# 1m bar 数量
+SIZES = {
+    "1d": 1440,
+    "1w": 7 * 1440,
+    "1mo": 30 * 1440,
+    "1y": 365 * 1440,
+    "5y": 5 * 365 * 1440,
+}
+
+
+def generate_ohlcv(
+    n_bars: int,
+    timeframe_ms: int = 60_000,
+    start: str = "2020-01-01",
+    price: float = 30000.0,
+    vol: float = 0.001,
+    seed: int = 0,
+    gap: float = 0.0,
+) -> pd.DataFrame:
+    """
+    生成与 HistoricalFetcher.fetch_ohlcv 输出格式一致的合成K线
+    价格为几何随机游走, 保证 low <= open/close <= high
+    :param n_bars: bar数量
+    :param timeframe_ms: 周期 (毫秒)
+    :param start: 起始日期 (UTC)
+    :param price: 初始价格
+    :param vol: 每根bar收益率的标准差
+    :param seed: 随机数种子
+    :param gap: 开盘价相对上一根收盘价跳空的标准差, 0 为不跳空
+    """
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0.0, vol, n_bars)))
+    open_ = np.empty_like(close)
+    open_[0] = price
+    open_[1:] = close[:-1]
+    if gap:
+        open_ *= np.exp(np.random.default_rng(seed + 1).normal(0.0, gap, n_bars))
+    wick = np.abs(rng.normal(0.0, vol / 2, (2, n_bars)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+
+    start_ms = int(pd.Timestamp(start, tz="UTC").value // 1_000_000)
+    timestamp = start_ms + timeframe_ms * np.arange(n_bars, dtype=np.int64)
+
+    df = pd.DataFrame(
+        {
+            "timestamp": timestamp,
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": rng.lognormal(2.0, 1.0, n_bars),
+        }
+    )
+    df["datetime"] = pd.to_datetime(df["timestamp"], unit="ms")
+    return df
+
+
+def generate_funding(n: int, seed: int = 0) -> pd.DataFrame:
+    """
+    生成合成资金费率 (8小时一次)
+    """
+    rng = np.random.default_rng(seed)
+    df = generate_ohlcv(n, timeframe_ms=8 * 3_600_000, seed=seed)[
+        ["timestamp", "datetime"]
+    ]
+    df["fundingRate"] = rng.normal(0.0001, 0.0002, n)
+    return df
+
+
+def generate_orderbook(
+    n_updates: int,
+    depth: int = 50,
+    interval_ms: int = 100,
+    start: str = "2020-01-01",
+    price: float = 30000.0,
+    tick: float = 0.1,
+    seed: int = 0,
+) -> list:
+    """
+    生成 ccxt watch_order_book 格式的订单簿快照序列
+    每次更新中间价以小概率移动一个tick, 并改动少量档位的数量
+    :param n_updates: 快照数量
+    :param depth: 每边档位数
+    :param interval_ms: 相邻快照的间隔 (毫秒)
+    :param tick: 最小价格变动
+    """
+    rng = np.random.default_rng(seed)
+    start_ms = int(pd.Timestamp(start, tz="UTC").value // 1_000_000)
+    mid = int(round(price / tick))
+    amounts = {}  # 价格 (tick数) -> 数量
+
+    def amount():
+        return round(float(rng.lognormal(0.0, 1.0)), 4)
+
+    books = []
+    for i in range(n_updates):
+        if rng.random() < 0.1:
+            mid += int(rng.choice([-1, 1]))
+        bid_ticks = mid - 1 - np.arange(depth)
+        ask_ticks = mid + 1 + np.arange(depth)
+        for t in rng.choice(np.r_[bid_ticks[:10], ask_ticks[:10]], 3):
+            amounts[int(t)] = amount()
+        levels = []
+        for ticks in (bid_ticks, ask_ticks):
+            side = []
+            for t in ticks.tolist():
+                if t not in amounts:
+                    amounts[t] = amount()
+                side.append([round(t * tick, 8), amounts[t]])
+            levels.append(side)
+        books.append(
+            {
+                "timestamp": start_ms + i * interval_ms,
+                "bids": levels[0],
+                "asks": levels[1],
+            }
+        )
+    return books
@@ -0,0 +1,580 @@
+# -*- coding: utf-8 -*-
+"""
+统一命令行入口
+
+    cryptotradelib etl --exchange binance --symbol BTC/USDT --start_date 2025-10-01
+    cryptotradelib backtest SmaCrossStrategy --timeframe 1d --param maperiod=20 --plot
+    cryptotradelib stream
+    cryptotradelib quality --exchange binance --symbol BTC/USDT
+    cryptotradelib migrate --data_type ohlcv_1m --dry_run
+    cryptotradelib features --exchange binance --timeframe 1m
+    cryptotradelib compare SmaCrossStrategy MacdStrategy RsiStrategy --timeframe 1h
+    cryptotradelib robustness MacdStrategy --timeframe 1h --paths 10000 --block 48
+    cryptotradelib sweep submit MacdStrategy --grid fast_period=8,12,16 --grid slow_period=26,30
+    cryptotradelib sweep work --processes 8
+    cryptotradelib bars serve
+
+本模块顶层只导入标准库; 各子命令在执行时才导入 pandas / ccxt / backtrader,
+matplotlib 只在 --plot 时加载, 因此 --help 和无事可做的增量ETL都能立即返回.
+"""
+
+import sys
+import json
+import argparse
+import logging
+from datetime import date, timedelta
+
+from config import (
+    BAR_SERVER_ADDRESS,
+    BAR_SERVER_BYTES,
+    DATA_ROOT_PATH,
+    OHLCV_DATA_TYPE,
+    OHLCV_DATA_TYPES,
+    RESULTS_ROOT_PATH,
+    SWEEP_QUEUE,
+)
+
+logger = logging.getLogger("cli")
+
+
+def _latest_partition(
+    data_root: str, data_type: str, exchange: str, timeframe: str, symbol: str
+) -> str:
+    """
+    已存储的最新 date= 分区值, 没有数据时返回None (只列目录, 不读取文件)
+    """
+    from data_processor.storage import storage_for
+    from data_processor.symbols import symbol_path_name
+
+    storage = storage_for(data_root)
+    base_path = storage.join(
+        data_root, data_type, exchange, timeframe, symbol_path_name(symbol)
+    )
+    if not storage.isdir(base_path):
+        return None
+    dates = [
+        d[len("date=") :] for d in storage.listdir(base_path) if d.startswith("date=")
+    ]
+    return max(dates) if dates else None
+
+
+def _parse_value(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def _ohlcv_data_type(timeframe: str) -> str:
+    """该周期K线所在的 data_type 目录 (etl 写入, 其他子命令默认读取)"""
+    return OHLCV_DATA_TYPES.get(timeframe, OHLCV_DATA_TYPE)
+
+
+def cmd_etl(args) -> int:
+    if args.data_type == "trades":
+        data_type = "trades"
+    else:
+        data_type = _ohlcv_data_type(args.timeframe)
+    timeframe = "tick" if args.data_type == "trades" else args.timeframe
+    start_date = args.start_date
+
+    if args.incremental:
+        latest = _latest_partition(
+            DATA_ROOT_PATH, data_type, args.exchange, timeframe, args.symbol
+        )
+        # 只处理日分区 (YYYY-MM-DD)
+        if latest and len(latest) == len("YYYY-MM-DD"):
+            if args.end_date:
+                last_day = date.fromisoformat(args.end_date) - timedelta(days=1)
+                if latest >= last_day.isoformat():
+                    print(f"Up to date: latest partition {latest}, nothing to fetch.")
+                    return 0
+            # 最新分区可能不完整, 从它开始重新拉取并覆盖
+            start_date = max(start_date, latest)
+
+    from utils.logger import setup_logger
+    from scripts.main_etl import run_etl, run_trades_etl
+
+    setup_logger("etl")
+    if args.data_type == "trades":
+        run_trades_etl(
+            exchange_id=args.exchange,
+            symbol=args.symbol,
+            start_date=start_date,
+            end_date=args.end_date,
+        )
+    else:
+        run_etl(
+            exchange_id=args.exchange,
+            symbol=args.symbol,
+            start_date=start_date,
+            timeframe=args.timeframe,
+            end_date=args.end_date,
+            data_type=data_type,
+        )
+
+    from data_processor.bar_server import notify_refresh
+
+    # 共享内存K线服务在运行时, 把新落盘的数据追加到已加载的序列
+    notify_refresh(data_type, args.exchange, timeframe, args.symbol, DATA_ROOT_PATH)
+    return 0
+
+
+def cmd_backtest(args) -> int:
+    from strategy import discover_strategies
+
+    strategies = discover_strategies()
+    if args.strategy not in strategies:
+        print(f"Unknown strategy {args.strategy!r}, choose from {sorted(strategies)}")
+        return 2
+
+    from utils.logger import setup_logger
+    from data_processor.feed import ParquetData
+    from data_processor.loader import dataset_fingerprint
+    from backtest.result_store import ResultStore
+    from backtest.runner import run_backtest, parse_timeframe
+
+    setup_logger("backtest")
+    dataset = dict(
+        data_root=args.data_root,
+        data_type=args.data_type,
+        exchange=args.exchange,
+        timeframe=args.timeframe,
+        symbol=args.symbol,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
+    bt_timeframe, compression = parse_timeframe(args.timeframe)
+
+    def load_data():
+        kwargs = dict(dataset)
+        kwargs["timeframe_str"] = kwargs.pop("timeframe")
+        return ParquetData(timeframe=bt_timeframe, compression=compression, **kwargs)
+
+    params = dict(p.split("=", 1) for p in args.param)
+    params = {k: _parse_value(v) for k, v in params.items()}
+    use_store = not args.no_cache and not args.plot
+    result = run_backtest(
+        strategies[args.strategy],
+        load_data,
+        params=params,
+        broker={
+            "cash": args.cash,
+            "commission": args.commission,
+            "sizer_params": {"stake": args.stake},
+        },
+        timeframe=bt_timeframe,
+        compression=compression,
+        store=ResultStore(args.results_root) if use_store else None,
+        data_fingerprint=dataset_fingerprint(**dataset),
+        profile=args.profile,
+    )
+
+    for name, value in result.metrics.items():
+        logger.info(f"{name:<16} {value}")
+    if result.profile is not None:
+        logger.info("\n" + result.profile.format())
+    if args.plot:
+        # 只有这里才会导入 matplotlib
+        result.cerebro.plot()
+    return 0
+
+
+def cmd_robustness(args) -> int:
+    from utils.logger import setup_logger
+    from data_processor.loader import load_from_parquet
+    from backtest.kernel import SIGNALS
+    from backtest.robustness import distribution, run_paths
+
+    if args.strategy not in SIGNALS:
+        print(f"Unknown strategy {args.strategy!r}, choose from {sorted(SIGNALS)}")
+        return 2
+
+    setup_logger("backtest")
+    df = load_from_parquet(
+        args.data_root,
+        args.data_type,
+        args.exchange,
+        args.timeframe,
+        args.symbol,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
+    params = dict(p.split("=", 1) for p in args.param)
+    method_params = {"bootstrap": {"block": args.block}, "noise": {"sigma": args.sigma}}
+    paths = run_paths(
+        df,
+        args.strategy,
+        params={k: _parse_value(v) for k, v in params.items()},
+        broker={
+            "cash": args.cash,
+            "commission": args.commission,
+            "sizer_params": {"stake": args.stake},
+        },
+        method=args.method,
+        n_paths=args.paths,
+        seed=args.seed,
+        workers=args.workers,
+        **method_params.get(args.method, {}),
+    )
+    print(distribution(paths).to_string())
+    return 0
+
+
+def cmd_compare(args) -> int:
+    from data_processor.loader import load_from_parquet
+    from backtest.kernel import SIGNALS, run_strategies
+
+    unknown = [s for s in args.strategies if s not in SIGNALS]
+    if unknown:
+        print(f"Unknown strategy {unknown[0]!r}, choose from {sorted(SIGNALS)}")
+        return 2
+
+    import pandas as pd
+
+    df = load_from_parquet(
+        args.data_root,
+        args.data_type,
+        args.exchange,
+        args.timeframe,
+        args.symbol,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
+    broker = {
+        "cash": args.cash,
+        "commission": args.commission,
+        "sizer_params": {"stake": args.stake},
+    }
+    results = run_strategies(df, [(s, {}) for s in args.strategies], broker)
+    table = pd.DataFrame([r.metrics for r in results], index=args.strategies)
+    print(table.to_string())
+    return 0
+
+
+def cmd_sweep(args) -> int:
+    from utils.logger import setup_logger
+    from backtest import sweep
+
+    setup_logger("backtest")
+    queue = sweep.queue_for(args.queue)
+    if args.action == "submit":
+        grid = {}
+        for item in args.grid:
+            name, values = item.split("=", 1)
+            grid[name] = [_parse_value(v) for v in values.split(",")]
+        dataset = dict(
+            data_root=args.data_root,
+            data_type=args.data_type,
+            exchange=args.exchange,
+            timeframe=args.timeframe,
+            symbol=args.symbol,
+            start_date=args.start_date,
+            end_date=args.end_date,
+        )
+        broker = {
+            "cash": args.cash,
+            "commission": args.commission,
+            "sizer_params": {"stake": args.stake},
+        }
+        sweep_id = sweep.submit(
+            queue,
+            args.strategy,
+            grid,
+            dataset,
+            broker=broker,
+            engine=args.engine,
+            chunk_size=args.chunk_size,
+        )
+        print(sweep_id)
+        if args.wait:
+            sweep.wait(queue, sweep_id, interval=args.interval)
+    elif args.action == "work":
+        sweep.run_node(args.queue, args.processes, args.sweep)
+    else:
+        for sweep_id in [args.sweep] if args.sweep else queue.sweeps():
+            progress = queue.progress(sweep_id)
+            print(f"{sweep_id} " + " ".join(f"{k}={v}" for k, v in progress.items()))
+    return 0
+
+
+def cmd_bars(args) -> int:
+    from data_processor.bar_server import BarClient, serve
+
+    if args.action == "serve":
+        from utils.logger import setup_logger
+
+        setup_logger("bars")
+        serve(args.address, args.max_bytes)
+        return 0
+    with BarClient(args.address) as client:
+        if args.action == "refresh":
+            appended = client.refresh(
+                args.data_type,
+                args.exchange,
+                args.timeframe,
+                args.symbol,
+                args.data_root,
+            )
+            print(f"{args.symbol}: {appended} new rows")
+        else:
+            print(json.dumps(client.stats(), indent=2))
+    return 0
+
+
+def cmd_stream(args) -> int:
+    import asyncio
+    from utils.logger import setup_logger
+    from data_fetcher import stream_live
+
+    setup_logger("stream")
+    logger.info("Starting WebSocket data streams... Press Ctrl+C to stop.")
+    try:
+        asyncio.run(stream_live.main())
+    except KeyboardInterrupt:
+        logger.info("Stopping WebSocket streams.")
+    return 0
+
+
+def cmd_quality(args) -> int:
+    from utils.logger import setup_logger
+    from data_processor.loader import load_from_parquet
+    from reporting.quality_check import generate_quality_report
+
+    setup_logger("quality")
+    df = load_from_parquet(
+        args.data_root,
+        args.data_type,
+        args.exchange,
+        args.timeframe,
+        args.symbol,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    )
+    generate_quality_report(df, args.timeframe)
+    return 0
+
+
+def cmd_migrate(args) -> int:
+    from utils.logger import setup_logger
+    from scripts import migrate_storage
+
+    setup_logger("etl")
+    argv = ["--data_root", args.data_root]
+    for name in ("data_type", "exchange"):
+        if getattr(args, name):
+            argv += [f"--{name}", getattr(args, name)]
+    if args.dry_run:
+        argv.append("--dry_run")
+    migrate_storage.main(argv)
+    return 0
+
+
+def cmd_features(args) -> int:
+    from utils.logger import setup_logger
+    from data_processor.feature_store import update_features
+
+    setup_logger("etl")
+    written = update_features(
+        args.data_root,
+        args.exchange,
+        args.timeframe,
+        symbols=args.symbol or None,
+        bars_type=args.data_type,
+        spot_exchange=args.spot_exchange,
+    )
+    for symbol, rows in written.items():
+        print(f"{symbol}: {rows} new rows")
+    return 0
+
+
+def _add_dataset_args(p, timeframe: str):
+    p.add_argument("--exchange", default="binance", help="Exchange ID")
+    p.add_argument("--symbol", default="BTC/USDT", help="Trading symbol")
+    _add_data_type_arg(p)
+    p.add_argument("--timeframe", default=timeframe, help="Timeframe, e.g. 1m, 1d")
+    p.add_argument("--start_date", default=None, help="YYYY-MM-DD, inclusive")
+    p.add_argument("--end_date", default=None, help="YYYY-MM-DD, inclusive")
+    p.add_argument("--data_root", default=DATA_ROOT_PATH)
+
+
+def _add_data_type_arg(p):
+    p.add_argument(
+        "--data_type",
+        default=None,
+        help="Dataset type directory (default: where etl stores this timeframe)",
+    )
+    p.set_defaults(bars_data_type=True)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cryptotradelib", description="Cryptotradelib command line tools."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    etl = sub.add_parser("etl", help="Backfill historical data into parquet")
+    etl.add_argument("--exchange", required=True, help="Exchange ID (e.g., 'binance')")
+    etl.add_argument(
+        "--symbol", required=True, help="Trading symbol (e.g., 'BTC/USDT')"
+    )
+    etl.add_argument("--start_date", required=True, help="Start date, YYYY-MM-DD")
+    etl.add_argument("--end_date", default=None, help="End date (exclusive)")
+    etl.add_argument("--data_type", default="ohlcv", choices=["ohlcv", "trades"])
+    etl.add_argument("--timeframe", default="1m", help="OHLCV timeframe")
+    etl.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Resume from the latest stored partition; no-op when already complete",
+    )
+    etl.set_defaults(func=cmd_etl)
+
+    backtest = sub.add_parser("backtest", help="Run a strategy on stored data")
+    backtest.add_argument("strategy", help="Strategy class name, e.g. SmaCrossStrategy")
+    _add_dataset_args(backtest, timeframe="1d")
+    backtest.add_argument(
+        "--param",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Strategy parameter (repeatable)",
+    )
+    backtest.add_argument("--cash", type=float, default=100000.0)
+    backtest.add_argument("--commission", type=float, default=0.01)
+    backtest.add_argument("--stake", type=float, default=0.001)
+    backtest.add_argument("--results_root", default=RESULTS_ROOT_PATH)
+    backtest.add_argument("--no_cache", action="store_true", help="Skip ResultStore")
+    backtest.add_argument("--profile", action="store_true", help="Profile the run")
+    backtest.add_argument("--plot", action="store_true", help="Plot with matplotlib")
+    backtest.set_defaults(func=cmd_backtest)
+
+    robustness = sub.add_parser(
+        "robustness", help="Evaluate a strategy on resampled price paths"
+    )
+    robustness.add_argument("strategy", help="Strategy class name, e.g. MacdStrategy")
+    _add_dataset_args(robustness, timeframe="1h")
+    robustness.add_argument(
+        "--param",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Strategy parameter (repeatable)",
+    )
+    robustness.add_argument(
+        "--method", default="bootstrap", choices=["bootstrap", "noise", "offset"]
+    )
+    robustness.add_argument("--paths", type=int, default=1000)
+    robustness.add_argument("--block", type=int, default=24, help="Bootstrap block")
+    robustness.add_argument("--sigma", type=float, default=0.5, help="Noise scale")
+    robustness.add_argument("--seed", type=int, default=0)
+    robustness.add_argument("--workers", type=int, default=None)
+    robustness.add_argument("--cash", type=float, default=100000.0)
+    robustness.add_argument("--commission", type=float, default=0.01)
+    robustness.add_argument("--stake", type=float, default=0.001)
+    robustness.set_defaults(func=cmd_robustness)
+
+    compare = sub.add_parser(
+        "compare", help="Backtest several strategies in one pass with the kernel"
+    )
+    compare.add_argument("strategies", nargs="+", help="Strategy class names")
+    _add_dataset_args(compare, timeframe="1h")
+    compare.add_argument("--cash", type=float, default=100000.0)
+    compare.add_argument("--commission", type=float, default=0.01)
+    compare.add_argument("--stake", type=float, default=0.001)
+    compare.set_defaults(func=cmd_compare)
+
+    sweep = sub.add_parser("sweep", help="Distributed parameter sweeps")
+    sweep_sub = sweep.add_subparsers(dest="action", required=True)
+    sweep_submit = sweep_sub.add_parser("submit", help="Queue a parameter grid")
+    sweep_submit.add_argument("strategy", help="Strategy class name")
+    _add_dataset_args(sweep_submit, timeframe="1d")
+    sweep_submit.add_argument(
+        "--grid",
+        action="append",
+        default=[],
+        metavar="NAME=V1,V2,...",
+        help="Parameter values (repeatable)",
+    )
+    sweep_submit.add_argument(
+        "--engine", default="backtrader", choices=["backtrader", "kernel"]
+    )
+    sweep_submit.add_argument("--chunk_size", type=int, default=8)
+    sweep_submit.add_argument("--cash", type=float, default=100000.0)
+    sweep_submit.add_argument("--commission", type=float, default=0.01)
+    sweep_submit.add_argument("--stake", type=float, default=0.001)
+    sweep_submit.add_argument(
+        "--wait", action="store_true", help="Log progress until the sweep finishes"
+    )
+    sweep_submit.add_argument("--interval", type=float, default=10.0)
+    sweep_work = sweep_sub.add_parser("work", help="Run workers on this node")
+    sweep_work.add_argument("--processes", type=int, default=None)
+    sweep_status = sweep_sub.add_parser("status", help="Show sweep progress")
+    for p in (sweep_submit, sweep_work, sweep_status):
+        p.add_argument("--queue", default=SWEEP_QUEUE, help="SQLite path or redis URL")
+    for p in (sweep_work, sweep_status):
+        p.add_argument("--sweep", default=None, help="Sweep ID (default: all)")
+    sweep.set_defaults(func=cmd_sweep)
+
+    bars = sub.add_parser("bars", help="Shared-memory bar server for local processes")
+    bars_sub = bars.add_subparsers(dest="action", required=True)
+    bars_serve = bars_sub.add_parser("serve", help="Run the bar server")
+    bars_serve.add_argument(
+        "--max_bytes",
+        type=int,
+        default=BAR_SERVER_BYTES,
+        help="Keep unused series loaded up to this many bytes",
+    )
+    bars_refresh = bars_sub.add_parser(
+        "refresh", help="Append newly stored rows to a loaded series"
+    )
+    _add_dataset_args(bars_refresh, timeframe="1m")
+    bars_stats = bars_sub.add_parser("stats", help="Show server statistics")
+    for p in (bars_serve, bars_refresh, bars_stats):
+        p.add_argument("--address", default=BAR_SERVER_ADDRESS, help="Unix socket")
+    bars.set_defaults(func=cmd_bars)
+
+    stream = sub.add_parser("stream", help="Stream live tickers and order books")
+    stream.set_defaults(func=cmd_stream)
+
+    quality = sub.add_parser("quality", help="Data quality report for a dataset")
+    _add_dataset_args(quality, timeframe="1m")
+    quality.set_defaults(func=cmd_quality)
+
+    migrate = sub.add_parser(
+        "migrate", help="Rewrite stored data with the compact storage schema"
+    )
+    migrate.add_argument("--data_root", default=DATA_ROOT_PATH)
+    migrate.add_argument("--data_type", default=None)
+    migrate.add_argument("--exchange", default=None)
+    migrate.add_argument("--dry_run", action="store_true")
+    migrate.set_defaults(func=cmd_migrate)
+
+    features = sub.add_parser(
+        "features", help="Update the feature store with newly stored bars"
+    )
+    features.add_argument("--exchange", default="binance", help="Exchange ID")
+    features.add_argument(
+        "--symbol",
+        action="append",
+        default=[],
+        help="Trading symbol (repeatable, default: every stored symbol)",
+    )
+    features.add_argument("--timeframe", default="1m")
+    _add_data_type_arg(features)
+    features.add_argument(
+        "--spot_exchange", default=None, help="Where the spot leg of the basis lives"
+    )
+    features.add_argument("--data_root", default=DATA_ROOT_PATH)
+    features.set_defaults(func=cmd_features)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if getattr(args, "bars_data_type", False) and args.data_type is None:
+        args.data_type = _ohlcv_data_type(args.timeframe)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import os
+import tempfile
 
 # -----------------------------------------------------------------------------
 # API Keys Configuration
@@ -59,6 +60,47 @@ EXCHANGE_CONFIGS_WITHOUT_API_KEYS = {
 # -----------------------------------------------------------------------------
 DATA_ROOT_PATH = "data/"
 
+# K线的 data_type 目录按周期区分: 1m K线在 ohlcv_1m 下, 其他周期在 ohlcv 下
+OHLCV_DATA_TYPES = {"1m": "ohlcv_1m"}
+OHLCV_DATA_TYPE = "ohlcv"
+
+# In-memory cache of decoded recent partitions (see data_processor/cache.py)
+PARTITION_CACHE_BYTES = int(os.getenv("CTL_CACHE_BYTES", str(256 * 1024 * 1024)))
+PARTITION_CACHE_HOT_DAYS = 7
+
+# Shared-memory bar server (see data_processor/bar_server.py): Unix socket path
+# and the total size of series kept loaded while no client is using them
+BAR_SERVER_ADDRESS = os.getenv(
+    "CTL_BAR_SERVER", os.path.join(tempfile.gettempdir(), "ctl-bars.sock")
+)
+BAR_SERVER_BYTES = int(os.getenv("CTL_BAR_SERVER_BYTES", str(4 * 1024**3)))
+
+# Object storage (see data_processor/storage.py): DATA_ROOT_PATH may be a URL
+# such as "s3://bucket/data"; options are passed to fsspec per protocol, e.g.
+# {"s3": {"endpoint_url": "http://localhost:9000"}} for MinIO
+STORAGE_OPTIONS = {}
+# Local read-through cache for remote parquet files, unset = ranged reads only
+STORAGE_CACHE_DIR = os.getenv("CTL_STORAGE_CACHE")
+
+# Exchange transport: "live" | "record" | "replay" (see data_fetcher/transport.py)
+TRANSPORT_MODE = os.getenv("CTL_TRANSPORT", "live")
+RECORDINGS_PATH = os.getenv("CTL_RECORDINGS", "recordings/")
+# Replay mode only: playback speed (0 = as fast as possible), extra latency (s),
+# latency jitter (s) and probability of a simulated RateLimitExceeded
+REPLAY_OPTIONS = {
+    "speed": float(os.getenv("CTL_REPLAY_SPEED", "0")),
+    "latency": 0.0,
+    "jitter": 0.0,
+    "rate_limit_error_rate": 0.0,
+    "seed": 0,
+}
+
+# Backtest results cache (see backtest/result_store.py)
+RESULTS_ROOT_PATH = "results/"
+# Parameter sweep job queue (see backtest/sweep.py): a SQLite file on storage
+# shared by all nodes, or a redis:// URL
+SWEEP_QUEUE = os.getenv("CTL_SWEEP_QUEUE", os.path.join(RESULTS_ROOT_PATH, "sweeps.db"))
+
 # -----------------------------------------------------------------------------
 # WebSocket Subscription Configuration
 # -----------------------------------------------------------------------------
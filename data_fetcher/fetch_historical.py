@@ -1,10 +1,51 @@
 # -*- coding: utf-8 -*-
 import ccxt
+import logging
 import pandas as pd
 from datetime import datetime
 import time
 
 from config import EXCHANGE_CONFIGS_WITHOUT_API_KEYS, USE_SANDBOX
+from data_fetcher.transport import create_exchange
+from utils import instrumentation
+
+logger = logging.getLogger(__name__)
+
+TRADE_COLUMNS = ["id", "timestamp", "price", "amount", "side"]
+
+
+def trades_to_frame(trades: list) -> pd.DataFrame:
+    """
+    把ccxt的成交列表转换为紧凑的DataFrame
+    side: 1 = 主动买, -1 = 主动卖, 0 = 未知
+    """
+    if not trades:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+
+    df = pd.DataFrame(
+        {
+            "id": pd.to_numeric(
+                pd.Series([t["id"] for t in trades]), errors="coerce"
+            ).fillna(-1),
+            "timestamp": [t["timestamp"] for t in trades],
+            "price": [t["price"] for t in trades],
+            "amount": [t["amount"] for t in trades],
+            "side": [
+                1 if t["side"] == "buy" else -1 if t["side"] == "sell" else 0
+                for t in trades
+            ],
+        }
+    )
+    df = df.astype(
+        {
+            "id": "int64",
+            "timestamp": "int64",
+            "price": "float64",
+            "amount": "float64",
+            "side": "int8",
+        }
+    )
+    return df.sort_values(["timestamp", "id"], kind="stable").reset_index(drop=True)
 
 
 class HistoricalFetcher:
@@ -12,21 +53,76 @@ class HistoricalFetcher:
     用于从交易所拉取各类历史数据的类
     """
 
-    def __init__(self, exchange_id: str):
+    def __init__(self, exchange_id: str, exchange=None, max_retries: int = 5):
         """
         初始化
         :param exchange_id: 交易所ID, e.g., 'binance'
+        :param exchange: 可选, 已创建的交易所对象 (e.g., transport.ReplayExchange);
+            默认按 config.TRANSPORT_MODE 通过 create_exchange 创建
+        :param max_retries: 限频/网络错误的最大重试次数
         """
         if exchange_id not in EXCHANGE_CONFIGS_WITHOUT_API_KEYS:
             raise ValueError(f"Exchange '{exchange_id}' is not configured in config.py")
 
         config = EXCHANGE_CONFIGS_WITHOUT_API_KEYS[exchange_id]
-        exchange_class = getattr(ccxt, exchange_id)
-        self.exchange = exchange_class(config)
+        if exchange is None:
+            exchange = create_exchange(exchange_id, config)
+        self.exchange = exchange
+        self.max_retries = max_retries
         if USE_SANDBOX == True:
             self.exchange.set_sandbox_mode(True)
         self.exchange.load_markets()
-        print(f"Initialized fetcher for {exchange_id}.")
+        logger.info(f"Initialized fetcher for {exchange_id}.")
+
+    def _request(self, method: str, *args):
+        """
+        调用交易所接口, 遇到限频或网络错误时指数退避重试
+        """
+        exchange_id = self.exchange.id
+        latency = instrumentation.histogram(
+            "exchange_request_seconds",
+            "REST request latency",
+            exchange=exchange_id,
+            method=method,
+        )
+        delay = max(self.exchange.rateLimit / 1000, 0.05)
+        for attempt in range(self.max_retries + 1):
+            try:
+                with latency.time():
+                    return getattr(self.exchange, method)(*args)
+            except ccxt.NetworkError as e:  # 包含 RateLimitExceeded
+                if attempt == self.max_retries:
+                    raise
+                instrumentation.counter(
+                    "exchange_retries_total",
+                    "Retried requests",
+                    exchange=exchange_id,
+                    error=type(e).__name__,
+                ).inc()
+                logger.warning(
+                    f"{type(e).__name__} on {method}, retrying in {delay:.2f}s..."
+                )
+                self._wait(delay)
+                delay *= 2
+
+    def _wait(self, seconds: float):
+        """
+        限频等待, 同时记录等待时长
+        """
+        instrumentation.histogram(
+            "rate_limit_wait_seconds",
+            "Time spent sleeping for rate limits",
+            exchange=self.exchange.id,
+        ).observe(seconds)
+        time.sleep(seconds)
+
+    def _count_rows(self, data_type: str, n: int):
+        instrumentation.counter(
+            "rows_fetched_total",
+            "Rows fetched from the exchange",
+            exchange=self.exchange.id,
+            data_type=data_type,
+        ).inc(n)
 
     def fetch_ohlcv(
         self, symbol: str, timeframe: str = "1m", since: int = None, limit: int = 1000
@@ -40,21 +136,22 @@ class HistoricalFetcher:
         :return: DataFrame
         """
         if not self.exchange.has["fetchOHLCV"]:
-            print(f"{self.exchange.id} does not support fetchOHLCV.")
+            logger.warning(f"{self.exchange.id} does not support fetchOHLCV.")
             return pd.DataFrame()
 
-        print(
+        logger.debug(
             f"Fetching OHLCV for {symbol} on {self.exchange.id} from {datetime.fromtimestamp(since/1000) if since else 'latest'}..."
         )
         try:
-            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since, limit)
+            ohlcv = self._request("fetch_ohlcv", symbol, timeframe, since, limit)
             df = pd.DataFrame(
                 ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"]
             )
             df["datetime"] = pd.to_datetime(df["timestamp"], unit="ms")
+            self._count_rows("ohlcv", len(df))
             return df
         except Exception as e:
-            print(f"Error fetching OHLCV for {symbol}: {e}")
+            logger.error(f"Error fetching OHLCV for {symbol}: {e}")
             return pd.DataFrame()
 
     def fetch_funding_rate(
@@ -68,21 +165,24 @@ class HistoricalFetcher:
         :return: DataFrame
         """
         if not self.exchange.has["fetchFundingRateHistory"]:
-            print(f"{self.exchange.id} does not support fetchFundingRateHistory.")
+            logger.warning(
+                f"{self.exchange.id} does not support fetchFundingRateHistory."
+            )
             return pd.DataFrame()
 
-        print(f"Fetching funding rate for {symbol} on {self.exchange.id}...")
+        logger.info(f"Fetching funding rate for {symbol} on {self.exchange.id}...")
         try:
             params = {"symbol": symbol}
-            funding_rates = self.exchange.fetch_funding_rate_history(
-                symbol, since, limit, params
+            funding_rates = self._request(
+                "fetch_funding_rate_history", symbol, since, limit, params
             )
             df = pd.DataFrame(funding_rates)
             # 数据清洗和格式化
             df = df[["timestamp", "datetime", "fundingRate"]]
+            self._count_rows("funding_rate", len(df))
             return df
         except Exception as e:
-            print(f"Error fetching funding rates for {symbol}: {e}")
+            logger.error(f"Error fetching funding rates for {symbol}: {e}")
             return pd.DataFrame()
 
     def fetch_all_history(
@@ -110,7 +210,7 @@ class HistoricalFetcher:
                 break
             since = new_since
 
-            time.sleep(self.exchange.rateLimit / 1000)  # 遵守交易所的请求频率限制
+            self._wait(self.exchange.rateLimit / 1000)  # 遵守交易所的请求频率限制
 
         if not all_ohlcv:
             return pd.DataFrame()
@@ -119,6 +219,103 @@ class HistoricalFetcher:
         full_df.drop_duplicates(subset=["timestamp"], keep="first", inplace=True)
         return full_df
 
+    def fetch_trades(
+        self, symbol: str, since: int = None, limit: int = 1000, params: dict = None
+    ) -> pd.DataFrame:
+        """
+        获取逐笔成交, 只保留回放需要的字段并使用紧凑的数据类型
+        :param symbol: 交易对
+        :param since: 起始时间戳 (ms)
+        :param limit: 单次请求数量
+        :param params: 交易所特定参数, e.g., {'fromId': 123}
+        :return: DataFrame[id:int64, timestamp:int64, price:float64, amount:float64, side:int8]
+        """
+        if not self.exchange.has["fetchTrades"]:
+            logger.warning(f"{self.exchange.id} does not support fetchTrades.")
+            return pd.DataFrame()
+
+        try:
+            trades = self._request("fetch_trades", symbol, since, limit, params or {})
+        except Exception as e:
+            logger.error(f"Error fetching trades for {symbol}: {e}")
+            return pd.DataFrame()
+
+        self._count_rows("trades", len(trades))
+        return trades_to_frame(trades)
+
+    def iter_trade_history(
+        self,
+        symbol: str,
+        start_date_str: str,
+        end_date_str: str = None,
+        paginate: str = "timestamp",
+        limit: int = 1000,
+    ):
+        """
+        分页拉取一段时间内的全部逐笔成交, 按页返回DataFrame的生成器
+        :param symbol: 交易对
+        :param start_date_str: 起始日期 'YYYY-MM-DD'
+        :param end_date_str: 结束日期 'YYYY-MM-DD' (不含), 默认拉到最新
+        :param paginate: 'timestamp' 按时间戳翻页; 'id' 按成交ID翻页 (binance的fromId)
+        :param limit: 单次请求数量
+        """
+        since = self.exchange.parse8601(start_date_str + "T00:00:00Z")
+        end_ts = (
+            self.exchange.parse8601(end_date_str + "T00:00:00Z")
+            if end_date_str
+            else None
+        )
+        params = None
+        last_id = None
+        # 最后一个已返回的毫秒及其中已返回的成交数
+        last_ts, seen = None, 0
+
+        while True:
+            raw = self.fetch_trades(symbol, since, limit, params)
+            if raw.empty:
+                break
+
+            page = raw
+            if last_id is not None and last_id >= 0:
+                # 翻页边界上同一毫秒的成交会被重复返回, 按ID去重
+                page = page[page["id"] > last_id]
+            elif last_ts is not None:
+                # 成交ID不是数字: 从 last_ts 重新拉取时, 该毫秒已返回的 seen 笔
+                # 成交按同样的顺序排在最前面
+                same = page["timestamp"] == last_ts
+                page = page[
+                    (page["timestamp"] > last_ts) | (same & (same.cumsum() > seen))
+                ]
+            if end_ts is not None:
+                page = page[page["timestamp"] < end_ts]
+
+            if not page.empty:
+                yield page
+                last_id = int(page["id"].iloc[-1])
+                ts = int(page["timestamp"].iloc[-1])
+                n = int((page["timestamp"] == ts).sum())
+                last_ts, seen = ts, seen + n if ts == last_ts else n
+            elif len(raw) < limit:
+                break  # 没有新的成交
+
+            if end_ts is not None and raw["timestamp"].iloc[-1] >= end_ts:
+                break
+
+            if paginate == "id":
+                since, params = None, {"fromId": int(raw["id"].iloc[-1]) + 1}
+            elif page.empty:
+                # 同一毫秒的成交超过一页, 按时间戳翻页取不到其余部分, 只能跳过该毫秒
+                since = int(raw["timestamp"].iloc[-1]) + 1
+                logger.warning(
+                    f"More than {limit} trades for {symbol} at {since - 1} ms: "
+                    f"trades after the first {limit} in that millisecond are skipped. "
+                    "Use paginate='id' or a larger limit to fetch them."
+                )
+            else:
+                since = int(raw["timestamp"].iloc[-1])
+
+            self._wait(self.exchange.rateLimit / 1000)  # 遵守交易所的请求频率限制
+
 
 # 示例
 if __name__ == "__main__":
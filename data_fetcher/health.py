@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+实时数据流的健康监控: 按 (exchange, channel, symbol) 统计
+
+    - 交易所时间戳到本地接收时间的延迟分位数 (对数分桶, 内存固定)
+    - 消息速率 (指数衰减的每秒消息数)
+    - 距上一条消息的时间 (staleness)
+    - 序列缺口: 订单簿 nonce 回退, ccxt 抛出 InvalidNonce/ChecksumError,
+      以及 id 连续的交易所 (CONTIGUOUS_TRADE_IDS) 的逐笔成交 id 跳号
+
+supervise 负责订阅循环: 超过 stale_after 秒没有消息时重新订阅; 出错时按指数退避
+重试 (不再退出); 发现缺口时用 REST 重新同步 (订单簿重新订阅并拉取快照,
+逐笔成交补齐缺失的成交).
+
+    monitor = StreamMonitor()
+    await asyncio.gather(supervise("binance", "orderbook", on_book, monitor), monitor.run())
+
+monitor.report() 返回当前统计; 打开 utils.instrumentation 时 monitor.run()
+定期把统计写成 ws_* 指标并导出到 CTL_METRICS_FILE.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import NamedTuple
+
+import ccxt
+
+from config import WS_SYMBOLS
+from data_fetcher.transport import create_exchange
+from data_processor.symbols import REGISTRY as SYMBOLS
+from utils import instrumentation
+from utils.instrumentation import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+WATCH_METHODS = {
+    "ticker": "watch_ticker",
+    "orderbook": "watch_order_book",
+    "trades": "watch_trades",
+}
+# 超过该秒数没有消息视为断流
+STALE_AFTER = {"ticker": 30.0, "orderbook": 30.0, "trades": 120.0}
+# 逐笔成交 id 为逐个递增整数的交易所
+CONTIGUOUS_TRADE_IDS = {"binance", "binanceusdm"}
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class LagStats(LatencyStats):
+    """交易所到本地的延迟: 0.1ms ~ 100s"""
+
+    MIN = 1e-4
+    DECADES = 6
+
+
+class Gap(NamedTuple):
+    """
+    序列缺口: after 为缺口前最后一个序号, before 为缺口后第一个序号,
+    since 为缺口前最后一条消息的交易所时间戳 (毫秒); 由 ccxt 报告的缺口均为None
+    """
+
+    after: int = None
+    before: int = None
+    since: int = None
+
+
+class StreamStats:
+    """单个数据流的统计, 内存与消息数无关"""
+
+    def __init__(self, now: float):
+        self.started = now
+        self.latency = LagStats()
+        self.messages = 0
+        self.rate = 0.0
+        self.last_received = None
+        self.last_sequence = None
+        self.last_timestamp = None
+        self.gaps = 0
+        self.missing = 0
+        self.stale = 0
+        self.errors = 0
+        self.reconnects = 0
+
+
+class StreamMonitor:
+    """
+    :param stale_after: {channel: 秒}, 覆盖 STALE_AFTER
+    :param rate_window: 消息速率的时间常数 (秒)
+    :param backoff: 出错重试的 (初始, 最大) 等待秒数, 每次失败翻倍
+    :param clock: 当前时间 (秒), 测试时可替换
+    """
+
+    def __init__(
+        self,
+        stale_after: dict = None,
+        rate_window: float = 60.0,
+        backoff: tuple = (1.0, 60.0),
+        contiguous_trade_ids=CONTIGUOUS_TRADE_IDS,
+        clock=time.time,
+    ):
+        self.stale_after = {**STALE_AFTER, **(stale_after or {})}
+        self.rate_window = rate_window
+        self.backoff = backoff
+        self.contiguous_trade_ids = set(contiguous_trade_ids)
+        self.clock = clock
+        self.streams = {}
+
+    def stats(self, exchange: str, channel: str, symbol: str) -> StreamStats:
+        key = (exchange, channel, symbol)
+        stats = self.streams.get(key)
+        if stats is None:
+            stats = self.streams[key] = StreamStats(self.clock())
+        return stats
+
+    def on_message(self, exchange: str, channel: str, symbol: str, message) -> Gap:
+        """
+        记录一条消息 (ticker / 订单簿 dict, 或一批逐笔成交 list)
+        :return: 发现序列缺口时返回 Gap, 否则为None
+        """
+        now = self.clock()
+        stats = self.stats(exchange, channel, symbol)
+        if stats.last_received is not None:
+            decay = math.exp(-(now - stats.last_received) / self.rate_window)
+            stats.rate *= decay
+        stats.rate += 1.0 / self.rate_window
+        stats.last_received = now
+        stats.messages += 1
+
+        last = message[-1] if isinstance(message, list) else message
+        ts = last.get("timestamp") if last else None
+        if ts:
+            stats.latency.observe(now - ts / 1000)
+
+        gap = None
+        if channel == "orderbook":
+            nonce = message.get("nonce")
+            if nonce is not None:
+                if stats.last_sequence is not None and nonce < stats.last_sequence:
+                    gap = Gap(stats.last_sequence, nonce, stats.last_timestamp)
+                stats.last_sequence = nonce
+        elif channel == "trades" and message and exchange in self.contiguous_trade_ids:
+            first, last_id = int(message[0]["id"]), int(message[-1]["id"])
+            if stats.last_sequence is not None and first > stats.last_sequence + 1:
+                gap = Gap(stats.last_sequence, first, stats.last_timestamp)
+                stats.missing += first - stats.last_sequence - 1
+            stats.last_sequence = max(last_id, stats.last_sequence or last_id)
+        if ts:
+            stats.last_timestamp = ts
+        if gap is not None:
+            self.on_gap(exchange, channel, symbol, gap)
+
+        if instrumentation.enabled():
+            labels = dict(exchange=exchange, channel=channel, symbol=symbol)
+            instrumentation.counter(
+                "ws_messages_total", "WebSocket messages received", **labels
+            ).inc()
+            if ts:
+                instrumentation.histogram(
+                    "ws_message_lag_seconds",
+                    "Exchange timestamp to local receive time",
+                    **labels,
+                ).observe(now - ts / 1000)
+        return gap
+
+    def _count(self, name: str, help: str, exchange, channel, symbol):
+        instrumentation.counter(
+            name, help, exchange=exchange, channel=channel, symbol=symbol
+        ).inc()
+
+    def on_gap(self, exchange: str, channel: str, symbol: str, gap: Gap = Gap()):
+        self.stats(exchange, channel, symbol).gaps += 1
+        self._count(
+            "ws_sequence_gaps_total", "Sequence gaps", exchange, channel, symbol
+        )
+        logger.warning(
+            f"[{exchange}] [{channel}] [{symbol}] sequence gap "
+            f"{gap.after} -> {gap.before}, resyncing"
+        )
+
+    def on_stale(self, exchange: str, channel: str, symbol: str):
+        self.stats(exchange, channel, symbol).stale += 1
+        self._count("ws_stale_total", "Streams gone stale", exchange, channel, symbol)
+
+    def on_error(self, exchange: str, channel: str, symbol: str):
+        self.stats(exchange, channel, symbol).errors += 1
+        self._count("ws_errors_total", "Watch errors", exchange, channel, symbol)
+
+    def on_reconnect(self, exchange: str, channel: str, symbol: str):
+        self.stats(exchange, channel, symbol).reconnects += 1
+        self._count("ws_reconnects_total", "Resubscriptions", exchange, channel, symbol)
+
+    def report(self, now: float = None) -> list:
+        """每个数据流一行: 延迟分位数, 速率, staleness 与各类计数"""
+        now = self.clock() if now is None else now
+        rows = []
+        for (exchange, channel, symbol), stats in sorted(self.streams.items()):
+            since = now - (stats.last_received or stats.started)
+            row = dict(
+                exchange=exchange,
+                channel=channel,
+                symbol=symbol,
+                messages=stats.messages,
+                rate=stats.rate * math.exp(-since / self.rate_window),
+                stale_seconds=since,
+                stale=since > self.stale_after.get(channel, math.inf),
+            )
+            for q in QUANTILES:
+                row[f"lag_p{round(q * 100)}"] = stats.latency.quantile(q)
+            row["lag_max"] = stats.latency.max
+            for name in ("gaps", "missing", "errors", "reconnects"):
+                row[name] = getattr(stats, name)
+            rows.append(row)
+        return rows
+
+    def publish(self, now: float = None) -> list:
+        """把 report() 写成 ws_* gauge 指标"""
+        rows = self.report(now)
+        if not instrumentation.enabled():
+            return rows
+        for row in rows:
+            labels = {k: row[k] for k in ("exchange", "channel", "symbol")}
+            instrumentation.gauge(
+                "ws_message_rate", "Messages per second (decayed)", **labels
+            ).set(row["rate"])
+            instrumentation.gauge(
+                "ws_stale_seconds", "Seconds since the last message", **labels
+            ).set(row["stale_seconds"])
+            for q in QUANTILES:
+                instrumentation.gauge(
+                    "ws_lag_seconds",
+                    "Exchange to local latency quantiles",
+                    quantile=str(q),
+                    **labels,
+                ).set(row[f"lag_p{round(q * 100)}"])
+        return rows
+
+    async def run(self, interval: float = 10.0):
+        """定期发布/导出指标并报告断流的数据流, 直到被取消"""
+        while True:
+            await asyncio.sleep(interval)
+            for row in self.publish():
+                if row["stale"]:
+                    logger.warning(
+                        f"[{row['exchange']}] [{row['channel']}] [{row['symbol']}] "
+                        f"no message for {row['stale_seconds']:.0f}s"
+                    )
+            instrumentation.export()
+
+
+async def resync_order_book(exchange, venue: str, gap: Gap, orderbook):
+    """订单簿缺口: 重新订阅 (关闭连接, 下次 watch 时重建), 并用REST快照代替当前消息"""
+    await exchange.close()
+    return [await exchange.fetch_order_book(venue)]
+
+
+async def resync_trades(exchange, venue: str, gap: Gap, trades):
+    """逐笔成交id跳号: 用REST补齐缺失的成交, 放在这一批之前"""
+    fetched = await exchange.fetch_trades(venue, since=gap.since)
+    missed = [t for t in fetched if gap.after < int(t["id"]) < gap.before]
+    if len(missed) < gap.before - gap.after - 1:
+        logger.warning(
+            f"[{venue}] recovered {len(missed)} of {gap.before - gap.after - 1} "
+            f"missing trades"
+        )
+    return [missed + list(trades or [])]
+
+
+RESYNC = {"orderbook": resync_order_book, "trades": resync_trades}
+
+
+async def _resubscribe(exchange, monitor, exchange_id, channel, symbol):
+    monitor.on_reconnect(exchange_id, channel, symbol)
+    try:
+        await exchange.close()
+    except Exception as e:
+        logger.warning(f"Error closing {exchange_id} connection: {e}")
+
+
+async def supervise(
+    exchange_id: str,
+    channel: str,
+    handle,
+    monitor: StreamMonitor = None,
+    symbols=None,
+    exchange=None,
+):
+    """
+    订阅一个 channel 的全部交易对, 直到被取消
+    :param channel: 'ticker' / 'orderbook' / 'trades'
+    :param handle: handle(symbol, message) 处理每条消息
+    :param monitor: 默认为模块级的 MONITOR
+    :param exchange: ccxt.pro 交易所对象, 默认 create_exchange(exchange_id, pro=True)
+    """
+    monitor = monitor or MONITOR
+    symbols = symbols or WS_SYMBOLS
+    exchange = exchange or create_exchange(exchange_id, pro=True)
+    watch = getattr(exchange, WATCH_METHODS[channel])
+    timeout = monitor.stale_after.get(channel)
+    resync = RESYNC.get(channel)
+    failures = 0
+    try:
+        while True:
+            for symbol in symbols:
+                venue = SYMBOLS.venue_symbol(exchange_id, symbol)
+                try:
+                    try:
+                        message = await asyncio.wait_for(watch(venue), timeout)
+                    except (ccxt.InvalidNonce, ccxt.ChecksumError):
+                        # ccxt 自己发现的缺口 (增量序号不连续 / 校验和不符)
+                        gap, message = Gap(), None
+                        monitor.on_gap(exchange_id, channel, symbol, gap)
+                    else:
+                        gap = monitor.on_message(exchange_id, channel, symbol, message)
+                    if gap is not None and resync is not None:
+                        messages = await resync(exchange, venue, gap, message)
+                    else:
+                        messages = [message] if message is not None else []
+                    for m in messages:
+                        handle(symbol, m)
+                    failures = 0
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"[{exchange_id}] [{channel}] [{symbol}] no message for "
+                        f"{timeout}s, resubscribing"
+                    )
+                    monitor.on_stale(exchange_id, channel, symbol)
+                    await _resubscribe(exchange, monitor, exchange_id, channel, symbol)
+                except Exception as e:
+                    failures += 1
+                    base, cap = monitor.backoff
+                    delay = min(cap, base * 2 ** (failures - 1))
+                    logger.error(
+                        f"Error watching {channel} on {exchange_id} ({symbol}): {e}; "
+                        f"retrying in {delay:.1f}s"
+                    )
+                    monitor.on_error(exchange_id, channel, symbol)
+                    await asyncio.sleep(delay)
+                    await _resubscribe(exchange, monitor, exchange_id, channel, symbol)
+    finally:
+        await exchange.close()
+
+
+MONITOR = StreamMonitor()
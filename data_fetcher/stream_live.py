@@ -1,49 +1,62 @@
 # -*- coding: utf-8 -*-
-import ccxt.pro
 import asyncio
+import logging
 
-from config import WS_SYMBOLS, WS_EXCHANGES
+from config import WS_EXCHANGES
+from data_fetcher.health import MONITOR, StreamMonitor, supervise
+from data_processor.bar_builder import BarBuilder
+from utils.logger import setup_logger
 
+logger = logging.getLogger(__name__)
 
-async def watch_ticker(exchange_id):
+
+async def watch_ticker(exchange_id, monitor: StreamMonitor = None):
     """
     订阅Ticker数据
     """
-    exchange_class = getattr(ccxt.pro, exchange_id)
-    exchange = exchange_class()
-
-    while True:
-        try:
-            for symbol in WS_SYMBOLS:
-                ticker = await exchange.watch_ticker(symbol)
-                print(
-                    f"[{exchange.id}] [{symbol}] Ticker: {ticker['datetime']}, Close: {ticker['close']}"
-                )
-        except Exception as e:
-            print(f"Error watching ticker on {exchange_id}: {e}")
-            break  # 出错时退出循环
-    await exchange.close()
-
-
-async def watch_l2_orderbook(exchange_id):
+
+    def handle(symbol, ticker):
+        logger.debug(
+            f"[{exchange_id}] [{symbol}] Ticker: {ticker.get('datetime')}, Close: {ticker['close']}"
+        )
+
+    await supervise(exchange_id, "ticker", handle, monitor)
+
+
+async def watch_l2_orderbook(exchange_id, monitor: StreamMonitor = None):
     """
-    订阅L2 Orderbook数据
+    订阅L2 Orderbook数据, nonce 回退或 ccxt 报告缺口时重新订阅并拉取REST快照
     """
-    exchange_class = getattr(ccxt.pro, exchange_id)
-    exchange = exchange_class()
-
-    while True:
-        try:
-            for symbol in WS_SYMBOLS:
-                orderbook = await exchange.watch_order_book(symbol)
-                print(
-                    f"[{exchange.id}] [{symbol}] OrderBook: {orderbook['datetime']}, "
-                    f"Best Ask: {orderbook['asks'][0][0]}, Best Bid: {orderbook['bids'][0][0]}"
-                )
-        except Exception as e:
-            print(f"Error watching order book on {exchange_id}: {e}")
-            break
-    await exchange.close()
+
+    def handle(symbol, orderbook):
+        if orderbook["bids"] and orderbook["asks"]:
+            logger.debug(
+                f"[{exchange_id}] [{symbol}] OrderBook: {orderbook.get('datetime')}, "
+                f"Best Ask: {orderbook['asks'][0][0]}, Best Bid: {orderbook['bids'][0][0]}"
+            )
+
+    await supervise(exchange_id, "orderbook", handle, monitor)
+
+
+async def watch_bars(exchange_id, builder, monitor: StreamMonitor = None):
+    """
+    订阅逐笔成交并合成K线, 收盘的bar通过 builder.on_bar 回调
+    成交id跳号时用REST补齐缺失的成交
+    :param builder: data_processor.bar_builder.BarBuilder
+    """
+
+    def handle(symbol, trades):
+        for t in trades:
+            builder.on_trade(symbol, t["timestamp"], t["price"], t["amount"])
+
+    await supervise(exchange_id, "trades", handle, monitor)
+
+
+def log_bar(bar):
+    logger.debug(
+        f"[{bar.symbol}] Bar: {bar.timestamp}, O: {bar.open}, H: {bar.high}, "
+        f"L: {bar.low}, C: {bar.close}, V: {bar.volume}"
+    )
 
 
 async def main():
@@ -51,6 +64,9 @@ async def main():
     for exchange_id in WS_EXCHANGES:
         tasks.append(watch_ticker(exchange_id))
         tasks.append(watch_l2_orderbook(exchange_id))
+        builder = BarBuilder("1m", on_bar=log_bar)
+        tasks.append(watch_bars(exchange_id, builder, MONITOR))
+    tasks.append(MONITOR.run())
 
     await asyncio.gather(*tasks)
 
@@ -58,8 +74,9 @@ async def main():
 if __name__ == "__main__":
     # 提示: 实时数据流会持续打印，需要手动停止 (Ctrl+C)
     # 实际项目中，数据会被送入消息队列(如Kafka)或直接存入数据库
-    print("Starting WebSocket data streams... Press Ctrl+C to stop.")
+    setup_logger("stream")
+    logger.info("Starting WebSocket data streams... Press Ctrl+C to stop.")
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        print("Stopping WebSocket streams.")
+        logger.info("Stopping WebSocket streams.")
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+交易所传输层: 在真实ccxt连接和本地录制/回放之间切换
+
+- live:   直接使用ccxt (默认)
+- record: 使用ccxt, 同时把每次请求的参数/结果/耗时追加写入 <recordings>/<exchange>.jsonl
+- replay: 不联网, 按录制文件返回结果, 可调节回放速度, 模拟延迟和限频错误
+
+HistoricalFetcher 与 stream_live 都通过 create_exchange 获取交易所对象,
+模式由 config.TRANSPORT_MODE (环境变量 CTL_TRANSPORT) 决定.
+"""
+
+import asyncio
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+import ccxt
+
+from config import TRANSPORT_MODE, RECORDINGS_PATH, REPLAY_OPTIONS
+
+# 需要录制的方法前缀
+RECORDED_PREFIXES = ("fetch_", "watch_", "load_markets")
+# 回放时从录制文件头恢复的属性
+HEADER_ATTRIBUTES = ("id", "has", "rateLimit", "timeframes")
+
+
+class RecordingExhausted(ccxt.ExchangeError):
+    """
+    回放时录制文件中已没有对应的响应
+    不是 NetworkError 的子类, 因此不会被重试
+    """
+
+
+def _call_key(method: str, args: tuple, kwargs: dict) -> str:
+    return json.dumps([method, list(args), kwargs], sort_keys=True, default=str)
+
+
+def recording_path(exchange_id: str, recording_dir: str = RECORDINGS_PATH) -> str:
+    return os.path.join(recording_dir, f"{exchange_id}.jsonl")
+
+
+class RecordingExchange:
+    """
+    包装一个真实的ccxt交易所对象, 把请求与响应写入JSON Lines文件
+    未录制的属性/方法直接透传
+    :param overwrite: 为True时清空已有的录制, 默认追加为新的一段 (以header开始)
+    """
+
+    def __init__(self, exchange, path: str, overwrite: bool = False):
+        self._exchange = exchange
+        self._path = path
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "w" if overwrite else "a", encoding="utf-8")
+        header = {a: getattr(exchange, a, None) for a in HEADER_ATTRIBUTES}
+        self._write({"type": "header", **header})
+
+    def _write(self, record: dict):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def _record(self, method, args, kwargs, started, result=None, error=None):
+        record = {
+            "type": "call",
+            "key": _call_key(method, args, kwargs),
+            "t": started - self._t0,
+            "latency": time.monotonic() - started,
+        }
+        if error is not None:
+            record["error"] = {"type": type(error).__name__, "message": str(error)}
+        else:
+            record["result"] = result
+        self._write(record)
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        if not callable(attr) or not name.startswith(RECORDED_PREFIXES):
+            return attr
+
+        if inspect.iscoroutinefunction(attr):
+
+            async def async_wrapper(*args, **kwargs):
+                started = time.monotonic()
+                try:
+                    result = await attr(*args, **kwargs)
+                except Exception as e:
+                    self._record(name, args, kwargs, started, error=e)
+                    raise
+                self._record(name, args, kwargs, started, result=result)
+                return result
+
+            return async_wrapper
+
+        def wrapper(*args, **kwargs):
+            started = time.monotonic()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                self._record(name, args, kwargs, started, error=e)
+                raise
+            self._record(name, args, kwargs, started, result=result)
+            return result
+
+        return wrapper
+
+    async def close(self):
+        self._file.close()
+        close = getattr(self._exchange, "close", None)
+        if close is not None and inspect.iscoroutinefunction(close):
+            await close()
+
+
+class ReplayExchange:
+    """
+    根据录制文件模拟交易所, 不访问网络
+
+    :param path: 录制文件路径
+    :param speed: 回放速度倍数; 1.0 = 按录制时的节奏, 10.0 = 快10倍, 0 = 不等待
+    :param latency: 每次请求额外的模拟延迟 (秒)
+    :param jitter: 延迟的随机抖动上限 (秒)
+    :param rate_limit_error_rate: 以此概率抛出 ccxt.RateLimitExceeded (不消耗录制的响应)
+    :param seed: 随机数种子, 保证基准测试可复现
+    """
+
+    def __init__(
+        self,
+        path: str,
+        speed: float = 0.0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit_error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.speed = speed
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_error_rate = rate_limit_error_rate
+        self._rng = random.Random(seed)
+        self._responses = defaultdict(deque)
+        self._header = {}
+        self._t0 = None
+        self.markets = {}
+
+        # 追加录制的多段按顺序接在一起: 每段的时间轴从上一段结束时开始
+        offset = end = 0.0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["type"] == "header":
+                    self._header = record
+                    offset = end
+                else:
+                    record["t"] += offset
+                    end = max(end, record["t"] + record["latency"])
+                    self._responses[record["key"]].append(record)
+
+        for attr in HEADER_ATTRIBUTES:
+            setattr(self, attr, self._header.get(attr))
+        self.has = self.has or {}
+        self.rateLimit = self.rateLimit or 0
+
+    # ccxt工具函数不依赖网络, 直接复用
+    parse8601 = staticmethod(ccxt.Exchange.parse8601)
+    iso8601 = staticmethod(ccxt.Exchange.iso8601)
+    milliseconds = staticmethod(ccxt.Exchange.milliseconds)
+
+    def set_sandbox_mode(self, enabled: bool):
+        pass
+
+    def _next(self, method, args, kwargs) -> tuple[dict, float]:
+        """
+        取出下一条录制的响应, 返回 (记录, 需要等待的秒数)
+        """
+        if (
+            self.rate_limit_error_rate
+            and self._rng.random() < self.rate_limit_error_rate
+        ):
+            raise ccxt.RateLimitExceeded(f"[replay] simulated rate limit on {method}")
+
+        queue = self._responses.get(_call_key(method, args, kwargs))
+        if not queue:
+            raise RecordingExhausted(
+                f"[replay] no recorded response for {method}{args}"
+            )
+        record = queue.popleft()
+
+        wait = self.latency + (
+            self._rng.uniform(0, self.jitter) if self.jitter else 0.0
+        )
+        if self.speed:
+            now = time.monotonic()
+            if self._t0 is None:
+                self._t0 = now - record["t"] / self.speed
+            # 按录制的时间轴对齐, 包括原始请求耗时
+            due = self._t0 + (record["t"] + record["latency"]) / self.speed
+            wait += max(0.0, due - now)
+        return record, wait
+
+    @staticmethod
+    def _result(record: dict):
+        error = record.get("error")
+        if error is not None:
+            error_class = getattr(ccxt, error["type"], ccxt.ExchangeError)
+            raise error_class(error["message"])
+        return record["result"]
+
+    def _call(self, method, args, kwargs):
+        record, wait = self._next(method, args, kwargs)
+        if wait > 0:
+            time.sleep(wait)
+        result = self._result(record)
+        if method == "load_markets":
+            self.markets = result
+        return result
+
+    async def _acall(self, method, args, kwargs):
+        record, wait = self._next(method, args, kwargs)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return self._result(record)
+
+    def __getattr__(self, name):
+        if name.startswith("watch_"):
+
+            async def async_method(*args, **kwargs):
+                return await self._acall(name, args, kwargs)
+
+            return async_method
+
+        if name.startswith(RECORDED_PREFIXES):
+            return lambda *args, **kwargs: self._call(name, args, kwargs)
+
+        raise AttributeError(name)
+
+    async def close(self):
+        pass
+
+
+def create_exchange(
+    exchange_id: str,
+    config: dict = None,
+    pro: bool = False,
+    mode: str = None,
+    recording_dir: str = RECORDINGS_PATH,
+    **replay_options,
+):
+    """
+    按传输模式创建交易所对象
+    :param exchange_id: 交易所ID, e.g., 'binance'
+    :param config: ccxt配置
+    :param pro: 是否使用 ccxt.pro (WebSocket)
+    :param mode: 'live' / 'record' / 'replay', 默认取 config.TRANSPORT_MODE
+    :param recording_dir: 录制文件目录
+    :param replay_options: 传给 ReplayExchange 的参数 (speed, latency, ...),
+        覆盖 config.REPLAY_OPTIONS
+    """
+    mode = mode or TRANSPORT_MODE
+    # REST 与 WebSocket 的录制分开保存
+    name = f"{exchange_id}.pro" if pro else exchange_id
+    path = recording_path(name, recording_dir)
+
+    if mode == "replay":
+        return ReplayExchange(path, **{**REPLAY_OPTIONS, **replay_options})
+
+    if pro:
+        from ccxt import pro as ccxt_pro
+
+        exchange = getattr(ccxt_pro, exchange_id)(config or {})
+    else:
+        exchange = getattr(ccxt, exchange_id)(config or {})
+
+    if mode == "record":
+        return RecordingExchange(exchange, path)
+    if mode != "live":
+        raise ValueError(f"Unknown transport mode: {mode}")
+    return exchange
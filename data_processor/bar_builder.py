@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+实时K线合成: 把逐笔成交 / ticker 合成为固定周期 (e.g., 1s, 1m) 的OHLCV
+
+    builder = BarBuilder("1m", on_bar=handle_bar)
+    builder.on_trade("BTC/USDT", ts_ms, price, amount)   # 每个事件 O(1)
+    builder.on_ticker(ticker)                            # ccxt ticker 字典
+
+一根bar在收到下一周期的第一个事件 (或调用 flush(now)) 时收盘并回调 on_bar.
+收盘的bar可以直接喂给 indicators.streaming 中的增量指标.
+"""
+
+from typing import Callable, NamedTuple
+
+TIMEFRAME_MS = {"s": 1_000, "m": 60_000, "h": 3_600_000, "d": 86_400_000}
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """
+    '1s' / '1m' / '4h' -> 毫秒
+    """
+    unit = timeframe[-1]
+    if unit not in TIMEFRAME_MS:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return int(timeframe[:-1] or 1) * TIMEFRAME_MS[unit]
+
+
+class Bar(NamedTuple):
+    timestamp: int  # bar开始时间 (ms)
+    symbol: str
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    trades: int
+
+
+class BarBuilder:
+    """
+    多交易对的K线合成器, 每个交易对只保存当前未收盘的一根bar
+
+    :param timeframe: 周期, e.g., '1s', '1m'
+    :param on_bar: 收盘回调 on_bar(bar); 为None时收盘的bar从 on_trade/flush 的返回值取得
+    :param fill_gaps: 没有成交的周期是否补一根平盘bar (volume=0), 保证bar时间连续
+    """
+
+    def __init__(
+        self,
+        timeframe: str = "1m",
+        on_bar: Callable[[Bar], None] = None,
+        fill_gaps: bool = False,
+    ):
+        self.interval = timeframe_to_ms(timeframe)
+        self.on_bar = on_bar
+        self.fill_gaps = fill_gaps
+        # symbol -> [start, open, high, low, close, volume, trades]
+        self._open = {}
+        # fill_gaps: symbol -> (下一根待补bar的开始时间, 最近收盘价)
+        self._last = {}
+        # ticker的成交量是24h滚动值, 用相邻两次的差作为增量
+        self._last_ticker_volume = {}
+        # 属于已收盘bar的迟到成交数 (被丢弃)
+        self.late = 0
+
+    def _emit(self, closed: list):
+        if self.on_bar is not None:
+            for bar in closed:
+                self.on_bar(bar)
+            closed.clear()
+        return closed
+
+    def _fill(self, symbol: str, until: int, closed: list):
+        """补齐上一根bar之后到 until (不含) 之间没有成交的周期"""
+        last = self._last.get(symbol)
+        if last is None:
+            return
+        start, close = last
+        for t in range(start, until, self.interval):
+            closed.append(Bar(t, symbol, close, close, close, close, 0.0, 0))
+        if until > start:
+            self._last[symbol] = (until, close)
+
+    def _close(self, symbol: str, state: list, closed: list):
+        closed.append(Bar(state[0], symbol, *state[1:]))
+        if self.fill_gaps:
+            self._last[symbol] = (state[0] + self.interval, state[4])
+
+    def on_trade(
+        self, symbol: str, timestamp: int, price: float, amount: float = 0.0
+    ) -> list:
+        """
+        处理一笔成交, 返回因此收盘的bar列表 (设置了on_bar时为空)
+        属于已收盘bar的迟到成交 (e.g., 补齐缺口时拉取的成交) 不改变当前bar, 只计入 late
+        """
+        start = timestamp - timestamp % self.interval
+        state = self._open.get(symbol)
+        if state is not None and start < state[0]:
+            self.late += 1
+            return []
+        if state is not None and start == state[0]:
+            if price > state[2]:
+                state[2] = price
+            elif price < state[3]:
+                state[3] = price
+            state[4] = price
+            state[5] += amount
+            state[6] += 1
+            return []
+
+        closed = []
+        if state is not None:
+            self._close(symbol, state, closed)
+        if self.fill_gaps:
+            self._fill(symbol, start, closed)
+        self._open[symbol] = [start, price, price, price, price, amount, 1]
+        return self._emit(closed)
+
+    def on_ticker(self, ticker: dict) -> list:
+        """
+        用 ticker 的最新价更新bar; 成交量取 baseVolume 的增量 (24h窗口回落时记0)
+        """
+        symbol = ticker["symbol"]
+        price = ticker.get("last") or ticker.get("close")
+        if price is None:
+            return []
+        volume = ticker.get("baseVolume")
+        amount = 0.0
+        if volume is not None:
+            prev = self._last_ticker_volume.get(symbol)
+            if prev is not None and volume > prev:
+                amount = volume - prev
+            self._last_ticker_volume[symbol] = volume
+        return self.on_trade(symbol, ticker["timestamp"], price, amount)
+
+    def flush(self, now: int = None) -> list:
+        """
+        收盘已经结束的bar; now为None时收盘全部未完成的bar (e.g., 退出时)
+        """
+        closed = []
+        for symbol in list(self._open):
+            state = self._open[symbol]
+            if now is None or now >= state[0] + self.interval:
+                del self._open[symbol]
+                self._close(symbol, state, closed)
+        if self.fill_gaps and now is not None:
+            for symbol in list(self._last):
+                if symbol not in self._open:
+                    self._fill(symbol, now - now % self.interval, closed)
+        return self._emit(closed)
@@ -0,0 +1,484 @@
+# -*- coding: utf-8 -*-
+"""
+共享内存K线服务: 同一台机器上的多个进程共用一份解码后的数据
+
+    cryptotradelib bars serve                      # 长驻服务
+
+    client = BarClient()
+    bars = client.open("ohlcv", "binance", "1h", "BTC/USDT")
+    bars.arrays()                  # {列名: np.ndarray}, 只读, 不复制
+    bars.table()                   # pa.Table, 不复制
+    bars.frame("2025-10-01")       # DataFrame, 不复制
+    run_backtest(MacdStrategy, ArrowData(dataname=bars.arrays()))
+    bars.close()
+
+服务端第一次被请求某个序列时用 load_from_parquet 整体读入一段共享内存
+(multiprocessing.shared_memory), 之后的请求只返回段名与列布局, 客户端直接映射,
+因此内存占用不随客户端进程数增加. 协议是本地 Unix socket 上的一行一个JSON.
+
+段的布局: 64字节头 (行数, 容量, 是否作废) + 按列连续存放的数组, 容量预留
+GROWTH 倍. ETL 落盘后调用 refresh (cryptotradelib etl 会自动通知) 时, 服务端
+从磁盘读取比最后一行更新的行, 写在已有行之后再更新行数, 已打开的客户端直接看到新数据;
+容量不够时换一段更大的内存, 旧段标记作废, 客户端下次访问时自动重新打开.
+每个段按打开它的客户端连接计数 (连接断开即释放), 没有客户端使用的序列在总大小
+超过 max_bytes 时按最近使用顺序淘汰.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from config import BAR_SERVER_ADDRESS, BAR_SERVER_BYTES, DATA_ROOT_PATH
+from data_processor.loader import _row_bounds, load_from_parquet
+
+logger = logging.getLogger(__name__)
+
+HEADER = 64  # int64: 行数, 容量, 是否作废
+ALIGN = 64
+GROWTH = 1.25
+MIN_HEADROOM = 4096  # 至少预留的行数
+
+
+def _align(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+
+def _capacity(rows: int) -> int:
+    return max(int(rows * GROWTH), rows + MIN_HEADROOM)
+
+
+def _dataset(data_root, data_type, exchange, timeframe, symbol) -> dict:
+    return dict(
+        data_root=data_root,
+        data_type=data_type,
+        exchange=exchange,
+        timeframe=timeframe,
+        symbol=symbol,
+    )
+
+
+def _key(dataset: dict) -> tuple:
+    return (
+        os.path.normpath(dataset["data_root"]),
+        dataset["data_type"],
+        dataset["exchange"],
+        dataset["timeframe"],
+        dataset["symbol"],
+    )
+
+
+class _Segment:
+    """服务端持有的一段共享内存, 存放一个序列的全部数值列"""
+
+    def __init__(self, df: pd.DataFrame, capacity: int):
+        self.columns = []
+        offset = HEADER
+        for name in df.columns:
+            dtype = df[name].dtype
+            if not isinstance(dtype, np.dtype) or dtype.kind not in "biufM":
+                continue  # 只共享数值/时间列
+            self.columns.append((name, dtype.str, offset))
+            offset = _align(offset + capacity * dtype.itemsize)
+        self.nbytes = offset
+        self.shm = shared_memory.SharedMemory(create=True, size=offset)
+        self.header = np.ndarray(3, np.int64, buffer=self.shm.buf)
+        self.header[:] = (0, capacity, 0)
+        self.append(df)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __len__(self) -> int:
+        return int(self.header[0])
+
+    def _view(self, dtype: str, offset: int) -> np.ndarray:
+        return np.ndarray(
+            int(self.header[1]), np.dtype(dtype), buffer=self.shm.buf, offset=offset
+        )
+
+    def column(self, name: str) -> np.ndarray:
+        for column, dtype, offset in self.columns:
+            if column == name:
+                return self._view(dtype, offset)[: len(self)].copy()
+        raise KeyError(name)
+
+    def append(self, df: pd.DataFrame) -> bool:
+        """在已有行之后写入, 写完再更新行数; 容量不够时返回False"""
+        n, start = len(df), len(self)
+        if start + n > self.header[1]:
+            return False
+        for name, dtype, offset in self.columns:
+            self._view(dtype, offset)[start : start + n] = df[name].to_numpy(
+                dtype=np.dtype(dtype)
+            )
+        self.header[0] = start + n
+        return True
+
+    def describe(self) -> dict:
+        return {"name": self.name, "columns": self.columns, "pid": os.getpid()}
+
+    def retire(self):
+        """标记作废并释放; 已映射的客户端在关闭前仍可读取"""
+        self.header[2] = 1
+        del self.header
+        self.shm.close()
+        self.shm.unlink()
+
+
+class BarServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    :param address: Unix socket 路径
+    :param max_bytes: 没有客户端使用的序列的总大小上限 (字节)
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, address: str = BAR_SERVER_ADDRESS, max_bytes: int = BAR_SERVER_BYTES
+    ):
+        if os.path.exists(address):
+            os.unlink(address)  # 上次未正常退出留下的socket文件
+        self.address = address
+        self.max_bytes = max_bytes
+        self.series = OrderedDict()  # key -> _Segment, 最近使用的在后
+        self.refs = {}  # 段名 -> 打开的客户端数
+        self.loads = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        super().__init__(address, _Handler)
+
+    def _load(self, dataset: dict, key: tuple) -> _Segment:
+        df = load_from_parquet(use_cache=False, **dataset)
+        segment = self.series[key] = _Segment(df, _capacity(len(df)))
+        self.refs[segment.name] = 0
+        self.loads += 1
+        logger.info(f"Loaded {key[1:]} ({len(df)} rows, {segment.nbytes} bytes)")
+        return segment
+
+    def open(self, dataset: dict) -> dict:
+        key = _key(dataset)
+        with self._lock:
+            segment = self.series.get(key)
+            if segment is None:
+                segment = self._load(dataset, key)
+            self.series.move_to_end(key)
+            self.refs[segment.name] += 1
+            self._evict()
+            return segment.describe()
+
+    def release(self, name: str):
+        with self._lock:
+            if name in self.refs:
+                self.refs[name] -= 1
+                self._evict()
+
+    def refresh(self, dataset: dict) -> int:
+        """
+        读取磁盘上比已加载的最后一行更新的行并追加, 返回追加的行数
+        没有加载过的序列不做任何事
+        """
+        key = _key(dataset)
+        with self._lock:
+            segment = self.series.get(key)
+            if segment is None:
+                return 0
+            names = [c[0] for c in segment.columns]
+            if "timestamp" not in names or not len(segment):
+                self._replace(key, load_from_parquet(use_cache=False, **dataset))
+                return len(self.series[key])
+            last = int(segment.column("timestamp")[-1])
+            day = datetime.fromtimestamp(last / 1000, tz=timezone.utc)
+            df = load_from_parquet(
+                start_date=day.strftime("%Y-%m-%d"), use_cache=False, **dataset
+            )
+            new = df[df["timestamp"] > last]
+            if new.empty or segment.append(new):
+                return len(new)
+            # 容量不够: 换一段更大的内存
+            old = pd.DataFrame({name: segment.column(name) for name in names})
+            self._replace(key, pd.concat([old, new[names]], ignore_index=True))
+            return len(new)
+
+    def _replace(self, key: tuple, df: pd.DataFrame):
+        old = self.series.pop(key)
+        refs = self.refs.pop(old.name)
+        old.retire()
+        segment = self.series[key] = _Segment(df, _capacity(len(df)))
+        # 仍打开着旧段的客户端会重新打开新段, 届时计数
+        self.refs[segment.name] = 0
+        logger.info(f"Reallocated {key[1:]} ({len(df)} rows, {refs} readers moved)")
+
+    def _evict(self):
+        total = sum(s.nbytes for s in self.series.values())
+        for key in list(self.series):
+            if total <= self.max_bytes:
+                break
+            segment = self.series[key]
+            if self.refs[segment.name] > 0:
+                continue
+            total -= segment.nbytes
+            del self.series[key], self.refs[segment.name]
+            segment.retire()
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "series": len(self.series),
+                "bytes": sum(s.nbytes for s in self.series.values()),
+                "max_bytes": self.max_bytes,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "readers": sum(self.refs.values()),
+            }
+
+    def server_close(self):
+        super().server_close()
+        with self._lock:
+            for segment in self.series.values():
+                segment.retire()
+            self.series.clear()
+            self.refs.clear()
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """一个客户端连接; 断开时释放它打开的全部段"""
+
+    def handle(self):
+        server = self.server
+        opened = []
+        try:
+            for line in self.rfile:
+                request = json.loads(line)
+                op = request["op"]
+                try:
+                    if op == "open":
+                        reply = server.open(request["dataset"])
+                        opened.append(reply["name"])
+                    elif op == "release":
+                        opened.remove(request["name"])
+                        server.release(request["name"])
+                        reply = {}
+                    elif op == "refresh":
+                        reply = {"appended": server.refresh(request["dataset"])}
+                    elif op == "stats":
+                        reply = server.stats()
+                    else:
+                        raise ValueError(f"Unknown op {op!r}")
+                    reply["ok"] = True
+                except Exception as e:
+                    reply = {"ok": False, "error": type(e).__name__, "message": str(e)}
+                self.wfile.write((json.dumps(reply) + "\n").encode())
+        finally:
+            for name in opened:
+                server.release(name)
+
+
+def _attach(name: str, owner_pid: int) -> shared_memory.SharedMemory:
+    """映射服务端的段; 不让本进程的 resource_tracker 在退出时删除它"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if owner_pid != os.getpid():
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SharedBars:
+    """
+    服务端一个序列的只读视图; 行数随服务端的追加增长, 段作废时自动重新打开
+    """
+
+    def __init__(self, client, dataset: dict):
+        self.client = client
+        self.dataset = dataset
+        self.shm = None
+        self._pinned = []
+        self._open()
+
+    def _open(self):
+        info = self.client._request("open", dataset=self.dataset)
+        self.shm = _attach(info["name"], info["pid"])
+        self.layout = [tuple(c) for c in info["columns"]]
+        self._header = np.ndarray(3, np.int64, buffer=self.shm.buf)
+
+    def _close_segment(self):
+        name = self.shm.name
+        del self._header
+        try:
+            self.shm.close()
+        except BufferError:
+            # 调用方还持有之前的数组视图, 保留映射
+            self._pinned.append(self.shm)
+        self.shm = None
+        self.client._request("release", name=name)
+
+    def _current(self):
+        if self._header[2]:
+            self._close_segment()
+            self._open()
+        return int(self._header[0])
+
+    def __len__(self) -> int:
+        return self._current()
+
+    @property
+    def columns(self) -> list:
+        return [c[0] for c in self.layout]
+
+    def arrays(self, columns: list = None) -> dict:
+        """当前全部行的 {列名: 只读数组}, 与服务端共用内存"""
+        n = self._current()
+        capacity = int(self._header[1])
+        result = {}
+        for name, dtype, offset in self.layout:
+            if columns and name not in columns:
+                continue
+            view = np.ndarray(
+                capacity, np.dtype(dtype), buffer=self.shm.buf, offset=offset
+            )
+            view = view[:n]
+            view.flags.writeable = False
+            result[name] = view
+        return result
+
+    def table(self, columns: list = None) -> pa.Table:
+        return pa.table(self.arrays(columns))
+
+    def frame(
+        self, start_date: str = None, end_date: str = None, columns: list = None
+    ) -> pd.DataFrame:
+        """
+        [start_date, end_date] 内的行 (按 timestamp 切片), 列与共享内存共用, 不复制
+        """
+        arrays = self.arrays()
+        lo, hi = _row_bounds(start_date, end_date)
+        a, b = 0, len(self)
+        if lo is not None:
+            a = int(np.searchsorted(arrays["timestamp"], lo, side="left"))
+        if hi is not None:
+            b = int(np.searchsorted(arrays["timestamp"], hi, side="left"))
+        names = columns or list(arrays)
+        return pd.DataFrame({name: arrays[name][a:b] for name in names}, copy=False)
+
+    def close(self):
+        if self.shm is not None:
+            self._close_segment()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BarClient:
+    """
+    连接本机的 BarServer
+    :param address: Unix socket 路径
+    """
+
+    def __init__(self, address: str = BAR_SERVER_ADDRESS, timeout: float = 600.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+        self._file = self.sock.makefile("rwb")
+        self._lock = threading.Lock()
+
+    def _request(self, op: str, **params) -> dict:
+        with self._lock:
+            self._file.write((json.dumps({"op": op, **params}) + "\n").encode())
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError("Bar server closed the connection")
+        reply = json.loads(line)
+        if not reply.pop("ok"):
+            if reply["error"] == "FileNotFoundError":
+                raise FileNotFoundError(reply["message"])
+            raise RuntimeError(f"{reply['error']}: {reply['message']}")
+        return reply
+
+    def open(
+        self,
+        data_type: str,
+        exchange: str,
+        timeframe: str,
+        symbol: str,
+        data_root: str = DATA_ROOT_PATH,
+    ) -> SharedBars:
+        """打开一个序列 (服务端没有时先从磁盘加载)"""
+        dataset = _dataset(data_root, data_type, exchange, timeframe, symbol)
+        return SharedBars(self, dataset)
+
+    def refresh(
+        self,
+        data_type: str,
+        exchange: str,
+        timeframe: str,
+        symbol: str,
+        data_root: str = DATA_ROOT_PATH,
+    ) -> int:
+        """让服务端追加磁盘上的新行, 返回追加的行数"""
+        dataset = _dataset(data_root, data_type, exchange, timeframe, symbol)
+        return self._request("refresh", dataset=dataset)["appended"]
+
+    def stats(self) -> dict:
+        return self._request("stats")
+
+    def close(self):
+        self._file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def notify_refresh(
+    data_type: str,
+    exchange: str,
+    timeframe: str,
+    symbol: str,
+    data_root: str = DATA_ROOT_PATH,
+    address: str = BAR_SERVER_ADDRESS,
+) -> int:
+    """
+    ETL 写入后调用: 服务在运行时让它追加新数据, 否则什么也不做
+    :return: 追加的行数, 服务未运行时为None
+    """
+    if not os.path.exists(address):
+        return None
+    try:
+        with BarClient(address) as client:
+            return client.refresh(data_type, exchange, timeframe, symbol, data_root)
+    except (OSError, RuntimeError) as e:
+        # 数据已经落盘, 服务端出错或超时不影响 ETL 的结果
+        logger.warning(f"Bar server refresh failed: {e}")
+        return None
+
+
+def serve(address: str = BAR_SERVER_ADDRESS, max_bytes: int = BAR_SERVER_BYTES):
+    """运行服务直到被中断"""
+    with BarServer(address, max_bytes) as server:
+        logger.info(f"Serving bars on {address}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Stopping bar server.")
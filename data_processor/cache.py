@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+分区读缓存: 热层在内存, 冷层为磁盘上的Parquet分区
+
+    - 分区缓存: 进程内LRU, 缓存解码后的最近分区 (DataFrame), 总大小按字节数限制.
+      每次命中都会比对分区目录下文件的 (名字, 大小, mtime), 以及数据集的目录版本
+      (本进程的 save_to_parquet 写入后递增), 任一变化即重新读取.
+    - 实时尾部: 长驻的读取服务可以把 BarBuilder 收盘的bar直接写入缓存,
+      尚未落盘的最新数据也能被 load_from_parquet 读到:
+
+        builder = BarBuilder("1m", on_bar=PARTITION_CACHE.bar_sink("ohlcv", "binance", "1m"))
+
+只缓存最近 hot_days 天的分区, 长区间回测读取历史分区时不会挤掉热数据.
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from config import DATA_ROOT_PATH, PARTITION_CACHE_BYTES, PARTITION_CACHE_HOT_DAYS
+from data_processor.storage import storage_for
+from data_processor.symbols import symbol_path_name
+from utils import instrumentation
+
+logger = logging.getLogger(__name__)
+
+BAR_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+def dataset_path(
+    data_root: str, data_type: str, exchange: str, timeframe: str, symbol: str
+) -> str:
+    """数据集 (一个交易对) 的目录, 分区目录 date=... 在其下"""
+    return storage_for(data_root).join(
+        data_root, data_type, exchange, timeframe, symbol_path_name(symbol)
+    )
+
+
+def partition_signature(path: str) -> tuple:
+    """分区目录下文件的 (名字, 大小, mtime/ETag), 不读取文件内容"""
+    return storage_for(path).signature(path)
+
+
+class PartitionCache:
+    """
+    解码后分区的LRU缓存, 线程安全
+
+    :param max_bytes: 缓存的DataFrame总大小上限 (字节)
+    :param hot_days: 只缓存最近这么多天的分区 (按分区值判断, 年分区按年份)
+    :param live_days: 实时尾部保留的天数
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = PARTITION_CACHE_BYTES,
+        hot_days: int = PARTITION_CACHE_HOT_DAYS,
+        live_days: int = 3,
+    ):
+        self.max_bytes = max_bytes
+        self.hot_days = hot_days
+        self.live_days = live_days
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # (分区路径, 列) -> (签名, 目录版本, DataFrame, 字节数)
+        self._entries = OrderedDict()
+        self._versions = {}  # 数据集目录 -> 版本
+        # 数据集目录 -> {分区值: {timestamp: 行}}
+        self._live = {}
+
+    # ------------------------------------------------------------------
+    # 分区缓存
+    # ------------------------------------------------------------------
+    def is_hot(self, partition: str) -> bool:
+        """分区值 ('YYYY-MM-DD' / 'YYYY-MM' / 'YYYY') 是否在最近 hot_days 天内"""
+        if self.hot_days is None:
+            return True
+        cutoff = datetime.now(timezone.utc).date() - timedelta(days=self.hot_days)
+        return partition >= cutoff.isoformat()[: len(partition)]
+
+    def _version(self, path: str) -> int:
+        return self._versions.get(os.path.dirname(os.path.normpath(path)), 0)
+
+    def get(self, path: str, columns: list = None):
+        """
+        命中且分区未变化时返回缓存的DataFrame (调用方不应修改), 否则返回None
+        只缓存了全部列时, 也能满足只读部分列的请求
+        """
+        signature = partition_signature(path)
+        version = self._version(path)
+        keys = [(path, tuple(columns) if columns else None)]
+        if columns:
+            keys.append((path, None))
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] != signature or entry[1] != version:
+                    self._drop(key)
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                df = entry[2]
+                return df if key[1] == keys[0][1] else df[list(columns)]
+            self.misses += 1
+        return None
+
+    def put(self, path: str, columns: list, df: pd.DataFrame, signature=None):
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        key = (path, tuple(columns) if columns else None)
+        if signature is None:
+            signature = partition_signature(path)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (signature, self._version(path), df, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        self.nbytes -= self._entries.pop(key)[3]
+
+    def read(self, path: str, columns: list, load, partition: str = None):
+        """
+        读取一个分区: 命中则直接返回, 否则调用 load() 解码并 (热分区) 放入缓存
+        :param load: 无参函数, 从磁盘读取并返回DataFrame
+        :param partition: 分区值, 用于判断是否为热分区; None表示总是缓存
+        """
+        hot = partition is None or self.is_hot(partition)
+        if hot:
+            df = self.get(path, columns)
+            if df is not None:
+                instrumentation.counter(
+                    "partition_cache_hits_total", "Partition cache hits"
+                ).inc()
+                return df
+            instrumentation.counter(
+                "partition_cache_misses_total", "Partition cache misses"
+            ).inc()
+        # 读取前取签名, 读取期间被改写时下次访问会重新读取
+        signature = partition_signature(path) if hot else None
+        df = load()
+        if hot:
+            self.put(path, columns, df, signature)
+        return df
+
+    def bump_version(self, base_path: str):
+        """数据集被改写 (e.g., save_to_parquet 写入) 后调用, 使其全部分区失效"""
+        base_path = os.path.normpath(base_path)
+        with self._lock:
+            self._versions[base_path] = self._versions.get(base_path, 0) + 1
+            for key in [
+                k
+                for k in self._entries
+                if os.path.dirname(os.path.normpath(k[0])) == base_path
+            ]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._live.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    # ------------------------------------------------------------------
+    # 实时尾部
+    # ------------------------------------------------------------------
+    def add_bar(self, base_path: str, bar):
+        """
+        写入一根收盘的bar (data_processor.bar_builder.Bar), 同一时间戳后写覆盖先写
+        """
+        dt = datetime.fromtimestamp(bar.timestamp / 1000, tz=timezone.utc)
+        date = dt.strftime("%Y-%m-%d")
+        row = (bar.timestamp, bar.open, bar.high, bar.low, bar.close, bar.volume)
+        with self._lock:
+            days = self._live.setdefault(os.path.normpath(base_path), {})
+            days.setdefault(date, {})[bar.timestamp] = row
+            if len(days) > self.live_days:
+                for old in sorted(days)[: len(days) - self.live_days]:
+                    del days[old]
+
+    def bar_sink(
+        self,
+        data_type: str,
+        exchange: str,
+        timeframe: str,
+        data_root: str = DATA_ROOT_PATH,
+    ):
+        """
+        返回可作为 BarBuilder(on_bar=...) 的回调, 按 bar.symbol 写入对应数据集的实时尾部
+        """
+        paths = {}
+
+        def on_bar(bar):
+            path = paths.get(bar.symbol)
+            if path is None:
+                path = paths[bar.symbol] = dataset_path(
+                    data_root, data_type, exchange, timeframe, bar.symbol
+                )
+            self.add_bar(path, bar)
+
+        return on_bar
+
+    def live_frame(
+        self,
+        base_path: str,
+        start_date: str = None,
+        end_date: str = None,
+        columns: list = None,
+    ) -> pd.DataFrame:
+        """
+        实时尾部中落在 [start_date, end_date] 内的bar, 没有时返回None
+        """
+        with self._lock:
+            days = self._live.get(os.path.normpath(base_path))
+            if not days:
+                return None
+            rows = [
+                row
+                for date in sorted(days)
+                if (not start_date or date >= start_date)
+                and (not end_date or date <= end_date)
+                for _, row in sorted(days[date].items())
+            ]
+        if not rows:
+            return None
+        df = pd.DataFrame(rows, columns=BAR_COLUMNS)
+        df["datetime"] = pd.to_datetime(df["timestamp"], unit="ms")
+        if columns:
+            df = df[[c for c in columns if c in df.columns]]
+        return df
+
+
+PARTITION_CACHE = PartitionCache()
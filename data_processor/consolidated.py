@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+跨交易所合并行情
+
+把同一标的在多个交易所 (e.g., binance / binanceusdm / okx) 的数据合并为
+    - 成交量加权的合成K线 (CompositeBar)
+    - 全市场最优买卖价 (ConsolidatedBBO)
+
+所有输入都是各自按时间排序的事件流, 先用 heapq.merge 做k路归并 (每个事件
+O(log k)), 再按规范化交易对 (symbols.Instrument.pair) 分组, 全程流式处理,
+内存只与交易所和交易对的数量有关.
+
+    bars = consolidated_bars(
+        bar_stream("binance", "BTC/USDT"),
+        bar_stream("binanceusdm", "BTC/USDT:USDT"),
+        bar_stream("okx", "BTC/USDT:USDT"),
+    )
+    for bar in bars:
+        ...
+"""
+
+import heapq
+from typing import Iterable, Iterator, NamedTuple
+
+from config import DATA_ROOT_PATH
+from data_processor.loader import iter_parquet_batches
+from data_processor.symbols import REGISTRY, SymbolRegistry
+
+BAR_FIELDS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+class BarEvent(NamedTuple):
+    timestamp: int  # bar开始时间 (ms)
+    exchange: str
+    symbol: str  # 交易所写法
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+class CompositeBar(NamedTuple):
+    """
+    open/close 为各交易所的成交量加权平均, high/low 为极值, volume 为总和
+    成交量全为0时退化为等权平均
+    """
+
+    timestamp: int
+    symbol: str  # 规范化交易对, e.g., 'BTC/USDT'
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    venues: int
+
+
+class QuoteEvent(NamedTuple):
+    timestamp: int
+    exchange: str
+    symbol: str  # 交易所写法
+    bid: float
+    bid_size: float
+    ask: float
+    ask_size: float
+
+
+class ConsolidatedBBO(NamedTuple):
+    timestamp: int
+    symbol: str  # 规范化交易对
+    bid: float
+    bid_size: float
+    bid_exchange: str
+    ask: float
+    ask_size: float
+    ask_exchange: str
+
+
+def bar_stream(
+    exchange: str,
+    symbol: str,
+    data_type: str = "ohlcv",
+    timeframe: str = "1m",
+    start_date: str = None,
+    end_date: str = None,
+    data_root: str = DATA_ROOT_PATH,
+    batch_size: int = 65536,
+) -> Iterator[BarEvent]:
+    """
+    按时间顺序读取已存储的K线, 每次只解码一个批次
+    """
+    for batch in iter_parquet_batches(
+        data_root,
+        data_type,
+        exchange,
+        timeframe,
+        symbol,
+        start_date=start_date,
+        end_date=end_date,
+        columns=BAR_FIELDS,
+        batch_size=batch_size,
+    ):
+        cols = [batch.column(name).to_pylist() for name in BAR_FIELDS]
+        for ts, o, h, l, c, v in zip(*cols):
+            yield BarEvent(ts, exchange, symbol, o, h, l, c, v)
+
+
+def quote_stream(books: Iterable[dict], exchange: str, symbol: str = None):
+    """
+    把订单簿快照或ticker (ccxt watch_order_book / watch_ticker 的输出) 转换为QuoteEvent
+    """
+    for msg in books:
+        if "bids" in msg:
+            bid, bid_size = msg["bids"][0][:2] if msg["bids"] else (None, 0.0)
+            ask, ask_size = msg["asks"][0][:2] if msg["asks"] else (None, 0.0)
+        else:
+            bid, bid_size = msg.get("bid"), msg.get("bidVolume") or 0.0
+            ask, ask_size = msg.get("ask"), msg.get("askVolume") or 0.0
+        yield QuoteEvent(
+            msg["timestamp"],
+            exchange,
+            symbol or msg["symbol"],
+            bid,
+            bid_size,
+            ask,
+            ask_size,
+        )
+
+
+def merge_by_time(*streams: Iterable) -> Iterator:
+    """
+    k路归并, 同一时间戳下保持参数中的流顺序
+    """
+    return heapq.merge(*streams, key=lambda e: e.timestamp)
+
+
+def consolidated_bars(
+    *streams: Iterable[BarEvent], registry: SymbolRegistry = REGISTRY
+) -> Iterator[CompositeBar]:
+    """
+    把多个交易所的K线流合并为合成K线, 按 (timestamp, symbol) 顺序输出
+    某个交易所缺少某根bar时, 该bar只由其余交易所合成
+    """
+    # 规范化交易对 -> [volume, open*v, close*v, open, close, high, low, venues]
+    pending = {}
+    current = None
+    pair_cache = {}
+
+    def flush():
+        for pair in sorted(pending):
+            vol, ov, cv, o, c, h, l, n = pending[pair]
+            if vol > 0:
+                yield CompositeBar(current, pair, ov / vol, h, l, cv / vol, vol, n)
+            else:
+                yield CompositeBar(current, pair, o / n, h, l, c / n, 0.0, n)
+        pending.clear()
+
+    for e in merge_by_time(*streams):
+        if e.timestamp != current:
+            if pending:
+                yield from flush()
+            current = e.timestamp
+
+        key = (e.exchange, e.symbol)
+        pair = pair_cache.get(key)
+        if pair is None:
+            pair = pair_cache[key] = registry.instrument(*key).pair
+
+        acc = pending.get(pair)
+        v = e.volume or 0.0
+        if acc is None:
+            pending[pair] = [
+                v,
+                e.open * v,
+                e.close * v,
+                e.open,
+                e.close,
+                e.high,
+                e.low,
+                1,
+            ]
+        else:
+            acc[0] += v
+            acc[1] += e.open * v
+            acc[2] += e.close * v
+            acc[3] += e.open
+            acc[4] += e.close
+            if e.high > acc[5]:
+                acc[5] = e.high
+            if e.low < acc[6]:
+                acc[6] = e.low
+            acc[7] += 1
+
+    if pending:
+        yield from flush()
+
+
+class _BestQuotes:
+    """
+    一个交易对在各交易所的最新报价, 用带惰性删除的堆维护最优价
+    每次更新 O(log k), k 为交易所数量
+    """
+
+    __slots__ = ("quotes", "bids", "asks")
+
+    def __init__(self):
+        self.quotes = {}  # exchange -> QuoteEvent
+        self.bids = []  # (-bid, exchange)
+        self.asks = []  # (ask, exchange)
+
+    def update(self, q: QuoteEvent):
+        self.quotes[q.exchange] = q
+        if q.bid is not None:
+            heapq.heappush(self.bids, (-q.bid, q.exchange))
+        if q.ask is not None:
+            heapq.heappush(self.asks, (q.ask, q.exchange))
+
+    def _top(self, heap, side: str, sign: float):
+        # 弹出已经过期的堆顶 (该交易所的报价已变化)
+        while heap:
+            price, exchange = heap[0]
+            current = getattr(self.quotes[exchange], side)
+            if current is not None and current == price * sign:
+                return exchange
+            heapq.heappop(heap)
+        return None
+
+    def best(self):
+        bid_ex = self._top(self.bids, "bid", -1.0)
+        ask_ex = self._top(self.asks, "ask", 1.0)
+        # 堆中同一报价可能有重复项, 控制堆大小
+        if len(self.bids) > 4 * len(self.quotes) + 16:
+            self.bids = [
+                (-q.bid, ex) for ex, q in self.quotes.items() if q.bid is not None
+            ]
+            heapq.heapify(self.bids)
+        if len(self.asks) > 4 * len(self.quotes) + 16:
+            self.asks = [
+                (q.ask, ex) for ex, q in self.quotes.items() if q.ask is not None
+            ]
+            heapq.heapify(self.asks)
+        return bid_ex, ask_ex
+
+
+def consolidated_bbo(
+    *streams: Iterable[QuoteEvent], registry: SymbolRegistry = REGISTRY
+) -> Iterator[ConsolidatedBBO]:
+    """
+    合并多个交易所的报价流, 全市场最优买卖价变化时输出一条ConsolidatedBBO
+    同价时按交易所名排序取第一个
+    """
+    books = {}
+    last = {}
+    pair_cache = {}
+
+    for q in merge_by_time(*streams):
+        key = (q.exchange, q.symbol)
+        pair = pair_cache.get(key)
+        if pair is None:
+            pair = pair_cache[key] = registry.instrument(*key).pair
+
+        book = books.get(pair)
+        if book is None:
+            book = books[pair] = _BestQuotes()
+        book.update(q)
+
+        bid_ex, ask_ex = book.best()
+        bid_q = book.quotes[bid_ex] if bid_ex else None
+        ask_q = book.quotes[ask_ex] if ask_ex else None
+        state = (
+            bid_q.bid if bid_q else None,
+            bid_q.bid_size if bid_q else 0.0,
+            bid_ex,
+            ask_q.ask if ask_q else None,
+            ask_q.ask_size if ask_q else 0.0,
+            ask_ex,
+        )
+        if state != last.get(pair):
+            last[pair] = state
+            yield ConsolidatedBBO(q.timestamp, pair, *state)
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+特征库: 为全部交易对增量计算特征 (indicators.features), 存为按时间戳对齐的宽表
+
+    update_features(DATA_ROOT_PATH, "binance", "1m")          # 每次ETL之后运行
+    tensor = load_feature_tensor(DATA_ROOT_PATH, "binance", "1m",
+                                 start_date="2025-09-01")
+    tensor.values[t, s, f]    # (时间 × 交易对 × 特征)
+
+特征与K线使用相同的目录布局与分区方案:
+    features/<exchange>/<timeframe>/<symbol>/date=.../part.0.parquet
+每行为一根K线的 timestamp 与全部特征列. 数据集目录下的 _feature_state.pkl 保存
+已处理到的时间戳与特征对象的状态, 下一次运行只读取之后的K线; 特征集变化
+(列名不同) 时从头重算. 读取特征张量经 data_processor.query 扫描, 不经过 pandas.
+"""
+
+import logging
+import pickle
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_ROOT_PATH
+from data_processor.cache import dataset_path
+from data_processor.loader import load_from_parquet
+from data_processor.query import PARTITION_COLUMNS, datasets, scan
+from data_processor.storage import storage_for
+from data_processor.symbols import parse_symbol, path_name_symbol
+from data_processor.writer import save_to_parquet
+from indicators.features import default_features, feature_columns
+
+logger = logging.getLogger(__name__)
+
+FEATURE_DATA_TYPE = "features"
+STATE_FILE = "_feature_state.pkl"
+NON_FEATURE_COLUMNS = PARTITION_COLUMNS + ["timestamp", "datetime"]
+
+
+class FeatureTensor(NamedTuple):
+    timestamps: np.ndarray  # datetime64[ms], 升序
+    symbols: list  # 目录名, e.g. 'BTC_USDT'
+    features: list
+    values: np.ndarray  # float64 (时间, 交易对, 特征), 缺失为 nan
+
+
+def compute_features(bars: pd.DataFrame, features: list) -> pd.DataFrame:
+    """
+    按时间顺序逐根K线更新特征, 返回 timestamp + 特征列
+    :param bars: 按 timestamp 排序, 包含特征需要的全部字段
+    """
+    columns = feature_columns(features)
+    rows = np.full((len(bars), len(columns)), np.nan)
+    for i, bar in enumerate(bars.itertuples(index=False, name="Bar")):
+        rows[i] = [v for f in features for v in f.update(bar)]
+    out = pd.DataFrame(rows, columns=columns)
+    out.insert(0, "timestamp", bars["timestamp"].to_numpy(dtype=np.int64))
+    return out
+
+
+def _date(ts_ms: int, days_before: int = 0) -> str:
+    dt = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc)
+    return (dt - timedelta(days=days_before)).strftime("%Y-%m-%d")
+
+
+def _load(data_root, data_type, exchange, timeframe, symbol, start_date, columns):
+    """读取一个数据集, 不存在时返回None"""
+    try:
+        return load_from_parquet(
+            data_root,
+            data_type,
+            exchange,
+            timeframe,
+            symbol,
+            start_date=start_date,
+            columns=columns,
+            use_cache=False,
+        )
+    except (FileNotFoundError, ValueError, RuntimeError):
+        return None
+
+
+def _with_inputs(
+    bars: pd.DataFrame,
+    inputs: set,
+    data_root: str,
+    bars_type: str,
+    exchange: str,
+    timeframe: str,
+    symbol: str,
+    spot_exchange: str = None,
+    funding_timeframe: str = "8h",
+) -> pd.DataFrame:
+    """按时间对齐特征需要的资金费率 (最近一次结算) 与现货收盘价"""
+    first = int(bars["timestamp"].iloc[0])
+    if "fundingRate" in inputs:
+        funding = _load(
+            data_root,
+            "funding_rate",
+            exchange,
+            funding_timeframe,
+            symbol,
+            _date(first, days_before=1),
+            ["timestamp", "datetime", "fundingRate"],
+        )
+        if funding is None:
+            bars["fundingRate"] = np.nan
+        else:
+            funding = funding[["timestamp", "fundingRate"]]
+            bars = pd.merge_asof(bars, funding, on="timestamp")
+    if "spot_close" in inputs:
+        instrument = parse_symbol(symbol)
+        spot = None
+        if instrument.kind != "spot":
+            spot = _load(
+                data_root,
+                bars_type,
+                spot_exchange or exchange,
+                timeframe,
+                instrument.as_kind("spot").symbol,
+                _date(first),
+                ["timestamp", "datetime", "close"],
+            )
+        if spot is None:
+            bars["spot_close"] = np.nan
+        else:
+            spot = spot[["timestamp", "close"]].rename(columns={"close": "spot_close"})
+            bars = bars.merge(spot, on="timestamp", how="left")
+    return bars
+
+
+def _read_state(storage, base_path: str):
+    path = storage.join(base_path, STATE_FILE)
+    if not storage.exists(path):
+        return None
+    return pickle.loads(storage.read_bytes(path))
+
+
+def update_symbol(
+    data_root: str,
+    exchange: str,
+    timeframe: str,
+    symbol: str,
+    features=default_features,
+    bars_type: str = "ohlcv_1m",
+    spot_exchange: str = None,
+    funding_timeframe: str = "8h",
+) -> int:
+    """
+    计算一个交易对上次运行之后的新K线的特征并写入特征库
+    :param features: 返回新特征对象列表的函数
+    :param spot_exchange: 计算基差时现货所在的交易所, 默认同一交易所
+    :return: 写入的行数
+    """
+    storage = storage_for(data_root)
+    base_path = dataset_path(data_root, FEATURE_DATA_TYPE, exchange, timeframe, symbol)
+    fresh = features()
+    columns = feature_columns(fresh)
+    state = _read_state(storage, base_path)
+    if state is None or state["columns"] != columns:
+        # 第一次运行或特征集变化, 从头计算
+        state = {"columns": columns, "features": fresh, "timestamp": None}
+    last = state["timestamp"]
+
+    bars = _load(
+        data_root,
+        bars_type,
+        exchange,
+        timeframe,
+        symbol,
+        None if last is None else _date(last),
+        None,
+    )
+    if bars is None:
+        return 0
+    if last is not None:
+        bars = bars[bars["timestamp"] > last]
+    if bars.empty:
+        return 0
+    bars = bars.sort_values("timestamp").reset_index(drop=True)
+    inputs = {name for f in state["features"] for name in f.inputs}
+    bars = _with_inputs(
+        bars,
+        inputs,
+        data_root,
+        bars_type,
+        exchange,
+        timeframe,
+        symbol,
+        spot_exchange,
+        funding_timeframe,
+    )
+    new = compute_features(bars, state["features"])
+
+    # 新行所在分区中之前写入的行由 save_to_parquet 合并保留
+    if not save_to_parquet(
+        new, FEATURE_DATA_TYPE, exchange, symbol, timeframe, data_root
+    ):
+        raise RuntimeError(f"Failed to write features for {symbol}")
+
+    state["timestamp"] = int(new["timestamp"].iloc[-1])
+    storage.write_bytes(storage.join(base_path, STATE_FILE), pickle.dumps(state))
+    return len(new)
+
+
+def update_features(
+    data_root: str = DATA_ROOT_PATH,
+    exchange: str = "binance",
+    timeframe: str = "1m",
+    symbols: list = None,
+    bars_type: str = "ohlcv_1m",
+    **kwargs,
+) -> dict:
+    """
+    为 symbols (默认该交易所/周期下已存储K线的全部交易对) 增量更新特征
+    :param kwargs: 传给 update_symbol
+    :return: {symbol: 写入的行数}
+    """
+    if symbols is None:
+        storage = storage_for(data_root)
+        path = storage.join(data_root, bars_type, exchange, timeframe)
+        names = sorted(storage.listdir(path)) if storage.isdir(path) else []
+        symbols = [path_name_symbol(n) for n in names]
+    written = {}
+    for symbol in symbols:
+        try:
+            written[symbol] = update_symbol(
+                data_root, exchange, timeframe, symbol, bars_type=bars_type, **kwargs
+            )
+        except Exception as e:
+            logger.error(f"Failed to update features for {symbol}: {e}")
+    return written
+
+
+def load_feature_tensor(
+    data_root: str = DATA_ROOT_PATH,
+    exchange: str = "binance",
+    timeframe: str = "1m",
+    symbols=None,
+    features: list = None,
+    start_date: str = None,
+    end_date: str = None,
+) -> FeatureTensor:
+    """
+    读取 (时间 × 交易对 × 特征) 张量, 时间轴为所有交易对时间戳的并集
+    :param symbols: 统一写法列表或通配符, None为全部
+    :param features: 特征列名, None为全部
+    """
+    if features is None:
+        # 只读取文件元数据
+        features = []
+        for dataset, _ in datasets(
+            data_root, FEATURE_DATA_TYPE, exchange, timeframe, symbols
+        ):
+            for name in dataset.schema.names:
+                if name not in features and name not in NON_FEATURE_COLUMNS:
+                    features.append(name)
+    table = scan(
+        data_root,
+        FEATURE_DATA_TYPE,
+        ["timestamp", "symbol"] + list(features),
+        exchange=exchange,
+        timeframe=timeframe,
+        symbols=symbols,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    timestamps, t_index = np.unique(table["timestamp"].to_numpy(), return_inverse=True)
+    symbol_list, s_index = np.unique(
+        table["symbol"].to_numpy(zero_copy_only=False), return_inverse=True
+    )
+    values = np.full((len(timestamps), len(symbol_list), len(features)), np.nan)
+    for k, name in enumerate(features):
+        column = table[name].to_numpy(zero_copy_only=False)
+        values[t_index, s_index, k] = column
+    return FeatureTensor(
+        timestamps.astype("datetime64[ms]"),
+        symbol_list.tolist(),
+        list(features),
+        values,
+    )
@@ -0,0 +1,207 @@
+import array
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import backtrader as bt
+from backtrader.linebuffer import LineBuffer
+
+from data_processor.loader import iter_parquet_batches
+
+# 1970-01-01 在backtrader(matplotlib旧版)日期数中的序数
+EPOCH_ORDINAL = 719163.0
+MS_PER_DAY = 86_400_000.0
+
+_UNITS_PER_MS = {"s": 1e-3, "ms": 1.0, "us": 1e3, "ns": 1e6}
+
+
+def epoch_ms_to_num(ms: np.ndarray) -> np.ndarray:
+    """
+    向量化的 bt.date2num: UTC毫秒时间戳 -> backtrader浮点日期
+    """
+    return np.asarray(ms, dtype=np.float64) / MS_PER_DAY + EPOCH_ORDINAL
+
+
+def _column_to_numpy(col) -> np.ndarray:
+    if isinstance(col, pd.Series):
+        col = pa.array(col)
+    if isinstance(col, pa.ChunkedArray):
+        col = col.combine_chunks()
+    if isinstance(col, pa.Array):
+        if pa.types.is_timestamp(col.type):
+            ms = col.cast(pa.int64()).to_numpy(zero_copy_only=False)
+            return ms / _UNITS_PER_MS[col.type.unit]
+        return col.to_numpy(zero_copy_only=False)
+    col = np.asarray(col)
+    if np.issubdtype(col.dtype, np.datetime64):
+        return col.astype("datetime64[ms]").astype(np.int64)
+    return col
+
+
+class ArrowData(bt.feed.DataBase):
+    """
+    直接从 pyarrow / NumPy 数组构造的backtrader数据源
+
+    dataname 可以是:
+      - 单个 pa.Table / pa.RecordBatch / dict[str, np.ndarray] / DataFrame
+      - 返回上述对象迭代器的无参函数 (每次 start() 都会重新调用, 适合分块读取)
+
+    时间取自 'timestamp' (UTC毫秒) 列, 没有时退回 'datetime' 列.
+
+    preload=True (默认) 时按列整体写入backtrader的line缓冲区, 不再逐行load();
+    preload=False 时按块惰性读取, 内存中只保留当前块.
+    分块数据需按时间升序给出 (save_to_parquet 写入的分区满足这一点).
+    """
+
+    def _chunks(self):
+        source = self.p.dataname
+        if callable(source):
+            return iter(source())
+        return iter([source])
+
+    def _chunk_columns(self, chunk) -> list:
+        """
+        把一个数据块转换为与 self.lines 顺序一致的 float64 数组列表
+        缺失的列以NaN填充 (与PandasData一致)
+        """
+        if isinstance(chunk, (pa.Table, pa.RecordBatch)):
+            names = chunk.schema.names
+            get = lambda name: chunk.column(name)
+        else:
+            names = (
+                list(chunk.keys()) if isinstance(chunk, dict) else list(chunk.columns)
+            )
+            get = lambda name: chunk[name]
+
+        if "timestamp" in names:
+            ms = _column_to_numpy(get("timestamp"))
+        elif "datetime" in names:
+            ms = _column_to_numpy(get("datetime"))
+        else:
+            raise ValueError("ArrowData needs a 'timestamp' or 'datetime' column")
+
+        n = len(ms)
+        columns = []
+        for alias in self.getlinealiases():
+            if alias == "datetime":
+                columns.append(epoch_ms_to_num(ms))
+            elif alias in names:
+                columns.append(
+                    np.asarray(_column_to_numpy(get(alias)), dtype=np.float64)
+                )
+            else:
+                columns.append(np.full(n, np.nan))
+        return columns
+
+    def _bulk_ok(self) -> bool:
+        return (
+            not self._filters
+            and not self._ffilters
+            and self._tzinput is None
+            and all(line.mode == LineBuffer.UnBounded for line in self.lines)
+        )
+
+    def preload(self):
+        if not self._bulk_ok():
+            # 有过滤器/时区转换时走backtrader的逐行路径
+            return super().preload()
+
+        lines = list(self.lines)
+        idt = self.getlinealiases().index("datetime")
+        last_dt = -np.inf
+        ordered = True
+        for chunk in self._chunks():
+            columns = self._chunk_columns(chunk)
+            dt = columns[idt]
+            if not len(dt):
+                continue
+            mask = (dt >= self.fromdate) & (dt <= self.todate)
+            if not mask.all():
+                columns = [c[mask] for c in columns]
+                dt = columns[idt]
+                if not len(dt):
+                    continue
+            if dt[0] < last_dt or (np.diff(dt) < 0).any():
+                ordered = False
+            last_dt = dt[-1]
+            for line, values in zip(lines, columns):
+                line.array.frombytes(
+                    np.ascontiguousarray(values, dtype=np.float64).tobytes()
+                )
+
+        if not ordered:
+            order = np.argsort(
+                np.frombuffer(lines[idt].array, dtype=np.float64), kind="stable"
+            )
+            for line in lines:
+                values = np.frombuffer(line.array, dtype=np.float64)[order]
+                line.array = array.array("d", values.tobytes())
+
+        self._last()
+        self.home()
+
+    def start(self):
+        super().start()
+        self._iter = None
+        self._cur = None
+        self._pos = 0
+        self._n = 0
+
+    def _load(self):
+        if self._iter is None:
+            self._iter = self._chunks()
+
+        while self._pos >= self._n:
+            chunk = next(self._iter, None)
+            if chunk is None:
+                self._cur = None
+                return False
+            # 转成Python float列表, 逐bar取值比NumPy标量快
+            self._cur = [c.tolist() for c in self._chunk_columns(chunk)]
+            self._n = len(self._cur[0])
+            self._pos = 0
+
+        i = self._pos
+        for line, values in zip(self.lines, self._cur):
+            line[0] = values[i]
+        self._pos += 1
+        return True
+
+
+class ParquetData(ArrowData):
+    """
+    直接读取 save_to_parquet 写入的分区数据的backtrader数据源
+
+    用法:
+        data = ParquetData(
+            data_root="data", data_type="ohlcv", exchange="binance",
+            timeframe_str="1d", symbol="BTC/USDT",
+            start_date="2022-10-01", end_date="2025-10-12",
+            timeframe=bt.TimeFrame.Days,
+        )
+    """
+
+    params = (
+        ("data_root", "data"),
+        ("data_type", "ohlcv"),
+        ("exchange", "binance"),
+        ("timeframe_str", "1m"),
+        ("symbol", "BTC/USDT"),
+        ("start_date", None),
+        ("end_date", None),
+        ("batch_size", 65536),
+    )
+
+    def _chunks(self):
+        p = self.p
+        return iter_parquet_batches(
+            p.data_root,
+            p.data_type,
+            p.exchange,
+            p.timeframe_str,
+            p.symbol,
+            start_date=p.start_date,
+            end_date=p.end_date,
+            columns=["timestamp", "datetime"] + list(self.getlinealiases()[1:]),
+            batch_size=p.batch_size,
+        )
@@ -1,7 +1,18 @@
-import os
+import json
+import hashlib
 import pandas as pd
+import pyarrow.compute as pc
+import logging
 from datetime import datetime
 
+from data_processor.cache import PARTITION_CACHE, dataset_path
+from data_processor.partitioning import DAY_MS, PartitionScheme, read_scheme
+from data_processor.schema import decode, file_scales, read_frame, storage_columns
+from data_processor.storage import storage_for
+from utils import instrumentation
+
+logger = logging.getLogger(__name__)
+
 
 def load_from_parquet(
     data_root: str,
@@ -12,10 +23,15 @@ def load_from_parquet(
     start_date: str = None,
     end_date: str = None,
     columns: list[str] = None,
+    use_cache: bool = True,
 ) -> pd.DataFrame:
     """
     Load OHLCV (or other) data from partitioned parquet files.
 
+    Recent partitions are served from the in-process ``PARTITION_CACHE`` while
+    their files are unchanged, and bars written to the cache's live tail (see
+    ``PartitionCache.bar_sink``) are appended when they are not on disk yet.
+
     Parameters
     ----------
     data_root : str
@@ -32,58 +48,67 @@ def load_from_parquet(
         Inclusive upper bound (format 'YYYY-MM-DD').
     columns : list[str], optional
         Columns to load from parquet.
+    use_cache : bool, optional
+        Read through the partition cache (default True).
 
     Returns
     -------
     pd.DataFrame
         Concatenated DataFrame with all rows in the requested date range.
     """
-    symbol_path_name = symbol.replace("/", "_")
-    base_path = os.path.join(
-        data_root, data_type, exchange, timeframe, symbol_path_name
-    )
-
-    if not os.path.exists(base_path):
-        raise FileNotFoundError(f"Data path not found: {base_path}")
+    live = None
+    if use_cache:
+        live = PARTITION_CACHE.live_frame(
+            dataset_path(data_root, data_type, exchange, timeframe, symbol),
+            start_date,
+            end_date,
+            columns,
+        )
+    try:
+        base_path, selected_dates, scheme = _select_partitions(
+            data_root, data_type, exchange, timeframe, symbol, start_date, end_date
+        )
+    except (FileNotFoundError, ValueError):
+        # 只有尚未落盘的实时数据
+        if live is None:
+            raise
+        base_path, selected_dates, scheme = None, [], None
 
-    # list available date partitions
-    partitions = [
-        d
-        for d in os.listdir(base_path)
-        if d.startswith("date=") and os.path.isdir(os.path.join(base_path, d))
-    ]
-    if not partitions:
-        raise FileNotFoundError(f"No date partitions found under {base_path}")
-
-    # extract and sort partition dates
-    partition_dates = sorted(d.split("date=")[1] for d in partitions)
-
-    # filter by start/end date
-    def in_range(date_str: str) -> bool:
-        if start_date and date_str < start_date:
-            return False
-        if end_date and date_str > end_date:
-            return False
-        return True
+    # load and concatenate
+    read_timer = instrumentation.histogram(
+        "partition_read_seconds", "Time to read one partition", data_type=data_type
+    )
 
-    selected_dates = [d for d in partition_dates if in_range(d)]
-    if not selected_dates:
-        raise ValueError(f"No partitions in range {start_date} - {end_date}")
+    def read(p):
+        with read_timer.time():
+            return read_frame(p, columns)
 
-    # load and concatenate
+    storage = storage_for(data_root)
     dfs = []
     for d in selected_dates:
-        p = os.path.join(base_path, f"date={d}")
+        p = storage.join(base_path, f"date={d}")
         try:
-            df = pd.read_parquet(p, columns=columns)
+            if use_cache:
+                df = PARTITION_CACHE.read(p, columns, lambda: read(p), partition=d)
+            else:
+                df = read(p)
             dfs.append(df)
         except Exception as e:
-            print(f"Failed to read {p}: {e}")
+            logger.error(f"Failed to read {p}: {e}")
 
+    if live is not None:
+        dfs.append(live)
     if not dfs:
         raise RuntimeError("No data loaded from any partition.")
 
-    data = pd.concat(dfs, ignore_index=True).sort_values("datetime")
+    data = pd.concat(dfs, ignore_index=True)
+    if live is not None and "timestamp" in data.columns:
+        # 已落盘的数据优先
+        data = data.drop_duplicates("timestamp", keep="first")
+    if scheme is not None and not scheme.aligned_to_days:
+        # 月/年分区的首尾分区包含区间外的行
+        data = _trim_rows(data, start_date, end_date)
+    data = data.sort_values("datetime")
 
     # ensure datetime dtype
     if "datetime" in data.columns:
@@ -91,3 +116,174 @@ def load_from_parquet(
         data = data.dropna(subset=["datetime"])
 
     return data.reset_index(drop=True)
+
+
+def _select_partitions(
+    data_root: str,
+    data_type: str,
+    exchange: str,
+    timeframe: str,
+    symbol: str,
+    start_date: str = None,
+    end_date: str = None,
+) -> tuple[str, list[str], PartitionScheme]:
+    """
+    Resolve the dataset directory, the sorted partition values that overlap
+    [start_date, end_date] and the dataset's partition scheme.
+    """
+    storage = storage_for(data_root)
+    base_path = dataset_path(data_root, data_type, exchange, timeframe, symbol)
+    legacy_path = storage.join(
+        data_root, data_type, exchange, timeframe, symbol.replace("/", "_")
+    )
+    if not storage.exists(base_path) and storage.exists(legacy_path):
+        # 旧版本把 ':' 原样写进目录名
+        base_path = legacy_path
+
+    if not storage.exists(base_path):
+        raise FileNotFoundError(f"Data path not found: {base_path}")
+
+    # list available date partitions
+    partitions = [
+        d
+        for d in storage.listdir(base_path)
+        if d.startswith("date=") and storage.isdir(storage.join(base_path, d))
+    ]
+    if not partitions:
+        raise FileNotFoundError(f"No date partitions found under {base_path}")
+
+    # extract partition values and prune with the dataset's partition scheme,
+    # so that e.g. yearly 'date=2023' matches start_date='2023-05-01'
+    partition_dates = [d.split("date=")[1] for d in partitions]
+    scheme = read_scheme(base_path, partition_dates)
+    selected_dates = scheme.select(partition_dates, start_date, end_date)
+    if not selected_dates:
+        raise ValueError(f"No partitions in range {start_date} - {end_date}")
+
+    return base_path, selected_dates, scheme
+
+
+def _row_bounds(start_date: str = None, end_date: str = None) -> tuple:
+    """[start_date, end_date] (inclusive dates) as [lo, hi) epoch milliseconds."""
+    lo = hi = None
+    if start_date:
+        lo = int(pd.Timestamp(start_date, tz="UTC").timestamp() * 1000)
+    if end_date:
+        hi = int(pd.Timestamp(end_date, tz="UTC").timestamp() * 1000) + DAY_MS
+    return lo, hi
+
+
+def _trim_rows(data: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+    lo, hi = _row_bounds(start_date, end_date)
+    if lo is None and hi is None:
+        return data
+    if "timestamp" in data.columns:
+        ts = data["timestamp"]
+    elif "datetime" in data.columns:
+        ts = pd.to_datetime(data["datetime"]).astype("datetime64[ms]").astype("int64")
+    else:
+        return data
+    mask = pd.Series(True, index=data.index)
+    if lo is not None:
+        mask &= ts >= lo
+    if hi is not None:
+        mask &= ts < hi
+    return data[mask]
+
+
+def dataset_fingerprint(
+    data_root: str,
+    data_type: str,
+    exchange: str,
+    timeframe: str,
+    symbol: str,
+    start_date: str = None,
+    end_date: str = None,
+) -> str:
+    """
+    Cheap fingerprint of the partitions `load_from_parquet` would read with the
+    same arguments. Only file names, sizes and mtimes (ETags on object
+    storage) are hashed, so nothing is
+    decoded; any rewrite of a partition changes the fingerprint.
+
+    Returns
+    -------
+    str
+        Hex digest identifying the selected data.
+    """
+    base_path, selected_dates, _ = _select_partitions(
+        data_root, data_type, exchange, timeframe, symbol, start_date, end_date
+    )
+
+    storage = storage_for(data_root)
+    entries = []
+    for d in selected_dates:
+        p = storage.join(base_path, f"date={d}")
+        for name, size, token in storage.files(p):
+            entries.append((d, name, size, token))
+
+    payload = {
+        "dataset": [data_type, exchange, timeframe, symbol],
+        "range": [start_date, end_date],
+        "files": entries,
+    }
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+def iter_parquet_batches(
+    data_root: str,
+    data_type: str,
+    exchange: str,
+    timeframe: str,
+    symbol: str,
+    start_date: str = None,
+    end_date: str = None,
+    columns: list[str] = None,
+    batch_size: int = 65536,
+):
+    """
+    按分区顺序逐批读取Parquet数据, 返回 pa.RecordBatch 的生成器
+    只读取需要的列, 任何时刻内存中最多一个批次; 定点整数列还原为 float64,
+    文件中没有 'datetime' 时用 'timestamp' 代替
+    """
+    base_path, selected_dates, scheme = _select_partitions(
+        data_root, data_type, exchange, timeframe, symbol, start_date, end_date
+    )
+    lo, hi = (
+        (None, None) if scheme.aligned_to_days else _row_bounds(start_date, end_date)
+    )
+    storage = storage_for(data_root)
+    for d in selected_dates:
+        p = storage.join(base_path, f"date={d}")
+        for name, size, token in storage.files(p):
+            if not name.endswith(".parquet"):
+                continue
+            path = storage.join(p, name)
+            present = storage.metadata(path, size, token).schema.to_arrow_schema().names
+            cols = storage_columns(columns, present)
+            if cols and "timestamp" in cols and "datetime" in cols:
+                # 两者等价, 只读整数时间戳
+                cols.remove("datetime")
+            pf = storage.open_parquet(path, size, token, columns=cols)
+            scales = file_scales(pf.schema_arrow)
+            for batch in pf.iter_batches(batch_size=batch_size, columns=cols):
+                if scales:
+                    batch = decode(batch, scales)
+                if (
+                    lo is not None or hi is not None
+                ) and "timestamp" in batch.schema.names:
+                    batch = _trim_batch(batch, lo, hi)
+                    if not batch.num_rows:
+                        continue
+                yield batch
+
+
+def _trim_batch(batch, lo: int, hi: int):
+    ts = batch.column("timestamp")
+    mask = None
+    if lo is not None:
+        mask = pc.greater_equal(ts, lo)
+    if hi is not None:
+        upper = pc.less(ts, hi)
+        mask = upper if mask is None else pc.and_(mask, upper)
+    return batch.filter(mask)
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+订单簿存储: 定期关键帧 + 逐次更新的档位增量, 列式定点整数
+
+    recorder = OrderBookRecorder("binance", "BTC/USDT", keyframe_every=1000)
+    recorder.on_book(orderbook)        # ccxt watch_order_book 的输出
+    recorder.flush()                   # 定期落盘
+
+    reader = OrderBookReader("binance", "BTC/USDT")
+    reader.at(1760000000000)           # 该时刻的订单簿 {'timestamp', 'bids', 'asks'}
+    for book in reader.replay("2025-10-01", "2025-10-01"): ...
+
+与 save_to_parquet 相同的目录布局 (timeframe 为 'tick'):
+    orderbook/<exchange>/tick/<symbol>/date=.../part.0.parquet
+每行是一个档位: timestamp, kind, side (1 买 / -1 卖), price, amount.
+kind=1/2 为关键帧的第一档/其余档位, 完整记录当时的订单簿; kind=0 为增量,
+amount=0 表示删除该档. 每 keyframe_every 次更新以及每个分区的第一次更新写关键帧,
+因此任一时刻的订单簿只需读取一个分区, 从之前最近的关键帧开始应用增量.
+价格/数量存为定点整数 (小数位数默认按数据推断), 时间戳与价格用 DELTA 编码.
+"""
+
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_ROOT_PATH
+from data_processor.cache import dataset_path
+from data_processor.loader import _row_bounds
+from data_processor.partitioning import dataset_scheme, read_scheme
+from data_processor.schema import partition_scales, policy_for, read_frame
+from data_processor.storage import storage_for
+from data_processor.writer import save_to_parquet
+
+logger = logging.getLogger(__name__)
+
+ORDERBOOK_DATA_TYPE = "orderbook"
+TIMEFRAME = "tick"
+DELTA, KEYFRAME, KEYFRAME_LEVEL = 0, 1, 2
+BID, ASK = 1, -1
+COLUMNS = ["timestamp", "kind", "side", "price", "amount"]
+MAX_DECIMALS = 12
+
+
+def decimals(values: np.ndarray, max_decimals: int = MAX_DECIMALS) -> int:
+    """能无损表示全部取值的最少小数位数"""
+    values = np.asarray(values, dtype=np.float64)
+    for d in range(max_decimals + 1):
+        scaled = values * 10.0**d
+        if np.all(np.abs(scaled - np.rint(scaled)) < 1e-6):
+            return d
+    return max_decimals
+
+
+class BookEncoder:
+    """
+    把连续的订单簿快照编码为关键帧与增量行
+    :param keyframe_every: 每多少次更新写一次关键帧
+    :param depth: 每边只保留前 depth 档, None为全部
+    :param scheme: 分区方案, 每个分区的第一次更新写关键帧
+    """
+
+    def __init__(self, keyframe_every: int = 1000, depth: int = None, scheme=None):
+        self.keyframe_every = keyframe_every
+        self.depth = depth
+        self.scheme = scheme
+        self.bids = {}
+        self.asks = {}
+        self.count = 0
+        self.partition = None
+        self._rows = {c: [] for c in COLUMNS}
+
+    def _levels(self, levels) -> dict:
+        if self.depth is not None:
+            levels = levels[: self.depth]
+        return {float(level[0]): float(level[1]) for level in levels}
+
+    def _emit(self, ts, kind, side, price, amount):
+        rows = self._rows
+        rows["timestamp"].append(ts)
+        rows["kind"].append(kind)
+        rows["side"].append(side)
+        rows["price"].append(price)
+        rows["amount"].append(amount)
+
+    def encode(self, timestamp: int, bids, asks):
+        """
+        加入一次快照
+        :param bids / asks: [[price, amount], ...], 买盘从高到低, 卖盘从低到高
+        """
+        bids, asks = self._levels(bids), self._levels(asks)
+        partition = self.scheme.format_ms(timestamp) if self.scheme else None
+        if self.count % self.keyframe_every == 0 or partition != self.partition:
+            self.partition = partition
+            self.count = 0
+            levels = [(BID, p, a) for p, a in bids.items()]
+            levels += [(ASK, p, a) for p, a in asks.items()]
+            if not levels:
+                levels = [(0, 0.0, 0.0)]  # 空订单簿的关键帧
+            for i, (side, price, amount) in enumerate(levels):
+                self._emit(
+                    timestamp,
+                    KEYFRAME if i == 0 else KEYFRAME_LEVEL,
+                    side,
+                    price,
+                    amount,
+                )
+        else:
+            for side, new, old in ((BID, bids, self.bids), (ASK, asks, self.asks)):
+                for price, amount in new.items():
+                    if old.get(price) != amount:
+                        self._emit(timestamp, DELTA, side, price, amount)
+                for price in old.keys() - new.keys():
+                    self._emit(timestamp, DELTA, side, price, 0.0)
+        self.bids, self.asks = bids, asks
+        self.count += 1
+
+    def __len__(self) -> int:
+        return len(self._rows["timestamp"])
+
+    def frame(self) -> pd.DataFrame:
+        """取出已编码的行并清空缓冲区"""
+        rows, self._rows = self._rows, {c: [] for c in COLUMNS}
+        return pd.DataFrame(
+            {
+                "timestamp": np.asarray(rows["timestamp"], dtype=np.int64),
+                "kind": np.asarray(rows["kind"], dtype=np.int8),
+                "side": np.asarray(rows["side"], dtype=np.int8),
+                "price": np.asarray(rows["price"], dtype=np.float64),
+                "amount": np.asarray(rows["amount"], dtype=np.float64),
+            }
+        )
+
+
+def save_orderbook(
+    rows: pd.DataFrame,
+    exchange: str,
+    symbol: str,
+    data_root: str = DATA_ROOT_PATH,
+    price_precision: int = None,
+    amount_precision: int = None,
+    partitioning: str = None,
+) -> bool:
+    """
+    把编码后的行写入分区, 与分区中已有的行合并
+    :param price_precision / amount_precision: 定点小数位数, None为按数据推断
+    :return: 是否写入了数据
+    """
+    if rows.empty:
+        return False
+    storage = storage_for(data_root)
+    base_path = dataset_path(
+        data_root, ORDERBOOK_DATA_TYPE, exchange, TIMEFRAME, symbol
+    )
+    scheme = dataset_scheme(base_path, TIMEFRAME, partitioning)
+
+    # 与分区中已有的行合并 (见 save_to_parquet), 精度不低于已写入的文件
+    value = scheme.format_ms(int(rows["timestamp"].iloc[0]))
+    path = storage.join(base_path, f"date={value}")
+    scales = partition_scales(path) if storage.isdir(path) else {}
+    if price_precision is None:
+        price_precision = max(decimals(rows["price"]), scales.get("price", 0))
+    if amount_precision is None:
+        amount_precision = max(decimals(rows["amount"]), scales.get("amount", 0))
+    policy = policy_for(ORDERBOOK_DATA_TYPE).with_precision(
+        price_precision, amount_precision
+    )
+    return save_to_parquet(
+        rows,
+        ORDERBOOK_DATA_TYPE,
+        exchange,
+        symbol,
+        TIMEFRAME,
+        data_root,
+        partitioning=scheme.name,
+        policy=policy,
+    )
+
+
+class OrderBookRecorder:
+    """
+    记录一个交易对的订单簿流: on_book 接收快照, 缓冲的行达到 flush_rows 时落盘
+    """
+
+    def __init__(
+        self,
+        exchange: str,
+        symbol: str,
+        data_root: str = DATA_ROOT_PATH,
+        keyframe_every: int = 1000,
+        depth: int = None,
+        flush_rows: int = 1_000_000,
+        partitioning: str = None,
+        price_precision: int = None,
+        amount_precision: int = None,
+    ):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.data_root = data_root
+        self.flush_rows = flush_rows
+        self.precision = dict(
+            price_precision=price_precision, amount_precision=amount_precision
+        )
+        base_path = dataset_path(
+            data_root, ORDERBOOK_DATA_TYPE, exchange, TIMEFRAME, symbol
+        )
+        self.scheme = dataset_scheme(base_path, TIMEFRAME, partitioning)
+        self.encoder = BookEncoder(keyframe_every, depth, self.scheme)
+
+    def on_book(self, orderbook: dict):
+        """ccxt 订单簿 {'timestamp', 'bids', 'asks', ...}"""
+        self.encoder.encode(
+            orderbook["timestamp"], orderbook["bids"], orderbook["asks"]
+        )
+        if len(self.encoder) >= self.flush_rows:
+            self.flush()
+
+    def flush(self) -> bool:
+        return save_orderbook(
+            self.encoder.frame(),
+            self.exchange,
+            self.symbol,
+            self.data_root,
+            partitioning=self.scheme.name,
+            **self.precision,
+        )
+
+
+def _book(timestamp: int, side, price, amount, depth: int = None) -> dict:
+    """
+    按顺序应用的档位行 -> 订单簿 (每个档位取最后一次的数量, 去掉数量为0的档位)
+    """
+    key = side * price  # 买盘为正, 卖盘为负
+    last = len(key) - 1 - np.unique(key[::-1], return_index=True)[1]
+    key, amount = key[last], amount[last]
+    alive = amount > 0
+    key, amount = key[alive], amount[alive]
+    bid = key > 0
+    order = np.argsort(-key[bid], kind="stable")
+    bids = np.column_stack([key[bid][order], amount[bid][order]])
+    order = np.argsort(-key[~bid], kind="stable")
+    asks = np.column_stack([-key[~bid][order], amount[~bid][order]])
+    if depth is not None:
+        bids, asks = bids[:depth], asks[:depth]
+    return {"timestamp": int(timestamp), "bids": bids.tolist(), "asks": asks.tolist()}
+
+
+class OrderBookReader:
+    """
+    读取 OrderBookRecorder 写入的订单簿; 最近用到的分区解码后缓存在内存中
+    """
+
+    def __init__(
+        self,
+        exchange: str,
+        symbol: str,
+        data_root: str = DATA_ROOT_PATH,
+        cache_partitions: int = 4,
+    ):
+        self.storage = storage_for(data_root)
+        self.base_path = dataset_path(
+            data_root, ORDERBOOK_DATA_TYPE, exchange, TIMEFRAME, symbol
+        )
+        self.values = []
+        if self.storage.isdir(self.base_path):
+            self.values = sorted(
+                d[len("date=") :]
+                for d in self.storage.listdir(self.base_path)
+                if d.startswith("date=")
+            )
+        self.scheme = read_scheme(self.base_path, self.values)
+        self.cache_partitions = cache_partitions
+        self._cache = OrderedDict()
+
+    def _partition(self, value: str) -> dict:
+        arrays = self._cache.get(value)
+        if arrays is None:
+            df = read_frame(self.storage.join(self.base_path, f"date={value}"), COLUMNS)
+            arrays = {c: df[c].to_numpy() for c in COLUMNS}
+            arrays["keyframes"] = np.flatnonzero(arrays["kind"] == KEYFRAME)
+            self._cache[value] = arrays
+            while len(self._cache) > self.cache_partitions:
+                self._cache.popitem(last=False)
+        self._cache.move_to_end(value)
+        return arrays
+
+    def at(self, timestamp: int, depth: int = None) -> dict:
+        """
+        timestamp (毫秒) 时刻的订单簿, 'timestamp' 为最近一次变化的时间;
+        在第一条记录之前时返回None
+        """
+        if self.scheme is None:
+            return None
+        value = self.scheme.format_ms(timestamp)
+        i = np.searchsorted(self.values, value, side="right") - 1
+        while i >= 0:
+            p = self._partition(self.values[i])
+            end = np.searchsorted(p["timestamp"], timestamp, side="right")
+            if end > 0:
+                starts = p["keyframes"]
+                start = starts[np.searchsorted(starts, end - 1, side="right") - 1]
+                window = slice(start, end)
+                return _book(
+                    p["timestamp"][end - 1],
+                    p["side"][window].astype(np.float64),
+                    p["price"][window],
+                    p["amount"][window],
+                    depth,
+                )
+            i -= 1  # 早于本分区的第一条记录, 取上一个分区的最后状态
+        return None
+
+    def replay(self, start_date: str = None, end_date: str = None, depth: int = None):
+        """
+        按时间顺序逐个产出每次变化后的订单簿 (ccxt 格式, 可直接给 replay.book_stream)
+        """
+        if self.scheme is None:
+            return
+        lo, hi = _row_bounds(start_date, end_date)
+        for value in self.scheme.select(self.values, start_date, end_date):
+            p = self._partition(value)
+            books = {BID: {}, ASK: {}}
+            ts, kind, side = p["timestamp"], p["kind"], p["side"]
+            price, amount = p["price"], p["amount"]
+            n = len(ts)
+            for i in range(n):
+                if kind[i] == KEYFRAME:
+                    books = {BID: {}, ASK: {}}
+                if side[i]:
+                    if amount[i] > 0:
+                        books[side[i]][price[i]] = amount[i]
+                    else:
+                        books[side[i]].pop(price[i], None)
+                if i + 1 < n and ts[i + 1] == ts[i]:
+                    continue
+                if (lo is None or ts[i] >= lo) and (hi is None or ts[i] < hi):
+                    bids = sorted(books[BID].items(), reverse=True)[:depth]
+                    asks = sorted(books[ASK].items())[:depth]
+                    yield {
+                        "timestamp": int(ts[i]),
+                        "bids": [[float(p), float(a)] for p, a in bids],
+                        "asks": [[float(p), float(a)] for p, a in asks],
+                    }
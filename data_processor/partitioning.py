@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+分区方案: 按时间周期和数据量选择 小时/日/月/年 分区
+
+分区目录统一为 date=<值>, 值的格式由方案决定且按字典序即时间序:
+    hourly   date=2025-10-01T05
+    daily    date=2025-10-01
+    monthly  date=2025-10
+    yearly   date=2025
+
+写入时把方案记录在数据集目录的 _partitioning.json 中, 读取时据此把
+[start_date, end_date] 换算为分区值再裁剪; 没有记录的旧数据集按分区值的长度推断.
+"""
+
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from data_processor.bar_builder import TIMEFRAME_MS
+from data_processor.storage import storage_for
+
+METADATA_FILE = "_partitioning.json"
+DAY_MS = 86_400_000
+
+# 单个分区的目标行数上限, 超过时换用更细的分区
+TARGET_ROWS = 4_000_000
+# 没有周期可推算时 (逐笔成交) 每天行数的估计
+TICK_ROWS_PER_DAY = 1_000_000
+
+
+@dataclass(frozen=True)
+class PartitionScheme:
+    name: str
+    fmt: str  # strftime 格式
+    days: float  # 每个分区大约覆盖的天数
+
+    def format_ms(self, ts_ms: int) -> str:
+        dt = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc)
+        return dt.strftime(self.fmt)
+
+    def format_series(self, dt):
+        """pandas datetime Series -> 分区值 Series"""
+        return dt.dt.strftime(self.fmt)
+
+    def bounds(self, start_date: str = None, end_date: str = None) -> tuple:
+        """
+        日期区间 [start_date, end_date] (YYYY-MM-DD, 含两端) 覆盖的分区值范围
+        """
+        lo = hi = None
+        if start_date:
+            lo = datetime.fromisoformat(start_date).strftime(self.fmt)
+        if end_date:
+            last = datetime.fromisoformat(end_date) + timedelta(days=1, hours=-1)
+            hi = last.strftime(self.fmt)
+        return lo, hi
+
+    def select(self, values, start_date: str = None, end_date: str = None) -> list:
+        lo, hi = self.bounds(start_date, end_date)
+        return [
+            v
+            for v in sorted(values)
+            if (lo is None or v >= lo) and (hi is None or v <= hi)
+        ]
+
+    @property
+    def aligned_to_days(self) -> bool:
+        """分区边界与自然日对齐, 按日期裁剪分区后不需要再按行过滤"""
+        return self.days <= 1
+
+
+SCHEMES = {
+    s.name: s
+    for s in (
+        PartitionScheme("hourly", "%Y-%m-%dT%H", 1 / 24),
+        PartitionScheme("daily", "%Y-%m-%d", 1),
+        PartitionScheme("monthly", "%Y-%m", 30),
+        PartitionScheme("yearly", "%Y", 365),
+    )
+}
+# 从细到粗
+ORDER = ["hourly", "daily", "monthly", "yearly"]
+
+
+# bar_builder 只支持日内周期, 这里补上周/月
+PERIOD_MS = {**TIMEFRAME_MS, "w": 7 * DAY_MS, "M": 30 * DAY_MS}
+
+
+def rows_per_day(timeframe: str) -> float:
+    unit = timeframe[-1:]
+    if timeframe == "tick" or unit not in PERIOD_MS:
+        return TICK_ROWS_PER_DAY
+    return DAY_MS / (int(timeframe[:-1] or 1) * PERIOD_MS[unit])
+
+
+def scheme_for(timeframe: str, daily_rows: float = None) -> PartitionScheme:
+    """
+    选择分区方案: 每个分区不超过 TARGET_ROWS 行的最粗方案;
+    日内周期 (秒/分钟/逐笔) 最粗按日分区, 便于每日增量写入只改写最新分区
+    :param daily_rows: 每天的行数, 默认按周期推算
+    """
+    if daily_rows is None:
+        daily_rows = rows_per_day(timeframe)
+    intraday = timeframe == "tick" or timeframe[-1:] in ("s", "m")
+    candidates = ORDER[:2] if intraday else ORDER
+    chosen = candidates[0]
+    for name in candidates:
+        if daily_rows * SCHEMES[name].days <= TARGET_ROWS:
+            chosen = name
+    return SCHEMES[chosen]
+
+
+def write_scheme(base_path: str, scheme: PartitionScheme, timeframe: str = None):
+    storage = storage_for(base_path)
+    storage.makedirs(base_path)
+    meta = {"scheme": scheme.name, "format": scheme.fmt, "timeframe": timeframe}
+    path = storage.join(base_path, METADATA_FILE)
+    storage.write_bytes(path, json.dumps(meta, sort_keys=True).encode("utf-8"))
+
+
+def infer_scheme(value: str) -> PartitionScheme:
+    """由分区值推断方案 (没有 _partitioning.json 的旧数据集)"""
+    for scheme in SCHEMES.values():
+        if len(value) == len(datetime(2000, 1, 1).strftime(scheme.fmt)):
+            return scheme
+    raise ValueError(f"Unrecognized partition value: {value!r}")
+
+
+def read_scheme(base_path: str, values=None) -> PartitionScheme:
+    """
+    数据集记录的分区方案; 没有记录时按第一个分区值推断, 都没有时返回None
+    """
+    storage = storage_for(base_path)
+    path = storage.join(base_path, METADATA_FILE)
+    if storage.exists(path):
+        return SCHEMES[json.loads(storage.read_bytes(path))["scheme"]]
+    for value in values or ():
+        return infer_scheme(value)
+    return None
+
+
+def dataset_scheme(
+    base_path: str,
+    timeframe: str,
+    partitioning: str = None,
+    daily_rows: float = None,
+) -> PartitionScheme:
+    """
+    写入时使用的分区方案: 已有数据集沿用记录 (或推断) 的方案, 新数据集按
+    partitioning 或 scheme_for 选择, 并写入 _partitioning.json
+    :raises ValueError: partitioning 与已有数据集的方案不一致
+    """
+    storage = storage_for(base_path)
+    values = []
+    if storage.isdir(base_path):
+        values = [
+            d[len("date=") :]
+            for d in storage.listdir(base_path)
+            if d.startswith("date=")
+        ]
+    recorded = read_scheme(base_path, values)
+    requested = SCHEMES[partitioning] if partitioning else None
+    if recorded is not None and requested is not None and recorded != requested:
+        raise ValueError(
+            f"{base_path} is partitioned {recorded.name}, not {requested.name}; "
+            "rewrite the dataset to change its partitioning"
+        )
+    scheme = recorded or requested or scheme_for(timeframe, daily_rows)
+    if not storage.exists(storage.join(base_path, METADATA_FILE)):
+        write_scheme(base_path, scheme, timeframe)
+    return scheme
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+跨交易对查询: 把 data_type/exchange/timeframe/symbol/date= 目录树当作一张表扫描
+
+    t = scan(DATA_ROOT_PATH, "ohlcv_1m", ["symbol", "high", "low"],
+             symbols="*/USDT", start_date="2025-09-01", end_date="2025-09-30")
+    t = t.append_column("range", pc.subtract(t["high"], t["low"]))
+    t.group_by("symbol").aggregate([("range", "mean")])
+
+    # 安装了 duckdb 时可以直接写SQL, 每个 data_type 是一个视图
+    sql("SELECT symbol, avg(high - low) AS r FROM ohlcv_1m GROUP BY symbol")
+
+目录层级 exchange/timeframe/symbol 与分区值 date 作为字符串列 (symbol 为目录名,
+e.g. 'BTC_USDT'). 对这些列的条件在列目录时裁剪文件, 时间区间与列选择下推到
+Parquet (行组统计, 只读所需列), 扫描由 pyarrow.dataset 多线程执行, 定点整数列
+在扫描中还原为 float64. 结果为 pa.Table, 不经过 pandas.
+"""
+
+import fnmatch
+import json
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from config import DATA_ROOT_PATH
+from data_processor.partitioning import DAY_MS, read_scheme
+from data_processor.schema import file_scales
+from data_processor.storage import storage_for
+from data_processor.symbols import symbol_path_name
+
+PARTITION_COLUMNS = ["exchange", "timeframe", "symbol", "date"]
+# scan 的 filter 可以引用的列: 其余数值列在文件中可能是定点整数, 不能直接比较
+FILTER_SCHEMA = pa.schema(
+    [(c, pa.string()) for c in PARTITION_COLUMNS] + [("timestamp", pa.int64())]
+)
+
+
+def _names(storage, path: str) -> list:
+    if not storage.isdir(path):
+        return []
+    return sorted(n for n in storage.listdir(path) if not n.startswith(("_", ".")))
+
+
+def _selected(names: list, wanted) -> list:
+    if wanted is None:
+        return names
+    if isinstance(wanted, str):
+        wanted = [wanted]
+    return [n for n in names if n in wanted]
+
+
+def _symbol_matches(name: str, symbols) -> bool:
+    """symbols 为统一写法列表, 或通配符 (e.g. '*/USDT', '*/USDT:USDT')"""
+    if symbols is None:
+        return True
+    if isinstance(symbols, str):
+        return fnmatch.fnmatchcase(name, symbol_path_name(symbols))
+    return name in {symbol_path_name(s) for s in symbols}
+
+
+def _ms(date: str) -> int:
+    dt = datetime.fromisoformat(date).replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def _time_filter(start_date: str = None, end_date: str = None):
+    """[start_date, end_date] (含两端的日期) 的 timestamp 条件"""
+    expr = None
+    if start_date:
+        expr = pc.field("timestamp") >= _ms(start_date)
+    if end_date:
+        upper = pc.field("timestamp") < _ms(end_date) + DAY_MS
+        expr = upper if expr is None else expr & upper
+    return expr
+
+
+def datasets(
+    data_root: str,
+    data_type: str,
+    exchange=None,
+    timeframe=None,
+    symbols=None,
+    start_date: str = None,
+    end_date: str = None,
+):
+    """
+    把目录树中符合条件的分区文件组织为 pyarrow 数据集
+
+    文件布局 (列与定点整数的小数位数) 相同的交易对合为一个数据集, 旧文件与按
+    不同精度存储的交易对因此分属不同数据集
+    :param exchange / timeframe: 名字或名字列表, None为全部
+    :param symbols: 统一写法列表或通配符, None为全部
+    :param start_date / end_date: 只包含与 [start_date, end_date] 重叠的分区
+    :return: [(ds.FileSystemDataset, {列名: 小数位数})]
+    """
+    storage = storage_for(data_root)
+    root = storage.join(data_root, data_type)
+    groups = {}  # 文件布局 -> [schema, scales, paths, partitions]
+    for ex in _selected(_names(storage, root), exchange):
+        ex_path = storage.join(root, ex)
+        for tf in _selected(_names(storage, ex_path), timeframe):
+            tf_path = storage.join(ex_path, tf)
+            for sym in _names(storage, tf_path):
+                if not _symbol_matches(sym, symbols):
+                    continue
+                base_path = storage.join(tf_path, sym)
+                values = [
+                    d[len("date=") :]
+                    for d in _names(storage, base_path)
+                    if d.startswith("date=")
+                ]
+                if not values:
+                    continue
+                files = []
+                scheme = read_scheme(base_path, values)
+                for value in scheme.select(values, start_date, end_date):
+                    p = storage.join(base_path, f"date={value}")
+                    files += [
+                        (storage.join(p, name), value)
+                        for name, _, _ in storage.files(p)
+                        if name.endswith(".parquet")
+                    ]
+                if not files:
+                    continue
+
+                schema = storage.metadata(files[0][0]).schema.to_arrow_schema()
+                scales = file_scales(schema)
+                key = (
+                    schema.remove_metadata().to_string(),
+                    json.dumps(scales, sort_keys=True),
+                )
+                group = groups.setdefault(key, [schema, scales, [], []])
+                keys = (
+                    (pc.field("exchange") == ex)
+                    & (pc.field("timeframe") == tf)
+                    & (pc.field("symbol") == sym)
+                )
+                for path, value in files:
+                    group[2].append(storage.arrow_path(path))
+                    group[3].append(keys & (pc.field("date") == value))
+
+    result = []
+    for schema, scales, paths, partitions in groups.values():
+        for name in PARTITION_COLUMNS:
+            if name not in schema.names:
+                schema = schema.append(pa.field(name, pa.string()))
+        dataset = ds.FileSystemDataset.from_paths(
+            paths,
+            schema=schema,
+            format=ds.ParquetFileFormat(),
+            filesystem=storage.arrow_filesystem(),
+            partitions=partitions,
+        )
+        result.append((dataset, scales))
+    return result
+
+
+def _projection(schema: pa.Schema, scales: dict, columns: list = None) -> dict:
+    """
+    请求的列 -> 扫描表达式; 定点整数还原为 float64, 'datetime' 由 timestamp 派生
+    """
+    if columns is None:
+        columns = PARTITION_COLUMNS + [
+            n
+            for n in schema.names
+            if n not in PARTITION_COLUMNS
+            and n != "datetime"
+            and not n.startswith("__index_level_")
+        ]
+    projection = {}
+    for name in columns:
+        if name in scales:
+            projection[name] = pc.field(name).cast(pa.float64()) / 10.0 ** scales[name]
+        elif name == "datetime" and "timestamp" in schema.names:
+            projection[name] = pc.field("timestamp").cast(pa.timestamp("ms"))
+        elif name in schema.names:
+            projection[name] = pc.field(name)
+    return projection
+
+
+def scan(
+    data_root: str,
+    data_type: str,
+    columns: list = None,
+    filter: pc.Expression = None,
+    exchange=None,
+    timeframe=None,
+    symbols=None,
+    start_date: str = None,
+    end_date: str = None,
+    use_threads: bool = True,
+) -> pa.Table:
+    """
+    扫描一个 data_type 下全部 (或符合条件的) 交易对, 返回一张 Arrow 表
+
+    :param columns: 列名列表, 可以包含分区列与 'datetime', None为全部
+    :param filter: 只能引用分区列与 timestamp 的 pc.Expression,
+        e.g. pc.field('symbol').isin(['BTC_USDT', 'ETH_USDT']);
+        按价格等数值列过滤请在结果上用 Table.filter
+    :param exchange / timeframe / symbols / start_date / end_date: 见 datasets
+    :raises FileNotFoundError: 没有符合条件的分区
+    :raises ValueError: filter 引用了其他列
+    """
+    if filter is not None:
+        try:
+            ds.dataset(FILTER_SCHEMA.empty_table()).to_table(filter=filter)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(
+                f"scan() filters may only use {FILTER_SCHEMA.names}: {e}"
+            ) from e
+    time_filter = _time_filter(start_date, end_date)
+    if time_filter is not None:
+        filter = time_filter if filter is None else filter & time_filter
+
+    tables = []
+    for dataset, scales in datasets(
+        data_root, data_type, exchange, timeframe, symbols, start_date, end_date
+    ):
+        tables.append(
+            dataset.to_table(
+                columns=_projection(dataset.schema, scales, columns),
+                filter=filter,
+                use_threads=use_threads,
+            )
+        )
+    if not tables:
+        raise FileNotFoundError(
+            f"No {data_type} partitions under {data_root} match the query"
+        )
+    return pa.concat_tables(tables, promote_options="default")
+
+
+def connect(data_root: str = DATA_ROOT_PATH, data_types: list = None, **selection):
+    """
+    DuckDB 连接, data_root 下的每个 data_type 注册为同名视图 (列同 scan)
+    DuckDB 把 WHERE 条件与列选择下推到 pyarrow 数据集, 查询多线程执行
+    :param selection: 传给 datasets 的 exchange / timeframe / symbols / start_date / end_date
+    """
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError(
+            "SQL queries need duckdb (pip install duckdb); "
+            "data_processor.query.scan works with pyarrow alone"
+        ) from e
+
+    con = duckdb.connect()
+    storage = storage_for(data_root)
+    for data_type in data_types or _names(storage, data_root):
+        selects = []
+        for i, (dataset, scales) in enumerate(
+            datasets(data_root, data_type, **selection)
+        ):
+            name = f"_{data_type}_{i}"
+            con.register(name, dataset)
+            cols = []
+            for column in _projection(dataset.schema, scales):
+                if column in scales:
+                    cols.append(
+                        f'CAST("{column}" AS DOUBLE) / {10.0 ** scales[column]!r} '
+                        f'AS "{column}"'
+                    )
+                else:
+                    cols.append(f'"{column}"')
+            if "timestamp" in dataset.schema.names:
+                cols.append('epoch_ms("timestamp") AS "datetime"')
+            selects.append(f'SELECT {", ".join(cols)} FROM "{name}"')
+        if selects:
+            con.execute(
+                f'CREATE VIEW "{data_type}" AS ' + " UNION ALL BY NAME ".join(selects)
+            )
+    return con
+
+
+def sql(query: str, data_root: str = DATA_ROOT_PATH, **selection) -> pa.Table:
+    """在 connect() 的视图上执行一条SQL, 返回 Arrow 表 (需要 duckdb)"""
+    return connect(data_root, **selection).sql(query).fetch_arrow_table()
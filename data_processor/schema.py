@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+存储schema策略: 每种 data_type 的列类型与编码
+
+    - 只存一个 int64 毫秒时间戳 'timestamp', 'datetime' 在读取时由它派生
+    - 价格/数量默认 float64 (无损), 可按市场配置为 float32 或定点整数
+      (value = int / 10**precision, 见 MARKET_PRECISION)
+    - 每列选择编码: 时间戳/id/定点整数用 DELTA_BINARY_PACKED, 浮点用
+      BYTE_STREAM_SPLIT, 取值很少的列 (e.g., side) 用字典编码
+    - 写入结果逐字节可复现: 按时间戳稳定排序, 固定的写入参数, 不写 pandas 元数据,
+      schema 元数据只包含本策略的信息 (同一 pyarrow 版本下相同输入得到相同文件)
+
+定点整数列的精度写在文件的 schema 元数据 (b"ctl.schema") 中, 读取时自动还原为 float64.
+"""
+
+import io
+import json
+import logging
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from data_processor.storage import FsspecStorage, storage_for
+from data_processor.symbols import symbol_path_name
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_METADATA_KEY = b"ctl.schema"
+SCHEMA_VERSION = 1
+# 派生列, 不落盘 ('date' 已由分区目录表示)
+DERIVED_COLUMNS = ("datetime", "date")
+
+ENCODINGS = {
+    "delta": "DELTA_BINARY_PACKED",
+    "byte_stream_split": "BYTE_STREAM_SPLIT",
+    "plain": "PLAIN",
+}
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """
+    :param dtype: 'int64' / 'int8' / 'float64' / 'float32' / 'scaled' (定点整数)
+    :param precision: dtype='scaled' 时的小数位数
+    :param encoding: 'delta' / 'byte_stream_split' / 'dictionary' / 'plain'
+    """
+
+    dtype: str = "float64"
+    precision: int = None
+    encoding: str = "byte_stream_split"
+
+
+TIMESTAMP = ColumnSpec("int64", encoding="delta")
+FLOAT = ColumnSpec()
+
+
+@dataclass(frozen=True)
+class StoragePolicy:
+    """
+    一种 data_type 的存储策略, 未列出的列按原类型写入
+
+    :param price_columns / amount_columns: MARKET_PRECISION 中 'price' / 'amount' 作用的列
+    """
+
+    columns: dict
+    price_columns: tuple = ()
+    amount_columns: tuple = ()
+    compression: str = "zstd"
+    compression_level: int = 3
+    row_group_size: int = 1 << 20
+
+    def with_precision(self, price=None, amount=None) -> "StoragePolicy":
+        """
+        按市场调整价格/数量列: 整数为定点小数位数, 'float32' 为单精度, None 不变
+        """
+        columns = dict(self.columns)
+        for names, setting in (
+            (self.price_columns, price),
+            (self.amount_columns, amount),
+        ):
+            if setting is None:
+                continue
+            for name in names:
+                if setting == "float32":
+                    columns[name] = ColumnSpec("float32")
+                else:
+                    columns[name] = ColumnSpec("scaled", int(setting), "delta")
+        return replace(self, columns=columns)
+
+
+POLICIES = {
+    "ohlcv": StoragePolicy(
+        columns={
+            "timestamp": TIMESTAMP,
+            "open": FLOAT,
+            "high": FLOAT,
+            "low": FLOAT,
+            "close": FLOAT,
+            "volume": FLOAT,
+        },
+        price_columns=("open", "high", "low", "close"),
+        amount_columns=("volume",),
+    ),
+    "trades": StoragePolicy(
+        columns={
+            "id": ColumnSpec("int64", encoding="delta"),
+            "timestamp": TIMESTAMP,
+            "price": FLOAT,
+            "amount": FLOAT,
+            "side": ColumnSpec("int8", encoding="dictionary"),
+        },
+        price_columns=("price",),
+        amount_columns=("amount",),
+    ),
+    "funding_rate": StoragePolicy(
+        columns={"timestamp": TIMESTAMP, "fundingRate": FLOAT},
+    ),
+    # 关键帧 + 档位增量, 见 data_processor/orderbook.py (写入时按数据设定精度)
+    "orderbook": StoragePolicy(
+        columns={
+            "timestamp": TIMESTAMP,
+            "kind": ColumnSpec("int8", encoding="dictionary"),
+            "side": ColumnSpec("int8", encoding="dictionary"),
+            "price": FLOAT,
+            "amount": FLOAT,
+        },
+        price_columns=("price",),
+        amount_columns=("amount",),
+    ),
+}
+POLICIES["ohlcv_1m"] = POLICIES["ohlcv"]
+DEFAULT_POLICY = StoragePolicy(columns={"timestamp": TIMESTAMP})
+
+# 按市场配置的精度, {(exchange, symbol): {'price': 2 | 'float32', 'amount': 6 | 'float32'}}
+# 为空时全部无损存储 float64
+MARKET_PRECISION = {}
+
+
+def policy_for(
+    data_type: str,
+    exchange: str = None,
+    symbol: str = None,
+    market_precision: dict = None,
+) -> StoragePolicy:
+    """
+    data_type 的存储策略, 并应用该市场在 MARKET_PRECISION 中的精度配置
+    symbol 可以是统一写法或目录名 ('BTC/USDT' 与 'BTC_USDT' 等价)
+    """
+    policy = POLICIES.get(data_type, DEFAULT_POLICY)
+    precision = market_precision if market_precision is not None else MARKET_PRECISION
+    if symbol is not None:
+        name = symbol_path_name(symbol)
+        for (ex, sym), setting in precision.items():
+            if ex == exchange and symbol_path_name(sym) == name:
+                return policy.with_precision(
+                    setting.get("price"), setting.get("amount")
+                )
+    return policy
+
+
+def _timestamp_ms(df: pd.DataFrame) -> np.ndarray:
+    if "timestamp" in df.columns:
+        return df["timestamp"].to_numpy(dtype=np.int64)
+    dt = pd.to_datetime(df["datetime"], utc=True)
+    return dt.to_numpy(dtype="datetime64[ms]").astype(np.int64)
+
+
+def encode(df: pd.DataFrame, policy: StoragePolicy) -> pa.Table:
+    """
+    DataFrame -> 按策略编码的 pa.Table (按时间戳稳定排序, 丢弃派生列)
+    """
+    ts = _timestamp_ms(df)
+    order = np.argsort(ts, kind="stable")
+    arrays, names, scales = [], [], {}
+
+    names.append("timestamp")
+    arrays.append(pa.array(ts[order], type=pa.int64()))
+    for name in df.columns:
+        if name in DERIVED_COLUMNS or name == "timestamp":
+            continue
+        values = df[name].to_numpy()[order]
+        spec = policy.columns.get(name)
+        if spec is None:
+            arrays.append(pa.array(values))
+        elif spec.dtype == "scaled":
+            values = values.astype(np.float64)
+            missing = np.isnan(values)
+            factor = 10.0**spec.precision
+            scaled = np.rint(np.where(missing, 0.0, values) * factor)
+            err = np.abs(scaled / factor - values)[~missing]
+            if len(err) and err.max() > 0:
+                logger.debug(
+                    "%s rounded to %d decimals, max error %g",
+                    name,
+                    spec.precision,
+                    err.max(),
+                )
+            arrays.append(pa.array(scaled.astype(np.int64), mask=missing))
+            scales[name] = spec.precision
+        else:
+            arrays.append(pa.array(values.astype(spec.dtype)))
+        names.append(name)
+
+    meta = {"version": SCHEMA_VERSION, "scales": scales}
+    table = pa.Table.from_arrays(arrays, names=names)
+    return table.replace_schema_metadata(
+        {SCHEMA_METADATA_KEY: json.dumps(meta, sort_keys=True).encode("utf-8")}
+    )
+
+
+def _write_options(table: pa.Table, policy: StoragePolicy) -> dict:
+    dictionary, column_encoding = [], {}
+    for name in table.column_names:
+        spec = policy.columns.get(name)
+        encoding = spec.encoding if spec is not None else None
+        if encoding == "dictionary":
+            dictionary.append(name)
+        elif encoding in ENCODINGS:
+            column_encoding[name] = ENCODINGS[encoding]
+        else:
+            column_encoding[name] = "PLAIN"
+    return dict(
+        use_dictionary=dictionary,
+        column_encoding=column_encoding,
+        compression=policy.compression,
+        compression_level=policy.compression_level,
+        row_group_size=policy.row_group_size,
+        write_statistics=True,
+    )
+
+
+def write_table(table: pa.Table, path: str, policy: StoragePolicy):
+    """
+    写入一个Parquet文件, 本地为临时文件+原子替换, 对象存储为单次PUT,
+    读者都不会看到写了一半的文件
+    """
+    storage_for(path).write_bytes(path, to_bytes(table, policy))
+
+
+def to_bytes(table: pa.Table, policy: StoragePolicy) -> bytes:
+    """编码后的Parquet文件内容, 用于比较/校验是否逐字节一致"""
+    buf = io.BytesIO()
+    pq.write_table(table, buf, **_write_options(table, policy))
+    return buf.getvalue()
+
+
+def file_scales(schema: pa.Schema) -> dict:
+    """文件中定点整数列的小数位数, 旧文件 (没有元数据) 返回空字典"""
+    raw = (schema.metadata or {}).get(SCHEMA_METADATA_KEY)
+    return json.loads(raw)["scales"] if raw else {}
+
+
+def partition_scales(path: str) -> dict:
+    """已写入的分区 (目录) 中定点整数列的小数位数"""
+    storage = storage_for(path)
+    if isinstance(storage, FsspecStorage):
+        for name, size, token in storage.files(path):
+            md = storage.metadata(storage.join(path, name), size, token)
+            return file_scales(md.schema.to_arrow_schema())
+        return {}
+    return file_scales(pq.ParquetDataset(path).schema)
+
+
+def decode(table, scales: dict):
+    """
+    把定点整数列还原为 float64, 支持 pa.Table 与 pa.RecordBatch
+    """
+    for name, precision in scales.items():
+        i = table.schema.get_field_index(name)
+        if i < 0:
+            continue
+        values = pc.divide(table.column(i).cast(pa.float64()), 10.0**precision)
+        table = table.set_column(i, name, values)
+    return table
+
+
+def storage_columns(columns: list, present: list) -> list:
+    """
+    把请求的列映射为文件中实际存在的列: 'datetime' 不在文件中时读取 'timestamp'
+    """
+    if columns is None:
+        return None
+    cols = []
+    for c in columns:
+        if c == "datetime" and c not in present:
+            c = "timestamp"
+        if c in present and c not in cols:
+            cols.append(c)
+    return cols
+
+
+def read_frame(path: str, columns: list = None) -> pd.DataFrame:
+    """
+    读取一个分区 (目录或文件) 并解码为DataFrame, 'datetime' 由 'timestamp' 派生
+    """
+    storage = storage_for(path)
+    if isinstance(storage, FsspecStorage):
+        table = _read_remote(storage, path, columns)
+    else:
+        dataset = pq.ParquetDataset(path)
+        present = dataset.schema.names
+        table = dataset.read(columns=storage_columns(columns, present))
+    table = decode(table, file_scales(table.schema))
+    df = table.to_pandas()
+    if "datetime" not in df.columns and "timestamp" in df.columns:
+        if columns is None or "datetime" in columns:
+            df["datetime"] = pd.to_datetime(df["timestamp"], unit="ms")
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+
+def _read_remote(storage, path: str, columns: list = None) -> pa.Table:
+    """逐个文件只请求所需列的数据, 见 data_processor.storage"""
+    if storage.isdir(path):
+        files = [
+            (storage.join(path, name), size, token)
+            for name, size, token in storage.files(path)
+        ]
+    else:
+        files = [(path, None, None)]
+    tables = []
+    for file_path, size, token in files:
+        md = storage.metadata(file_path, size, token)
+        present = md.schema.to_arrow_schema().names
+        cols = storage_columns(columns, present)
+        pf = storage.open_parquet(file_path, size, token, columns=cols)
+        tables.append(pf.read(columns=cols))
+    return pa.concat_tables(tables, promote_options="default")
@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+"""
+存储后端: 写入/读取/缓存/迁移通过同一套接口访问数据目录
+
+    storage = storage_for("data/")                 # 本地文件系统
+    storage = storage_for("s3://bucket/data")      # 对象存储 (需要 fsspec + s3fs)
+    storage = storage_for("memory://data")         # fsspec 内存文件系统, 用于测试
+
+data_root 写成 URL 即可让 save_to_parquet / load_from_parquet 等直接使用对象存储,
+其余代码只处理路径字符串, 由 storage_for 按协议选择后端.
+
+对象存储读取Parquet时:
+    - 文件尾部元数据 (footer) 按 (路径, 大小, ETag/mtime) 缓存, 重复读取不再请求
+    - 只请求所需列的 column chunk, 相邻区间合并后并发发出多个 Range GET
+    - 配置了本地缓存目录时, 整个文件以并发分段 GET 下载到本地后再读取 (读穿缓存),
+      远端文件变化 (ETag/mtime/大小) 后自动重新下载
+本模块顶层只依赖标准库, fsspec / pyarrow 在使用时才导入.
+"""
+
+import hashlib
+import io
+import os
+import posixpath
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import STORAGE_CACHE_DIR, STORAGE_OPTIONS
+
+# 读取尾部时一次请求的字节数, 通常足以包含整个footer
+FOOTER_READ_BYTES = 64 * 1024
+# 合并间隔小于此值的相邻区间, 减少请求数
+RANGE_COALESCE_BYTES = 1024 * 1024
+# 下载整个文件到本地缓存时每段的大小
+DOWNLOAD_PART_BYTES = 8 * 1024 * 1024
+
+
+def _hidden(name: str) -> bool:
+    """pyarrow数据集忽略的文件: 元数据 (_metadata) 与临时文件 (.xxx)"""
+    return name.startswith(("_", "."))
+
+
+class LocalStorage:
+    """本地文件系统"""
+
+    protocol = "file"
+
+    def join(self, *parts) -> str:
+        return os.path.join(*parts)
+
+    def dirname(self, path: str) -> str:
+        return os.path.dirname(os.path.normpath(path))
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    def isdir(self, path: str) -> bool:
+        return os.path.isdir(path)
+
+    def listdir(self, path: str) -> list:
+        return os.listdir(path)
+
+    def makedirs(self, path: str):
+        os.makedirs(path, exist_ok=True)
+
+    def remove(self, path: str):
+        os.remove(path)
+
+    def read_bytes(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    def write_bytes(self, path: str, data: bytes):
+        """先写到同目录临时文件再原子替换, 读者不会看到写了一半的文件"""
+        directory, name = os.path.split(path)
+        os.makedirs(directory or ".", exist_ok=True)
+        tmp_path = os.path.join(directory, f".{name}.tmp-{os.getpid()}")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def files(self, path: str) -> list:
+        """目录下的数据文件 [(名字, 大小, 版本标记)], 按名字排序, 不含隐藏文件"""
+        with os.scandir(path) as it:
+            entries = [
+                (e.name, e.stat().st_size, e.stat().st_mtime_ns)
+                for e in it
+                if e.is_file() and not _hidden(e.name)
+            ]
+        return sorted(entries)
+
+    def signature(self, path: str) -> tuple:
+        """目录下文件的 (名字, 大小, 版本标记), 不读取文件内容"""
+        return tuple(self.files(path))
+
+    def metadata(self, path: str, size: int = None, token=None):
+        import pyarrow.parquet as pq
+
+        return pq.read_metadata(path)
+
+    def open_parquet(self, path: str, size: int = None, token=None, columns=None):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path)
+
+    def arrow_filesystem(self):
+        """pyarrow.fs 文件系统, 供 pyarrow.dataset 扫描"""
+        import pyarrow.fs
+
+        return pyarrow.fs.LocalFileSystem()
+
+    def arrow_path(self, path: str) -> str:
+        return os.path.abspath(path)
+
+
+class _KnownRanges(io.RawIOBase):
+    """
+    只包含已下载区间的只读文件对象, 读到未下载的区间时再单独请求
+    """
+
+    def __init__(self, size: int, parts: dict, fetch):
+        self.size = size
+        self.parts = sorted(parts.items())  # [((start, end), bytes)]
+        self.fetch = fetch
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.pos = offset
+        elif whence == io.SEEK_CUR:
+            self.pos += offset
+        else:
+            self.pos = self.size + offset
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def read(self, n=-1):
+        start = self.pos
+        end = self.size if n is None or n < 0 else min(self.size, start + n)
+        if start >= end:
+            return b""
+        for (lo, hi), data in self.parts:
+            if lo <= start and end <= hi:
+                self.pos = end
+                return data[start - lo : end - lo]
+        data = self.fetch(start, end)
+        self.parts.append(((start, end), data))
+        self.pos = end
+        return data
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+
+class FsspecStorage(LocalStorage):
+    """
+    fsspec 文件系统 (s3 / gcs / memory / ...)
+
+    :param fs: fsspec.AbstractFileSystem
+    :param cache_dir: 本地读穿缓存目录, None 表示只做按列的区间读取
+    :param max_workers: 并发请求数 (同步文件系统用线程池, 异步文件系统用 cat_ranges)
+    :param footer_cache_size: 缓存的footer个数
+    """
+
+    def __init__(
+        self,
+        fs,
+        cache_dir: str = None,
+        max_workers: int = 16,
+        footer_cache_size: int = 4096,
+    ):
+        self.fs = fs
+        self.protocol = fs.protocol if isinstance(fs.protocol, str) else fs.protocol[0]
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.footer_cache_size = footer_cache_size
+        self._footers = OrderedDict()  # (path, size, token) -> FileMetaData
+        self._lock = threading.Lock()
+        self._pool = None
+        self.stats = {"requests": 0, "bytes": 0, "footer_hits": 0, "disk_hits": 0}
+
+    def join(self, *parts) -> str:
+        return posixpath.join(*parts)
+
+    def dirname(self, path: str) -> str:
+        return posixpath.dirname(path.rstrip("/"))
+
+    def exists(self, path: str) -> bool:
+        return self.fs.exists(path)
+
+    def isdir(self, path: str) -> bool:
+        return self.fs.isdir(path)
+
+    def listdir(self, path: str) -> list:
+        return [
+            posixpath.basename(p.rstrip("/")) for p in self.fs.ls(path, detail=False)
+        ]
+
+    def makedirs(self, path: str):
+        # 对象存储没有目录, 写入对象时自动出现
+        self.fs.makedirs(path, exist_ok=True)
+
+    def remove(self, path: str):
+        self.fs.rm_file(path)
+
+    def read_bytes(self, path: str) -> bytes:
+        return self.fs.cat_file(path)
+
+    def write_bytes(self, path: str, data: bytes):
+        # 单个对象的 PUT 是原子的
+        self.fs.pipe_file(path, data)
+
+    def arrow_filesystem(self):
+        import pyarrow.fs
+
+        return pyarrow.fs.PyFileSystem(pyarrow.fs.FSSpecHandler(self.fs))
+
+    def arrow_path(self, path: str) -> str:
+        return self.fs._strip_protocol(path)
+
+    @staticmethod
+    def _token(info: dict):
+        for key in (
+            "ETag",
+            "etag",
+            "mtime",
+            "LastModified",
+            "last_modified",
+            "created",
+        ):
+            if info.get(key) is not None:
+                return str(info[key])
+        return None
+
+    def files(self, path: str) -> list:
+        entries = []
+        for info in self.fs.ls(path, detail=True):
+            name = posixpath.basename(info["name"].rstrip("/"))
+            if info.get("type") == "file" and not _hidden(name):
+                entries.append((name, info["size"], self._token(info)))
+        return sorted(entries)
+
+    # ------------------------------------------------------------------
+    # 并发区间读取
+    # ------------------------------------------------------------------
+    def _count(self, ranges):
+        with self._lock:
+            self.stats["requests"] += len(ranges)
+            self.stats["bytes"] += sum(end - start for start, end in ranges)
+
+    def fetch_ranges(self, path: str, ranges: list) -> dict:
+        """
+        并发请求多个 [start, end) 区间, 返回 {(start, end): bytes}
+        """
+        self._count(ranges)
+        if getattr(self.fs, "async_impl", False):
+            starts = [s for s, _ in ranges]
+            ends = [e for _, e in ranges]
+            blobs = self.fs.cat_ranges([path] * len(ranges), starts, ends)
+        elif len(ranges) == 1:
+            blobs = [self.fs.cat_file(path, *ranges[0])]
+        else:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.max_workers)
+            blobs = list(
+                self._pool.map(lambda r: self.fs.cat_file(path, r[0], r[1]), ranges)
+            )
+        return dict(zip(ranges, blobs))
+
+    @staticmethod
+    def coalesce(ranges: list, gap: int = RANGE_COALESCE_BYTES) -> list:
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start - merged[-1][1] <= gap:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return [tuple(r) for r in merged]
+
+    def _info(self, path: str, size: int, token) -> tuple:
+        if size is None:
+            info = self.fs.info(path)
+            size, token = info["size"], self._token(info)
+        return size, token
+
+    def _footer(self, path: str, size: int, token) -> tuple:
+        """返回 (FileMetaData, 已下载的尾部区间)"""
+        import pyarrow.parquet as pq
+
+        key = (path, size, token)
+        with self._lock:
+            md = self._footers.get(key)
+            if md is not None:
+                self._footers.move_to_end(key)
+                self.stats["footer_hits"] += 1
+                return md, {}
+
+        start = max(0, size - FOOTER_READ_BYTES)
+        parts = self.fetch_ranges(path, [(start, size)])
+        tail = parts[(start, size)]
+        footer_len = int.from_bytes(tail[-8:-4], "little")
+        if footer_len + 8 > len(tail):
+            start = size - footer_len - 8
+            parts.update(self.fetch_ranges(path, [(start, size)]))
+        f = _KnownRanges(size, parts, lambda s, e: self._fetch_one(path, s, e))
+        md = pq.read_metadata(f)
+        with self._lock:
+            self._footers[key] = md
+            while len(self._footers) > self.footer_cache_size:
+                self._footers.popitem(last=False)
+        return md, parts
+
+    def metadata(self, path: str, size: int = None, token=None):
+        """文件的Parquet元数据 (footer), 按 (路径, 大小, 版本标记) 缓存"""
+        import pyarrow.parquet as pq
+
+        size, token = self._info(path, size, token)
+        if self.cache_dir:
+            return pq.read_metadata(self._cached_copy(path, size, token))
+        return self._footer(path, size, token)[0]
+
+    def _fetch_one(self, path, start, end) -> bytes:
+        return self.fetch_ranges(path, [(start, end)])[(start, end)]
+
+    def _cached_copy(self, path: str, size: int, token) -> str:
+        """本地缓存中的完整副本, 没有时以并发分段GET下载"""
+        digest = hashlib.sha1(f"{path}|{size}|{token}".encode("utf-8")).hexdigest()
+        local = os.path.join(self.cache_dir, digest[:2], digest + ".parquet")
+        if os.path.exists(local):
+            with self._lock:
+                self.stats["disk_hits"] += 1
+            return local
+        ranges = [
+            (start, min(size, start + DOWNLOAD_PART_BYTES))
+            for start in range(0, size, DOWNLOAD_PART_BYTES)
+        ] or [(0, 0)]
+        parts = self.fetch_ranges(path, ranges)
+        LocalStorage().write_bytes(local, b"".join(parts[r] for r in ranges))
+        return local
+
+    def open_parquet(
+        self, path: str, size: int = None, token=None, columns: list = None
+    ):
+        """
+        打开远端Parquet文件
+        :param size / token: 已知的大小与版本标记 (来自目录列表), 省去一次HEAD请求
+        :param columns: 只预取这些列的 column chunk, None为全部
+        """
+        import pyarrow.parquet as pq
+
+        size, token = self._info(path, size, token)
+        if self.cache_dir:
+            return pq.ParquetFile(self._cached_copy(path, size, token))
+
+        md, parts = self._footer(path, size, token)
+        wanted = None if columns is None else set(columns)
+        ranges = []
+        for i in range(md.num_row_groups):
+            rg = md.row_group(i)
+            for j in range(rg.num_columns):
+                col = rg.column(j)
+                if (
+                    wanted is not None
+                    and col.path_in_schema.split(".")[0] not in wanted
+                ):
+                    continue
+                start = col.data_page_offset
+                if col.has_dictionary_page and col.dictionary_page_offset:
+                    start = min(start, col.dictionary_page_offset)
+                ranges.append((start, start + col.total_compressed_size))
+        # 小文件的尾部请求通常已包含全部数据
+        ranges = [
+            (start, end)
+            for start, end in self.coalesce(ranges)
+            if not any(lo <= start and end <= hi for lo, hi in parts)
+        ]
+        if ranges:
+            parts.update(self.fetch_ranges(path, ranges))
+        f = _KnownRanges(size, parts, lambda s, e: self._fetch_one(path, s, e))
+        return pq.ParquetFile(f, metadata=md)
+
+
+_LOCAL = LocalStorage()
+_BACKENDS = {}
+
+
+def storage_for(path: str):
+    """
+    按路径的协议选择存储后端; 无协议或 file:// 为本地文件系统
+    其余协议的参数取自 config.STORAGE_OPTIONS[协议]
+    """
+    protocol, _, rest = str(path).partition("://")
+    if not rest or protocol in ("file", "local"):
+        return _LOCAL
+    backend = _BACKENDS.get(protocol)
+    if backend is None:
+        import fsspec
+
+        fs = fsspec.filesystem(protocol, **STORAGE_OPTIONS.get(protocol, {}))
+        backend = _BACKENDS[protocol] = FsspecStorage(fs, cache_dir=STORAGE_CACHE_DIR)
+    return backend
+
+
+def register_storage(protocol: str, backend):
+    """替换某个协议的后端, e.g., 换用带本地缓存目录的 FsspecStorage"""
+    _BACKENDS[protocol] = backend
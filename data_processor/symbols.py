@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+交易对命名的统一
+
+同一个标的在不同交易所/市场类型下的写法不同:
+    binance (spot)       BTC/USDT        原始id BTCUSDT
+    binanceusdm (perp)   BTC/USDT:USDT   原始id BTCUSDT
+    okx (swap)           BTC/USDT:USDT   原始id BTC-USDT-SWAP
+
+Instrument 是规范化后的标的, SymbolRegistry 负责 (交易所, 交易所写法/原始id)
+与 Instrument 之间的双向映射. 本模块只依赖标准库, 可以在命令行入口中直接导入.
+"""
+
+from dataclasses import dataclass
+
+from config import EXCHANGE_CONFIGS_WITHOUT_API_KEYS
+
+# ccxt options.defaultType -> 该交易所默认的市场类型
+DEFAULT_TYPE_KINDS = {"spot": "spot", "future": "swap", "swap": "swap"}
+
+
+@dataclass(frozen=True)
+class Instrument:
+    """
+    规范化的标的 (ccxt统一写法 BASE/QUOTE[:SETTLE[-EXPIRY]])
+    """
+
+    base: str
+    quote: str
+    settle: str = None
+    expiry: str = None
+
+    @property
+    def kind(self) -> str:
+        if self.settle is None:
+            return "spot"
+        return "future" if self.expiry else "swap"
+
+    @property
+    def pair(self) -> str:
+        """不区分市场类型的交易对, 跨市场合并时的分组键"""
+        return f"{self.base}/{self.quote}"
+
+    @property
+    def symbol(self) -> str:
+        """ccxt统一写法"""
+        if self.settle is None:
+            return self.pair
+        suffix = f"-{self.expiry}" if self.expiry else ""
+        return f"{self.pair}:{self.settle}{suffix}"
+
+    def as_kind(self, kind: str) -> "Instrument":
+        """同一交易对的另一种市场类型 (永续/交割默认以计价币结算)"""
+        if kind == "spot":
+            return Instrument(self.base, self.quote)
+        return Instrument(self.base, self.quote, self.settle or self.quote, self.expiry)
+
+
+def parse_symbol(symbol: str) -> Instrument:
+    """
+    解析ccxt统一写法, e.g., 'BTC/USDT', 'BTC/USDT:USDT', 'BTC/USD:BTC-251226'
+    """
+    pair, _, contract = symbol.partition(":")
+    base, sep, quote = pair.partition("/")
+    if not sep or not base or not quote:
+        raise ValueError(f"Not a unified symbol: {symbol!r}")
+    if not contract:
+        return Instrument(base, quote)
+    settle, _, expiry = contract.partition("-")
+    return Instrument(base, quote, settle, expiry or None)
+
+
+def symbol_path_name(symbol: str) -> str:
+    """
+    交易对在存储目录中的名字: 'BTC/USDT' -> 'BTC_USDT', 'BTC/USDT:USDT' -> 'BTC_USDT_USDT'
+    """
+    return symbol.replace("/", "_").replace(":", "_")
+
+
+def path_name_symbol(name: str) -> str:
+    """
+    symbol_path_name 的逆变换: 'BTC_USDT' -> 'BTC/USDT', 'BTC_USDT_USDT' -> 'BTC/USDT:USDT'
+    (假设币种代码中没有'_')
+    """
+    if "/" in name:
+        return name
+    base, _, rest = name.partition("_")
+    quote, _, contract = rest.partition("_")
+    return f"{base}/{quote}:{contract}" if contract else f"{base}/{quote}"
+
+
+class SymbolRegistry:
+    """
+    (交易所, 交易所写法或原始id) <-> Instrument 的映射
+
+    未登记的写法按ccxt统一写法解析; 只有交易对 (如 'BTC/USDT') 时按
+    该交易所的默认市场类型补全, 因此同一份 WS_SYMBOLS 可以订阅所有交易所.
+    load_markets 可以直接导入 ccxt 的 exchange.markets 以识别原始id.
+    """
+
+    def __init__(self, default_kinds: dict = None):
+        if default_kinds is None:
+            default_kinds = {
+                exchange: DEFAULT_TYPE_KINDS.get(
+                    cfg.get("options", {}).get("defaultType", "spot"), "spot"
+                )
+                for exchange, cfg in EXCHANGE_CONFIGS_WITHOUT_API_KEYS.items()
+            }
+        self.default_kinds = dict(default_kinds)
+        self._instruments = {}  # (exchange, 写法或id) -> Instrument
+        self._venue_symbols = {}  # (exchange, Instrument) -> 交易所写法
+
+    def register(
+        self,
+        exchange: str,
+        venue_symbol: str,
+        instrument: Instrument = None,
+        market_id: str = None,
+    ):
+        instrument = instrument or parse_symbol(venue_symbol)
+        self._instruments[(exchange, venue_symbol)] = instrument
+        if market_id:
+            self._instruments[(exchange, market_id)] = instrument
+        self._venue_symbols[(exchange, instrument)] = venue_symbol
+
+    def load_markets(self, exchange: str, markets: dict):
+        """
+        登记 ccxt exchange.markets 中的全部市场
+        """
+        for symbol, market in markets.items():
+            settle = market.get("settle") if not market.get("spot") else None
+            expiry = symbol.partition(":")[2].partition("-")[2] or None
+            instrument = Instrument(market["base"], market["quote"], settle, expiry)
+            self.register(exchange, symbol, instrument, market_id=market.get("id"))
+
+    def instrument(self, exchange: str, symbol: str) -> Instrument:
+        """
+        交易所写法/原始id -> Instrument
+        """
+        found = self._instruments.get((exchange, symbol))
+        if found is not None:
+            return found
+        instrument = parse_symbol(symbol)
+        if ":" not in symbol:
+            instrument = instrument.as_kind(self.default_kinds.get(exchange, "spot"))
+        return instrument
+
+    def venue_symbol(self, exchange: str, symbol) -> str:
+        """
+        交易对/统一写法/Instrument -> 该交易所订阅时使用的写法
+        """
+        instrument = (
+            symbol
+            if isinstance(symbol, Instrument)
+            else self.instrument(exchange, symbol)
+        )
+        return self._venue_symbols.get((exchange, instrument), instrument.symbol)
+
+    def venues(self, pair: str, exchanges) -> dict:
+        """
+        同一交易对在多个交易所的写法, {exchange: venue_symbol}
+        """
+        return {exchange: self.venue_symbol(exchange, pair) for exchange in exchanges}
+
+
+REGISTRY = SymbolRegistry()
@@ -1,65 +1,159 @@
 # -*- coding: utf-8 -*-
 import pandas as pd
-import os
+import logging
 from config import DATA_ROOT_PATH
+from data_processor.cache import PARTITION_CACHE
+from data_processor.partitioning import dataset_scheme
+from data_processor.schema import (
+    StoragePolicy,
+    _timestamp_ms,
+    encode,
+    policy_for,
+    read_frame,
+    write_table,
+)
+from data_processor.storage import storage_for
+from data_processor.symbols import symbol_path_name
+from utils import instrumentation
+
+logger = logging.getLogger(__name__)
+
+PARTITION_FILE = "part.0.parquet"
 
 
 def save_to_parquet(
-    df: pd.DataFrame, data_type: str, exchange: str, symbol: str, timeframe: str = "1m"
+    df: pd.DataFrame,
+    data_type: str,
+    exchange: str,
+    symbol: str,
+    timeframe: str = "1m",
+    data_root: str = DATA_ROOT_PATH,
+    partitioning: str = None,
+    policy: StoragePolicy = None,
 ):
     """
     将DataFrame按分区格式存储为Parquet文件
-    分区: exchange/symbol/date
+    分区: exchange/symbol/date, 每个分区写为一个文件; 分区中已有的行与新行合并,
+    同一行 (有 'id' 列时按 id, 否则按 timestamp) 以新行为准
+    分区粒度 (小时/日/月/年) 由 data_processor.partitioning 按周期和数据量选择,
+    并记录在数据集目录的 _partitioning.json 中
+    列类型与编码由 data_processor.schema 中该 data_type 的存储策略决定
     :param df: 数据
     :param data_type: 数据类型, e.g., 'ohlcv', 'funding_rate'
     :param exchange: 交易所
     :param symbol: 交易对 (文件名会把'/'替换成'_')
+    :param timeframe: 时间周期, 'tick' 表示逐笔数据
+    :param data_root: 存储根目录, 默认 config.DATA_ROOT_PATH
+    :param partitioning: 'hourly' / 'daily' / 'monthly' / 'yearly', 默认自动选择;
+        已有数据集必须与记录的方案一致
+    :param policy: 存储策略, 默认为 policy_for(data_type, exchange, symbol)
+    :return: 是否写入了数据 (出错时记录日志并返回False)
     """
     if df.empty:
-        print("Dataframe is empty, skipping save.")
-        return
-
-    # 从datetime列创建date分区
-    if "datetime" in df.columns:
-        if timeframe.endswith("m") or timeframe.endswith("s"):
-            df["date"] = df["datetime"].dt.strftime("%Y-%m-%d")
-        else:
-            df["date"] = df["datetime"].dt.strftime("%Y")
-    else:
-        print("Warning: 'datetime' column not found. Cannot create date partition.")
-        return
+        logger.info("Dataframe is empty, skipping save.")
+        return False
 
-    symbol_path_name = symbol.replace("/", "_")
+    # 从timestamp列创建date分区 (没有timestamp时使用datetime)
+    if "timestamp" in df.columns:
+        dt = pd.to_datetime(df["timestamp"], unit="ms")
+    elif "datetime" in df.columns:
+        dt = pd.to_datetime(df["datetime"])
+    else:
+        logger.warning("'datetime' column not found. Cannot create date partition.")
+        return False
 
-    base_path = os.path.join(
-        DATA_ROOT_PATH,
+    storage = storage_for(data_root)
+    base_path = storage.join(
+        data_root,
         data_type,
         f"{exchange}",
         f"{timeframe}",
-        f"{symbol_path_name}",
+        symbol_path_name(symbol),
     )
-    os.makedirs(base_path, exist_ok=True)
-    # 使用 a dataset API with partitioning
+    daily_rows = None
+    if timeframe == "tick":
+        # 逐笔数据按本批数据的密度估计每天行数 (跨度至少按1小时计)
+        span_days = max((dt.max() - dt.min()).total_seconds() / 86400, 1 / 24)
+        daily_rows = len(df) / span_days
+    scheme = dataset_scheme(base_path, timeframe, partitioning, daily_rows)
+    df["date"] = scheme.format_series(dt)
+
+    if policy is None:
+        policy = policy_for(data_type, exchange, symbol)
 
     try:
-        df.to_parquet(
-            base_path,
-            engine="fastparquet",
-            partition_cols=["date"],
-            append=False,  # 增量写入
-            # write_index=False,
-        )
-        print(f"Successfully saved {len(df)} rows to {base_path}")
+        for date, part in df.groupby("date", sort=True):
+            path = storage.join(base_path, f"date={date}")
+            if storage.isdir(path):
+                # 月/年分区通常只覆盖本批数据的一部分, 不能整体替换
+                part = merge_partition(part, path)
+            write_partition(part, path, policy)
+        logger.info(f"Successfully saved {len(df)} rows to {base_path}")
     except Exception as e:
-        print(f"Failed to save data to Parquet: {e}")
+        logger.error(f"Failed to save data to Parquet: {e}")
+        return False
+    finally:
+        # 分区已被改写, 缓存中的旧数据失效
+        PARTITION_CACHE.bump_version(base_path)
+
+    if instrumentation.enabled():
+        labels = dict(data_type=data_type, exchange=exchange)
+        instrumentation.counter(
+            "rows_written_total", "Rows written to Parquet", **labels
+        ).inc(len(df))
+        instrumentation.counter(
+            "bytes_written_total", "Parquet bytes written", **labels
+        ).inc(_partition_bytes(base_path, df["date"].unique()))
+    return True
+
+
+def write_partition(df: pd.DataFrame, path: str, policy: StoragePolicy):
+    """
+    把一个分区的数据按存储策略写为 path/part.0.parquet, 并删除该分区中的其他数据文件
+    """
+    storage = storage_for(path)
+    storage.makedirs(path)
+    write_table(encode(df, policy), storage.join(path, PARTITION_FILE), policy)
+    for name in storage.listdir(path):
+        if name.endswith(".parquet") and name != PARTITION_FILE:
+            storage.remove(storage.join(path, name))
+
+
+def merge_partition(df: pd.DataFrame, path: str) -> pd.DataFrame:
+    """
+    把新行与分区 path 中已有的行合并, 只保留新行中的列
+    同一行 (有 'id' 列时按 id, 否则按 timestamp) 以新行为准
+    """
+    if "timestamp" not in df.columns:
+        df = df.assign(timestamp=_timestamp_ms(df))
+    old = read_frame(path)
+    key = "id" if "id" in df.columns and "id" in old.columns else "timestamp"
+    old = old[~old[key].isin(df[key])]
+    if old.empty:
+        return df
+    old = old[[c for c in df.columns if c in old.columns]]
+    return pd.concat([old, df], ignore_index=True)
 
 
 def register_metadata(schema, frequency, missing_info):
     """
     登记元数据 (此处为示例，实际可写入数据库或文件中)
     """
-    print("\n--- Metadata Registration ---")
-    print(f"Schema: {schema}")
-    print(f"Sampling Frequency: {frequency}")
-    print(f"Missing Value Handling: {missing_info}")
-    print("----------------------------\n")
+    logger.info(
+        "Metadata registration | schema=%s | frequency=%s | missing=%s",
+        schema,
+        frequency,
+        missing_info,
+    )
+
+
+def _partition_bytes(base_path: str, dates) -> int:
+    """
+    统计本次写入的分区文件大小
+    """
+    storage = storage_for(base_path)
+    total = 0
+    for d in dates:
+        p = storage.join(base_path, f"date={d}")
+        total += sum(size for _, size, _ in storage.files(p))
+    return total
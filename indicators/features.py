@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+逐根K线增量计算的特征, 供 data_processor.feature_store 为全部交易对生成特征表
+
+    features = default_features()
+    for bar in bars.itertuples(index=False):
+        row = [v for f in features for v in f.update(bar)]
+
+每个特征对象保存自己的状态 (可以pickle), 增量运行时恢复状态后只处理新K线,
+结果与从头计算一致. 列名包含参数, 参数变化即视为另一组特征.
+趋势类特征使用 indicators.streaming, 与 strategy/trendance 中 backtrader 指标一致.
+bar 需要 close (Stochastic 另需 high/low), Funding 需要 fundingRate,
+Basis 需要 spot_close (由特征库按时间对齐后提供).
+"""
+
+import math
+from collections import deque
+
+from indicators.streaming import MACD, RSI, SMA, BollingerBands, Stochastic
+
+NAN = float("nan")
+
+
+class Feature:
+    """特征的基类: columns 为输出列名, inputs 为 bar 中需要的字段"""
+
+    columns = ()
+    inputs = ("close",)
+
+    def update(self, bar) -> tuple:
+        raise NotImplementedError
+
+
+class Returns(Feature):
+    """horizon 根K线的对数收益"""
+
+    def __init__(self, horizon: int = 1):
+        self.closes = deque(maxlen=horizon + 1)
+        self.columns = (f"ret_{horizon}",)
+
+    def update(self, bar) -> tuple:
+        closes = self.closes
+        closes.append(bar.close)
+        if len(closes) < closes.maxlen or closes[0] <= 0:
+            return (NAN,)
+        return (math.log(bar.close / closes[0]),)
+
+
+class RealizedVol(Feature):
+    """最近 window 根K线对数收益的平方和开方 (未年化)"""
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self.prev = None
+        self.meansq = SMA(window)
+        self.columns = (f"rvol_{window}",)
+
+    def update(self, bar) -> tuple:
+        prev, self.prev = self.prev, bar.close
+        if prev is None or prev <= 0:
+            return (NAN,)
+        meansq = self.meansq.update(math.log(bar.close / prev) ** 2)
+        return (math.sqrt(meansq * self.window),)
+
+
+class SmaGap(Feature):
+    """收盘价相对均线的偏离, 对应 SmaCross/GoldenCross 策略"""
+
+    def __init__(self, period: int = 20):
+        self.sma = SMA(period)
+        self.columns = (f"sma_gap_{period}",)
+
+    def update(self, bar) -> tuple:
+        sma = self.sma.update(bar.close)
+        return (bar.close / sma - 1.0 if sma else NAN,)
+
+
+class MacdFeature(Feature):
+    """MACD 线, 信号线与柱, 对应 MACD 策略"""
+
+    def __init__(self, period_me1: int = 12, period_me2: int = 26, period_signal=9):
+        self.macd = MACD(period_me1, period_me2, period_signal)
+        suffix = f"{period_me1}_{period_me2}_{period_signal}"
+        self.columns = (
+            f"macd_{suffix}",
+            f"macd_signal_{suffix}",
+            f"macd_hist_{suffix}",
+        )
+
+    def update(self, bar) -> tuple:
+        return self.macd.update(bar.close)
+
+
+class RsiFeature(Feature):
+    def __init__(self, period: int = 14):
+        # 特征计算不应因为连续上涨 (下跌均值为0) 而中断
+        self.rsi = RSI(period, safediv=True)
+        self.columns = (f"rsi_{period}",)
+
+    def update(self, bar) -> tuple:
+        return (self.rsi.update(bar.close),)
+
+
+class BollingerFeature(Feature):
+    """布林带中的位置 %B, 对应 BollingerBands 策略"""
+
+    def __init__(self, period: int = 20, devfactor: float = 2.0):
+        self.bands = BollingerBands(period, devfactor)
+        self.columns = (f"bb_pctb_{period}",)
+
+    def update(self, bar) -> tuple:
+        mid, top, bot = self.bands.update(bar.close)
+        width = top - bot
+        return ((bar.close - bot) / width if width else NAN,)
+
+
+class StochasticFeature(Feature):
+    """慢速随机指标 %K / %D, 对应 Stochastic 策略"""
+
+    inputs = ("high", "low", "close")
+
+    def __init__(self, period: int = 14, period_dfast: int = 3, period_dslow: int = 3):
+        self.stoch = Stochastic(period, period_dfast, period_dslow, safediv=True)
+        self.columns = (f"stoch_k_{period}", f"stoch_d_{period}")
+
+    def update(self, bar) -> tuple:
+        return self.stoch.update(bar.high, bar.low, bar.close)
+
+
+class Funding(Feature):
+    """最近一次资金费率及其年化值 (同 metrics.calculate_annualized_funding_rate)"""
+
+    inputs = ("fundingRate",)
+
+    def __init__(self, periods_per_day: int = 3):
+        self.periods_per_day = periods_per_day
+        self.columns = ("funding_rate", "funding_annualized")
+
+    def update(self, bar) -> tuple:
+        rate = bar.fundingRate
+        if rate != rate:
+            return (NAN, NAN)
+        return (rate, (1 + rate) ** (self.periods_per_day * 365) - 1)
+
+
+class Basis(Feature):
+    """合约相对现货的基差 (同 metrics.calculate_basis) 与基差率"""
+
+    inputs = ("close", "spot_close")
+    columns = ("basis", "basis_pct")
+
+    def update(self, bar) -> tuple:
+        spot = bar.spot_close
+        if not spot == spot or not spot:
+            return (NAN, NAN)
+        basis = bar.close - spot
+        return (basis, basis / spot)
+
+
+def default_features() -> list:
+    """默认特征集, 每次调用返回新的 (无状态的) 特征对象"""
+    return [
+        Returns(1),
+        Returns(5),
+        Returns(60),
+        RealizedVol(60),
+        SmaGap(20),
+        MacdFeature(),
+        RsiFeature(14),
+        BollingerFeature(20),
+        StochasticFeature(14),
+        Funding(),
+        Basis(),
+    ]
+
+
+def feature_columns(features: list) -> list:
+    return [c for f in features for c in f.columns]
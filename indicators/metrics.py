@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
+import logging
+import random
 import pandas as pd
 
+logger = logging.getLogger(__name__)
+
 
 def calculate_annualized_funding_rate(
     df: pd.DataFrame, periods_per_day: int
@@ -25,10 +29,49 @@ def slippage_model(order_size: float, orderbook_df: pd.DataFrame) -> float:
     """
     # 这是一个非常简化的模型，实际模型会复杂得多
     # 这里仅为演示功能占位
-    print(f"Calculating slippage for order size {order_size}...")
+    logger.debug(f"Calculating slippage for order size {order_size}...")
     return 0.0005 * order_size  # 假设一个线性滑点
 
 
+# 各交易所默认费率 (maker, taker), 实际费率取决于账户VIP等级
+FEE_RATES = {
+    "binance": (0.001, 0.001),
+    "binanceusdm": (0.0002, 0.0005),
+    "okx": (0.0002, 0.0005),
+}
+DEFAULT_FEE_RATE = (0.001, 0.001)
+
+
+def trading_fee(
+    notional: float, exchange: str = None, taker: bool = True, rates: dict = None
+) -> float:
+    """
+    手续费模型
+    :param notional: 成交额 (价格 * 数量)
+    :param exchange: 交易所ID, 未登记的交易所使用 DEFAULT_FEE_RATE
+    :param taker: 主动成交 (taker) 还是挂单成交 (maker)
+    :param rates: 覆盖 FEE_RATES, {exchange: (maker, taker)}
+    :return: 手续费 (计价币)
+    """
+    maker_rate, taker_rate = (rates or FEE_RATES).get(exchange, DEFAULT_FEE_RATE)
+    return abs(notional) * (taker_rate if taker else maker_rate)
+
+
+def order_latency(
+    base: float = 0.05, jitter: float = 0.0, rng: random.Random = None
+) -> float:
+    """
+    下单延迟模型: 从发出订单到交易所撮合的时间
+    :param base: 固定延迟 (秒), 网络往返 + 撮合排队
+    :param jitter: 随机抖动的均值 (秒), 服从指数分布 (长尾)
+    :param rng: 随机数生成器, 传入带种子的 random.Random 以保证可复现
+    :return: 延迟 (秒)
+    """
+    if jitter <= 0:
+        return base
+    return base + (rng or random).expovariate(1.0 / jitter)
+
+
 def calculate_basis(spot_price: pd.Series, future_price: pd.Series) -> pd.Series:
     """
     计算基差 (期货价格 - 现货价格)
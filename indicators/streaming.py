@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+增量 (流式) 技术指标, 每次 update O(1), 结果与 backtrader 同名指标逐位一致
+
+    sma = SMA(15)
+    for bar in bars:
+        value = sma.update(bar.close)   # 预热期内返回 nan, 与 backtrader 的 line 一致
+
+与 backtrader 一致的关键点:
+    - SMA 用 math.fsum 求窗口和; 这里用 Shewchuk 精确部分和维护窗口和,
+      每次更新只处理少量部分和, 取值时 fsum 得到同一个正确舍入结果
+    - EMA/SMMA 用前 period 个值的 SMA 作种子, 之后 prev * (1 - alpha) + x * alpha
+    - RSI 默认 Wilder 平滑 (SMMA), safediv 行为同 backtrader
+    - StdDev 为总体标准差 sqrt(|SMA(x^2) - SMA(x)^2|)
+    - Highest/Lowest 用单调队列, 均摊 O(1)
+"""
+
+import math
+import operator
+from collections import deque
+
+NAN = float("nan")
+
+
+class _ExactSum:
+    """
+    可加可减的精确浮点求和 (与 math.fsum 相同的部分和算法)
+    """
+
+    __slots__ = ("partials",)
+
+    def __init__(self):
+        self.partials = []
+
+    def add(self, x: float):
+        partials = self.partials
+        i = 0
+        for y in partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo:
+                partials[i] = lo
+                i += 1
+            x = hi
+        partials[i:] = [x]
+
+    def value(self) -> float:
+        return math.fsum(self.partials)
+
+
+class SMA:
+    """简单移动平均, 对应 bt.indicators.SimpleMovingAverage"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque()
+        self.sum = _ExactSum()
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        window = self.window
+        window.append(x)
+        self.sum.add(x)
+        if len(window) > self.period:
+            self.sum.add(-window.popleft())
+        if len(window) == self.period:
+            self.value = self.sum.value() / self.period
+        return self.value
+
+
+class EMA:
+    """
+    指数平滑, 对应 bt.indicators.ExponentialMovingAverage
+    alpha 为None时取 2 / (1 + period)
+    """
+
+    def __init__(self, period: int, alpha: float = None):
+        self.period = period
+        self.alpha = 2.0 / (1.0 + period) if alpha is None else alpha
+        self.alpha1 = 1.0 - self.alpha
+        self._seed = SMA(period)
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        if self._seed is not None:
+            self.value = self._seed.update(x)
+            if self.value == self.value:  # 种子就绪
+                self._seed = None
+        else:
+            self.value = self.value * self.alpha1 + x * self.alpha
+        return self.value
+
+
+class SMMA(EMA):
+    """Wilder 平滑, 对应 bt.indicators.SmoothedMovingAverage"""
+
+    def __init__(self, period: int):
+        super().__init__(period, alpha=1.0 / period)
+
+
+MOVAV = {"sma": SMA, "ema": EMA, "smma": SMMA}
+
+
+class MACD:
+    """
+    对应 bt.indicators.MACD, update 返回 (macd, signal, histo)
+    """
+
+    def __init__(
+        self,
+        period_me1: int = 12,
+        period_me2: int = 26,
+        period_signal: int = 9,
+    ):
+        self.me1 = EMA(period_me1)
+        self.me2 = EMA(period_me2)
+        self.signal_ema = EMA(period_signal)
+        self.macd = self.signal = self.histo = NAN
+
+    def update(self, x: float) -> tuple:
+        macd = self.me1.update(x) - self.me2.update(x)
+        if macd == macd:
+            self.macd = macd
+            self.signal = self.signal_ema.update(macd)
+            self.histo = macd - self.signal
+        return self.macd, self.signal, self.histo
+
+
+class RSI:
+    """
+    对应 bt.indicators.RSI (movav='smma') 与 RSI_SMA (movav='sma')
+    safediv=False 时 0 下跌均值会像 backtrader 一样抛出 ZeroDivisionError
+    """
+
+    def __init__(
+        self,
+        period: int = 14,
+        movav: str = "smma",
+        safediv: bool = False,
+        safehigh: float = 100.0,
+        safelow: float = 50.0,
+        lookback: int = 1,
+    ):
+        self.maup = MOVAV[movav](period)
+        self.madown = MOVAV[movav](period)
+        self.safediv = safediv
+        self.highrs = self._rscalc(safehigh)
+        self.lowrs = self._rscalc(safelow)
+        self.prices = deque(maxlen=lookback + 1)
+        self.value = NAN
+
+    @staticmethod
+    def _rscalc(rsi: float) -> float:
+        try:
+            return (-100.0 / (rsi - 100.0)) - 1.0
+        except ZeroDivisionError:
+            return float("inf")
+
+    def update(self, x: float) -> float:
+        prices = self.prices
+        prices.append(x)
+        if len(prices) < prices.maxlen:
+            return self.value
+        prev = prices[0]
+        maup = self.maup.update(max(x - prev, 0.0))
+        madown = self.madown.update(max(prev - x, 0.0))
+        if maup != maup:
+            return self.value
+        if not self.safediv:
+            rs = maup / madown
+        elif madown == 0.0:
+            rs = self.lowrs if maup == 0.0 else self.highrs
+        else:
+            rs = maup / madown
+        self.value = 100.0 - 100.0 / (1.0 + rs)
+        return self.value
+
+
+class StdDev:
+    """总体标准差, 对应 bt.indicators.StandardDeviation (safepow=True)"""
+
+    def __init__(self, period: int = 20):
+        self.mean = SMA(period)
+        self.meansq = SMA(period)
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        mean = self.mean.update(x)
+        meansq = self.meansq.update(x**2)
+        if mean == mean:
+            self.value = abs(meansq - mean**2) ** 0.5
+        return self.value
+
+
+class BollingerBands:
+    """
+    对应 bt.indicators.BollingerBands, update 返回 (mid, top, bot)
+    """
+
+    def __init__(self, period: int = 20, devfactor: float = 2.0):
+        self.devfactor = devfactor
+        self.stddev = StdDev(period)
+        self.mid = self.top = self.bot = NAN
+
+    def update(self, x: float) -> tuple:
+        std = self.stddev.update(x)
+        if std == std:
+            self.mid = self.stddev.mean.value
+            dev = self.devfactor * std
+            self.top = self.mid + dev
+            self.bot = self.mid - dev
+        return self.mid, self.top, self.bot
+
+
+class _Extreme:
+    """窗口极值的单调队列, 队首为当前极值"""
+
+    def __init__(self, period: int, better):
+        self.period = period
+        self.better = better
+        self.queue = deque()  # (index, value)
+        self.n = 0
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        queue = self.queue
+        better = self.better
+        while queue and not better(queue[-1][1], x):
+            queue.pop()
+        queue.append((self.n, x))
+        self.n += 1
+        if queue[0][0] <= self.n - 1 - self.period:
+            queue.popleft()
+        if self.n >= self.period:
+            self.value = queue[0][1]
+        return self.value
+
+
+class Highest(_Extreme):
+    """对应 bt.indicators.Highest"""
+
+    def __init__(self, period: int):
+        super().__init__(period, operator.gt)
+
+
+class Lowest(_Extreme):
+    """对应 bt.indicators.Lowest"""
+
+    def __init__(self, period: int):
+        super().__init__(period, operator.lt)
+
+
+class Stochastic:
+    """
+    慢速随机指标, 对应 bt.indicators.Stochastic (StochasticSlow)
+    update(high, low, close) 返回 (percK, percD)
+    """
+
+    def __init__(
+        self,
+        period: int = 14,
+        period_dfast: int = 3,
+        period_dslow: int = 3,
+        safediv: bool = False,
+        safezero: float = 0.0,
+    ):
+        self.highest = Highest(period)
+        self.lowest = Lowest(period)
+        self.k_avg = SMA(period_dfast)
+        self.d_avg = SMA(period_dslow)
+        self.safediv = safediv
+        self.safezero = safezero
+        self.percK = self.percD = NAN
+
+    def update(self, high: float, low: float, close: float) -> tuple:
+        hh = self.highest.update(high)
+        ll = self.lowest.update(low)
+        if hh != hh:
+            return self.percK, self.percD
+        knum = close - ll
+        kden = hh - ll
+        if self.safediv:
+            k = 100.0 * (knum / kden if kden else self.safezero)
+        else:
+            k = 100.0 * (knum / kden)
+        perc_k = self.k_avg.update(k)
+        if perc_k == perc_k:
+            self.percK = perc_k
+            self.percD = self.d_avg.update(perc_k)
+        return self.percK, self.percD
@@ -2,6 +2,7 @@
 
 # 获取昨天的日期 (YYYY-MM-DD)
 YESTERDAY=$(date -d "yesterday" '+%Y-%m-%d')
+TODAY=$(date '+%Y-%m-%d')
 
 # 项目根目录 (请根据你的实际路径修改)
 PROJECT_DIR="/path/to/your/project"
@@ -14,10 +15,14 @@ cd $PROJECT_DIR
 echo "Running daily incremental ETL for date: $YESTERDAY"
 
 # 为不同的交易所和交易对执行ETL任务
-python main_etl.py --exchange 'binance' --symbol 'BTC/USDT' --start_date $YESTERDAY
-python main_etl.py --exchange 'binance' --symbol 'ETH/USDT' --start_date $YESTERDAY
+# --incremental: 昨天的分区已经存在时直接跳过, 不会导入pandas/ccxt
+cryptotradelib etl --exchange 'binance' --symbol 'BTC/USDT' --start_date $YESTERDAY --end_date $TODAY --incremental
+cryptotradelib etl --exchange 'binance' --symbol 'ETH/USDT' --start_date $YESTERDAY --end_date $TODAY --incremental
 
 # 可以添加更多...
-# python main_etl.py --exchange 'okx' --symbol 'BTC/USDT' --start_date $YESTERDAY
+# cryptotradelib etl --exchange 'okx' --symbol 'BTC/USDT' --start_date $YESTERDAY --end_date $TODAY --incremental
+
+# 用新落盘的K线增量更新特征库
+cryptotradelib features --exchange 'binance' --timeframe 1m
 
 echo "Daily ETL job finished."
@@ -1,47 +1,57 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-import datetime
-import os
-import sys
+import argparse
 import pandas as pd
 import backtrader as bt
 import logging
-from data_processor.loader import load_from_parquet
-from strategy.trendance import sma_cross 
-import matplotlib
+from data_processor.loader import load_from_parquet, dataset_fingerprint
+from backtest.result_store import ResultStore
+from backtest.runner import run_backtest
+from strategy.trendance import sma_cross
 from utils.logger import setup_logger
 
 logger = setup_logger("backtest")
 
 if __name__ == "__main__":
-    cerebro = bt.Cerebro()
-    cerebro.addstrategy(sma_cross.SmaCrossStrategy, maperiod=15, printlog=False)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plot", action="store_true", help="Plot with matplotlib")
+    args = parser.parse_args()
 
-    df = load_from_parquet(
+    dataset = dict(
         data_root="data",
         data_type="ohlcv_1m",
         exchange="binance",
+        timeframe="1m",
         symbol="BTC/USDT",
         start_date="2025-10-01",
         end_date="2025-10-12",
     )
 
-    df["datetime"] = pd.to_datetime(df["datetime"]).dt.tz_localize(None)
-
-    data = bt.feeds.PandasData(
-        dataname=df,
-        datetime="datetime",
+    def load_data():
+        df = load_from_parquet(**dataset)
+        df["datetime"] = pd.to_datetime(df["datetime"]).dt.tz_localize(None)
+        return df
+
+    # 命中缓存时不会读取数据
+    result = run_backtest(
+        sma_cross.SmaCrossStrategy,
+        load_data,
+        params={"maperiod": 15, "printlog": False},
+        broker={
+            "cash": 100000.0,
+            "commission": 0.01,
+            "sizer": "FixedSize",
+            "sizer_params": {"stake": 0.001},
+        },
         timeframe=bt.TimeFrame.Minutes,
         compression=1,
+        store=ResultStore(),
+        data_fingerprint=dataset_fingerprint(**dataset),
     )
 
-    cerebro.adddata(data)
-    cerebro.broker.setcash(100000.0)
-    cerebro.addsizer(bt.sizers.FixedSize, stake=0.001)
-    cerebro.broker.setcommission(commission=0.01)
-
-    logging.info("Starting Portfolio Value: %.2f" % cerebro.broker.getvalue())
-    cerebro.run(maxcpus=1)
-    logging.info("Final Portfolio Value: %.2f" % cerebro.broker.getvalue())
+    logging.info("Starting Portfolio Value: %.2f" % result.metrics["start_value"])
+    logging.info("Final Portfolio Value: %.2f" % result.metrics["final_value"])
     # logging.info(f"Logs saved to: {LOG_FILE}")
-    cerebro.plot()
+    # 命中缓存时没有cerebro, 需要绘图时用 cryptotradelib backtest --plot
+    if args.plot and result.cerebro is not None:
+        result.cerebro.plot()
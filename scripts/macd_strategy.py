@@ -1,37 +1,32 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-import datetime
-import os
-import sys
+import argparse
 import pandas as pd
 import backtrader as bt
 import logging
-from data_processor.loader import load_from_parquet
+from data_processor.feed import ParquetData
 from strategy.trendance import macd
-import matplotlib
 from utils.logger import setup_logger
 
 logger = setup_logger("backtest")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plot", action="store_true", help="Plot with matplotlib")
+    args = parser.parse_args()
+
     cerebro = bt.Cerebro()
     cerebro.addstrategy(macd.MacdStrategy, printlog=True)
 
-    df = load_from_parquet(
+    # 直接从分区读取到backtrader的line缓冲区, 不经过DataFrame
+    data = ParquetData(
         data_root="data",
         data_type="ohlcv",
         exchange="binance",
-        timeframe="1d",
+        timeframe_str="1d",
         symbol="BTC/USDT",
         start_date="2022-10-01",
         end_date="2025-10-12",
-    )
-
-    df["datetime"] = pd.to_datetime(df["datetime"]).dt.tz_localize(None)
-
-    data = bt.feeds.PandasData(
-        dataname=df,
-        datetime="datetime",
         timeframe=bt.TimeFrame.Days,
         compression=1,
     )
@@ -44,4 +39,5 @@ if __name__ == "__main__":
     logging.info("Starting Portfolio Value: %.2f" % cerebro.broker.getvalue())
     cerebro.run(maxcpus=1)
     logging.info("Final Portfolio Value: %.2f" % cerebro.broker.getvalue())
-    cerebro.plot()
+    if args.plot:
+        cerebro.plot()
@@ -1,19 +1,36 @@
 # -*- coding: utf-8 -*-
 import argparse
+import logging
+import pandas as pd
+from config import OHLCV_DATA_TYPE, OHLCV_DATA_TYPES
 from data_fetcher.fetch_historical import HistoricalFetcher
 from data_processor.writer import save_to_parquet, register_metadata
 from reporting.quality_check import generate_quality_report
+from utils.logger import setup_logger
 
+logger = logging.getLogger("etl")
 
-def run_etl(exchange_id: str, symbol: str, start_date: str, timeframe: str = "1m"):
+
+def run_etl(
+    exchange_id: str,
+    symbol: str,
+    start_date: str,
+    timeframe: str = "1m",
+    end_date: str = None,
+    data_type: str = None,
+):
     """
     执行ETL主流程: 拉取、处理、存储、报告
     :param exchange_id: 交易所
     :param symbol: 交易对
     :param start_date: 起始日期
     :param timeframe: 时间周期
+    :param end_date: 结束日期 (不含), 为None时拉取到最新
+    :param data_type: 存储的 data_type, 默认按周期取 config.OHLCV_DATA_TYPES
     """
-    print(f"Starting ETL process for {exchange_id} - {symbol} from {start_date}")
+    if data_type is None:
+        data_type = OHLCV_DATA_TYPES.get(timeframe, OHLCV_DATA_TYPE)
+    logger.info(f"Starting ETL process for {exchange_id} - {symbol} from {start_date}")
 
     # 1. 初始化Fetcher
     fetcher = HistoricalFetcher(exchange_id=exchange_id)
@@ -23,13 +40,21 @@ def run_etl(exchange_id: str, symbol: str, start_date: str, timeframe: str = "1m
         symbol=symbol, timeframe=timeframe, start_date_str=start_date
     )
 
+    if end_date and not ohlcv_df.empty:
+        end_ms = fetcher.exchange.parse8601(end_date + "T00:00:00Z")
+        ohlcv_df = ohlcv_df[ohlcv_df["timestamp"] < end_ms]
+
     if ohlcv_df.empty:
-        print(f"No OHLCV data found for {symbol}. Exiting.")
+        logger.info(f"No OHLCV data found for {symbol}. Exiting.")
         return
 
     # 3. 存储数据
     save_to_parquet(
-        df=ohlcv_df, data_type="ohlcv_1m", exchange=exchange_id, symbol=symbol
+        df=ohlcv_df,
+        data_type=data_type,
+        exchange=exchange_id,
+        symbol=symbol,
+        timeframe=timeframe,
     )
 
     # 4. 登记元数据 (示例)
@@ -42,7 +67,62 @@ def run_etl(exchange_id: str, symbol: str, start_date: str, timeframe: str = "1m
     # 5. 生成数据质量报告
     generate_quality_report(df=ohlcv_df.copy(), timeframe_str=timeframe)
 
-    print("ETL process finished.")
+    logger.info("ETL process finished.")
+
+
+DAY_MS = 86_400_000
+
+
+def run_trades_etl(
+    exchange_id: str, symbol: str, start_date: str, end_date: str = None
+):
+    """
+    回填逐笔成交: 分页拉取, 每凑满一个自然日(UTC)就写入一个日分区
+    内存中最多保留约一天的成交
+    :param exchange_id: 交易所
+    :param symbol: 交易对
+    :param start_date: 起始日期
+    :param end_date: 结束日期 (不含)
+    """
+    logger.info(f"Starting trades ETL for {exchange_id} - {symbol} from {start_date}")
+    fetcher = HistoricalFetcher(exchange_id=exchange_id)
+    # binance 支持按 fromId 翻页, 比按时间戳翻页更可靠
+    paginate = "id" if exchange_id.startswith("binance") else "timestamp"
+
+    pending = []
+    pending_day = None
+    total = 0
+
+    def flush(frames):
+        nonlocal total
+        df = pd.concat(frames, ignore_index=True)
+        save_to_parquet(
+            df=df,
+            data_type="trades",
+            exchange=exchange_id,
+            symbol=symbol,
+            timeframe="tick",
+        )
+        total += len(df)
+
+    for page in fetcher.iter_trade_history(
+        symbol, start_date, end_date, paginate=paginate
+    ):
+        last_day = int(page["timestamp"].iloc[-1]) // DAY_MS
+        if pending_day is not None and last_day > pending_day:
+            # 之前缓存的日期已经完整, 写出并保留跨日部分
+            cutoff = last_day * DAY_MS
+            done = [f[f["timestamp"] < cutoff] for f in pending + [page]]
+            rest = page[page["timestamp"] >= cutoff]
+            flush(done)
+            pending = [rest]
+        else:
+            pending.append(page)
+        pending_day = last_day
+
+    if pending:
+        flush(pending)
+    logger.info(f"Trades ETL finished: {total} trades stored.")
 
 
 if __name__ == "__main__":
@@ -56,7 +136,31 @@ if __name__ == "__main__":
     parser.add_argument(
         "--start_date", type=str, required=True, help="Start date in YYYY-MM-DD format"
     )
+    parser.add_argument(
+        "--end_date", type=str, default=None, help="End date (exclusive)"
+    )
+    parser.add_argument(
+        "--data_type",
+        type=str,
+        default="ohlcv",
+        choices=["ohlcv", "trades"],
+        help="Data to backfill",
+    )
 
     args = parser.parse_args()
+    setup_logger("etl")
 
-    run_etl(exchange_id=args.exchange, symbol=args.symbol, start_date=args.start_date)
+    if args.data_type == "trades":
+        run_trades_etl(
+            exchange_id=args.exchange,
+            symbol=args.symbol,
+            start_date=args.start_date,
+            end_date=args.end_date,
+        )
+    else:
+        run_etl(
+            exchange_id=args.exchange,
+            symbol=args.symbol,
+            start_date=args.start_date,
+            end_date=args.end_date,
+        )
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+把已存储的分区改写为 data_processor.schema 的存储策略
+
+    python -m scripts.migrate_storage --data_type ohlcv_1m --dry_run
+    cryptotradelib migrate --exchange binance
+
+逐个分区读取 (旧文件的 datetime 列会被丢弃, 读取时由 timestamp 派生), 编码后与
+现有文件逐字节比较, 相同则跳过, 因此可以重复执行. 同时删除 fastparquet 在数据集
+根目录写入的 _metadata / _common_metadata, 并为没有 _partitioning.json 的
+旧数据集补上推断出的分区方案.
+"""
+
+import argparse
+import logging
+from dataclasses import replace
+
+from config import DATA_ROOT_PATH
+from data_processor.cache import PARTITION_CACHE
+from data_processor.partitioning import METADATA_FILE, read_scheme, write_scheme
+from data_processor.schema import (
+    FLOAT,
+    ColumnSpec,
+    encode,
+    partition_scales,
+    policy_for,
+    read_frame,
+    to_bytes,
+)
+from data_processor.storage import storage_for
+from data_processor.writer import PARTITION_FILE, write_partition
+from utils.logger import setup_logger
+
+logger = logging.getLogger("etl")
+
+FASTPARQUET_METADATA = ("_metadata", "_common_metadata")
+
+
+def _datasets(data_root: str, data_type: str = None, exchange: str = None):
+    """遍历 data_type/exchange/timeframe/symbol 目录"""
+    storage = storage_for(data_root)
+    for dt in sorted(storage.listdir(data_root)):
+        if data_type and dt != data_type:
+            continue
+        for ex in sorted(storage.listdir(storage.join(data_root, dt))):
+            if exchange and ex != exchange:
+                continue
+            ex_path = storage.join(data_root, dt, ex)
+            for tf in sorted(storage.listdir(ex_path)):
+                for sym in sorted(storage.listdir(storage.join(ex_path, tf))):
+                    path = storage.join(ex_path, tf, sym)
+                    if storage.isdir(path):
+                        yield dt, ex, tf, sym, path
+
+
+def keep_scales(policy, scales: dict):
+    """
+    策略没有为其设定精度的列保留文件中已有的定点整数精度
+    (e.g., orderbook 的精度在写入时按数据推断, 不在策略中)
+    """
+    columns = dict(policy.columns)
+    for name, precision in scales.items():
+        if columns.get(name, FLOAT) == FLOAT:
+            columns[name] = ColumnSpec("scaled", precision, "delta")
+    return replace(policy, columns=columns)
+
+
+def migrate_partition(path: str, policy, dry_run: bool = False) -> tuple:
+    """
+    改写一个分区, 返回 (改写前字节数, 改写后字节数, 是否改写)
+    """
+    storage = storage_for(path)
+    policy = keep_scales(policy, partition_scales(path))
+    files = [(n, size) for n, size, _ in storage.files(path) if n.endswith(".parquet")]
+    before = sum(size for _, size in files)
+    df = read_frame(path)
+    payload = to_bytes(encode(df, policy), policy)
+    if [n for n, _ in files] == [PARTITION_FILE]:
+        if storage.read_bytes(storage.join(path, PARTITION_FILE)) == payload:
+            return before, before, False
+    if not dry_run:
+        write_partition(df, path, policy)
+        if len(read_frame(path, columns=["timestamp"])) != len(df):
+            raise RuntimeError(f"Row count changed while migrating {path}")
+    return before, len(payload), True
+
+
+def migrate(
+    data_root: str = DATA_ROOT_PATH,
+    data_type: str = None,
+    exchange: str = None,
+    dry_run: bool = False,
+) -> dict:
+    """
+    改写 data_root 下的全部 (或指定 data_type / exchange 的) 数据集
+    :return: {'partitions', 'rewritten', 'bytes_before', 'bytes_after'}
+    """
+    storage = storage_for(data_root)
+    stats = {"partitions": 0, "rewritten": 0, "bytes_before": 0, "bytes_after": 0}
+    for dt, ex, tf, sym, base_path in _datasets(data_root, data_type, exchange):
+        policy = policy_for(dt, ex, sym)
+        for d in sorted(storage.listdir(base_path)):
+            path = storage.join(base_path, d)
+            if not d.startswith("date=") or not storage.isdir(path):
+                continue
+            before, after, changed = migrate_partition(path, policy, dry_run)
+            stats["partitions"] += 1
+            stats["rewritten"] += changed
+            stats["bytes_before"] += before
+            stats["bytes_after"] += after
+        if not dry_run:
+            # 旧数据集没有记录分区方案, 按分区值推断后补上
+            if not storage.exists(storage.join(base_path, METADATA_FILE)):
+                values = [
+                    d[len("date=") :]
+                    for d in storage.listdir(base_path)
+                    if d.startswith("date=")
+                ]
+                scheme = read_scheme(base_path, values)
+                if scheme is not None:
+                    write_scheme(base_path, scheme, tf)
+            for name in FASTPARQUET_METADATA:
+                stale = storage.join(base_path, name)
+                if storage.exists(stale):
+                    storage.remove(stale)
+            PARTITION_CACHE.bump_version(base_path)
+        logger.info(f"Migrated {base_path}")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rewrite stored partitions with the compact storage schema."
+    )
+    parser.add_argument("--data_root", default=DATA_ROOT_PATH)
+    parser.add_argument("--data_type", default=None, help="Only this data type")
+    parser.add_argument("--exchange", default=None, help="Only this exchange")
+    parser.add_argument(
+        "--dry_run", action="store_true", help="Report sizes without writing"
+    )
+    args = parser.parse_args(argv)
+
+    stats = migrate(args.data_root, args.data_type, args.exchange, args.dry_run)
+    before, after = stats["bytes_before"], stats["bytes_after"]
+    logger.info(
+        f"{stats['rewritten']}/{stats['partitions']} partitions "
+        f"{'would be ' if args.dry_run else ''}rewritten, "
+        f"{before / 1e6:.1f} MB -> {after / 1e6:.1f} MB"
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    setup_logger("etl")
+    main()
@@ -4,6 +4,7 @@ setup(
     name="Cryptotradelib",
     version="0.1.0",
     packages=find_packages(),
+    py_modules=["config", "cli"],
     python_requires=">=3.10",
     install_requires=[
         # Core libraries
@@ -15,6 +16,11 @@ setup(
         "schedule",
         "loguru",
     ],
+    entry_points={
+        "console_scripts": [
+            "cryptotradelib=cli:main",
+        ],
+    },
     author="Jack Li",
     author_email="lij081923@gmail.com",
     description="A simple project for data handling and exchange interaction",
@@ -0,0 +1,27 @@
+import os
+import glob
+import inspect
+import importlib
+
+
+def discover_strategies() -> dict:
+    """
+    收集 strategy/trendance 下定义的全部backtrader策略类
+    :return: {类名: 策略类}
+    """
+    import backtrader as bt
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    strategies = {}
+    for path in sorted(glob.glob(os.path.join(root, "trendance", "*.py"))):
+        module = importlib.import_module(
+            "strategy.trendance." + os.path.splitext(os.path.basename(path))[0]
+        )
+        for name, obj in inspect.getmembers(module, inspect.isclass):
+            if (
+                issubclass(obj, bt.Strategy)
+                and obj.__module__ == module.__name__
+                and not name.startswith("_")
+            ):
+                strategies[name] = obj
+    return strategies
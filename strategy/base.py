@@ -0,0 +1,134 @@
+import logging
+import numpy as np
+import backtrader as bt
+
+logger = logging.getLogger("backtest")
+
+# Closed-trade record, one row per trade. Datetimes are backtrader date numbers.
+TRADE_DTYPE = np.dtype(
+    [
+        ("open_datetime", "f8"),
+        ("close_datetime", "f8"),
+        ("size", "f8"),
+        ("price", "f8"),
+        ("pnl", "f8"),
+        ("pnlcomm", "f8"),
+        ("commission", "f8"),
+        ("barlen", "i8"),
+    ]
+)
+
+
+class BaseStrategy(bt.Strategy):
+    """
+    Common base for the strategies in strategy/trendance.
+
+    - ``log`` takes a %-style format string plus arguments and only formats
+      them when logging is on (``printlog`` or ``doprint``), so a disabled log
+      call costs one attribute check::
+
+          self.log("BUY CREATE, %.2f", self.dataclose[0])
+
+    - ``notify_order`` keeps ``self.order`` (the pending order), ``buyprice``,
+      ``buycomm`` and ``bar_executed`` up to date. Subclasses only check
+      ``if self.order: return`` in ``next``.
+
+    - ``notify_trade`` writes every closed trade into a preallocated structured
+      array (``TRADE_DTYPE``), doubling it when full. ``trade_record()``
+      returns the columns for vectorized analysis.
+
+    Subclasses overriding ``start``, ``notify_order`` or ``notify_trade``
+    must call the base implementation.
+    """
+
+    params = (("printlog", False),)
+
+    # Initial capacity of the trade array
+    trade_capacity = 256
+
+    order = None
+    buyprice = None
+    buycomm = None
+    bar_executed = None
+
+    def log(self, txt, *args, dt=None, doprint=False):
+        """Logging function for this strategy"""
+        if self.params.printlog or doprint:
+            dt = dt or self.datas[0].datetime.date(0)
+            logger.info("%s, " + txt, dt.isoformat(), *args)
+
+    def start(self):
+        self._trade_buf = np.empty(self.trade_capacity, dtype=TRADE_DTYPE)
+        self._trade_count = 0
+        self._trade_open_size = {}
+
+    def notify_order(self, order):
+        """
+        Handles order notifications.
+        Resets self.order once the order is no longer pending.
+        """
+        status = order.status
+        if status == order.Submitted or status == order.Accepted:
+            # Buy/Sell order submitted/accepted to/by broker - Nothing to do
+            return
+
+        if status == order.Completed:
+            executed = order.executed
+            if order.isbuy():
+                self.log(
+                    "BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm: %.2f",
+                    executed.price,
+                    executed.value,
+                    executed.comm,
+                )
+                self.buyprice = executed.price
+                self.buycomm = executed.comm
+            else:
+                self.log(
+                    "SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm: %.2f",
+                    executed.price,
+                    executed.value,
+                    executed.comm,
+                )
+            self.bar_executed = len(self)
+
+        elif status in (order.Canceled, order.Margin, order.Rejected):
+            self.log("Order Canceled/Margin/Rejected")
+
+        self.order = None
+
+    def notify_trade(self, trade):
+        if trade.justopened:
+            self._trade_open_size[trade.ref] = trade.size
+            return
+        if not trade.isclosed:
+            return
+
+        if self._trade_count == len(self._trade_buf):
+            self._trade_buf = np.resize(self._trade_buf, 2 * len(self._trade_buf))
+        # trade.size is 0 once closed, so use the size recorded at open
+        self._trade_buf[self._trade_count] = (
+            trade.dtopen,
+            trade.dtclose,
+            self._trade_open_size.pop(trade.ref, 0.0),
+            trade.price,
+            trade.pnl,
+            trade.pnlcomm,
+            trade.commission,
+            trade.barlen,
+        )
+        self._trade_count += 1
+        self.log("OPERATION PROFIT, GROSS %.2f, NET %.2f", trade.pnl, trade.pnlcomm)
+
+    @property
+    def trades(self) -> np.ndarray:
+        """Closed trades so far (a view, TRADE_DTYPE)"""
+        return self._trade_buf[: self._trade_count]
+
+    def trade_record(self) -> dict:
+        """
+        Closed trades as {column: ndarray}, the same columns as
+        backtest.analyzers.TradeList
+        """
+        trades = self.trades
+        return {name: trades[name].copy() for name in TRADE_DTYPE.names}
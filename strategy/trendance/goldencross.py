@@ -1,7 +1,9 @@
 import backtrader as bt
 
+from strategy.base import BaseStrategy
 
-class GoldenCrossStrategy(bt.Strategy):
+
+class GoldenCrossStrategy(BaseStrategy):
     """
     Implements the 'Golden Cross' strategy.
     A long position is taken when the short-term moving average (e.g., 50-day)
@@ -9,16 +11,10 @@ class GoldenCrossStrategy(bt.Strategy):
     The position is closed when the short-term MA crosses back below.
     """
 
-    params = (("fast_ma", 50), ("slow_ma", 200), ("printlog", False))
-
-    def log(self, txt, dt=None, doprint=False):
-        if self.params.printlog or doprint:
-            dt = dt or self.datas[0].datetime.date(0)
-            print(f"{dt.isoformat()}, {txt}")
+    params = (("fast_ma", 50), ("slow_ma", 200))
 
     def __init__(self):
         self.dataclose = self.datas[0].close
-        self.order = None
 
         # Short-term and long-term moving averages
         self.sma_fast = bt.indicators.SimpleMovingAverage(
@@ -31,54 +27,24 @@ class GoldenCrossStrategy(bt.Strategy):
         # The crossover signal
         self.crossover = bt.indicators.CrossOver(self.sma_fast, self.sma_slow)
 
-    def notify_order(self, order):
-        """
-        Handles order notifications.
-        Resets self.order when the order is completed.
-        """
-        if order.status in [order.Submitted, order.Accepted]:
-            # Buy/Sell order submitted/accepted to/by broker - Nothing to do
-            return
-
-        # Check if an order has been completed
-        if order.status in [order.Completed]:
-            if order.isbuy():
-                self.log(
-                    f"BUY EXECUTED, Price: {order.executed.price:.2f}, Cost: {order.executed.value:.2f}, Comm: {order.executed.comm:.2f}"
-                )
-                self.buyprice = order.executed.price
-                self.buycomm = order.executed.comm
-            else:  # Sell
-                self.log(
-                    f"SELL EXECUTED, Price: {order.executed.price:.2f}, Cost: {order.executed.value:.2f}, Comm: {order.executed.comm:.2f}"
-                )
-
-            self.bar_executed = len(self)
-
-        elif order.status in [order.Canceled, order.Margin, order.Rejected]:
-            self.log("Order Canceled/Margin/Rejected")
-
-        # Reset order status
-        self.order = None
-
     def next(self):
         if self.order:
             return
 
         if not self.position:  # Not in the market
             if self.crossover > 0:  # Fast MA crosses above Slow MA
-                self.log(f"BUY CREATE (Golden Cross), {self.dataclose[0]:.2f}")
+                self.log("BUY CREATE (Golden Cross), %.2f", self.dataclose[0])
                 self.order = self.buy()
         else:  # Already in the market
             if self.crossover < 0:  # Fast MA crosses below Slow MA
-                self.log(f"SELL CREATE (Death Cross), {self.dataclose[0]:.2f}")
+                self.log("SELL CREATE (Death Cross), %.2f", self.dataclose[0])
                 self.order = self.sell()
 
 
 # ====================================================================
 # 3. RSI Strategy: Relative Strength Index
 # ====================================================================
-class RsiStrategy(bt.Strategy):
+class RsiStrategy(BaseStrategy):
     """
     A strategy based on the Relative Strength Index (RSI).
     It buys when the RSI enters an oversold region (e.g., below 30) and
@@ -89,18 +55,14 @@ class RsiStrategy(bt.Strategy):
         ("rsi_period", 14),
         ("rsi_overbought", 70),
         ("rsi_oversold", 30),
-        ("printlog", False),
     )
 
-    def log(self, txt, dt=None, doprint=False):
-        if self.params.printlog or doprint:
-            dt = dt or self.datas[0].datetime.date(0)
-            print(f"{dt.isoformat()}, {txt}")
-
     def __init__(self):
         self.dataclose = self.datas[0].close
-        self.order = None
-        self.rsi = bt.indicators.RSI_SMA(self.datas[0], period=self.params.rsi_period)
+        # safediv: a flat window (no down moves) gives RSI 100 instead of ZeroDivisionError
+        self.rsi = bt.indicators.RSI_SMA(
+            self.datas[0], period=self.params.rsi_period, safediv=True
+        )
 
     def next(self):
         if self.order:
@@ -108,9 +70,9 @@ class RsiStrategy(bt.Strategy):
 
         if not self.position:
             if self.rsi < self.params.rsi_oversold:
-                self.log(f"BUY CREATE (RSI Oversold), {self.dataclose[0]:.2f}")
+                self.log("BUY CREATE (RSI Oversold), %.2f", self.dataclose[0])
                 self.order = self.buy()
         else:
             if self.rsi > self.params.rsi_overbought:
-                self.log(f"SELL CREATE (RSI Overbought), {self.dataclose[0]:.2f}")
+                self.log("SELL CREATE (RSI Overbought), %.2f", self.dataclose[0])
                 self.order = self.sell()
@@ -1,10 +1,9 @@
-import logging
 import backtrader as bt
 
-logger = logging.getLogger("backtest")
+from strategy.base import BaseStrategy
 
 
-class MacdStrategy(bt.Strategy):
+class MacdStrategy(BaseStrategy):
     """
     A strategy using the MACD indicator.
     It buys when the MACD line crosses above the signal line and
@@ -15,25 +14,15 @@ class MacdStrategy(bt.Strategy):
         ("fast_period", 12),
         ("slow_period", 26),
         ("signal_period", 9),
-        ("printlog", False),
     )
 
-    def log(self, txt, dt=None, doprint=False):
-        """Logging function for this strategy"""
-        if self.params.printlog or doprint:
-            dt = dt or self.datas[0].datetime.date(0)
-            logger.info(f"{dt.isoformat()}, {txt}")
-
     def __init__(self):
         """
         Initializes the strategy.
         - Sets up data and indicators.
-        - Initializes order tracking.
+        - Order tracking is handled by BaseStrategy.
         """
         self.dataclose = self.datas[0].close
-        self.order = None
-        self.buyprice = None
-        self.buycomm = None
 
         # Add a MACD indicator
         self.macd = bt.indicators.MACD(
@@ -45,43 +34,18 @@ class MacdStrategy(bt.Strategy):
         # CrossOver indicator for buy/sell signals
         self.crossover = bt.indicators.CrossOver(self.macd.macd, self.macd.signal)
 
-    def notify_order(self, order):
-        """
-        Handles order notifications.
-        Resets self.order when the order is completed.
-        """
-        if order.status in [order.Submitted, order.Accepted]:
-            # Buy/Sell order submitted/accepted to/by broker - Nothing to do
-            return
-
-        # Check if an order has been completed
-        if order.status in [order.Completed]:
-            if order.isbuy():
-                self.log(
-                    f"BUY EXECUTED, Price: {order.executed.price:.2f}, Cost: {order.executed.value:.2f}, Comm: {order.executed.comm:.2f}"
-                )
-                self.buyprice = order.executed.price
-                self.buycomm = order.executed.comm
-            else:  # Sell
-                self.log(
-                    f"SELL EXECUTED, Price: {order.executed.price:.2f}, Cost: {order.executed.value:.2f}, Comm: {order.executed.comm:.2f}"
-                )
-
-            self.bar_executed = len(self)
-
-        elif order.status in [order.Canceled, order.Margin, order.Rejected]:
-            self.log("Order Canceled/Margin/Rejected")
-
-        # Reset order status
-        self.order = None
-
     def next(self):
         """
         Defines the logic for each bar.
         """
-        self.log(
-            f"Close, {self.dataclose[0]:.2f}, MACD: {self.macd.macd[0]:.2f}, Signal: {self.macd.signal[0]:.2f}"
-        )
+        # Per-bar log: skip even the line lookups unless printlog is on
+        if self.params.printlog:
+            self.log(
+                "Close, %.2f, MACD: %.2f, Signal: %.2f",
+                self.dataclose[0],
+                self.macd.macd[0],
+                self.macd.signal[0],
+            )
 
         # Check if an order is pending. If so, we cannot send a 2nd one.
         if self.order:
@@ -91,10 +55,10 @@ class MacdStrategy(bt.Strategy):
         if not self.position:
             # Not in the market, look for a buy signal
             if self.crossover > 0:
-                self.log(f"BUY CREATE, {self.dataclose[0]:.2f}")
+                self.log("BUY CREATE, %.2f", self.dataclose[0])
                 self.order = self.buy()
         else:
             # Already in the market, look for a sell signal
             if self.crossover < 0:
-                self.log(f"SELL CREATE, {self.dataclose[0]:.2f}")
+                self.log("SELL CREATE, %.2f", self.dataclose[0])
                 self.order = self.sell()
@@ -1,79 +1,40 @@
-import logging
 import backtrader as bt
 
-logger = logging.getLogger("backtest")
+from strategy.base import BaseStrategy
 
 
-class SmaCrossStrategy(bt.Strategy):
+class SmaCrossStrategy(BaseStrategy):
     """
     A simple strategy based on the crossover of the closing price and a
     Simple Moving Average (SMA). Buys when the close is above the SMA and
     sells when it's below.
     """
 
-    params = (
-        ("maperiod", 15),
-        ("printlog", False),
-    )
-
-    def log(self, txt, dt=None, doprint=False):
-        """Logging function for this strategy"""
-        if self.params.printlog or doprint:
-            dt = dt or self.datas[0].datetime.date(0)
-            logger.info(f"{dt.isoformat()}, {txt}")
+    params = (("maperiod", 15),)
 
     def __init__(self):
         self.dataclose = self.datas[0].close
-        self.order = None
-        self.buyprice = None
-        self.buycomm = None
         self.sma = bt.indicators.SimpleMovingAverage(
             self.datas[0], period=self.params.maperiod
         )
 
-    def notify_order(self, order):
-        if order.status in [order.Submitted, order.Accepted]:
-            return
-
-        if order.status in [order.Completed]:
-            if order.isbuy():
-                self.log(
-                    f"BUY EXECUTED, Price: {order.executed.price:.2f}, "
-                    f"Cost: {order.executed.value:.2f}, Comm: {order.executed.comm:.2f}"
-                )
-                self.buyprice = order.executed.price
-                self.buycomm = order.executed.comm
-            else:
-                self.log(
-                    f"SELL EXECUTED, Price: {order.executed.price:.2f}, "
-                    f"Cost: {order.executed.value:.2f}, Comm: {order.executed.comm:.2f}"
-                )
-            self.bar_executed = len(self)
-        elif order.status in [order.Canceled, order.Margin, order.Rejected]:
-            self.log("Order Canceled/Margin/Rejected")
-
-        self.order = None
-
-    def notify_trade(self, trade):
-        if not trade.isclosed:
-            return
-        self.log(f"OPERATION PROFIT, GROSS {trade.pnl:.2f}, NET {trade.pnlcomm:.2f}")
-
     def next(self):
         if self.order:
             return
 
         if not self.position:
             if self.dataclose[0] > self.sma[0]:
-                self.log(f"BUY CREATE, {self.dataclose[0]:.2f}")
+                self.log("BUY CREATE, %.2f", self.dataclose[0])
                 self.order = self.buy()
         else:
             if self.dataclose[0] < self.sma[0]:
-                self.log(f"SELL CREATE, {self.dataclose[0]:.2f}")
+                self.log("SELL CREATE, %.2f", self.dataclose[0])
                 self.order = self.sell()
 
     def stop(self):
         self.log(
-            f"(MA Period {self.params.maperiod}) Ending Value {self.broker.getvalue():.2f}",
+            "(MA Period %s) Ending Value %.2f",
+            self.params.maperiod,
+            self.broker.getvalue(),
             doprint=True,
         )
@@ -0,0 +1,110 @@
+import os
+import subprocess
+import sys
+import threading
+
+import numpy as np
+
+from benchmarks.synthetic import generate_ohlcv
+from data_processor.bar_server import BarClient, BarServer, notify_refresh
+from data_processor.loader import load_from_parquet
+from data_processor.writer import save_to_parquet
+
+HOUR = 3_600_000
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 另一个进程: 打开同一个序列, 检查收盘价之和与读者数
+CHILD = """
+import sys
+from data_processor.bar_server import BarClient
+with BarClient(sys.argv[1]) as client:
+    bars = client.open("ohlcv", "binance", "1h", "BTC/USDT", sys.argv[2])
+    assert float(bars.arrays()["close"].sum()) == float(sys.argv[3])
+    assert client.stats()["readers"] == 2
+"""
+
+
+def start_server(tmp_path, **kwargs):
+    address = str(tmp_path / "bars.sock")
+    server = BarServer(address, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, address
+
+
+def test_processes_share_one_copy_and_see_appends(tmp_path):
+    root = str(tmp_path / "data")
+    full = generate_ohlcv(24 * 12, timeframe_ms=HOUR)
+    save_to_parquet(full[: 24 * 10], "ohlcv", "binance", "BTC/USDT", "1h", root)
+    server, address = start_server(tmp_path)
+    try:
+        client = BarClient(address)
+        shared = client.open("ohlcv", "binance", "1h", "BTC/USDT", root)
+        expected = load_from_parquet(root, "ohlcv", "binance", "1h", "BTC/USDT")
+        arrays = shared.arrays()
+        assert not arrays["close"].flags.writeable
+        np.testing.assert_array_equal(arrays["close"], expected["close"])
+
+        total = repr(float(expected["close"].sum()))
+        subprocess.run(
+            [sys.executable, "-c", CHILD, address, root, total], cwd=REPO, check=True
+        )
+        # 子进程退出释放了引用, 但没有删除共享内存
+        stats = client.stats()
+        assert stats["loads"] == 1 and stats["readers"] == 1
+
+        # ETL 追加两天, 已打开的视图原地增长
+        save_to_parquet(full, "ohlcv", "binance", "BTC/USDT", "1h", root)
+        assert client.refresh("ohlcv", "binance", "1h", "BTC/USDT", root) == 48
+        assert client.refresh("ohlcv", "binance", "1h", "BTC/USDT", root) == 0
+        expected = load_from_parquet(root, "ohlcv", "binance", "1h", "BTC/USDT")
+        assert len(shared) == len(expected) == 24 * 12
+        window = shared.frame("2020-01-05", "2020-01-11")
+        want = load_from_parquet(
+            root, "ohlcv", "binance", "1h", "BTC/USDT", "2020-01-05", "2020-01-11"
+        )
+        np.testing.assert_array_equal(window["timestamp"], want["timestamp"])
+        np.testing.assert_array_equal(window["close"], want["close"])
+        assert np.shares_memory(window["close"].to_numpy(), shared.arrays()["close"])
+        shared.close()
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_segment_grows_and_unused_series_are_evicted(tmp_path):
+    root = str(tmp_path / "data")
+    full = generate_ohlcv(6100, timeframe_ms=HOUR)
+    for symbol in ("BTC/USDT", "ETH/USDT"):
+        save_to_parquet(full[:100], "ohlcv", "binance", symbol, "1h", root)
+    server, address = start_server(tmp_path, max_bytes=1)
+    try:
+        with BarClient(address) as client:
+            btc = client.open("ohlcv", "binance", "1h", "BTC/USDT", root)
+            old = btc.arrays()["close"]
+            # 超过预留容量, 服务端换一段更大的内存
+            save_to_parquet(full, "ohlcv", "binance", "BTC/USDT", "1h", root)
+            assert client.refresh("ohlcv", "binance", "1h", "BTC/USDT", root) == 6000
+            assert len(old) == 100  # 旧视图仍然可读
+            close = btc.arrays()["close"]
+            assert len(close) == 6100 and close[-1] == full["close"].iloc[-1]
+            assert client.stats()["readers"] == 1
+
+            eth = client.open("ohlcv", "binance", "1h", "ETH/USDT", root)
+            assert client.stats()["series"] == 2  # 都在使用中, 不淘汰
+            btc.close()
+            stats = client.stats()
+            assert stats["series"] == 1 and stats["evictions"] == 1
+            eth.close()
+            assert client.stats()["series"] == 0
+
+        # 服务端出错时 ETL 只记录警告
+        def fail(dataset):
+            raise ValueError("disk error")
+
+        server.refresh = fail
+        args = ("ohlcv", "binance", "1h", "BTC/USDT", root, address)
+        assert notify_refresh(*args) is None
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_processor.bar_builder import BarBuilder
+from data_processor.cache import PARTITION_CACHE
+from data_processor.loader import load_from_parquet
+
+DAY_MS = 86_400_000
+
+
+def write_days(base, start_ms, days, scale=1.0):
+    ts = start_ms + 60000 * np.arange(days * 1440, dtype=np.int64)
+    close = scale * (100 + np.arange(len(ts)) * 0.01)
+    df = pd.DataFrame(
+        {
+            "timestamp": ts,
+            "open": close,
+            "high": close,
+            "low": close,
+            "close": close,
+            "volume": 1.0,
+        }
+    )
+    df["datetime"] = pd.to_datetime(df["timestamp"], unit="ms")
+    for date, part in df.groupby(df["datetime"].dt.strftime("%Y-%m-%d")):
+        (base / f"date={date}").mkdir(parents=True, exist_ok=True)
+        part.to_parquet(base / f"date={date}" / "part.0.parquet", index=False)
+    return df
+
+
+def test_recent_partitions_are_cached_and_invalidated(tmp_path):
+    PARTITION_CACHE.clear()
+    today = int(time.time() * 1000) // DAY_MS * DAY_MS
+    base = tmp_path / "ohlcv" / "binance" / "1m" / "BTC_USDT"
+    expected = write_days(base, today - 3 * DAY_MS, 3)
+    args = (str(tmp_path), "ohlcv", "binance", "1m", "BTC/USDT")
+
+    first = load_from_parquet(*args)
+    hits = PARTITION_CACHE.hits
+    second = load_from_parquet(*args)
+    assert PARTITION_CACHE.hits == hits + 3
+    assert second["close"].tolist() == first["close"].tolist()
+    assert second["close"].tolist() == expected["close"].tolist()
+
+    # 改写一个分区后重新读取
+    rewritten = write_days(base, today - DAY_MS, 1, scale=2.0)
+    third = load_from_parquet(*args)
+    assert third["close"].tolist()[-1440:] == rewritten["close"].tolist()
+
+    # 实时尾部: 今天的bar尚未落盘
+    builder = BarBuilder(
+        "1m", on_bar=PARTITION_CACHE.bar_sink("ohlcv", "binance", "1m", str(tmp_path))
+    )
+    builder.on_trade("BTC/USDT", today + 1000, 500.0, 2.0)
+    builder.on_trade("BTC/USDT", today + 61000, 501.0, 1.0)
+    live = load_from_parquet(*args)
+    assert len(live) == 3 * 1440 + 1
+    assert live["close"].iloc[-1] == 500.0
+    assert live["timestamp"].iloc[-1] == today
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+
+def test_cli_help_does_not_import_heavy_modules():
+    code = (
+        "import sys, contextlib, io, cli\n"
+        "with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):\n"
+        "    cli.main(['etl', '--help'])\n"
+        "print(sorted(m for m in ('pandas', 'ccxt', 'backtrader', 'matplotlib') if m in sys.modules))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_etl_and_readers_agree_on_data_type(monkeypatch):
+    import cli
+    import scripts.main_etl as main_etl
+
+    calls = {}
+    monkeypatch.setattr(main_etl, "run_etl", lambda **kw: calls.update(etl=kw))
+    monkeypatch.setattr(cli, "cmd_compare", lambda args: calls.update(compare=args))
+    monkeypatch.setattr(cli, "cmd_quality", lambda args: calls.update(quality=args))
+    common = ["--exchange", "binance", "--symbol", "BTC/USDT"]
+    for timeframe, expected in (("1h", "ohlcv"), ("1m", "ohlcv_1m")):
+        cli.main(
+            ["etl", *common, "--start_date", "2025-10-01", "--timeframe", timeframe]
+        )
+        cli.main(["compare", "MacdStrategy", "--timeframe", timeframe])
+        cli.main(["quality", "--timeframe", timeframe])
+        assert calls["etl"]["data_type"] == expected
+        assert calls["compare"].data_type == calls["quality"].data_type == expected
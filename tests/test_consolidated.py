@@ -0,0 +1,75 @@
+import pytest
+
+from data_processor.consolidated import (
+    BarEvent,
+    QuoteEvent,
+    consolidated_bars,
+    consolidated_bbo,
+)
+from data_processor.symbols import SymbolRegistry, parse_symbol, symbol_path_name
+
+
+def test_symbol_registry_maps_venue_symbols():
+    registry = SymbolRegistry()
+    assert registry.venue_symbol("binance", "BTC/USDT") == "BTC/USDT"
+    assert registry.venue_symbol("binanceusdm", "BTC/USDT") == "BTC/USDT:USDT"
+    assert registry.venue_symbol("okx", "BTC/USDT") == "BTC/USDT:USDT"
+
+    registry.load_markets(
+        "okx",
+        {
+            "BTC/USDT:USDT": {
+                "id": "BTC-USDT-SWAP",
+                "base": "BTC",
+                "quote": "USDT",
+                "settle": "USDT",
+                "spot": False,
+            }
+        },
+    )
+    assert registry.instrument("okx", "BTC-USDT-SWAP") == parse_symbol("BTC/USDT:USDT")
+    assert parse_symbol("BTC/USD:BTC-251226").kind == "future"
+    assert symbol_path_name("BTC/USDT:USDT") == "BTC_USDT_USDT"
+
+
+def test_composite_bars_are_volume_weighted():
+    binance = [
+        BarEvent(0, "binance", "BTC/USDT", 100, 101, 99, 100.5, 3.0),
+        BarEvent(60_000, "binance", "BTC/USDT", 100.5, 102, 100, 101, 1.0),
+    ]
+    okx = [
+        BarEvent(0, "okx", "BTC/USDT:USDT", 101, 103, 100, 101.5, 1.0),
+        BarEvent(60_000, "okx", "ETH/USDT:USDT", 10, 11, 9, 10.5, 2.0),
+    ]
+    bars = list(consolidated_bars(binance, okx))
+
+    assert [(b.timestamp, b.symbol, b.venues) for b in bars] == [
+        (0, "BTC/USDT", 2),
+        (60_000, "BTC/USDT", 1),
+        (60_000, "ETH/USDT", 1),
+    ]
+    first = bars[0]
+    assert first.open == pytest.approx((100 * 3 + 101 * 1) / 4)
+    assert first.close == pytest.approx((100.5 * 3 + 101.5 * 1) / 4)
+    assert (first.high, first.low, first.volume) == (103, 99, 4.0)
+
+
+def test_consolidated_bbo_tracks_best_quotes():
+    binance = [
+        QuoteEvent(1, "binance", "BTC/USDT", 100.0, 1.0, 100.2, 1.0),
+        QuoteEvent(3, "binance", "BTC/USDT", 99.8, 1.0, 100.1, 1.0),
+    ]
+    okx = [
+        QuoteEvent(2, "okx", "BTC/USDT:USDT", 100.1, 2.0, 100.3, 2.0),
+        QuoteEvent(4, "okx", "BTC/USDT:USDT", 99.7, 2.0, 100.3, 2.0),
+    ]
+    bbo = [
+        (b.timestamp, b.bid, b.bid_exchange, b.ask, b.ask_exchange)
+        for b in consolidated_bbo(binance, okx)
+    ]
+    assert bbo == [
+        (1, 100.0, "binance", 100.2, "binance"),
+        (2, 100.1, "okx", 100.2, "binance"),
+        (3, 100.1, "okx", 100.1, "binance"),
+        (4, 99.8, "binance", 100.1, "binance"),
+    ]
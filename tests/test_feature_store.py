@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_ohlcv
+from data_processor.feature_store import load_feature_tensor, update_features
+from data_processor.loader import load_from_parquet
+from data_processor.writer import save_to_parquet
+
+START_MS = 1_700_006_400_000  # 2023-11-15
+DAY_MS = 86_400_000
+
+
+def bars(scale, days=2):
+    return generate_ohlcv(days * 1440, start="2023-11-15", price=scale)
+
+
+def write(root, start, end):
+    """写入 [start, end) 的K线与资金费率"""
+    for symbol, scale in [("BTC/USDT", 100.0), ("BTC/USDT:USDT", 101.0)]:
+        df = bars(scale)
+        df = df[(df["timestamp"] >= start) & (df["timestamp"] < end)]
+        save_to_parquet(df, "ohlcv_1m", "okx", symbol, "1m", root)
+    funding = pd.DataFrame(
+        {"timestamp": np.arange(start, end, 8 * 3_600_000), "fundingRate": 0.0001}
+    )
+    save_to_parquet(funding, "funding_rate", "okx", "BTC/USDT:USDT", "8h", root)
+
+
+def test_incremental_features_match_full_run_and_tensor(tmp_path):
+    full, incremental = str(tmp_path / "full"), str(tmp_path / "incremental")
+    write(full, START_MS, START_MS + 2 * DAY_MS)
+    assert update_features(full, "okx", "1m") == {
+        "BTC/USDT": 2880,
+        "BTC/USDT:USDT": 2880,
+    }
+
+    # 第二天的K线在第一次运行之后才落盘
+    write(incremental, START_MS, START_MS + DAY_MS)
+    update_features(incremental, "okx", "1m")
+    write(incremental, START_MS + DAY_MS, START_MS + 2 * DAY_MS)
+    assert update_features(incremental, "okx", "1m")["BTC/USDT:USDT"] == 1440
+    assert update_features(incremental, "okx", "1m")["BTC/USDT:USDT"] == 0
+
+    args = ("features", "okx", "1m", "BTC/USDT:USDT")
+    expected = load_from_parquet(full, *args, use_cache=False)
+    got = load_from_parquet(incremental, *args, use_cache=False)
+    pd.testing.assert_frame_equal(got, expected)
+    assert np.allclose(got["basis_pct"], 0.01)
+    assert (got["funding_rate"] == 0.0001).all()
+
+    tensor = load_feature_tensor(incremental, "okx", "1m", features=["ret_1", "rsi_14"])
+    assert tensor.values.shape == (2880, 2, 2)
+    assert tensor.symbols == ["BTC_USDT", "BTC_USDT_USDT"]
+    np.testing.assert_array_equal(tensor.values[:, 1, 0], expected["ret_1"])
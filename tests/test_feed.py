@@ -0,0 +1,58 @@
+import pandas as pd
+import backtrader as bt
+
+from benchmarks.synthetic import generate_ohlcv
+from data_processor.feed import ArrowData, ParquetData
+from strategy.trendance import sma_cross
+
+
+def make_ohlcv(n=2000):
+    return generate_ohlcv(n, start="2025-10-01", price=100.0, vol=0.002, seed=1)
+
+
+def final_value(data, **cerebro_kwargs):
+    cerebro = bt.Cerebro(**cerebro_kwargs)
+    cerebro.addstrategy(sma_cross.SmaCrossStrategy, maperiod=15)
+    cerebro.adddata(data)
+    cerebro.broker.setcash(100000.0)
+    cerebro.addsizer(bt.sizers.FixedSize, stake=0.001)
+    cerebro.broker.setcommission(commission=0.01)
+    cerebro.run(maxcpus=1)
+    return cerebro.broker.getvalue()
+
+
+def test_arrow_feed_matches_pandas_feed():
+    df = make_ohlcv()
+    expected = final_value(
+        bt.feeds.PandasData(dataname=df.drop(columns="timestamp"), datetime="datetime")
+    )
+    assert final_value(ArrowData(dataname=df)) == expected
+
+    chunks = lambda: (df.iloc[i : i + 300] for i in range(0, len(df), 300))
+    assert final_value(ArrowData(dataname=chunks)) == expected
+    assert (
+        final_value(ArrowData(dataname=chunks), preload=False, runonce=False)
+        == expected
+    )
+
+
+def test_parquet_feed_reads_partitions(tmp_path):
+    df = make_ohlcv(n=3 * 1440)
+    base = tmp_path / "ohlcv" / "binance" / "1m" / "BTC_USDT"
+    for date, part in df.groupby(df["datetime"].dt.strftime("%Y-%m-%d")):
+        (base / f"date={date}").mkdir(parents=True)
+        part.to_parquet(base / f"date={date}" / "part.0.parquet", index=False)
+
+    data = ParquetData(
+        data_root=str(tmp_path),
+        exchange="binance",
+        timeframe_str="1m",
+        symbol="BTC/USDT",
+        start_date="2025-10-02",
+        batch_size=500,
+    )
+    cerebro = bt.Cerebro()
+    cerebro.adddata(data)
+    cerebro.run()
+    assert data.buflen() == 2 * 1440
+    assert bt.num2date(data.datetime.array[0]) == pd.Timestamp("2025-10-02")
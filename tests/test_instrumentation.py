@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from utils import instrumentation
+
+
+@pytest.fixture
+def metrics():
+    registry = instrumentation.REGISTRY
+    saved = registry.enabled, registry.export_path, registry.export_format
+    registry.reset()
+    instrumentation.enable()
+    yield registry
+    registry.enabled, registry.export_path, registry.export_format = saved
+    registry.reset()
+
+
+def test_metrics_are_registered_once_per_name_and_labels(metrics, tmp_path):
+    c = instrumentation.counter("rows_total", "Rows", exchange="binance", kind="x")
+    # 标签顺序无关
+    assert instrumentation.counter("rows_total", kind="x", exchange="binance") is c
+    other = instrumentation.counter("rows_total", "Rows", exchange="okx", kind="x")
+    assert other is not c
+    c.inc()
+    c.inc(2.5)
+    other.inc()
+    assert c.value == 3.5 and other.value == 1.0
+
+    g = instrumentation.gauge("lag_seconds", "Lag")
+    g.set(4.0)
+    g.set(2.0)
+    assert g.value == 2.0
+
+    h = instrumentation.histogram("read_seconds", "Reads", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        h.observe(value)
+    # 上界包含: 0.1 落在 le=0.1 的桶
+    assert h.counts == [2, 1, 1] and h.count == 4 and h.sum == 2.65
+    with h.time():
+        pass
+    assert h.counts == [3, 1, 1] and h.count == 5
+    assert len(metrics.collect()) == 4
+
+    path = tmp_path / "metrics.prom"
+    instrumentation.export_prometheus(str(path))
+    lines = path.read_text().splitlines()
+    assert lines[:4] == [
+        "# HELP lag_seconds Lag",
+        "# TYPE lag_seconds gauge",
+        "lag_seconds 2.0",
+        "# HELP read_seconds Reads",
+    ]
+    assert 'read_seconds_bucket{le="0.1"} 3' in lines
+    assert 'read_seconds_bucket{le="1.0"} 4' in lines
+    assert 'read_seconds_bucket{le="+Inf"} 5' in lines
+    assert lines.count("# TYPE rows_total counter") == 1
+    assert 'rows_total{exchange="binance",kind="x"} 3.5' in lines
+    assert 'rows_total{exchange="okx",kind="x"} 1.0' in lines
+
+    path = tmp_path / "metrics.jsonl"
+    instrumentation.enable(str(path), fmt="jsonl")
+    assert instrumentation.export() and instrumentation.export()
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 2
+    by_name = {
+        (m["name"], m["labels"].get("exchange")): m for m in records[0]["metrics"]
+    }
+    assert by_name["rows_total", "binance"] == {
+        "name": "rows_total",
+        "type": "counter",
+        "labels": {"exchange": "binance", "kind": "x"},
+        "value": 3.5,
+    }
+    assert by_name["read_seconds", None]["buckets"] == {"0.1": 3, "1.0": 1, "inf": 1}
+
+
+def test_disabled_metrics_are_shared_no_ops(metrics):
+    instrumentation.disable()
+    c = instrumentation.counter("rows_total", exchange="binance")
+    assert instrumentation.counter("other_total") is c
+    c.inc()
+    h = instrumentation.histogram("read_seconds")
+    h.observe(1.0)
+    with h.time():
+        pass
+    instrumentation.gauge("lag_seconds").set(1.0)
+    assert c.value == 0.0 and h.count == 0
+    assert metrics.collect() == []
+    assert not instrumentation.export()
+
+    # 已注册的指标在关闭后也不再记录
+    instrumentation.enable()
+    live = instrumentation.counter("rows_total")
+    instrumentation.disable()
+    live.inc()
+    assert live.value == 0.0 and metrics.collect() == [live]
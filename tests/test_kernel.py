@@ -0,0 +1,185 @@
+import backtrader as bt
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_ohlcv
+import backtest.kernel as kernel
+from backtest.kernel import SignalCache, run_strategies, simulate, strategy_signals
+from backtest.runner import run_backtest
+from strategy.base import BaseStrategy
+from strategy.trendance.bollinger_bands import BollingerBandsStrategy
+from strategy.trendance.goldencross import GoldenCrossStrategy, RsiStrategy
+from strategy.trendance.macd import MacdStrategy
+from strategy.trendance.sma_cross import SmaCrossStrategy
+from strategy.trendance.stochastic_oscillator import StochasticStrategy
+
+
+def make_ohlcv(seed=0):
+    # 开盘价带跳空, 用来覆盖止损单按开盘价成交的分支
+    return generate_ohlcv(
+        3000, start="2025-10-01", price=100.0, vol=0.003, seed=seed, gap=0.001
+    )
+
+
+class ProtectedSmaCross(BaseStrategy):
+    """限价入场 (有效期 valid 根), 成交后挂出 OCO 的止损/跟踪止损/止盈"""
+
+    params = (
+        ("maperiod", 20),
+        ("offset", 0.001),
+        ("valid", 5),
+        ("stop_loss", 0.004),
+        ("take_profit", 0.006),
+        ("trail", 0.003),
+    )
+
+    def __init__(self):
+        self.sma = bt.indicators.SMA(self.data, period=self.p.maperiod)
+        self.protect = []
+
+    def notify_order(self, order):
+        super().notify_order(order)
+        if order.status == order.Completed and order.isbuy():
+            p = order.executed.price
+            sl = self.sell(exectype=bt.Order.Stop, price=p * (1 - self.p.stop_loss))
+            trail = self.sell(
+                exectype=bt.Order.StopTrail, trailpercent=self.p.trail, oco=sl
+            )
+            tp = self.sell(
+                exectype=bt.Order.Limit, price=p * (1 + self.p.take_profit), oco=sl
+            )
+            self.protect = [sl, trail, tp]
+
+    def next(self):
+        if self.order:
+            return
+        close = self.data.close[0]
+        if not self.position:
+            if close > self.sma[0]:
+                self.order = self.buy(
+                    exectype=bt.Order.Limit,
+                    price=close * (1 - self.p.offset),
+                    valid=self.data.datetime[0] + (self.p.valid + 0.5) / 1440,
+                )
+        elif len(self) > self.bar_executed and close < self.sma[0]:
+            # 刚挂出的保护单要到下一根才能撤销
+            for o in self.protect:
+                self.cancel(o)
+            self.order = self.sell()
+
+
+def assert_same(expected, got):
+    np.testing.assert_allclose(
+        got.equity["value"], expected.equity["value"], rtol=1e-12
+    )
+    np.testing.assert_allclose(got.equity["cash"], expected.equity["cash"], rtol=1e-12)
+    assert (
+        got.equity["datetime"].to_numpy() == expected.equity["datetime"].to_numpy()
+    ).all()
+    assert len(got.trades) == len(expected.trades) > 0
+    for col in ("size", "price", "pnl", "pnlcomm", "commission", "barlen"):
+        np.testing.assert_allclose(got.trades[col], expected.trades[col], rtol=1e-9)
+
+
+def test_kernel_matches_backtrader_strategies():
+    df = make_ohlcv()
+    cases = [
+        (SmaCrossStrategy, {"maperiod": 20}, None),
+        (GoldenCrossStrategy, {"fast_ma": 10, "slow_ma": 30}, None),
+        (
+            MacdStrategy,
+            {},
+            {"sizer": "PercentSizer", "sizer_params": {"percents": 50}},
+        ),
+    ]
+    for strategy, params, broker in cases:
+        expected = run_backtest(strategy, df, params=params, broker=broker)
+        entries, exits, start = strategy_signals(strategy, df, params)
+        assert_same(expected, simulate(df, entries, exits, start, broker=broker))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_kernel_matches_backtrader_oscillators(seed):
+    df = make_ohlcv(seed=seed)
+    cases = [
+        (BollingerBandsStrategy, {}),
+        (RsiStrategy, {}),
+        (RsiStrategy, {"rsi_period": 7, "rsi_oversold": 25}),
+        (StochasticStrategy, {}),
+    ]
+    for strategy, params in cases:
+        expected = run_backtest(strategy, df, params=params)
+        entries, exits, start = strategy_signals(strategy, df, params)
+        assert_same(expected, simulate(df, entries, exits, start))
+
+
+def test_kernel_protective_orders_match_backtrader():
+    df = make_ohlcv(seed=1)
+    expected = run_backtest(ProtectedSmaCross, df)
+    entries, exits, start = strategy_signals(SmaCrossStrategy, df, {"maperiod": 20})
+    got = simulate(
+        df,
+        entries,
+        exits,
+        start,
+        entry="limit",
+        entry_offset=0.001,
+        valid=5,
+        stop_loss=0.004,
+        take_profit=0.006,
+        trail=0.003,
+    )
+    assert_same(expected, got)
+
+
+def test_run_strategies_matches_separate_runs():
+    df = make_ohlcv(seed=2)
+    percent = {"sizer": "PercentSizer", "sizer_params": {"percents": 50}}
+    configs = [
+        (SmaCrossStrategy, {"maperiod": 20}),
+        ("MacdStrategy", {}, {"broker": percent}),
+        ("BollingerBandsStrategy", {}),
+        ("RsiStrategy", {"rsi_period": 7}),
+        ("StochasticStrategy", {}, {"broker": {"cash": 500.0}}),
+        (SmaCrossStrategy, {"maperiod": 20}, {"entry": "limit", "entry_offset": 0.001}),
+        (SmaCrossStrategy, {"maperiod": 30}, {"stop_loss": 0.004, "trail": 0.003}),
+    ]
+    cache = SignalCache(df)
+    results = run_strategies(df, configs)
+    assert len(results) == len(configs)
+
+    for config, got in zip(configs, results):
+        strategy, params, options = (tuple(config) + ({},))[:3]
+        entries, exits, start = strategy_signals(strategy, df, params, cache)
+        assert_same(simulate(df, entries, exits, start, **options), got)
+    # 两个 SMA(20) 配置共用一份指标
+    assert sum(key[0] == "SMA" for key in cache._values if isinstance(key, tuple)) == 2
+
+    expected = run_backtest(MacdStrategy, df, broker=percent)
+    assert_same(expected, results[1])
+
+
+def test_array_indicators_match_streaming(monkeypatch):
+    # 整列版本 (装了numba时使用) 与逐根更新 streaming 指标逐位一致;
+    # 取整后的价格带来平盘/零波动窗口
+    df = make_ohlcv(seed=3)
+    rounded = df.assign(**{c: df[c].round(0) for c in ("open", "high", "low", "close")})
+    for data in (df, rounded):
+        for name in kernel.SIGNALS:
+            monkeypatch.setattr(kernel, "USE_ARRAYS", False)
+            with np.errstate(invalid="ignore"):  # 0/0 的 %K 为nan
+                expected = strategy_signals(name, data)
+            monkeypatch.setattr(kernel, "USE_ARRAYS", True)
+            got = strategy_signals(name, data)
+            for e, g in zip(expected[:2], got[:2]):
+                assert (e == g).all(), name
+            assert expected[2] == got[2], name
+        cache = SignalCache(data)
+        for cls, array in kernel.ARRAY_INDICATORS.items():
+            inputs = (
+                ("high", "low", "close") if cls.__name__ == "Stochastic" else ("close",)
+            )
+            columns = [cache.column(c) for c in inputs]
+            with np.errstate(invalid="ignore"):
+                expected = kernel._run(cls(10), *columns)
+            np.testing.assert_array_equal(array(*columns, 10), expected)
@@ -0,0 +1,49 @@
+import atexit
+import logging
+import logging.handlers
+
+import pytest
+
+from utils import logger as log_setup
+
+
+@pytest.fixture
+def fresh_logging(monkeypatch):
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    root.handlers[:] = []
+    monkeypatch.setattr(log_setup, "_listener", None)
+    monkeypatch.setattr(log_setup, "_log_file", None)
+    yield
+    root.handlers[:], root.level = handlers, level
+
+
+def stop(listener):
+    listener.stop()  # 处理完队列中的记录
+    atexit.unregister(listener.stop)
+
+
+def test_logging_goes_through_the_queue_to_one_file(fresh_logging, tmp_path):
+    logger = log_setup.setup_logger("sweep", log_dir=str(tmp_path))
+    root = logging.getLogger()
+    queue_handlers = [
+        h for h in root.handlers if isinstance(h, logging.handlers.QueueHandler)
+    ]
+    assert len(queue_handlers) == 1 and log_setup._listener is not None
+
+    # 之后的调用不再安装handler, 其他名字的日志写入同一个文件
+    handlers = list(root.handlers)
+    other = log_setup.setup_logger("stream", log_dir=str(tmp_path / "unused"))
+    assert other.name == "stream" and root.handlers == handlers
+    logger.info("from sweep")
+    logging.getLogger("backtest.kernel").warning("from a module logger")
+    logging.getLogger("backtest.kernel").debug("below the root level")
+    stop(log_setup._listener)
+
+    (path,) = tmp_path.glob("sweep_*.log")
+    assert not (tmp_path / "unused").exists()
+    text = path.read_text(encoding="utf-8")
+    assert "[INFO] from sweep" in text
+    assert "[WARNING] from a module logger" in text
+    assert "below the root level" not in text
+    assert text.count("Logger initialized") == 2
@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_orderbook
+from data_processor.orderbook import OrderBookReader, OrderBookRecorder
+
+
+def dir_bytes(path):
+    return sum(
+        os.path.getsize(os.path.join(d, f))
+        for d, _, files in os.walk(path)
+        for f in files
+    )
+
+
+def test_reconstruction_matches_snapshots_across_flushes_and_partitions(tmp_path):
+    # 每秒2次更新, 跨越3个小时分区
+    books = generate_orderbook(3 * 7200, depth=20, interval_ms=500, seed=1)
+    root = str(tmp_path / "data")
+    recorder = OrderBookRecorder(
+        "binance",
+        "BTC/USDT",
+        root,
+        keyframe_every=500,
+        flush_rows=20_000,
+        partitioning="hourly",
+    )
+    for book in books:
+        recorder.on_book(book)
+    recorder.flush()
+
+    reader = OrderBookReader("binance", "BTC/USDT", root)
+    assert reader.values[0].endswith("T00") and len(reader.values) == 3
+    first = books[0]["timestamp"]
+    assert reader.at(first - 1) is None
+    rng = np.random.default_rng(0)
+    for i in np.r_[0, 1, 499, 500, 7199, 7200, 21599, rng.integers(0, len(books), 200)]:
+        # 快照之间的时刻返回之前最近的快照
+        got = reader.at(books[i]["timestamp"] + 250)
+        assert got["bids"] == books[i]["bids"] and got["asks"] == books[i]["asks"]
+    assert reader.at(first, depth=5)["asks"] == books[0]["asks"][:5]
+
+    replayed = list(reader.replay())
+    assert len(replayed) == len(books)
+    assert replayed[5000]["bids"] == books[5000]["bids"]
+
+
+def test_delta_storage_is_much_smaller_than_raw_snapshots(tmp_path):
+    books = generate_orderbook(5000, depth=50, seed=2)
+    root = str(tmp_path / "delta")
+    recorder = OrderBookRecorder("binance", "BTC/USDT", root, keyframe_every=1000)
+    for book in books:
+        recorder.on_book(book)
+    recorder.flush()
+
+    raw = pd.DataFrame(
+        [
+            (b["timestamp"], side, level, p, a)
+            for b in books
+            for side, levels in ((1, b["bids"]), (-1, b["asks"]))
+            for level, (p, a) in enumerate(levels)
+        ],
+        columns=["timestamp", "side", "level", "price", "amount"],
+    )
+    raw_path = tmp_path / "raw.parquet"
+    raw.to_parquet(raw_path, compression="zstd", index=False)
+    assert os.path.getsize(raw_path) > 3 * dir_bytes(root)
+
+
+def test_migrate_keeps_fixed_point_order_book(tmp_path):
+    import pyarrow.parquet as pq
+
+    from scripts.migrate_storage import migrate
+
+    books = generate_orderbook(2000, depth=10, interval_ms=500, seed=3)
+    root = str(tmp_path / "data")
+    recorder = OrderBookRecorder("binance", "BTC/USDT", root, keyframe_every=200)
+    for book in books:
+        recorder.on_book(book)
+    recorder.flush()
+    before = dir_bytes(root)
+
+    stats = migrate(root)
+    assert stats["partitions"] > 0 and stats["rewritten"] == 0
+    assert dir_bytes(root) == before
+    for path in (tmp_path / "data" / "orderbook").rglob("*.parquet"):
+        schema = pq.read_schema(path)
+        assert str(schema.field("price").type) == "int64"
+        assert str(schema.field("amount").type) == "int64"
+    book = OrderBookReader("binance", "BTC/USDT", root).at(books[-1]["timestamp"])
+    assert book["bids"] == books[-1]["bids"]
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import pytest
+
+from backtest.paper import PaperBroker, PaperEngine, PaperStrategy
+from backtest.replay import BookEvent
+
+
+class BuyThenSell(PaperStrategy):
+    """Market buy on the first book, then a resting limit sell above the market."""
+
+    def on_start(self):
+        self.books = 0
+        self.fill_log = []
+
+    def on_book(self, event):
+        self.books += 1
+        if self.books == 1:
+            self.broker.buy(event.exchange, event.symbol, 1.5)
+        elif self.books == 2:
+            self.broker.sell(event.exchange, event.symbol, 1.5, price=103.0)
+
+    def on_fill(self, fill):
+        self.fill_log.append((fill.timestamp, fill.price, fill.amount, fill.taker))
+
+
+def books(exchange="okx"):
+    return [
+        BookEvent(0, "BTC/USDT", [[99.0, 1.0]], [[100.0, 1.0], [101.0, 2.0]], exchange),
+        BookEvent(100, "BTC/USDT", [[101.0, 1.0]], [[102.0, 5.0]], exchange),
+        BookEvent(200, "BTC/USDT", [[104.0, 3.0]], [[105.0, 1.0]], exchange),
+    ]
+
+
+def test_fills_with_latency_fees_and_pnl():
+    strategy = BuyThenSell()
+    engine = PaperEngine(strategy, PaperBroker(latency=0.05), budget=1.0)
+    report = engine.run(iter(books()))
+
+    # 买单 50ms 后到达, 按 t=0 的订单簿逐档吃单; 卖单挂在103, 被 t=200 的买盘穿过
+    assert strategy.fill_log == [
+        (50.0, 100.0, 1.0, True),
+        (50.0, 101.0, 0.5, True),
+        (200, 103.0, 1.5, False),
+    ]
+    pnl = report["pnl"]["okx"]
+    assert pnl["realized"] == pytest.approx(1.5 * 103 - 150.5)
+    # okx: taker 0.05%, maker 0.02%
+    assert pnl["fees"] == pytest.approx(150.5 * 0.0005 + 154.5 * 0.0002)
+    assert engine.broker.position("okx", "BTC/USDT").qty == 0.0
+    assert report["events"] == 3
+    assert report["latency"]["count"] == 3
+    assert report["latency"]["over_budget"] == 0
+
+
+def test_run_live_on_recorded_websocket(tmp_path):
+    key = json.dumps(["watch_order_book", ["BTC/USDT"], {}], sort_keys=True)
+    with open(tmp_path / "binance.pro.jsonl", "w") as f:
+        f.write(json.dumps({"type": "header", "id": "binance"}) + "\n")
+        for e in books("binance"):
+            ob = {"timestamp": e.timestamp, "bids": e.bids, "asks": e.asks}
+            record = {"type": "call", "key": key, "t": 0, "latency": 0, "result": ob}
+            f.write(json.dumps(record) + "\n")
+
+    strategy = BuyThenSell()
+    engine = PaperEngine(strategy, PaperBroker(latency=0.05))
+    report = asyncio.run(
+        engine.run_live(
+            exchanges=["binance"],
+            symbols=["BTC/USDT"],
+            duration=0.2,
+            trades=False,
+            mode="replay",
+            recording_dir=str(tmp_path),
+        )
+    )
+    assert report["events"] == 3
+    assert report["queue_delay"]["count"] == 3
+    assert len(strategy.fill_log) == 3
+    assert report["pnl"]["binance"]["realized"] == pytest.approx(4.0)
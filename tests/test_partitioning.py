@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from data_processor.loader import iter_parquet_batches, load_from_parquet
+from data_processor.partitioning import read_scheme, scheme_for
+from data_processor.writer import save_to_parquet
+
+
+def test_scheme_follows_timeframe_and_volume():
+    assert scheme_for("1m").name == "daily"
+    assert scheme_for("1s").name == "daily"
+    assert scheme_for("tick", daily_rows=20_000_000).name == "hourly"
+    assert scheme_for("1h").name == "yearly"
+    assert scheme_for("1d").name == "yearly"
+
+
+def test_yearly_partitions_prune_by_date(tmp_path):
+    ts = pd.date_range("2022-01-01", "2024-12-31", freq="D")
+    df = pd.DataFrame(
+        {
+            "timestamp": ts.as_unit("ms").asi8,
+            "open": 1.0,
+            "high": 1.0,
+            "low": 1.0,
+            "close": np.arange(len(ts), dtype=float),
+            "volume": 1.0,
+        }
+    )
+    save_to_parquet(df, "ohlcv", "binance", "BTC/USDT", "1d", data_root=str(tmp_path))
+    base = tmp_path / "ohlcv" / "binance" / "1d" / "BTC_USDT"
+    assert sorted(p.name for p in base.glob("date=*")) == [
+        "date=2022",
+        "date=2023",
+        "date=2024",
+    ]
+    assert read_scheme(str(base)).name == "yearly"
+
+    args = (str(tmp_path), "ohlcv", "binance", "1d", "BTC/USDT")
+    got = load_from_parquet(*args, "2023-05-01", "2023-06-30", use_cache=False)
+    assert len(got) == 61
+    assert got["datetime"].iloc[0] == pd.Timestamp("2023-05-01")
+    assert got["datetime"].iloc[-1] == pd.Timestamp("2023-06-30")
+
+    batches = iter_parquet_batches(
+        *args, "2023-05-01", "2023-06-30", columns=["timestamp", "close"]
+    )
+    assert sum(b.num_rows for b in batches) == 61
+
+
+def test_incremental_write_keeps_yearly_partition(tmp_path):
+    ts = pd.date_range("2025-01-01", periods=283, freq="D")
+    df = pd.DataFrame(
+        {
+            "timestamp": ts.as_unit("ms").asi8,
+            "open": 1.0,
+            "high": 1.0,
+            "low": 1.0,
+            "close": np.arange(len(ts), dtype=float),
+            "volume": 1.0,
+        }
+    )
+    args = ("ohlcv", "binance", "BTC/USDT", "1d")
+    save_to_parquet(df.copy(), *args, data_root=str(tmp_path))
+    tail = df.tail(2).copy()
+    tail["close"] = -1.0
+    save_to_parquet(tail, *args, data_root=str(tmp_path))
+
+    got = load_from_parquet(
+        str(tmp_path), "ohlcv", "binance", "1d", "BTC/USDT", use_cache=False
+    )
+    assert len(got) == 283
+    assert got["timestamp"].is_monotonic_increasing
+    assert (got["close"].iloc[-2:] == -1.0).all()
+    assert got["close"].iloc[:-2].tolist() == df["close"].iloc[:-2].tolist()
@@ -0,0 +1,22 @@
+from backtest.runner import run_backtest
+from backtest.profiling import BacktestProfiler
+from benchmarks.synthetic import generate_ohlcv
+from data_processor.feed import ArrowData
+from strategy.trendance import sma_cross
+
+
+def test_profiled_run_matches_plain_run():
+    df = generate_ohlcv(5000, seed=3)
+    plain = run_backtest(sma_cross.SmaCrossStrategy, ArrowData(dataname=df))
+    profiled = run_backtest(
+        sma_cross.SmaCrossStrategy,
+        ArrowData(dataname=df),
+        profile=BacktestProfiler(sample_interval=0.001),
+    )
+
+    assert profiled.metrics == plain.metrics
+    report = profiled.profile
+    assert report.strategy == "SmaCrossStrategy"
+    assert report.calls["next"]["count"] == report.bars - 14
+    assert report.calls["notify_order"]["count"] > 0
+    assert abs(sum(report.phases.values()) - report.total_seconds) < 1e-6
@@ -0,0 +1,50 @@
+import pandas as pd
+import pyarrow.compute as pc
+import pytest
+
+from benchmarks.synthetic import generate_ohlcv
+from data_processor import schema
+from data_processor.query import scan
+from data_processor.writer import save_to_parquet
+
+
+def bars(days, price):
+    # 价格不变, 每根bar的 high - low 都是 2.0
+    df = generate_ohlcv(days * 1440, start="2023-11-15", price=price, vol=0.0)
+    return df.assign(high=price + 1.25, low=price - 0.75)
+
+
+def test_scan_aggregates_across_symbols_and_layouts(tmp_path, monkeypatch):
+    # ETH 按定点整数存储, 其余为 float64
+    monkeypatch.setitem(
+        schema.MARKET_PRECISION, ("okx", "ETH/USDT"), {"price": 2, "amount": 3}
+    )
+    root = str(tmp_path)
+    for exchange, symbol, price in [
+        ("binance", "BTC/USDT", 100.0),
+        ("okx", "ETH/USDT", 10.0),
+        ("okx", "BTC/USD", 50.0),
+    ]:
+        save_to_parquet(bars(3, price), "ohlcv_1m", exchange, symbol, "1m", root)
+
+    table = scan(
+        root,
+        "ohlcv_1m",
+        ["exchange", "symbol", "high", "low", "datetime"],
+        symbols="*/USDT",
+        start_date="2023-11-16",
+    )
+    assert table.num_rows == 2 * 2 * 1440
+    assert table.column_names == ["exchange", "symbol", "high", "low", "datetime"]
+    table = table.append_column("range", pc.subtract(table["high"], table["low"]))
+    ranges = table.group_by("symbol").aggregate([("range", "mean")]).to_pydict()
+    assert dict(zip(ranges["symbol"], ranges["range_mean"])) == {
+        "BTC_USDT": 2.0,
+        "ETH_USDT": 2.0,
+    }
+    assert pc.min(table["datetime"]).as_py() == pd.Timestamp("2023-11-16")
+
+    day = scan(root, "ohlcv_1m", ["date"], filter=pc.field("date") == "2023-11-15")
+    assert day.num_rows == 3 * 1440
+    with pytest.raises(ValueError):
+        scan(root, "ohlcv_1m", filter=pc.field("close") > 1)
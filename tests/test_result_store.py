@@ -0,0 +1,59 @@
+import pandas as pd
+
+from benchmarks.synthetic import generate_ohlcv
+from backtest.result_store import ResultStore, run_key
+from backtest.runner import run_backtest, normalize_broker
+from strategy.trendance import sma_cross
+
+
+def test_run_key_ignores_param_order_and_printlog():
+    broker = normalize_broker()
+    k1 = run_key(sma_cross.SmaCrossStrategy, {"maperiod": 15}, "abc", broker)
+    k2 = run_key(
+        sma_cross.SmaCrossStrategy, {"printlog": True, "maperiod": 15}, "abc", broker
+    )
+    k3 = run_key(sma_cross.SmaCrossStrategy, {"maperiod": 20}, "abc", broker)
+    k4 = run_key(
+        sma_cross.SmaCrossStrategy,
+        {"maperiod": 15},
+        "abc",
+        normalize_broker({"commission": 0.001}),
+    )
+    assert k1 == k2
+    assert len({k1, k3, k4}) == 3
+
+
+def test_result_store_cache_hit(tmp_path):
+    df = generate_ohlcv(600, start="2025-10-01", price=100.0, vol=0.002)
+    store = ResultStore(root=str(tmp_path))
+    loads = []
+
+    def load_data():
+        loads.append(1)
+        return df
+
+    first = run_backtest(
+        sma_cross.SmaCrossStrategy,
+        load_data,
+        params={"maperiod": 15},
+        store=store,
+        data_fingerprint="fixture-v1",
+    )
+    assert not first.cached
+    assert len(first.equity) == len(df)
+
+    second = run_backtest(
+        sma_cross.SmaCrossStrategy,
+        load_data,
+        params={"maperiod": 15},
+        store=ResultStore(root=str(tmp_path)),
+        data_fingerprint="fixture-v1",
+    )
+    assert second.cached
+    assert len(loads) == 1
+    assert second.key == first.key
+    assert second.metrics["final_value"] == first.metrics["final_value"]
+    pd.testing.assert_frame_equal(second.trades, first.trades)
+
+    runs = store.query(strategy="SmaCrossStrategy")
+    assert list(runs["key"]) == [first.key]
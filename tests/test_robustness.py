@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from backtest.robustness import (
+    PATH_METHODS,
+    bar_shapes,
+    build_ohlc,
+    distribution,
+    path_rng,
+    run_paths,
+    shuffle_trades,
+)
+from benchmarks.synthetic import generate_ohlcv
+from strategy.trendance.macd import MacdStrategy
+
+
+def test_paths_are_valid_bars_and_results_do_not_depend_on_workers():
+    df = generate_ohlcv(2000, timeframe_ms=3_600_000, seed=3)
+    ohlc = df[["open", "high", "low", "close"]].to_numpy()
+    shapes = bar_shapes(ohlc)
+    np.testing.assert_allclose(build_ohlc(ohlc[0, 3], shapes), ohlc[1:], rtol=1e-9)
+    for method, make_path in PATH_METHODS.items():
+        path = make_path(ohlc, shapes, path_rng(0, 1))
+        o, h, l, c = path.T
+        assert (h >= np.maximum(o, c) - 1e-9).all() and (
+            l <= np.minimum(o, c) + 1e-9
+        ).all()
+
+    kwargs = dict(params={"fast_period": 6, "slow_period": 13}, n_paths=6, seed=7)
+    serial = run_paths(df, MacdStrategy, workers=1, block=48, **kwargs)
+    parallel = run_paths(df, "MacdStrategy", workers=2, block=48, **kwargs)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert serial["n_trades"].min() > 0
+    assert serial["total_return"].nunique() == 6
+    assert set(distribution(serial).columns) >= {"mean", "p5", "p95", "p_loss"}
+
+
+def test_shuffle_trades_keeps_final_return():
+    trades = pd.DataFrame({"pnlcomm": [50.0, -120.0, 30.0, -10.0, 80.0]})
+    out = shuffle_trades(trades, 1000.0, n_paths=200, seed=1)
+    np.testing.assert_allclose(out["total_return"], 0.03)
+    # 最坏的顺序: 先连续亏损 130
+    assert np.isclose(out["max_drawdown"].max(), 130 / 1000)
+    assert out["max_drawdown"].min() < out["max_drawdown"].max()
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from benchmarks.synthetic import generate_ohlcv
+from data_processor.loader import load_from_parquet
+from data_processor.schema import POLICIES, encode, read_frame, to_bytes
+from data_processor.writer import save_to_parquet
+from scripts.migrate_storage import migrate
+
+
+def make_bars(n=3 * 1440):
+    # 价格2位小数, 数量4位小数, 定点整数存储时无损
+    df = generate_ohlcv(n, start="2025-10-01", price=100.0, seed=3)
+    return df.round({"open": 2, "high": 2, "low": 2, "close": 2, "volume": 4})
+
+
+def test_scaled_prices_roundtrip_and_bytes_are_reproducible(tmp_path):
+    df = make_bars(1440)
+    policy = POLICIES["ohlcv"].with_precision(price=2, amount=4)
+    shuffled = df.sample(frac=1.0, random_state=0)
+    assert to_bytes(encode(df, policy), policy) == to_bytes(
+        encode(shuffled, policy), policy
+    )
+
+    path = tmp_path / "part.parquet"
+    path.write_bytes(to_bytes(encode(df, policy), policy))
+    back = read_frame(str(path))
+    assert back.columns.tolist() == df.columns.tolist()
+    for col in ["open", "close", "volume"]:
+        assert back[col].tolist() == df[col].tolist()
+    assert (back["datetime"] == df["datetime"]).all()
+
+
+def test_migrate_legacy_partitions(tmp_path):
+    df = make_bars()
+    base = tmp_path / "ohlcv" / "binance" / "1m" / "BTC_USDT"
+    legacy = df.assign(date=df["datetime"].dt.strftime("%Y-%m-%d"))
+    legacy.to_parquet(base, engine="fastparquet", partition_cols=["date"])
+    args = (str(tmp_path), "ohlcv", "binance", "1m", "BTC/USDT")
+    expected = load_from_parquet(*args, use_cache=False)
+
+    stats = migrate(str(tmp_path))
+    assert stats["rewritten"] == stats["partitions"] == 3
+    assert stats["bytes_after"] < stats["bytes_before"]
+    assert not (base / "_metadata").exists()
+    migrated = load_from_parquet(*args, use_cache=False)
+    pd.testing.assert_frame_equal(migrated, expected, check_dtype=False)
+
+    # 逐字节可复现: 再次迁移或重新写入都不改变文件
+    assert migrate(str(tmp_path))["rewritten"] == 0
+    save_to_parquet(df.copy(), "ohlcv", "binance", "BTC/USDT", data_root=str(tmp_path))
+    assert migrate(str(tmp_path))["rewritten"] == 0
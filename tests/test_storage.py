@@ -0,0 +1,54 @@
+import io
+import uuid
+
+import fsspec
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from benchmarks.synthetic import generate_ohlcv
+from data_processor.loader import load_from_parquet
+from data_processor.storage import FsspecStorage
+from data_processor.writer import save_to_parquet
+
+
+def bars(days):
+    return generate_ohlcv(days * 1440, start="2023-11-15", price=100.0)
+
+
+def test_memory_filesystem_round_trip_matches_local(tmp_path):
+    remote = f"memory://{uuid.uuid4().hex}/data"
+    for root in (str(tmp_path), remote):
+        save_to_parquet(bars(3), "ohlcv_1m", "binance", "BTC/USDT", "1m", root)
+
+    args = ("ohlcv_1m", "binance", "1m", "BTC/USDT", "2023-11-16", None)
+    local = load_from_parquet(str(tmp_path), *args, use_cache=False)
+    loaded = load_from_parquet(remote, *args, use_cache=False)
+    pd.testing.assert_frame_equal(loaded, local)
+    assert len(loaded) == 2 * 1440
+
+
+def test_ranged_reads_footer_cache_and_disk_cache(tmp_path):
+    fs = fsspec.filesystem("memory")
+    path = f"/{uuid.uuid4().hex}/part.0.parquet"
+    rng = np.random.default_rng(0)
+    table = pa.table({c: rng.random(200_000) for c in "abcd"})
+    buf = io.BytesIO()
+    pq.write_table(table, buf, row_group_size=50_000, compression="none")
+    fs.pipe_file(path, buf.getvalue())
+    size = len(buf.getvalue())
+
+    storage = FsspecStorage(fs, max_workers=4)
+    got = storage.open_parquet(path, columns=["b"]).read(columns=["b"])
+    assert got.equals(table.select(["b"]))
+    # 只请求了一列的数据, 4个行组并发请求
+    assert storage.stats["bytes"] < size / 2
+    storage.open_parquet(path, columns=["b"]).read(columns=["b"])
+    assert storage.stats["footer_hits"] == 1
+
+    cached = FsspecStorage(fs, cache_dir=str(tmp_path))
+    first = cached.open_parquet(path).read()
+    requests = cached.stats["requests"]
+    assert cached.open_parquet(path).read().equals(first)
+    assert cached.stats["requests"] == requests and cached.stats["disk_hits"] == 1
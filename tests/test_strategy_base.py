@@ -0,0 +1,39 @@
+import numpy as np
+import backtrader as bt
+
+from backtest.analyzers import TradeList
+from strategy import discover_strategies
+from benchmarks.synthetic import generate_ohlcv
+from data_processor.feed import ArrowData
+from strategy.trendance.sma_cross import SmaCrossStrategy
+
+
+class TinyBufferSma(SmaCrossStrategy):
+    # forces the trade array to grow several times
+    trade_capacity = 1
+
+
+def test_trade_record_matches_trade_analyzer():
+    cerebro = bt.Cerebro()
+    cerebro.addstrategy(TinyBufferSma)
+    cerebro.adddata(ArrowData(dataname=generate_ohlcv(5000, seed=7)))
+    cerebro.broker.setcash(100000.0)
+    cerebro.addsizer(bt.sizers.FixedSize, stake=0.001)
+    cerebro.addanalyzer(TradeList, _name="trades")
+    strat = cerebro.run(maxcpus=1)[0]
+
+    record = strat.trade_record()
+    expected = strat.analyzers.trades.get_analysis()
+    assert len(record["pnl"]) == len(expected["pnl"]) > 10
+    for name, values in expected.items():
+        np.testing.assert_allclose(record[name], values)
+
+
+def test_all_strategies_run():
+    df = generate_ohlcv(3000, seed=11)
+    for name, strategy in discover_strategies().items():
+        cerebro = bt.Cerebro()
+        cerebro.addstrategy(strategy)
+        cerebro.adddata(ArrowData(dataname=df))
+        strat = cerebro.run(maxcpus=1)[0]
+        assert strat.order is None or strat.order.alive(), name
@@ -0,0 +1,136 @@
+import asyncio
+
+import ccxt
+
+from data_fetcher.health import StreamMonitor, supervise
+from utils import instrumentation
+
+
+class FakeExchange:
+    """按脚本返回消息的 ccxt.pro 交易所; 脚本中的异常会被抛出, None 表示一直没有消息"""
+
+    def __init__(self, books=(), trades=(), rest_trades=()):
+        self.books = list(books)
+        self.trades = list(trades)
+        self.rest_trades = list(rest_trades)
+        self.closed = 0
+
+    async def _next(self, script):
+        item = script.pop(0) if script else None
+        if item is None:
+            await asyncio.sleep(3600)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def watch_order_book(self, symbol):
+        return await self._next(self.books)
+
+    async def watch_trades(self, symbol):
+        return await self._next(self.trades)
+
+    async def fetch_order_book(self, symbol):
+        return {"bids": [], "asks": [], "nonce": 1000, "timestamp": None}
+
+    async def fetch_trades(self, symbol, since=None):
+        return [t for t in self.rest_trades if t["timestamp"] >= since]
+
+    async def close(self):
+        self.closed += 1
+
+
+def run(channel, exchange, monitor, n_messages):
+    received = []
+
+    async def main():
+        done = asyncio.Event()
+
+        def handle(symbol, message):
+            received.append(message)
+            if len(received) == n_messages:
+                done.set()
+
+        task = asyncio.ensure_future(
+            supervise("binance", channel, handle, monitor, ["BTC/USDT"], exchange)
+        )
+        await asyncio.wait_for(done.wait(), 5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+    return received
+
+
+def trade(i, ts):
+    return {"id": str(i), "timestamp": ts, "price": 1.0, "amount": 1.0}
+
+
+def test_gaps_trigger_rest_resync():
+    monitor = StreamMonitor(backoff=(0.0, 0.0))
+    exchange = FakeExchange(
+        trades=[
+            [trade(1, 1000), trade(2, 1001)],
+            [trade(6, 1005)],  # 3..5 丢失
+            ccxt.NetworkError("disconnected"),
+            [trade(7, 1006)],
+        ],
+        rest_trades=[trade(i, 1000 + i - 1) for i in range(1, 8)],
+    )
+    batches = run("trades", exchange, monitor, 3)
+    assert [[int(t["id"]) for t in b] for b in batches] == [[1, 2], [3, 4, 5, 6], [7]]
+
+    book = {"bids": [[1.0, 1.0]], "asks": [[2.0, 1.0]], "timestamp": None}
+    exchange = FakeExchange(
+        books=[
+            {**book, "nonce": 10},
+            {**book, "nonce": 5},  # nonce 回退
+            ccxt.InvalidNonce("out of order"),
+            {**book, "nonce": 1001},
+        ]
+    )
+    books = run("orderbook", exchange, monitor, 4)
+    assert [b["nonce"] for b in books] == [10, 1000, 1000, 1001]
+    assert exchange.closed == 3  # 两次重新同步 + 退出时关闭
+
+    rows = {(r["channel"]): r for r in monitor.report()}
+    assert rows["trades"]["gaps"] == 1 and rows["trades"]["missing"] == 3
+    assert rows["trades"]["errors"] == 1 and rows["trades"]["reconnects"] == 1
+    assert rows["orderbook"]["gaps"] == 2
+
+
+def test_stale_stream_resubscribes_and_stats_are_exported(tmp_path):
+    now = [1_000.0]
+    monitor = StreamMonitor(
+        stale_after={"orderbook": 0.05}, rate_window=10.0, clock=lambda: now[0]
+    )
+    books = [None] + [
+        {"bids": [], "asks": [], "nonce": i, "timestamp": 1_000_000 - 50 * (i % 3)}
+        for i in range(300)
+    ]
+    exchange = FakeExchange(books=books)
+    run("orderbook", exchange, monitor, 300)
+    assert exchange.closed >= 1
+
+    (row,) = monitor.report()
+    assert row["messages"] == 300 and row["reconnects"] == 1
+    assert 0.0 <= row["lag_p50"] <= 0.06 and 0.09 <= row["lag_p99"] <= 0.11
+    # 时钟不动时所有消息同时到达; 60秒后速率衰减
+    assert abs(row["rate"] - 30.0) < 1e-9
+    now[0] += 60.0
+    (row,) = monitor.report()
+    assert row["stale"] and row["stale_seconds"] == 60.0 and row["rate"] < 0.1
+
+    path = tmp_path / "metrics.prom"
+    instrumentation.REGISTRY.reset()
+    instrumentation.enable(str(path))
+    try:
+        monitor.publish()
+        assert instrumentation.export()
+    finally:
+        instrumentation.disable()
+        instrumentation.REGISTRY.export_path = None
+    text = path.read_text()
+    assert 'ws_stale_seconds{channel="orderbook",exchange="binance"' in text
+    assert (
+        'ws_lag_seconds{channel="orderbook",exchange="binance",quantile="0.99"' in text
+    )
@@ -0,0 +1,99 @@
+import numpy as np
+import backtrader as bt
+
+from benchmarks.synthetic import generate_ohlcv
+from data_processor.bar_builder import BarBuilder
+from data_processor.feed import ArrowData
+from indicators import streaming
+
+
+class Collect(bt.Strategy):
+    def __init__(self):
+        d = self.data
+        self.ind = {
+            "sma": bt.ind.SMA(d, period=15),
+            "ema": bt.ind.EMA(d, period=20),
+            "macd": bt.ind.MACD(d),
+            "rsi": bt.ind.RSI(d, period=14, safediv=True),
+            "rsi_sma": bt.ind.RSI_SMA(d, period=14, safediv=True),
+            "boll": bt.ind.BollingerBands(d, period=20, devfactor=2.0),
+            "stoch": bt.ind.Stochastic(d, period=14, safediv=True),
+        }
+
+
+def lines(ind, *names):
+    return [np.array(getattr(ind.lines, n).array) for n in names]
+
+
+def test_streaming_indicators_match_backtrader():
+    df = generate_ohlcv(3000, seed=5)
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.addstrategy(Collect)
+    cerebro.adddata(ArrowData(dataname=df))
+    ind = cerebro.run(maxcpus=1)[0].ind
+
+    live = {
+        "sma": streaming.SMA(15),
+        "ema": streaming.EMA(20),
+        "macd": streaming.MACD(),
+        "rsi": streaming.RSI(14, safediv=True),
+        "rsi_sma": streaming.RSI(14, movav="sma", safediv=True),
+        "boll": streaming.BollingerBands(20, 2.0),
+        "stoch": streaming.Stochastic(14, safediv=True),
+    }
+    got = {k: [] for k in live}
+    for h, l, c in zip(df["high"], df["low"], df["close"]):
+        for name in ("sma", "ema", "rsi", "rsi_sma"):
+            got[name].append([live[name].update(c)])
+        got["macd"].append(live["macd"].update(c))
+        got["boll"].append(live["boll"].update(c))
+        got["stoch"].append(live["stoch"].update(h, l, c))
+
+    expected = {
+        "sma": lines(ind["sma"], "sma"),
+        "ema": lines(ind["ema"], "ema"),
+        "rsi": lines(ind["rsi"], "rsi"),
+        "rsi_sma": lines(ind["rsi_sma"], "rsi"),
+        "macd": lines(ind["macd"], "macd", "signal"),
+        "boll": lines(ind["boll"], "mid", "top", "bot"),
+        "stoch": lines(ind["stoch"], "percK", "percD"),
+    }
+    for name, cols in expected.items():
+        values = np.array(got[name], dtype=float)
+        for i, col in enumerate(cols):
+            # 逐位一致 (预热期两边都是nan)
+            np.testing.assert_array_equal(values[:, i], col, err_msg=name)
+
+
+def test_bar_builder_ohlcv_and_gap_fill():
+    bars = []
+    builder = BarBuilder("1s", on_bar=bars.append, fill_gaps=True)
+    for ts, price, amount in [
+        (0, 10.0, 1.0),
+        (300, 12.0, 2.0),
+        (900, 9.0, 1.0),
+        (1000, 11.0, 1.0),
+        (3500, 13.0, 1.0),
+    ]:
+        builder.on_trade("BTC/USDT", ts, price, amount)
+    builder.flush()
+
+    assert [tuple(b[:8]) for b in bars] == [
+        (0, "BTC/USDT", 10.0, 12.0, 9.0, 9.0, 4.0, 3),
+        (1000, "BTC/USDT", 11.0, 11.0, 11.0, 11.0, 1.0, 1),
+        (2000, "BTC/USDT", 11.0, 11.0, 11.0, 11.0, 0.0, 0),
+        (3000, "BTC/USDT", 13.0, 13.0, 13.0, 13.0, 1.0, 1),
+    ]
+
+
+def test_bar_builder_drops_trades_from_closed_bars():
+    builder = BarBuilder("1s")
+    builder.on_trade("BTC/USDT", 500, 10.0, 1.0)
+    builder.on_trade("BTC/USDT", 1200, 11.0, 1.0)
+    # 补齐缺口时拉取的上一根bar的成交晚于当前bar的成交到达
+    assert builder.on_trade("BTC/USDT", 800, 50.0, 5.0) == []
+    builder.on_trade("BTC/USDT", 1500, 10.5, 1.0)
+    (bar,) = builder.flush()
+
+    assert tuple(bar[:8]) == (1000, "BTC/USDT", 11.0, 11.0, 10.5, 10.5, 2.0, 2)
+    assert builder.late == 1
@@ -0,0 +1,276 @@
+import time
+
+import numpy as np
+
+from backtest.runner import run_backtest
+from backtest.sweep import (
+    RedisQueue,
+    SQLiteQueue,
+    run_node,
+    run_worker,
+    submit,
+    sweep_results,
+)
+from benchmarks.synthetic import generate_ohlcv
+from data_processor.loader import load_from_parquet
+from data_processor.writer import save_to_parquet
+from strategy.trendance.sma_cross import SmaCrossStrategy
+
+
+class WatchError(Exception):
+    pass
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the redis-py client: the commands RedisQueue uses,
+    pipelines and WATCH/MULTI/EXEC transactions. before_execute(pipe) runs
+    just before a transaction is applied (to inject concurrent writes or a crash).
+    """
+
+    WRITES = {"hsetnx", "hset", "hincrby", "rpush", "lpop", "zadd", "zrem", "sadd"}
+
+    def __init__(self):
+        self.data = {}
+        self.versions = {}
+        self.before_execute = None
+
+    def _get(self, key, default):
+        return self.data.setdefault(key, default)
+
+    def call(self, name, *args, **kwargs):
+        if name in self.WRITES:
+            self.versions[args[0]] = self.versions.get(args[0], 0) + 1
+        return getattr(self, "_" + name)(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("_") or not hasattr(type(self), "_" + name):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    def _hsetnx(self, key, field, value):
+        h = self._get(key, {})
+        if field in h:
+            return 0
+        h[field] = str(value)
+        return 1
+
+    def _hset(self, key, field=None, value=None, mapping=None):
+        h = self._get(key, {})
+        h.update(mapping or {field: str(value)})
+
+    def _hget(self, key, field):
+        return self.data.get(key, {}).get(str(field))
+
+    def _hincrby(self, key, field, amount):
+        h = self._get(key, {})
+        h[field] = str(int(h.get(field, 0)) + amount)
+        return int(h[field])
+
+    def _hlen(self, key):
+        return len(self.data.get(key, {}))
+
+    def _hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def _rpush(self, key, *values):
+        self._get(key, []).extend(str(v) for v in values)
+
+    def _lpop(self, key):
+        items = self.data.get(key)
+        return items.pop(0) if items else None
+
+    def _lindex(self, key, index):
+        items = self.data.get(key, [])
+        return items[index] if -len(items) <= index < len(items) else None
+
+    def _llen(self, key):
+        return len(self.data.get(key, []))
+
+    def _zadd(self, key, mapping, xx=False, ch=False):
+        z = self._get(key, {})
+        changed = 0
+        for member, score in mapping.items():
+            if xx and member not in z:
+                continue
+            changed += z.get(member) != score
+            z[member] = score
+        return changed
+
+    def _zrem(self, key, member):
+        return int(self.data.get(key, {}).pop(member, None) is not None)
+
+    def _zscore(self, key, member):
+        return self.data.get(key, {}).get(member)
+
+    def _zrangebyscore(self, key, lo, hi):
+        z = self.data.get(key, {})
+        return sorted((m for m, s in z.items() if lo <= s <= hi), key=z.get)
+
+    def _zrange(self, key, start, end):
+        z = self.data.get(key, {})
+        return sorted(z, key=z.get)
+
+    def _zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def _sadd(self, key, member):
+        self._get(key, set()).add(member)
+
+    def _scard(self, key):
+        return len(self.data.get(key, set()))
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def transaction(self, func, *watches, value_from_callable=False):
+        while True:
+            pipe = self.pipeline()
+            pipe.watch(*watches)
+            try:
+                value = func(pipe)
+                results = pipe.execute()
+            except WatchError:
+                continue
+            return value if value_from_callable else results
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.watched = None
+        self.buffering = False
+        self.commands = []
+
+    def watch(self, *keys):
+        self.watched = {k: self.redis.versions.get(k, 0) for k in keys}
+
+    def multi(self):
+        self.watched = self.watched or {}
+        self.buffering = True
+
+    def __getattr__(self, name):
+        if self.watched is not None and not self.buffering:
+            return getattr(self.redis, name)  # WATCH 之后 MULTI 之前立即执行
+
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        hook, self.redis.before_execute = self.redis.before_execute, None
+        if hook is not None and self.commands:
+            hook(self)
+        for key, version in (self.watched or {}).items():
+            if self.redis.versions.get(key, 0) != version:
+                raise WatchError(key)
+        return [self.redis.call(n, *a, **kw) for n, a, kw in self.commands]
+
+
+def make_dataset(tmp_path):
+    df = generate_ohlcv(24 * 20, timeframe_ms=3_600_000, seed=2)
+    root = str(tmp_path / "data")
+    save_to_parquet(df, "ohlcv", "binance", "BTC/USDT", "1h", root)
+    return dict(
+        data_root=root,
+        data_type="ohlcv",
+        exchange="binance",
+        timeframe="1h",
+        symbol="BTC/USDT",
+    )
+
+
+def test_sweep_recovers_dead_worker_and_dedups(tmp_path):
+    dataset = make_dataset(tmp_path)
+    queue = SQLiteQueue(str(tmp_path / "sweeps.db"), lease_seconds=0.5)
+    grid = {"maperiod": [5, 10, 15, 20]}
+    sweep_id = submit(queue, "SmaCrossStrategy", grid, dataset, chunk_size=1)
+    assert submit(queue, "SmaCrossStrategy", grid, dataset, chunk_size=1) == sweep_id
+    assert queue.progress(sweep_id)["total"] == 4
+
+    # 一个领取了块就死掉的进程, 和一个正常完成又被重复提交的块
+    assert queue.claim("dead", sweep_id)[1] == 0
+    assert run_worker(queue, sweep_id, "w1", poll_seconds=0.1) == 4
+    rows = queue.results(sweep_id)
+    # 租约已被接手/块已完成时迟到的提交被拒绝
+    assert not queue.complete(sweep_id, 0, "dead", rows[:2])
+    assert not queue.complete(sweep_id, 1, "late", rows[:2])
+
+    progress = queue.progress(sweep_id)
+    assert progress["done"] == 4 and progress["results"] == 4
+    out = sweep_results(queue, sweep_id).set_index("maperiod")
+    assert sorted(out.index) == [5, 10, 15, 20] and set(out["worker"]) == {"w1"}
+
+    df = load_from_parquet(**dataset)
+    expected = run_backtest(SmaCrossStrategy, df, params={"maperiod": 15})
+    assert np.isclose(out.loc[15, "final_value"], expected.metrics["final_value"])
+
+
+def test_failing_chunks_retry_then_fail_and_nodes_share_queue(tmp_path):
+    dataset = make_dataset(tmp_path)
+    path = str(tmp_path / "sweeps.db")
+    queue = SQLiteQueue(path, max_attempts=2)
+    bad = submit(queue, "SmaCrossStrategy", {"no_such_param": [1]}, dataset)
+    good = submit(
+        queue,
+        "SmaCrossStrategy",
+        {"maperiod": list(range(5, 17))},
+        dataset,
+        engine="kernel",
+        chunk_size=2,
+    )
+    started = time.perf_counter()
+    run_node(path, processes=2, max_attempts=2)
+    assert time.perf_counter() - started < 60
+
+    progress = queue.progress(bad)
+    assert progress["failed"] == 1 and progress["results"] == 0
+    assert queue.progress(good)["done"] == 6
+    assert sorted(sweep_results(queue, good)["maperiod"]) == list(range(5, 17))
+
+
+def test_redis_claims_are_atomic_and_expired_leases_requeue(tmp_path):
+    dataset = make_dataset(tmp_path)
+    redis = FakeRedis()
+    queue = RedisQueue(redis, lease_seconds=60, max_attempts=2)
+    grid = {"maperiod": [5, 10, 15]}
+    sweep_id = submit(queue, "SmaCrossStrategy", grid, dataset, chunk_size=1)
+
+    # 进程在 MULTI/EXEC 生效之前死掉: 块仍在 pending 中
+    def crash(pipe):
+        raise ConnectionError("worker died")
+
+    redis.before_execute = crash
+    try:
+        queue.claim("dead", sweep_id)
+    except ConnectionError:
+        pass
+    assert queue.progress(sweep_id)["pending"] == 3
+
+    # 另一个进程在 WATCH 之后抢先领走同一个块, 事务重试后领到下一个
+    redis.before_execute = lambda pipe: queue.claim("other", sweep_id)
+    assert queue.claim("w1", sweep_id)[1] == 1
+    progress = queue.progress(sweep_id)
+    assert progress["pending"] == 1 and progress["leased"] == 2
+
+    # 三个持有者都死掉, 租约过期 (把到期时间改到过去) 后块重新排队
+    assert queue.claim("dead", sweep_id)[1] == 2
+    redis.data[queue._k(sweep_id, "leases")] = dict.fromkeys(["0", "1", "2"], 0.0)
+    assert run_worker(queue, sweep_id, "w2", poll_seconds=0.01) == 3
+    progress = queue.progress(sweep_id)
+    assert progress["done"] == progress["results"] == 3 and progress["failed"] == 0
+    assert not redis.data.get(queue._k(sweep_id, "errors"))
+
+    # 死掉的持有者迟到的提交不写结果; 提交时租约被转走, 事务重试后同样拒绝
+    rows = [{"key": "stale", "params": {}, "metrics": {}}]
+    assert not queue.complete(sweep_id, 2, "dead", rows)
+    assert queue.claim("w3", sweep_id) is None
+    redis.data[queue._k(sweep_id, "leases")]["2"] = time.time() + 60
+    redis.data[queue._k(sweep_id, "owners")]["2"] = "w3"
+    redis.before_execute = lambda pipe: redis.hset(
+        queue._k(sweep_id, "owners"), "2", "w4"
+    )
+    assert not queue.complete(sweep_id, 2, "w3", rows)
+    assert queue.progress(sweep_id)["results"] == 3
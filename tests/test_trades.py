@@ -0,0 +1,148 @@
+import ccxt
+import pytest
+
+import scripts.main_etl as main_etl
+from backtest.replay import (
+    BookEvent,
+    ReplayEngine,
+    ReplayStrategy,
+    TradeEvent,
+    book_stream,
+    trade_stream,
+)
+from data_fetcher.fetch_historical import HistoricalFetcher
+from data_processor.writer import save_to_parquet
+
+START = 1696118400000  # 2023-10-01T00:00:00Z
+DAY_MS = 86_400_000
+
+
+class TradeStub:
+    """
+    Three trades in the same millisecond every 30 minutes, over three days.
+    Like real exchanges, returns at most page_size trades per request.
+    """
+
+    id = "binance"
+    has = {"fetchTrades": True}
+    rateLimit = 0
+    parse8601 = staticmethod(ccxt.Exchange.parse8601)
+
+    def __init__(self, page_size=10, numeric_ids=True):
+        self.page_size = page_size
+        self.trades = [
+            {
+                "id": str(1000 + i) if numeric_ids else f"t{i:04x}",
+                "timestamp": START + (i // 3) * 1_800_000,
+                "price": 100.0 + i,
+                "amount": 0.5,
+                "side": "buy" if i % 2 else "sell",
+            }
+            for i in range(3 * 48 * 3)
+        ]
+        self.calls = 0
+
+    def load_markets(self):
+        return {"BTC/USDT": {"symbol": "BTC/USDT"}}
+
+    def fetch_trades(self, symbol, since, limit, params):
+        self.calls += 1
+        if "fromId" in params:
+            rows = [t for t in self.trades if int(t["id"]) >= params["fromId"]]
+        else:
+            rows = [t for t in self.trades if t["timestamp"] >= since]
+        return rows[: min(limit, self.page_size)]
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = TradeStub()
+    monkeypatch.setattr(ccxt, "binance", lambda config: stub)
+    return stub
+
+
+@pytest.mark.parametrize("paginate", ["id", "timestamp"])
+def test_trade_pages_are_deduplicated_across_boundaries(stub, paginate):
+    fetcher = HistoricalFetcher("binance")
+    # 每页7笔, 同一毫秒的3笔成交会被拆到相邻两页
+    pages = list(
+        fetcher.iter_trade_history(
+            "BTC/USDT", "2023-10-01", "2023-10-03", paginate=paginate, limit=7
+        )
+    )
+    ids = [i for page in pages for i in page["id"].tolist()]
+    expected = [
+        int(t["id"]) for t in stub.trades if t["timestamp"] < START + 2 * DAY_MS
+    ]
+    assert ids == expected
+    assert len(pages) > 10 and stub.calls >= len(pages)
+
+
+def test_trades_without_numeric_ids_keep_same_millisecond_trades(monkeypatch):
+    stub = TradeStub(numeric_ids=False)
+    monkeypatch.setattr(ccxt, "binance", lambda config: stub)
+    fetcher = HistoricalFetcher("binance")
+    # 每页4笔: 同一毫秒的3笔成交分在两页, 第二页从该毫秒的开头重新返回
+    pages = fetcher.iter_trade_history("BTC/USDT", "2023-10-01", "2023-10-02", limit=4)
+    prices = [p for page in pages for p in page["price"].tolist()]
+    assert prices == [
+        t["price"] for t in stub.trades if t["timestamp"] < START + DAY_MS
+    ]
+
+
+def test_trades_beyond_a_page_in_one_millisecond_are_reported(stub, caplog):
+    fetcher = HistoricalFetcher("binance")
+    # 按时间戳翻页时, 同一毫秒超出一页的成交取不到
+    pages = fetcher.iter_trade_history("BTC/USDT", "2023-10-01", "2023-10-02", limit=2)
+    ids = [i for page in pages for i in page["id"].tolist()]
+    day = [int(t["id"]) for t in stub.trades if t["timestamp"] < START + DAY_MS]
+    assert ids == [i for n, i in enumerate(day) if n % 3 != 2]
+    skipped = [r for r in caplog.records if "are skipped" in r.getMessage()]
+    assert len(skipped) == len(day) // 3
+
+
+def test_trades_etl_flushes_each_day_and_replays_in_time_order(
+    stub, tmp_path, monkeypatch
+):
+    writes = []
+
+    def save(df, **kwargs):
+        writes.append(sorted(set(df["timestamp"] // DAY_MS)))
+        return save_to_parquet(df, **kwargs)
+
+    monkeypatch.chdir(tmp_path)  # config.DATA_ROOT_PATH 为相对路径
+    monkeypatch.setattr(main_etl, "save_to_parquet", save)
+    main_etl.run_trades_etl("binance", "BTC/USDT", "2023-10-01", "2023-10-04")
+
+    day = START // DAY_MS
+    assert writes == [[day], [day + 1], [day + 2]]
+
+    class Recorder(ReplayStrategy):
+        def __init__(self):
+            self.events = []
+
+        def on_trade(self, event):
+            self.events.append(event)
+
+        def on_book(self, event):
+            self.events.append(event)
+
+    # 订单簿快照与成交落在同一毫秒时排在成交之后 (按参数中的流顺序)
+    snapshots = [
+        {"timestamp": START + i * 3_600_000, "bids": [[1.0, 1.0]], "asks": []}
+        for i in range(72)
+    ]
+    strategy = Recorder()
+    stats = ReplayEngine(strategy).run(
+        trade_stream("binance", "BTC/USDT", batch_size=50),
+        book_stream(snapshots, "BTC/USDT"),
+    )
+
+    events = strategy.events
+    assert stats["events"] == len(events) == len(stub.trades) + len(snapshots)
+    assert [e.timestamp for e in events] == sorted(e.timestamp for e in events)
+    trades = [e.id for e in events if type(e) is TradeEvent]
+    assert trades == [int(t["id"]) for t in stub.trades]
+    for prev, event in zip(events, events[1:]):
+        if prev.timestamp == event.timestamp and type(prev) is BookEvent:
+            assert type(event) is BookEvent
@@ -0,0 +1,87 @@
+import asyncio
+
+import ccxt
+
+from data_fetcher.fetch_historical import HistoricalFetcher
+from data_fetcher.transport import RecordingExchange, ReplayExchange
+
+START = 1696118400000  # 2023-10-01T00:00:00Z
+
+
+class StubExchange:
+    """Deterministic stand-in for a ccxt exchange: 2500 one-minute candles."""
+
+    id = "binance"
+    has = {"fetchOHLCV": True}
+    rateLimit = 0
+    timeframes = {"1m": "1m"}
+    parse8601 = staticmethod(ccxt.Exchange.parse8601)
+
+    def load_markets(self):
+        return {"BTC/USDT": {"symbol": "BTC/USDT"}}
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        first = (since - START) // 60000
+        return [
+            [START + i * 60000, 1.0 + i, 2.0 + i, 0.5 + i, 1.5 + i, 10.0]
+            for i in range(first, min(first + limit, 2500))
+        ]
+
+    async def watch_ticker(self, symbol):
+        return {"symbol": symbol, "close": 42.0}
+
+
+def record(path):
+    exchange = RecordingExchange(StubExchange(), str(path))
+    fetcher = HistoricalFetcher("binance", exchange=exchange)
+    df = fetcher.fetch_all_history("BTC/USDT", "1m", "2023-10-01")
+    for _ in range(3):
+        asyncio.run(exchange.watch_ticker("BTC/USDT"))
+    asyncio.run(exchange.close())
+    return df
+
+
+def test_replay_reproduces_recorded_fetch(tmp_path):
+    path = tmp_path / "binance.jsonl"
+    expected = record(path)
+    assert len(expected) == 2500
+
+    replay = ReplayExchange(str(path), rate_limit_error_rate=0.3, seed=7)
+    fetcher = HistoricalFetcher("binance", exchange=replay, max_retries=20)
+    df = fetcher.fetch_all_history("BTC/USDT", "1m", "2023-10-01")
+    assert df.equals(expected)
+
+
+def test_replay_streams_and_exhausts(tmp_path):
+    path = tmp_path / "binance.jsonl"
+    record(path)
+    replay = ReplayExchange(str(path))
+
+    async def consume():
+        closes = []
+        try:
+            while True:
+                ticker = await replay.watch_ticker("BTC/USDT")
+                closes.append(ticker["close"])
+        except Exception as e:
+            return closes, e
+
+    closes, error = asyncio.run(consume())
+    assert closes == [42.0] * 3
+    assert "no recorded response" in str(error)
+
+
+def test_recordings_append_across_sessions(tmp_path):
+    path = tmp_path / "binance.jsonl"
+    expected = record(path)
+    record(path)  # 同一会话中的第二次 ETL 不会覆盖第一次的录制
+
+    replay = ReplayExchange(str(path))
+    for _ in range(2):
+        fetcher = HistoricalFetcher("binance", exchange=replay)
+        assert fetcher.fetch_all_history("BTC/USDT", "1m", "2023-10-01").equals(
+            expected
+        )
+
+    asyncio.run(RecordingExchange(StubExchange(), str(path), overwrite=True).close())
+    assert path.read_text().count("\n") == 1  # 只剩新的header
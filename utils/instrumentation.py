@@ -0,0 +1,335 @@
+# utils/instrumentation.py
+import os
+import json
+import math
+import time
+import atexit
+import bisect
+import threading
+from contextlib import nullcontext
+
+# 秒级延迟的默认分桶 (Prometheus风格, 上界包含)
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+_NULL_TIMER = nullcontext()
+
+
+class Registry:
+    """
+    进程内的指标注册表
+    关闭时 (默认) counter()/gauge()/histogram() 不查表, 直接返回共享的空指标,
+    指标操作只做一次属性判断就返回, 开销可以忽略
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.export_path = None
+        self.export_format = "prometheus"
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = cls(self, name, help, key[1], **kwargs)
+                    self._metrics[key] = metric
+        return metric
+
+    def collect(self) -> list:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, registry, name, help, labels):
+        self._registry = registry
+        self.name = name
+        self.help = help
+        self.labels = labels
+
+    def _label_str(self, extra=()) -> str:
+        items = list(self.labels) + list(extra)
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, registry, name, help, labels):
+        super().__init__(registry, name, help, labels)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if self._registry.enabled:
+            self.value += amount
+
+    def snapshot(self) -> dict:
+        return {"value": self.value}
+
+    def prometheus(self) -> list[str]:
+        return [f"{self.name}{self._label_str()} {self.value}"]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float):
+        if self._registry.enabled:
+            self.value = value
+
+
+class Histogram(_Metric):
+    """
+    固定分桶直方图, 内存占用与观测次数无关
+    time() 返回计时上下文, 退出时记录耗时 (秒)
+    """
+
+    type = "histogram"
+
+    def __init__(self, registry, name, help, labels, buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        if self._registry.enabled:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        if not self._registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self)
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(map(str, self.buckets + (float("inf"),)), self.counts)),
+        }
+
+    def prometheus(self) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, c in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += c
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(
+                f"{self.name}_bucket{self._label_str((('le', le),))} {cumulative}"
+            )
+        lines.append(f"{self.name}_sum{self._label_str()} {self.sum}")
+        lines.append(f"{self.name}_count{self._label_str()} {self.count}")
+        return lines
+
+
+class LatencyStats:
+    """
+    耗时分布, 对数分桶 (每10倍 BUCKETS_PER_DECADE 个桶, 相对误差约12%), 内存固定
+    :param budget: 单个事件的耗时预算 (秒), 统计超预算的事件数
+    """
+
+    BUCKETS_PER_DECADE = 20
+    MIN = 1e-7  # 100ns
+    DECADES = 8  # 100ns ~ 10s
+
+    def __init__(self, budget: float = None):
+        self.budget = budget
+        self.counts = [0] * (self.BUCKETS_PER_DECADE * self.DECADES + 2)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.over_budget = 0
+
+    def observe(self, seconds: float):
+        if seconds <= self.MIN:
+            i = 0
+        else:
+            i = int(math.log10(seconds / self.MIN) * self.BUCKETS_PER_DECADE) + 1
+            if i >= len(self.counts):
+                i = len(self.counts) - 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if self.budget is not None and seconds > self.budget:
+            self.over_budget += 1
+
+    def quantile(self, q: float) -> float:
+        """分位数的上界估计 (所在桶的上沿, 不超过最大值)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            cumulative += c
+            if cumulative >= target and c:
+                upper = self.MIN * 10 ** (i / self.BUCKETS_PER_DECADE)
+                return min(upper, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "p999": self.quantile(0.999),
+            "max": self.max,
+            "budget": self.budget,
+            "over_budget": self.over_budget,
+        }
+
+
+class _Timer:
+    __slots__ = ("_hist", "_start")
+
+    def __init__(self, hist: Histogram):
+        self._hist = hist
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._hist.observe(time.perf_counter() - self._start)
+        return False
+
+
+REGISTRY = Registry(enabled=os.getenv("CTL_METRICS", "0") == "1")
+
+# 关闭时返回的空指标, 属于一个始终关闭的注册表, 不会被导出
+_OFF = Registry()
+_NULL_COUNTER = Counter(_OFF, "", "", ())
+_NULL_GAUGE = Gauge(_OFF, "", "", ())
+_NULL_HISTOGRAM = Histogram(_OFF, "", "", ())
+
+
+def counter(name: str, help: str = "", **labels) -> Counter:
+    if not REGISTRY.enabled:
+        return _NULL_COUNTER
+    return REGISTRY._get(Counter, name, help, labels)
+
+
+def gauge(name: str, help: str = "", **labels) -> Gauge:
+    if not REGISTRY.enabled:
+        return _NULL_GAUGE
+    return REGISTRY._get(Gauge, name, help, labels)
+
+
+def histogram(
+    name: str, help: str = "", buckets=DEFAULT_BUCKETS, **labels
+) -> Histogram:
+    if not REGISTRY.enabled:
+        return _NULL_HISTOGRAM
+    return REGISTRY._get(Histogram, name, help, labels, buckets=buckets)
+
+
+def enabled() -> bool:
+    return REGISTRY.enabled
+
+
+def enable(export_path: str = None, fmt: str = "prometheus"):
+    """
+    打开指标采集; 关闭期间取得的指标 (空指标) 之后也不会记录, 应在进程启动时调用
+    :param export_path: 进程退出时导出到该文件
+    :param fmt: 'prometheus' (文本格式) 或 'jsonl' (追加一行JSON)
+    """
+    REGISTRY.enabled = True
+    if export_path:
+        if REGISTRY.export_path is None:
+            atexit.register(export)
+        REGISTRY.export_path = export_path
+        REGISTRY.export_format = fmt
+
+
+def export() -> bool:
+    """
+    导出到 enable 时指定的文件, 长时间运行的进程 (如实时数据流) 可以定期调用
+    :return: 是否导出
+    """
+    if not REGISTRY.export_path:
+        return False
+    if REGISTRY.export_format == "prometheus":
+        export_prometheus(REGISTRY.export_path)
+    else:
+        export_jsonl(REGISTRY.export_path)
+    return True
+
+
+def disable():
+    REGISTRY.enabled = False
+
+
+def export_prometheus(path: str):
+    """
+    以Prometheus文本格式写出全部指标 (可被node_exporter的textfile collector读取)
+    """
+    lines = []
+    seen = set()
+    for metric in sorted(REGISTRY.collect(), key=lambda m: (m.name, m.labels)):
+        if metric.name not in seen:
+            seen.add(metric.name)
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(metric.prometheus())
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+
+def export_jsonl(path: str):
+    """
+    把当前全部指标作为一行JSON追加到文件
+    """
+    record = {
+        "ts": time.time(),
+        "metrics": [
+            {"name": m.name, "type": m.type, "labels": dict(m.labels), **m.snapshot()}
+            for m in REGISTRY.collect()
+        ],
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+if os.getenv("CTL_METRICS_FILE"):
+    enable(os.getenv("CTL_METRICS_FILE"), os.getenv("CTL_METRICS_FORMAT", "prometheus"))
@@ -1,26 +1,52 @@
 # utils/logger.py
 import os
 import sys
+import queue
+import atexit
 import logging
+import logging.handlers
 import datetime
 
+_listener = None
+_log_file = None
+
 
 def setup_logger(name=None, log_dir="logs"):
-    """Configure and return a logger."""
-    os.makedirs(log_dir, exist_ok=True)
-    log_file = os.path.join(
-        log_dir, f"backtest_{datetime.datetime.now():%Y%m%d_%H%M%S}.log"
-    )
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-        handlers=[
-            logging.FileHandler(log_file, mode="w", encoding="utf-8"),
-            logging.StreamHandler(sys.stdout),
-        ],
-    )
+    """Configure and return a logger.
+
+    Handlers are installed once per process: the root logger gets a
+    QueueHandler, and a background QueueListener writes to the log file and
+    stdout, so logging calls on hot paths never block on I/O.
+
+    There is one log file per process, named after the first call's ``name``
+    and ``log_dir``. Later calls (with any name) just return the named
+    logger, whose records go to that same file.
+    """
+    global _listener, _log_file
+
+    if _listener is None:
+        os.makedirs(log_dir, exist_ok=True)
+        _log_file = os.path.join(
+            log_dir, f"{name or 'app'}_{datetime.datetime.now():%Y%m%d_%H%M%S}.log"
+        )
+
+        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+        file_handler = logging.FileHandler(_log_file, mode="w", encoding="utf-8")
+        stream_handler = logging.StreamHandler(sys.stdout)
+        for handler in (file_handler, stream_handler):
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(
+            log_queue, file_handler, stream_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger()
+        root.setLevel(logging.INFO)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
 
     logger = logging.getLogger(name)
-    logger.info(f"Logger initialized. Logs will be saved to: {log_file}")
+    logger.info(f"Logger initialized. Logs will be saved to: {_log_file}")
     return logger